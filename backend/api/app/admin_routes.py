@@ -10,7 +10,7 @@ from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
-from sqlalchemy import desc, func, or_, select
+from sqlalchemy import desc, func, or_, select, tuple_
 from sqlalchemy.orm import aliased
 from sqlalchemy.ext.asyncio import AsyncSession
 from geoalchemy2.functions import ST_X, ST_Y
@@ -20,13 +20,17 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common'))
 from common.database import get_db
 from common.models import (
-	AnnotationModeration, ContactMessage, FlaggedPhoto, Photo, PhotoAnnotation, PhotoModerationAudit,
+	ActivityEvent, AnnotationModeration, ContactMessage, FlaggedPhoto, Photo, PhotoAnnotation,
 	User, UserModeration, UserRole,
 )
 from auth import require_admin, require_moderator
+from common.utc import format_utc
 from push_notifications import create_notification_for_user
+import photo_counts
 
 ANNOTATION_EVENT_TYPES = ('created', 'updated', 'deleted')
+# activity_events rows read per round trip while squashing a feed page
+ACTIVITY_CHUNK = 500
 
 
 def _role_str(role) -> Optional[str]:
@@ -621,99 +625,107 @@ def _activity_link(kind: str, count: int, ctx: dict) -> Optional[str]:
 	return None
 
 
+@router.post("/photo-counts/repair")
+async def repair_photo_counts(
+	owner_id: Optional[str] = None,
+	current_user: User = Depends(require_admin()),
+	db: AsyncSession = Depends(get_db),
+):
+	"""Verify the per-owner photo status counters against photos now (all
+	owners, or one) and fix any drift. The same check runs periodically."""
+	drift = await photo_counts.repair(db, owner_id)
+	await db.commit()
+	return {"repaired": len(drift), "drift": drift}
+
+
+async def _activity_current(db: AsyncSession, events) -> dict:
+	"""Where the source rows of a chunk of contact, flag and upload events stand
+	now: (kind, ref_id) -> current event_type, or None if the row is gone (an
+	upload also counts as gone once deleted). The log only records inserts; the
+	feed shows each message's and flag's current status and hides deleted
+	uploads, as the merged feed did."""
+	ids: dict[str, set] = {}
+	for e in events:
+		if e.kind in ('contact', 'flag', 'upload'):
+			ids.setdefault(e.kind, set()).add(e.ref_id)
+	current = {(kind, ref_id): None for kind, refs in ids.items() for ref_id in refs}
+	if ids.get('contact'):
+		rows = await db.execute(select(ContactMessage.id, ContactMessage.status).where(
+			ContactMessage.id.in_([int(i) for i in ids['contact'] if i.isdigit()])))
+		current.update((('contact', str(i)), s or 'new') for i, s in rows)
+	if ids.get('flag'):
+		rows = await db.execute(select(FlaggedPhoto.id, FlaggedPhoto.resolved).where(
+			FlaggedPhoto.id.in_(ids['flag'])))
+		current.update((('flag', i), 'resolved' if r else 'open') for i, r in rows)
+	if ids.get('upload'):
+		rows = await db.execute(select(Photo.id).where(
+			Photo.id.in_(ids['upload']), Photo.deleted.is_(False)))
+		current.update((('upload', i), 'created') for i in rows.scalars())
+	return current
+
+
 @router.get("/activity")
 async def admin_activity(
 	limit: int = 50,
+	before: Optional[str] = None,
 	current_user: User = Depends(require_admin()),
 	db: AsyncSession = Depends(get_db),
 ):
-	"""Merged, reverse-chronological feed of server activity for the dashboard.
+	"""Reverse-chronological feed of server activity for the dashboard.
 
-	Merges the latest rows from each source at query time (no denormalized feed
-	table), then squashes consecutive runs of the same actor + kind + event_type
-	into a single counted row — so a burst of uploads reads as "uploaded 20
-	photos" rather than 20 lines.
+	Walks the append-only activity_events log (written by triggers on the
+	source tables, see ActivityEvent) newest first, squashing consecutive runs
+	of the same actor + kind + event_type into a single counted row — so a
+	burst of uploads reads as "uploaded 20 photos" rather than 20 lines. The
+	log only records inserts, so contact messages and flags carry their current
+	status and deleted uploads are left out (see _activity_current).
+
+	Paged by rows: ``next_cursor`` (pass back as ``before``) points just past
+	the oldest event of the last row, so a run is never split across pages.
 	"""
 	n = max(1, min(limit, 200))
-	raw: list[dict] = []
+	cursor = None
+	if before:
+		try:
+			ts, last_id = before.split('_', 1)
+			cursor = (datetime.fromisoformat(ts.replace('Z', '+00:00')), int(last_id))
+		except ValueError:
+			raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor format")
 
-	# Contact messages (submitter may be a guest → outer join to User).
-	rows = (await db.execute(
-		select(ContactMessage, User.username, User.role)
-		.join(User, ContactMessage.user_id == User.id, isouter=True)
-		.order_by(desc(ContactMessage.created_at)).limit(n)
-	)).all()
-	for m, username, role in rows:
-		raw.append({'kind': 'contact', 'id': str(m.id), 'at': m.created_at,
-			'actor': username or m.contact_info, 'actor_role': _role_str(role),
-			'event_type': m.status, 'ctx': {'contact_info': m.contact_info}})
-
-	# Moderation actions (actor/owner already snapshotted on the audit row).
-	rows = (await db.execute(
-		select(PhotoModerationAudit).order_by(desc(PhotoModerationAudit.created_at)).limit(n)
-	)).scalars().all()
-	for a in rows:
-		raw.append({'kind': 'moderation', 'id': a.id, 'at': a.created_at,
-			'actor': a.actor_username or a.actor_user_id, 'actor_role': _role_str(a.actor_role),
-			'event_type': a.action, 'ctx': {'owner': a.photo_owner_username or 'someone'}})
-
-	# Annotation events.
-	rows = (await db.execute(
-		select(PhotoAnnotation, User.username, User.role)
-		.join(User, PhotoAnnotation.user_id == User.id)
-		.order_by(desc(PhotoAnnotation.created_at)).limit(n)
-	)).all()
-	for ann, username, role in rows:
-		raw.append({'kind': 'annotation', 'id': ann.id, 'at': ann.created_at,
-			'actor': username, 'actor_role': _role_str(role),
-			'event_type': ann.event_type, 'ctx': {}})
-
-	# Flags (flagging user may be gone → outer join).
-	rows = (await db.execute(
-		select(FlaggedPhoto, User.username, User.role)
-		.join(User, FlaggedPhoto.flagging_user_id == User.id, isouter=True)
-		.order_by(desc(FlaggedPhoto.flagged_at)).limit(n)
-	)).all()
-	for f, username, role in rows:
-		raw.append({'kind': 'flag', 'id': f.id, 'at': f.flagged_at,
-			'actor': username or 'someone', 'actor_role': _role_str(role),
-			'event_type': 'resolved' if f.resolved else 'open', 'ctx': {'source': f.photo_source}})
-
-	# Uploads.
-	rows = (await db.execute(
-		select(Photo, User.username, User.role)
-		.join(User, Photo.owner_id == User.id, isouter=True)
-		.where(Photo.deleted.is_(False))
-		.order_by(desc(Photo.uploaded_at)).limit(n)
-	)).all()
-	for p, username, role in rows:
-		raw.append({'kind': 'upload', 'id': p.id, 'at': p.uploaded_at,
-			'actor': username or 'someone', 'actor_role': _role_str(role),
-			'event_type': 'created', 'ctx': {'label': p.title or p.original_filename, 'uid': f'hillview-{p.id}'}})
-
-	# User-management actions (role changes, suspensions, deletions) — denormalized
-	# snapshots on the audit row, so no joins.
-	rows = (await db.execute(
-		select(UserModeration).order_by(desc(UserModeration.created_at)).limit(n)
-	)).scalars().all()
-	for u in rows:
-		raw.append({'kind': 'user', 'id': u.id, 'at': u.created_at,
-			'actor': u.actor_username or u.actor_user_id, 'actor_role': _role_str(u.actor_role),
-			'event_type': u.action,
-			'ctx': {'target': u.target_username or 'a user', 'new_role': u.new_role, 'old_role': u.old_role}})
-
-	# Newest first (guard against a stray NULL timestamp).
-	raw.sort(key=lambda e: e['at'].timestamp() if e['at'] else 0.0, reverse=True)
-
-	# Squash consecutive same-actor/kind/event_type runs into counted rows.
+	# Read the log in chunks until one row more than a page has started: that
+	# proves the last returned run is complete.
 	groups: list[dict] = []
-	for e in raw:
-		last = groups[-1] if groups else None
-		if last and last['kind'] == e['kind'] and last['actor'] == e['actor'] and last['event_type'] == e['event_type']:
-			last['count'] += 1
-			last['since'] = e['at']  # oldest so far in the run
-		else:
-			groups.append({**e, 'count': 1, 'since': e['at']})
+	while len(groups) <= n:
+		query = select(ActivityEvent).order_by(desc(ActivityEvent.at), desc(ActivityEvent.id)).limit(ACTIVITY_CHUNK)
+		if cursor:
+			query = query.where(tuple_(ActivityEvent.at, ActivityEvent.id) < tuple_(*cursor))
+		events = (await db.execute(query)).scalars().all()
+		current = await _activity_current(db, events)
+		for e in events:
+			event_type = current.get((e.kind, e.ref_id), e.event_type)
+			if event_type is None and (e.kind, e.ref_id) in current:
+				continue  # source row deleted since
+			last = groups[-1] if groups else None
+			if last and last['kind'] == e.kind and last['actor'] == e.actor and last['event_type'] == event_type:
+				last['count'] += 1
+				last['since'] = e.at  # oldest so far in the run
+				last['since_id'] = e.id
+			else:
+				if len(groups) == n:
+					groups.append(None)  # a further row starts: page is complete
+					break
+				groups.append({'kind': e.kind, 'id': e.ref_id, 'at': e.at, 'actor': e.actor,
+					'actor_role': e.actor_role, 'event_type': event_type, 'ctx': e.ctx or {},
+					'count': 1, 'since': e.at, 'since_id': e.id})
+		if len(events) < ACTIVITY_CHUNK:
+			break
+		cursor = (events[-1].at, events[-1].id)
+
+	has_more = len(groups) > n
+	groups = groups[:n]
+	next_cursor = None
+	if has_more and groups:
+		next_cursor = f"{format_utc(groups[-1]['since'])}_{groups[-1]['since_id']}"
 
 	return {
 		"events": [
@@ -729,6 +741,7 @@ async def admin_activity(
 				"summary": _activity_summary(g['kind'], g['event_type'], g['count'], g['ctx']),
 				"link": _activity_link(g['kind'], g['count'], g['ctx']),
 			}
-			for g in groups[:n]
+			for g in groups
 		],
+		"next_cursor": next_cursor,
 	}
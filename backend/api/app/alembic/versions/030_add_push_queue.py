@@ -0,0 +1,53 @@
+"""Add push_queue table for durable push fan-out
+
+The worker's save-processed-photo callback used to run the whole activity
+broadcast inline: resolve every eligible user and anonymous client, insert one
+notification each, send FCM batches and POST every UnifiedPush endpoint — all
+before the worker got its response. It now enqueues one activity_broadcast job
+here and returns; the API's push dispatcher drains the queue (resolution,
+bulk notification insert, chunked delivery with retry and backoff).
+
+ix_push_queue_due serves the dispatcher's claim query; ix_push_queue_dedupe
+(partial, unclaimed rows only) lets repeat enqueues collapse via ON CONFLICT.
+
+Revision ID: 030_push_queue
+Revises: 029_share_links
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '030_push_queue'
+down_revision: Union[str, None] = '029_share_links'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'push_queue',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('kind', sa.String(length=50), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('dedupe_key', sa.String(length=200), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('run_after', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column('locked_until', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('failed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index('ix_push_queue_due', 'push_queue', ['run_after', 'id'],
+                    postgresql_where=sa.text('failed_at IS NULL'))
+    op.create_index('ix_push_queue_dedupe', 'push_queue', ['dedupe_key'], unique=True,
+                    postgresql_where=sa.text('attempts = 0 AND dedupe_key IS NOT NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_push_queue_dedupe', table_name='push_queue')
+    op.drop_index('ix_push_queue_due', table_name='push_queue')
+    op.drop_table('push_queue')
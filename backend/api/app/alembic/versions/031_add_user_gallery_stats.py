@@ -0,0 +1,160 @@
+"""Add user_gallery_stats: per-user photo count and latest upload for GET /users/
+
+The users listing used to aggregate over the whole photos table, load every
+active user and then run one "latest photo" query per user. It now reads this
+table (one row per user) joined to users, ordered by ix_user_gallery_stats_order.
+
+Rows are kept current by triggers rather than by the routes, because photos are
+written from many places — upload authorization, the worker callback filling
+in sizes, soft and hard deletes, admin moderation, account deletion. A
+statement-level trigger per photos INSERT / UPDATE / DELETE collects the owners
+whose rows changed a counted column (owner, deleted, upload time, sizes) and
+recomputes just those users, so a bulk statement costs one recompute per owner.
+The recompute takes a per-owner advisory lock first: two concurrent uploads by
+the same user would otherwise each count without seeing the other's row.
+
+Per-viewer hiding (hidden_photos / hidden_users) is applied on read; see
+get_users in user_routes.py.
+
+Revision ID: 031_user_gallery_stats
+Revises: 030_push_queue
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '031_user_gallery_stats'
+down_revision: Union[str, None] = '030_push_queue'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_gallery_stats',
+        sa.Column('user_id', sa.String(), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('photo_count', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('latest_photo_id', sa.String(), nullable=True),
+        sa.Column('latest_photo_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('latest_photo_url', sa.Text(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index('ix_user_gallery_stats_order', 'user_gallery_stats',
+                    [sa.text('photo_count DESC'), 'user_id'])
+
+    # Recompute the given owners' rows from photos. Advisory locks in sorted
+    # order (no deadlock between two multi-owner statements); the INSERT is a
+    # separate statement, so under READ COMMITTED it sees whatever a writer we
+    # waited on has committed. The backfill below skips the locks: nothing else
+    # writes during the migration, and one lock per user would overflow the
+    # lock table on a large install.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION user_gallery_stats_refresh(owners text[], take_locks boolean DEFAULT true) RETURNS void AS $$
+        DECLARE
+            o text;
+        BEGIN
+            IF take_locks THEN
+                FOR o IN SELECT DISTINCT unnest(owners) ORDER BY 1 LOOP
+                    PERFORM pg_advisory_xact_lock(hashtext('user_gallery_stats:' || o));
+                END LOOP;
+            END IF;
+            INSERT INTO user_gallery_stats
+                (user_id, photo_count, latest_photo_id, latest_photo_at, latest_photo_url, updated_at)
+            SELECT u.id, c.n, l.id, l.uploaded_at, l.sizes -> '320' ->> 'url', now()
+            FROM users u
+            CROSS JOIN LATERAL (
+                SELECT count(*) AS n FROM photos p
+                WHERE p.owner_id = u.id AND p.deleted = false) c
+            LEFT JOIN LATERAL (
+                SELECT p.id, p.uploaded_at, p.sizes FROM photos p
+                WHERE p.owner_id = u.id AND p.deleted = false
+                ORDER BY p.uploaded_at DESC NULLS LAST, p.id DESC LIMIT 1) l ON true
+            WHERE u.id = ANY(owners)
+            ON CONFLICT (user_id) DO UPDATE SET
+                photo_count = EXCLUDED.photo_count,
+                latest_photo_id = EXCLUDED.latest_photo_id,
+                latest_photo_at = EXCLUDED.latest_photo_at,
+                latest_photo_url = EXCLUDED.latest_photo_url,
+                updated_at = EXCLUDED.updated_at;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    # sizes is json (no equality operator), hence the text comparison.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION photos_user_gallery_stats() RETURNS trigger AS $$
+        DECLARE
+            owners text[];
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                SELECT array_agg(DISTINCT owner_id) INTO owners
+                FROM new_rows WHERE owner_id IS NOT NULL;
+            ELSIF TG_OP = 'DELETE' THEN
+                SELECT array_agg(DISTINCT owner_id) INTO owners
+                FROM old_rows WHERE owner_id IS NOT NULL;
+            ELSE
+                SELECT array_agg(DISTINCT x.owner_id) INTO owners
+                FROM old_rows o JOIN new_rows n ON n.id = o.id,
+                     LATERAL (VALUES (o.owner_id), (n.owner_id)) AS x(owner_id)
+                WHERE x.owner_id IS NOT NULL
+                  AND (o.owner_id IS DISTINCT FROM n.owner_id
+                       OR o.deleted IS DISTINCT FROM n.deleted
+                       OR o.uploaded_at IS DISTINCT FROM n.uploaded_at
+                       OR o.sizes::text IS DISTINCT FROM n.sizes::text);
+            END IF;
+            IF owners IS NOT NULL THEN
+                PERFORM user_gallery_stats_refresh(owners);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER photos_user_gallery_stats_ins
+        AFTER INSERT ON photos REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION photos_user_gallery_stats();
+    """)
+    op.execute("""
+        CREATE TRIGGER photos_user_gallery_stats_upd
+        AFTER UPDATE ON photos REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION photos_user_gallery_stats();
+    """)
+    op.execute("""
+        CREATE TRIGGER photos_user_gallery_stats_del
+        AFTER DELETE ON photos REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION photos_user_gallery_stats();
+    """)
+
+    # Every user gets a row, so the listing never has to outer-join users.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION users_user_gallery_stats() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO user_gallery_stats (user_id) VALUES (NEW.id) ON CONFLICT DO NOTHING;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER users_user_gallery_stats_ins
+        AFTER INSERT ON users
+        FOR EACH ROW EXECUTE FUNCTION users_user_gallery_stats();
+    """)
+
+    # Backfill.
+    op.execute("SELECT user_gallery_stats_refresh(ARRAY(SELECT id FROM users), false)")
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS users_user_gallery_stats_ins ON users")
+    op.execute("DROP FUNCTION IF EXISTS users_user_gallery_stats()")
+    op.execute("DROP TRIGGER IF EXISTS photos_user_gallery_stats_del ON photos")
+    op.execute("DROP TRIGGER IF EXISTS photos_user_gallery_stats_upd ON photos")
+    op.execute("DROP TRIGGER IF EXISTS photos_user_gallery_stats_ins ON photos")
+    op.execute("DROP FUNCTION IF EXISTS photos_user_gallery_stats()")
+    op.execute("DROP FUNCTION IF EXISTS user_gallery_stats_refresh(text[], boolean)")
+    op.drop_index('ix_user_gallery_stats_order', table_name='user_gallery_stats')
+    op.drop_table('user_gallery_stats')
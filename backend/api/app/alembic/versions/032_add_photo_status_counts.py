@@ -0,0 +1,114 @@
+"""Add user_photo_status_counts: per-owner photo counts by processing status
+
+GET /photos/ (every page), GET /photos/count and GET /users/{id}/photos each
+ran a COUNT ... GROUP BY processing_status over the owner's whole photo set.
+They now read these counters, which a statement-level trigger on photos keeps
+in step inside the writing transaction: it nets the transition tables into
+per-(owner, status) deltas — +1 for a non-deleted row that appears, -1 for one
+that goes away — and upserts them. Authorize (insert), processing (status
+change), soft delete and restore, hard delete and account deletion all go
+through it, and a bulk statement costs one upsert per (owner, status) touched.
+
+NULL processing_status is stored as ''. Rows reaching 0 are kept. The
+photo_counts module in the API verifies the counters against photos
+periodically and repairs any drift.
+
+Revision ID: 032_photo_status_counts
+Revises: 031_user_gallery_stats
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '032_photo_status_counts'
+down_revision: Union[str, None] = '031_user_gallery_stats'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_photo_status_counts',
+        sa.Column('owner_id', sa.String(), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('status', sa.String(), primary_key=True),
+        sa.Column('n', sa.Integer(), nullable=False, server_default=sa.text('0')),
+    )
+
+    # Deltas are applied in (owner, status) order so two concurrent multi-owner
+    # statements lock counter rows in the same order. The users check skips
+    # owners whose account is being deleted in this statement (the cascade
+    # deletes their photos after the user row is gone; their counters cascade
+    # away too).
+    op.execute("""
+        CREATE OR REPLACE FUNCTION photos_status_counts() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO user_photo_status_counts (owner_id, status, n)
+                SELECT owner_id, coalesce(processing_status, ''), count(*)
+                FROM new_rows
+                WHERE deleted = false AND owner_id IN (SELECT id FROM users)
+                GROUP BY 1, 2 ORDER BY 1, 2
+                ON CONFLICT (owner_id, status) DO UPDATE
+                SET n = user_photo_status_counts.n + EXCLUDED.n;
+            ELSIF TG_OP = 'DELETE' THEN
+                INSERT INTO user_photo_status_counts (owner_id, status, n)
+                SELECT owner_id, coalesce(processing_status, ''), -count(*)
+                FROM old_rows
+                WHERE deleted = false AND owner_id IN (SELECT id FROM users)
+                GROUP BY 1, 2 ORDER BY 1, 2
+                ON CONFLICT (owner_id, status) DO UPDATE
+                SET n = user_photo_status_counts.n + EXCLUDED.n;
+            ELSE
+                INSERT INTO user_photo_status_counts (owner_id, status, n)
+                SELECT owner_id, status, sum(delta)
+                FROM (
+                    SELECT owner_id, coalesce(processing_status, '') AS status, 1 AS delta
+                    FROM new_rows WHERE deleted = false
+                    UNION ALL
+                    SELECT owner_id, coalesce(processing_status, ''), -1
+                    FROM old_rows WHERE deleted = false
+                ) d
+                WHERE owner_id IN (SELECT id FROM users)
+                GROUP BY 1, 2 HAVING sum(delta) <> 0 ORDER BY 1, 2
+                ON CONFLICT (owner_id, status) DO UPDATE
+                SET n = user_photo_status_counts.n + EXCLUDED.n;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER photos_status_counts_ins
+        AFTER INSERT ON photos REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION photos_status_counts();
+    """)
+    op.execute("""
+        CREATE TRIGGER photos_status_counts_upd
+        AFTER UPDATE ON photos REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION photos_status_counts();
+    """)
+    op.execute("""
+        CREATE TRIGGER photos_status_counts_del
+        AFTER DELETE ON photos REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION photos_status_counts();
+    """)
+
+    # Backfill.
+    op.execute("""
+        INSERT INTO user_photo_status_counts (owner_id, status, n)
+        SELECT owner_id, coalesce(processing_status, ''), count(*)
+        FROM photos WHERE deleted = false AND owner_id IS NOT NULL
+        GROUP BY 1, 2
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS photos_status_counts_del ON photos")
+    op.execute("DROP TRIGGER IF EXISTS photos_status_counts_upd ON photos")
+    op.execute("DROP TRIGGER IF EXISTS photos_status_counts_ins ON photos")
+    op.execute("DROP FUNCTION IF EXISTS photos_status_counts()")
+    op.drop_table('user_photo_status_counts')
@@ -0,0 +1,164 @@
+"""Add sitemap_entries: the curated photo set behind GET /photos/sitemap-ids
+
+The endpoint evaluated the "interesting" predicate (featured, or has a
+title / description / keywords, or any annotation — a correlated EXISTS) over
+all public photos on every call, counted the whole set and paged with OFFSET.
+The curated set is now materialised here, one row per listed photo with its
+sitemap <image:loc> URL already picked, and pages are keyset range reads on
+ix_sitemap_entries_order.
+
+View sitemap_source holds the predicate and the rendition preference (same as
+the old Python). Triggers refresh just the photos a statement touched: photos
+INSERT / UPDATE of a column the predicate or the entry reads, and
+photo_annotations INSERT / DELETE. Deleted photos cascade out through the FK.
+
+Revision ID: 033_sitemap_entries
+Revises: 032_photo_status_counts
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '033_sitemap_entries'
+down_revision: Union[str, None] = '032_photo_status_counts'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'sitemap_entries',
+        sa.Column('photo_id', sa.String(), sa.ForeignKey('photos.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('uploaded_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('img', sa.Text(), nullable=True),
+    )
+    op.create_index('ix_sitemap_entries_order', 'sitemap_entries',
+                    [sa.text('uploaded_at DESC'), sa.text('photo_id DESC')])
+
+    # Image preference: the big image-search crop when the worker produced one
+    # (wide sources), else the largest flat size.
+    op.execute("""
+        CREATE OR REPLACE VIEW sitemap_source AS
+        SELECT p.id AS photo_id,
+               coalesce(p.uploaded_at, p.record_created_ts) AS uploaded_at,
+               coalesce(nullif(p.sizes -> '3840_crop' ->> 'url', ''),
+                        nullif(p.sizes -> 'full' ->> 'url', ''),
+                        nullif(p.sizes -> '4096' ->> 'url', ''),
+                        nullif(p.sizes -> '3072' ->> 'url', ''),
+                        nullif(p.sizes -> '2048' ->> 'url', ''),
+                        nullif(p.sizes -> '1200_crop' ->> 'url', '')) AS img
+        FROM photos p
+        WHERE p.is_public = true
+          AND p.deleted = false
+          AND p.processing_status = 'completed'
+          AND (p.featured = true
+               OR coalesce(p.title, '') <> ''
+               OR coalesce(p.description, '') <> ''
+               OR array_length(p.keywords, 1) > 0
+               OR EXISTS (SELECT 1 FROM photo_annotations a WHERE a.photo_id = p.id));
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION sitemap_refresh(ids text[]) RETURNS void AS $$
+        BEGIN
+            INSERT INTO sitemap_entries (photo_id, uploaded_at, img)
+            SELECT photo_id, uploaded_at, img FROM sitemap_source
+            WHERE photo_id = ANY(ids)
+            ORDER BY photo_id
+            ON CONFLICT (photo_id) DO UPDATE
+            SET uploaded_at = EXCLUDED.uploaded_at, img = EXCLUDED.img;
+            DELETE FROM sitemap_entries
+            WHERE photo_id = ANY(ids)
+              AND photo_id NOT IN (SELECT photo_id FROM sitemap_source WHERE photo_id = ANY(ids));
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    # sizes is json (no equality operator), hence the text comparison.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION photos_sitemap() RETURNS trigger AS $$
+        DECLARE
+            ids text[];
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                SELECT array_agg(id) INTO ids FROM new_rows
+                WHERE processing_status = 'completed';
+            ELSE
+                SELECT array_agg(n.id) INTO ids
+                FROM old_rows o JOIN new_rows n ON n.id = o.id
+                WHERE o.is_public IS DISTINCT FROM n.is_public
+                   OR o.deleted IS DISTINCT FROM n.deleted
+                   OR o.processing_status IS DISTINCT FROM n.processing_status
+                   OR o.featured IS DISTINCT FROM n.featured
+                   OR o.title IS DISTINCT FROM n.title
+                   OR o.description IS DISTINCT FROM n.description
+                   OR o.keywords IS DISTINCT FROM n.keywords
+                   OR o.uploaded_at IS DISTINCT FROM n.uploaded_at
+                   OR o.sizes::text IS DISTINCT FROM n.sizes::text;
+            END IF;
+            IF ids IS NOT NULL THEN
+                PERFORM sitemap_refresh(ids);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER photos_sitemap_ins
+        AFTER INSERT ON photos REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION photos_sitemap();
+    """)
+    op.execute("""
+        CREATE TRIGGER photos_sitemap_upd
+        AFTER UPDATE ON photos REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION photos_sitemap();
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION photo_annotations_sitemap() RETURNS trigger AS $$
+        DECLARE
+            ids text[];
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                SELECT array_agg(DISTINCT photo_id) INTO ids FROM new_rows;
+            ELSE
+                SELECT array_agg(DISTINCT photo_id) INTO ids FROM old_rows;
+            END IF;
+            IF ids IS NOT NULL THEN
+                PERFORM sitemap_refresh(ids);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER photo_annotations_sitemap_ins
+        AFTER INSERT ON photo_annotations REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION photo_annotations_sitemap();
+    """)
+    op.execute("""
+        CREATE TRIGGER photo_annotations_sitemap_del
+        AFTER DELETE ON photo_annotations REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION photo_annotations_sitemap();
+    """)
+
+    # Backfill.
+    op.execute("INSERT INTO sitemap_entries (photo_id, uploaded_at, img) "
+               "SELECT photo_id, uploaded_at, img FROM sitemap_source")
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS photo_annotations_sitemap_del ON photo_annotations")
+    op.execute("DROP TRIGGER IF EXISTS photo_annotations_sitemap_ins ON photo_annotations")
+    op.execute("DROP FUNCTION IF EXISTS photo_annotations_sitemap()")
+    op.execute("DROP TRIGGER IF EXISTS photos_sitemap_upd ON photos")
+    op.execute("DROP TRIGGER IF EXISTS photos_sitemap_ins ON photos")
+    op.execute("DROP FUNCTION IF EXISTS photos_sitemap()")
+    op.execute("DROP FUNCTION IF EXISTS sitemap_refresh(text[])")
+    op.execute("DROP VIEW IF EXISTS sitemap_source")
+    op.drop_index('ix_sitemap_entries_order', table_name='sitemap_entries')
+    op.drop_table('sitemap_entries')
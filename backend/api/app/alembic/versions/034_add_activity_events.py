@@ -0,0 +1,125 @@
+"""Add activity_events: append-only log behind the admin dashboard feed
+
+GET /api/admin/activity ran six "latest N" queries (contact messages,
+moderation audits, annotation events, flags, uploads, user moderation), merged
+and squashed them in Python, and could never show more than the merged top 200.
+Each of those tables now appends one row here when a row is inserted, with the
+actor and context snapshotted the way the feed renders them. The feed becomes
+keyset reads on ix_activity_events_order, and can page back through all of
+history.
+
+The inserts are done by statement-level AFTER INSERT triggers, so every write
+path is covered (routes, worker callbacks, admin undo) without each having to
+remember the log. _SOURCES below gives each source's SELECT once; it renders
+both its trigger (over the transition table) and the backfill (over the table).
+The backfill reproduces what the merged feed showed: the current contact and
+flag status, and non-deleted uploads only.
+
+Revision ID: 034_activity_events
+Revises: 033_sitemap_entries
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '034_activity_events'
+down_revision: Union[str, None] = '033_sitemap_entries'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# source table -> (event columns from alias s, backfill-only WHERE)
+_SOURCES = {
+    'contact_messages': ("""
+        SELECT s.created_at, 'contact', coalesce(s.status, 'new'), s.id::text,
+               coalesce(u.username, s.contact_info), lower(u.role::text),
+               jsonb_build_object('contact_info', s.contact_info)
+        FROM {src} s LEFT JOIN users u ON u.id = s.user_id""", None),
+    'photo_moderation_audit': ("""
+        SELECT s.created_at, 'moderation', s.action, s.id,
+               coalesce(s.actor_username, s.actor_user_id), lower(s.actor_role),
+               jsonb_build_object('owner', coalesce(s.photo_owner_username, 'someone'))
+        FROM {src} s""", None),
+    'photo_annotations': ("""
+        SELECT s.created_at, 'annotation', s.event_type, s.id,
+               u.username, lower(u.role::text), '{{}}'::jsonb
+        FROM {src} s JOIN users u ON u.id = s.user_id""", None),
+    'flagged_photos': ("""
+        SELECT s.flagged_at, 'flag', CASE WHEN s.resolved THEN 'resolved' ELSE 'open' END, s.id,
+               coalesce(u.username, 'someone'), lower(u.role::text),
+               jsonb_build_object('source', s.photo_source)
+        FROM {src} s LEFT JOIN users u ON u.id = s.flagging_user_id""", None),
+    'photos': ("""
+        SELECT s.uploaded_at, 'upload', 'created', s.id,
+               coalesce(u.username, 'someone'), lower(u.role::text),
+               jsonb_build_object('label', coalesce(nullif(s.title, ''), s.original_filename),
+                                  'uid', 'hillview-' || s.id)
+        FROM {src} s LEFT JOIN users u ON u.id = s.owner_id""", "s.deleted = false"),
+    'user_moderation': ("""
+        SELECT s.created_at, 'user', s.action, s.id,
+               coalesce(s.actor_username, s.actor_user_id), lower(s.actor_role),
+               jsonb_build_object('target', coalesce(s.target_username, 'a user'),
+                                  'new_role', s.new_role, 'old_role', s.old_role)
+        FROM {src} s""", None),
+}
+
+_INSERT = "INSERT INTO activity_events (at, kind, event_type, ref_id, actor, actor_role, ctx)"
+
+
+def upgrade() -> None:
+    op.create_table(
+        'activity_events',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('kind', sa.String(length=16), nullable=False),
+        sa.Column('event_type', sa.String(length=32), nullable=True),
+        sa.Column('ref_id', sa.String(), nullable=False),
+        sa.Column('actor', sa.String(), nullable=True),
+        sa.Column('actor_role', sa.String(), nullable=True),
+        sa.Column('ctx', postgresql.JSONB(), nullable=False, server_default=sa.text("'{}'::jsonb")),
+    )
+    op.create_index('ix_activity_events_order', 'activity_events',
+                    [sa.text('at DESC'), sa.text('id DESC')])
+
+    for table, (select, _) in _SOURCES.items():
+        # at falls back to now(): the feed orders by it, and a source row
+        # without its timestamp still happened now
+        op.execute(f"""
+            CREATE OR REPLACE FUNCTION {table}_activity() RETURNS trigger AS $$
+            BEGIN
+                {_INSERT}
+                SELECT coalesce(e.at, now()), e.kind, e.event_type, e.ref_id, e.actor, e.actor_role, e.ctx
+                FROM ({select.format(src='new_rows')})
+                     AS e(at, kind, event_type, ref_id, actor, actor_role, ctx);
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_activity_ins
+            AFTER INSERT ON {table} REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION {table}_activity();
+        """)
+
+    # Backfill, oldest first so ids follow time.
+    parts = []
+    for table, (select, where) in _SOURCES.items():
+        parts.append(select.format(src=table) + (f" WHERE {where}" if where else ""))
+    op.execute(f"""
+        {_INSERT}
+        SELECT coalesce(e.at, now()), e.kind, e.event_type, e.ref_id, e.actor, e.actor_role, e.ctx
+        FROM ({' UNION ALL '.join(parts)}) AS e(at, kind, event_type, ref_id, actor, actor_role, ctx)
+        ORDER BY 1
+    """)
+
+
+def downgrade() -> None:
+    for table in _SOURCES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_activity_ins ON {table}")
+        op.execute(f"DROP FUNCTION IF EXISTS {table}_activity()")
+    op.drop_index('ix_activity_events_order', table_name='activity_events')
+    op.drop_table('activity_events')
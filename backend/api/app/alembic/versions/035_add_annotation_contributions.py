@@ -0,0 +1,188 @@
+"""Add annotation_contributions: chain tips behind GET /api/annotations/contributions
+
+The contributions view walked superseded_by forward from every event the
+caller ever authored with a recursive CTE and grouped by tip, on every request,
+and gave up after 1000 chains. Chains are now materialised on write:
+
+- photo_annotations.chain_id names the chain a row belongs to: the id of the
+  chain's first row. A new row starts its own chain (chain_id = id); when a
+  row is superseded, the successor and its chain are folded into the
+  predecessor's.
+- annotation_contributions holds one row per (author, chain) with the roles the
+  author played in it (created / updated / deleted) and the chain's current tip,
+  kept current for every participant. The view is a keyset walk on
+  ix_annotation_contributions_order.
+
+Every writer (edit, delete, admin undo, graduation) inserts the successor and
+then sets superseded_by on the old tip, so row triggers on INSERT and on
+UPDATE OF superseded_by see every chain step.
+
+Revision ID: 035_annotation_contributions
+Revises: 034_activity_events
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '035_annotation_contributions'
+down_revision: Union[str, None] = '034_activity_events'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_ROLES_UNION = ("(SELECT array_agg(DISTINCT r ORDER BY r) "
+                "FROM unnest(annotation_contributions.roles || EXCLUDED.roles) AS r)")
+
+
+def upgrade() -> None:
+    op.add_column('photo_annotations', sa.Column('chain_id', sa.String(), nullable=True))
+
+    op.create_table(
+        'annotation_contributions',
+        sa.Column('user_id', sa.String(), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('chain_id', sa.String(), primary_key=True),
+        sa.Column('roles', postgresql.ARRAY(sa.Text()), nullable=False),
+        sa.Column('tip_id', sa.String(), nullable=False),
+        sa.Column('tip_created_at', sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index('ix_annotation_contributions_order', 'annotation_contributions',
+                    ['user_id', sa.text('tip_created_at DESC'), sa.text('chain_id DESC')])
+    op.create_index('ix_annotation_contributions_chain_id', 'annotation_contributions', ['chain_id'])
+
+    # Backfill chain_id by walking forward from every chain's first row (one no
+    # other row is superseded by).
+    op.execute("""
+        WITH RECURSIVE walk AS (
+            SELECT p.id AS chain_id, p.id, p.superseded_by
+            FROM photo_annotations p
+            WHERE NOT EXISTS (SELECT 1 FROM photo_annotations q WHERE q.superseded_by = p.id)
+            UNION ALL
+            SELECT w.chain_id, n.id, n.superseded_by
+            FROM walk w JOIN photo_annotations n ON n.id = w.superseded_by
+        )
+        UPDATE photo_annotations p SET chain_id = w.chain_id
+        FROM walk w WHERE p.id = w.id
+    """)
+    # Rows on a superseded_by cycle (never written by the app) have no first
+    # row; each stays a chain of its own.
+    op.execute("UPDATE photo_annotations SET chain_id = id WHERE chain_id IS NULL")
+    op.create_index('ix_photo_annotations_chain_id', 'photo_annotations', ['chain_id'])
+
+    op.execute("""
+        INSERT INTO annotation_contributions (user_id, chain_id, roles, tip_id, tip_created_at)
+        SELECT a.user_id, a.chain_id, array_agg(DISTINCT a.event_type ORDER BY a.event_type),
+               t.id, t.at
+        FROM photo_annotations a
+        JOIN LATERAL (
+            SELECT t.id, coalesce(t.created_at, now()) AS at
+            FROM photo_annotations t
+            WHERE t.chain_id = a.chain_id AND t.superseded_by IS NULL
+            ORDER BY t.created_at DESC NULLS LAST, t.id DESC
+            LIMIT 1
+        ) t ON true
+        WHERE a.user_id IS NOT NULL
+        GROUP BY a.user_id, a.chain_id, t.id, t.at
+    """)
+
+    # Point every participant of a chain at its current tip (the row nothing
+    # has superseded yet).
+    op.execute("""
+        CREATE OR REPLACE FUNCTION annotation_chain_retip(chain text) RETURNS void AS $$
+            UPDATE annotation_contributions c
+            SET tip_id = t.id, tip_created_at = t.at
+            FROM (SELECT id, coalesce(created_at, now()) AS at
+                  FROM photo_annotations
+                  WHERE chain_id = chain AND superseded_by IS NULL
+                  ORDER BY created_at DESC NULLS LAST, id DESC
+                  LIMIT 1) t
+            WHERE c.chain_id = chain AND c.tip_id IS DISTINCT FROM t.id;
+        $$ LANGUAGE sql;
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION photo_annotations_chain_start() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.chain_id IS NULL THEN
+                NEW.chain_id := NEW.id;
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER photo_annotations_chain_start
+        BEFORE INSERT ON photo_annotations
+        FOR EACH ROW EXECUTE FUNCTION photo_annotations_chain_start();
+    """)
+
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION photo_annotations_contribution() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.user_id IS NOT NULL THEN
+                INSERT INTO annotation_contributions (user_id, chain_id, roles, tip_id, tip_created_at)
+                VALUES (NEW.user_id, NEW.chain_id, ARRAY[NEW.event_type::text],
+                        NEW.id, coalesce(NEW.created_at, now()))
+                ON CONFLICT (user_id, chain_id) DO UPDATE SET roles = {_ROLES_UNION};
+            END IF;
+            IF NEW.chain_id <> NEW.id THEN
+                PERFORM annotation_chain_retip(NEW.chain_id);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER photo_annotations_contribution
+        AFTER INSERT ON photo_annotations
+        FOR EACH ROW EXECUTE FUNCTION photo_annotations_contribution();
+    """)
+
+    # A row was superseded: fold the successor's chain (so far just the
+    # successor itself) into this one, then move the tip. The chain_id UPDATE
+    # doesn't touch superseded_by, so it doesn't re-enter this trigger.
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION photo_annotations_chain_link() RETURNS trigger AS $$
+        DECLARE
+            succ_chain text;
+        BEGIN
+            SELECT chain_id INTO succ_chain FROM photo_annotations WHERE id = NEW.superseded_by;
+            IF succ_chain IS NOT NULL AND succ_chain <> NEW.chain_id THEN
+                UPDATE photo_annotations SET chain_id = NEW.chain_id WHERE chain_id = succ_chain;
+                INSERT INTO annotation_contributions (user_id, chain_id, roles, tip_id, tip_created_at)
+                SELECT user_id, NEW.chain_id, roles, tip_id, tip_created_at
+                FROM annotation_contributions WHERE chain_id = succ_chain
+                ORDER BY user_id
+                ON CONFLICT (user_id, chain_id) DO UPDATE SET roles = {_ROLES_UNION};
+                DELETE FROM annotation_contributions WHERE chain_id = succ_chain;
+            END IF;
+            PERFORM annotation_chain_retip(NEW.chain_id);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER photo_annotations_chain_link
+        AFTER UPDATE OF superseded_by ON photo_annotations
+        FOR EACH ROW
+        WHEN (NEW.superseded_by IS NOT NULL AND OLD.superseded_by IS DISTINCT FROM NEW.superseded_by)
+        EXECUTE FUNCTION photo_annotations_chain_link();
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS photo_annotations_chain_link ON photo_annotations")
+    op.execute("DROP FUNCTION IF EXISTS photo_annotations_chain_link()")
+    op.execute("DROP TRIGGER IF EXISTS photo_annotations_contribution ON photo_annotations")
+    op.execute("DROP FUNCTION IF EXISTS photo_annotations_contribution()")
+    op.execute("DROP TRIGGER IF EXISTS photo_annotations_chain_start ON photo_annotations")
+    op.execute("DROP FUNCTION IF EXISTS photo_annotations_chain_start()")
+    op.execute("DROP FUNCTION IF EXISTS annotation_chain_retip(text)")
+    op.drop_index('ix_annotation_contributions_chain_id', table_name='annotation_contributions')
+    op.drop_index('ix_annotation_contributions_order', table_name='annotation_contributions')
+    op.drop_table('annotation_contributions')
+    op.drop_index('ix_photo_annotations_chain_id', table_name='photo_annotations')
+    op.drop_column('photo_annotations', 'chain_id')
@@ -0,0 +1,103 @@
+"""Add photo_rating_counts: per-photo thumbs up / down counters
+
+Every rating read and write ran a COUNT ... GROUP BY rating over the photo's
+ratings, and gallery pages fetched every rating row of the page's photos to
+count them in Python. A statement-level trigger on photo_ratings now keeps one
+counter row per (photo_source, photo_id) in step inside the writing
+transaction, for any source (hillview, mapillary, panoramax): inserts add,
+deletes subtract, and changing a rating moves one from one column to the other.
+Account deletion cascades through the same trigger.
+
+Rows reaching 0 are kept.
+
+Revision ID: 036_photo_rating_counts
+Revises: 035_annotation_contributions
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '036_photo_rating_counts'
+down_revision: Union[str, None] = '035_annotation_contributions'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (rows, sign) -> per-photo deltas
+_DELTAS = """
+    SELECT photo_source, photo_id,
+           {sign} count(*) FILTER (WHERE rating = 'THUMBS_UP') AS up,
+           {sign} count(*) FILTER (WHERE rating = 'THUMBS_DOWN') AS down
+    FROM {rows} GROUP BY 1, 2"""
+
+_UPSERT = """
+    ON CONFLICT (photo_source, photo_id) DO UPDATE
+    SET thumbs_up = photo_rating_counts.thumbs_up + EXCLUDED.thumbs_up,
+        thumbs_down = photo_rating_counts.thumbs_down + EXCLUDED.thumbs_down"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        'photo_rating_counts',
+        sa.Column('photo_source', sa.String(length=20), primary_key=True),
+        sa.Column('photo_id', sa.String(length=255), primary_key=True),
+        sa.Column('thumbs_up', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('thumbs_down', sa.Integer(), nullable=False, server_default=sa.text('0')),
+    )
+
+    # Deltas are applied in (source, photo) order so concurrent multi-row
+    # statements lock counter rows in the same order.
+    added = _DELTAS.format(sign='', rows='new_rows')
+    removed = _DELTAS.format(sign='-', rows='old_rows')
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION photo_ratings_counts() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO photo_rating_counts (photo_source, photo_id, thumbs_up, thumbs_down)
+                SELECT * FROM ({added}) d ORDER BY 1, 2
+                {_UPSERT};
+            ELSIF TG_OP = 'DELETE' THEN
+                INSERT INTO photo_rating_counts (photo_source, photo_id, thumbs_up, thumbs_down)
+                SELECT * FROM ({removed}) d ORDER BY 1, 2
+                {_UPSERT};
+            ELSE
+                INSERT INTO photo_rating_counts (photo_source, photo_id, thumbs_up, thumbs_down)
+                SELECT photo_source, photo_id, sum(up), sum(down)
+                FROM ({added} UNION ALL {removed}) d
+                GROUP BY 1, 2 HAVING sum(up) <> 0 OR sum(down) <> 0 ORDER BY 1, 2
+                {_UPSERT};
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER photo_ratings_counts_ins
+        AFTER INSERT ON photo_ratings REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION photo_ratings_counts();
+    """)
+    op.execute("""
+        CREATE TRIGGER photo_ratings_counts_upd
+        AFTER UPDATE ON photo_ratings REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION photo_ratings_counts();
+    """)
+    op.execute("""
+        CREATE TRIGGER photo_ratings_counts_del
+        AFTER DELETE ON photo_ratings REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION photo_ratings_counts();
+    """)
+
+    # Backfill.
+    op.execute("INSERT INTO photo_rating_counts (photo_source, photo_id, thumbs_up, thumbs_down)"
+               + _DELTAS.format(sign='', rows='photo_ratings'))
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS photo_ratings_counts_del ON photo_ratings")
+    op.execute("DROP TRIGGER IF EXISTS photo_ratings_counts_upd ON photo_ratings")
+    op.execute("DROP TRIGGER IF EXISTS photo_ratings_counts_ins ON photo_ratings")
+    op.execute("DROP FUNCTION IF EXISTS photo_ratings_counts()")
+    op.drop_table('photo_rating_counts')
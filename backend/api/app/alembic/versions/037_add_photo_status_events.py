@@ -0,0 +1,73 @@
+"""Add photo_status_events: per-owner log behind GET /api/photos/status/stream
+
+Clients tracked uploads by POSTing their pending photo ids to
+/api/photos/status over and over. A statement-level trigger on photos now
+appends one row here whenever a photo's processing_status or deleted flag
+changes (the worker callback, retries, deletion), in the writing transaction.
+The stream endpoint fans these out per owner and resumes from the last event
+id a client saw; ids are the stream's cursor.
+
+Rows are short-lived: photo_status_stream.py prunes them after a day, which
+bounds how far back a reconnect can resume.
+
+Revision ID: 037_photo_status_events
+Revises: 036_photo_rating_counts
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '037_photo_status_events'
+down_revision: Union[str, None] = '036_photo_rating_counts'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'photo_status_events',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('user_id', sa.String(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('photo_id', sa.String(), nullable=False),
+        sa.Column('processing_status', sa.String(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('retry_after_minutes', sa.Integer(), nullable=True),
+        sa.Column('deleted', sa.Boolean(), nullable=False),
+        sa.Column('at', sa.DateTime(timezone=True), nullable=False, server_default=sa.text('now()')),
+    )
+    op.create_index('ix_photo_status_events_user_id', 'photo_status_events', ['user_id', 'id'])
+    op.create_index('ix_photo_status_events_at', 'photo_status_events', ['at'])
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION photos_status_events() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO photo_status_events
+                (user_id, photo_id, processing_status, error, retry_after_minutes, deleted)
+            SELECT n.owner_id, n.id, n.processing_status, n.error, n.retry_after_minutes,
+                   coalesce(n.deleted, false)
+            FROM new_rows n JOIN old_rows o ON o.id = n.id
+            WHERE n.owner_id IS NOT NULL
+              AND (n.processing_status IS DISTINCT FROM o.processing_status
+                   OR n.deleted IS DISTINCT FROM o.deleted)
+            ORDER BY n.id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER photos_status_events_upd
+        AFTER UPDATE ON photos REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION photos_status_events();
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS photos_status_events_upd ON photos")
+    op.execute("DROP FUNCTION IF EXISTS photos_status_events()")
+    op.drop_index('ix_photo_status_events_at', table_name='photo_status_events')
+    op.drop_index('ix_photo_status_events_user_id', table_name='photo_status_events')
+    op.drop_table('photo_status_events')
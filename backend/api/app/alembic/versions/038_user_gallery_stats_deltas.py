@@ -0,0 +1,189 @@
+"""Keep user_gallery_stats by deltas instead of per-owner recomputes
+
+Migration 031's trigger recomputed every affected owner from photos: a
+count(*) plus a latest-photo lookup over all of the owner's photos on each
+statement that touched a counted column — O(photos per owner) per write, and
+quadratic over a bulk upload. It now works from the transition tables, as the
+user_photo_status_counts trigger (032) does:
+
+- photo_count moves by the net number of non-deleted rows that appeared minus
+  those that went away.
+- The latest photo is replaced by an incoming row that ranks at or ahead of it
+  (uploaded_at DESC NULLS LAST, id DESC). It is looked up in photos again only
+  when the stored latest row left the owner's set (deleted, moved, hard
+  deleted) or its upload time went back.
+
+Only rows whose owner, deleted flag, upload time or 320 px URL changed take
+part. Instead of 031's advisory locks, the owners' stats rows are locked in
+user_id order before anything is read: a concurrent writer for the same owner
+waits there, and the statements after it see what that writer committed.
+user_gallery_stats_refresh stays for full recomputes (backfill, repair).
+
+Revision ID: 038_user_gallery_stats_deltas
+Revises: 037_photo_status_events
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '038_user_gallery_stats_deltas'
+down_revision: Union[str, None] = '037_photo_status_events'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# 031's trigger function, restored on downgrade.
+PREVIOUS_TRIGGER_FUNCTION = """
+    CREATE OR REPLACE FUNCTION photos_user_gallery_stats() RETURNS trigger AS $$
+    DECLARE
+        owners text[];
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            SELECT array_agg(DISTINCT owner_id) INTO owners
+            FROM new_rows WHERE owner_id IS NOT NULL;
+        ELSIF TG_OP = 'DELETE' THEN
+            SELECT array_agg(DISTINCT owner_id) INTO owners
+            FROM old_rows WHERE owner_id IS NOT NULL;
+        ELSE
+            SELECT array_agg(DISTINCT x.owner_id) INTO owners
+            FROM old_rows o JOIN new_rows n ON n.id = o.id,
+                 LATERAL (VALUES (o.owner_id), (n.owner_id)) AS x(owner_id)
+            WHERE x.owner_id IS NOT NULL
+              AND (o.owner_id IS DISTINCT FROM n.owner_id
+                   OR o.deleted IS DISTINCT FROM n.deleted
+                   OR o.uploaded_at IS DISTINCT FROM n.uploaded_at
+                   OR o.sizes::text IS DISTINCT FROM n.sizes::text);
+        END IF;
+        IF owners IS NOT NULL THEN
+            PERFORM user_gallery_stats_refresh(owners);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade() -> None:
+    # A non-deleted photo as far as the stats are concerned.
+    op.execute("""
+        CREATE TYPE user_gallery_stats_photo AS (
+            id text, owner_id text, uploaded_at timestamptz, url text)
+    """)
+
+    # gone: the statement's old non-deleted versions of changed rows; came:
+    # their new non-deleted versions. The stored latest row L needs a lookup
+    # only if it is in gone and did not come back for the same owner at the
+    # same or a later upload time; otherwise every other photo of the owner
+    # still ranks behind L, and the best row that came is the latest if it
+    # ranks at or ahead of L (L itself included, for a new URL).
+    op.execute("""
+        CREATE OR REPLACE FUNCTION user_gallery_stats_apply(
+            gone user_gallery_stats_photo[], came user_gallery_stats_photo[]) RETURNS void AS $$
+        DECLARE
+            owners text[];
+            stale text[];
+        BEGIN
+            SELECT array_agg(DISTINCT owner_id) INTO owners
+            FROM (SELECT owner_id FROM unnest(gone) UNION ALL SELECT owner_id FROM unnest(came)) x;
+            IF owners IS NULL THEN
+                RETURN;
+            END IF;
+            PERFORM 1 FROM user_gallery_stats
+            WHERE user_id = ANY(owners) ORDER BY user_id FOR UPDATE;
+
+            UPDATE user_gallery_stats s
+            SET photo_count = s.photo_count + d.delta, updated_at = now()
+            FROM (
+                SELECT owner_id, sum(delta) AS delta
+                FROM (SELECT owner_id, 1 AS delta FROM unnest(came)
+                      UNION ALL
+                      SELECT owner_id, -1 FROM unnest(gone)) x
+                GROUP BY owner_id HAVING sum(delta) <> 0
+            ) d
+            WHERE s.user_id = d.owner_id;
+
+            SELECT array_agg(s.user_id) INTO stale
+            FROM user_gallery_stats s
+            WHERE s.user_id = ANY(owners)
+              AND EXISTS (SELECT 1 FROM unnest(gone) g
+                          WHERE g.id = s.latest_photo_id AND g.owner_id = s.user_id)
+              AND NOT EXISTS (
+                  SELECT 1 FROM unnest(came) c
+                  WHERE c.id = s.latest_photo_id AND c.owner_id = s.user_id
+                    AND (c.uploaded_at >= s.latest_photo_at
+                         OR c.uploaded_at IS NOT NULL AND s.latest_photo_at IS NULL
+                         OR c.uploaded_at IS NULL AND s.latest_photo_at IS NULL));
+
+            IF stale IS NOT NULL THEN
+                UPDATE user_gallery_stats s
+                SET latest_photo_id = l.id, latest_photo_at = l.uploaded_at,
+                    latest_photo_url = l.url, updated_at = now()
+                FROM unnest(stale) AS o(user_id)
+                LEFT JOIN LATERAL (
+                    SELECT p.id, p.uploaded_at, p.sizes -> '320' ->> 'url' AS url FROM photos p
+                    WHERE p.owner_id = o.user_id AND p.deleted = false
+                    ORDER BY p.uploaded_at DESC NULLS LAST, p.id DESC LIMIT 1) l ON true
+                WHERE s.user_id = o.user_id;
+            END IF;
+
+            UPDATE user_gallery_stats s
+            SET latest_photo_id = c.id, latest_photo_at = c.uploaded_at,
+                latest_photo_url = c.url, updated_at = now()
+            FROM (
+                SELECT DISTINCT ON (owner_id) * FROM unnest(came)
+                ORDER BY owner_id, uploaded_at DESC NULLS LAST, id DESC
+            ) c
+            WHERE s.user_id = c.owner_id
+              AND NOT (s.user_id = ANY(coalesce(stale, '{}')))
+              AND (s.latest_photo_id IS NULL
+                   OR c.id = s.latest_photo_id
+                   OR c.uploaded_at > s.latest_photo_at
+                   OR c.uploaded_at IS NOT NULL AND s.latest_photo_at IS NULL
+                   OR c.uploaded_at IS NOT DISTINCT FROM s.latest_photo_at AND c.id > s.latest_photo_id);
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    # Same triggers as 031, new body. sizes is json (no equality operator);
+    # only its 320 px URL is stored, so that is what is compared.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION photos_user_gallery_stats() RETURNS trigger AS $$
+        DECLARE
+            gone user_gallery_stats_photo[];
+            came user_gallery_stats_photo[];
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                SELECT array_agg(ROW(id, owner_id, uploaded_at, sizes -> '320' ->> 'url')::user_gallery_stats_photo)
+                INTO came FROM new_rows WHERE deleted = false AND owner_id IS NOT NULL;
+            ELSIF TG_OP = 'DELETE' THEN
+                SELECT array_agg(ROW(id, owner_id, uploaded_at, sizes -> '320' ->> 'url')::user_gallery_stats_photo)
+                INTO gone FROM old_rows WHERE deleted = false AND owner_id IS NOT NULL;
+            ELSE
+                SELECT array_agg(ROW(o.id, o.owner_id, o.uploaded_at, o.sizes -> '320' ->> 'url')::user_gallery_stats_photo)
+                       FILTER (WHERE o.deleted = false AND o.owner_id IS NOT NULL),
+                       array_agg(ROW(n.id, n.owner_id, n.uploaded_at, n.sizes -> '320' ->> 'url')::user_gallery_stats_photo)
+                       FILTER (WHERE n.deleted = false AND n.owner_id IS NOT NULL)
+                INTO gone, came
+                FROM old_rows o JOIN new_rows n ON n.id = o.id
+                WHERE o.owner_id IS DISTINCT FROM n.owner_id
+                   OR o.deleted IS DISTINCT FROM n.deleted
+                   OR o.uploaded_at IS DISTINCT FROM n.uploaded_at
+                   OR o.sizes -> '320' ->> 'url' IS DISTINCT FROM n.sizes -> '320' ->> 'url';
+            END IF;
+            IF gone IS NOT NULL OR came IS NOT NULL THEN
+                PERFORM user_gallery_stats_apply(coalesce(gone, '{}'), coalesce(came, '{}'));
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+
+def downgrade() -> None:
+    op.execute(PREVIOUS_TRIGGER_FUNCTION)
+    op.execute("DROP FUNCTION IF EXISTS user_gallery_stats_apply(user_gallery_stats_photo[], user_gallery_stats_photo[])")
+    op.execute("DROP TYPE IF EXISTS user_gallery_stats_photo")
@@ -1,10 +1,11 @@
 """Photo annotation routes – simple free-for-all CRUD with versioned edits."""
 import logging
+from datetime import datetime
 from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
-from sqlalchemy import and_, or_, desc, func
+from sqlalchemy import and_, or_, func, tuple_
 from sqlalchemy.orm import aliased
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
@@ -14,7 +15,7 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common'))
 from common.database import get_db
-from common.models import Photo, PhotoAnnotation, User, HiddenUser
+from common.models import Photo, PhotoAnnotation, AnnotationContribution, User, HiddenUser
 from common.utc import format_utc
 from auth import get_current_active_user, get_current_user_optional
 
@@ -129,6 +130,7 @@ async def list_annotations(
 @router.get("/contributions")
 async def my_contributions(
     limit: int = 500,
+    before: Optional[str] = None,
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -143,87 +145,85 @@ async def my_contributions(
     reverted), so we surface only the current tip's body — the same text that is
     live and public on the photo — and we do NOT reveal who changed it.
 
-    Chains are reconstructed by walking superseded_by forward from every event
-    the caller authored (create / edit / delete) to the tip. This is the seed of
-    a broader contributions dashboard and, eventually, payout logic: `standing`
-    counts the chains whose current live version is still the caller's own work.
+    Chains come from annotation_contributions, which triggers keep at one row
+    per (author, chain) with the roles the author played (created / updated /
+    deleted) and the chain's current tip (migration 035). Newest tip first,
+    keyset-paginated: pass the previous page's ``next_cursor`` as ``before``.
+    The summary covers all of the caller's chains and is only computed for the
+    first page. This is the seed of a broader contributions dashboard and,
+    eventually, payout logic: `standing` counts the chains whose current live
+    version is still the caller's own work.
     """
     me = current_user.id
-    PA = PhotoAnnotation
-
-    # Recursive walk: seed from every event I authored, then follow superseded_by
-    # forward hop-by-hop to the chain tip (the row with superseded_by IS NULL).
-    # Carrying seed_event_type through the walk lets us report which roles I
-    # played in each chain (created / updated / deleted) once grouped by tip.
-    seed = (
-        select(
-            PA.id.label('seed_id'),
-            PA.event_type.label('seed_event_type'),
-            PA.id.label('cur_id'),
-            PA.superseded_by.label('superseded_by'),
-        )
-        .where(PA.user_id == me)
-        .cte(name='contrib_walk', recursive=True)
-    )
-    nxt = aliased(PA)
-    walk = seed.union_all(
-        select(
-            seed.c.seed_id,
-            seed.c.seed_event_type,
-            nxt.id,
-            nxt.superseded_by,
-        ).select_from(seed.join(nxt, nxt.id == seed.c.superseded_by))
+    C = AnnotationContribution
+    Tip = aliased(PhotoAnnotation)
+    limit = max(1, min(limit, 1000))
+
+    # Drop still-live placeholders (unfinished '?' boxes carry no contribution);
+    # keep removed chains, which tell the "your annotation was deleted" story.
+    mine = and_(
+        C.user_id == me,
+        or_(
+            Tip.event_type == 'deleted',
+            func.lower(func.trim(func.coalesce(Tip.body, ''))).notin_(PLACEHOLDER_BODIES),
+        ),
     )
 
-    # Collapse to one row per chain tip, gathering the distinct roles I played.
-    tips = (
-        select(
-            walk.c.cur_id.label('tip_id'),
-            func.array_agg(walk.c.seed_event_type.distinct()).label('my_roles'),
-        )
-        .where(walk.c.superseded_by.is_(None))
-        .group_by(walk.c.cur_id)
-        .subquery('contrib_tips')
-    )
-
-    Tip = aliased(PA)
     query = (
         select(
             Tip,
-            tips.c.my_roles,
+            C.roles,
+            C.tip_created_at,
+            C.chain_id,
             ST_Y(Photo.geometry).label('lat'),
             ST_X(Photo.geometry).label('lon'),
             Photo.compass_angle.label('bearing'),
             Photo.width.label('width'),
         )
-        .join(tips, tips.c.tip_id == Tip.id)
+        .select_from(C)
+        .join(Tip, Tip.id == C.tip_id)
         .join(Photo, Tip.photo_id == Photo.id, isouter=True)
-        # Drop still-live placeholders (unfinished '?' boxes carry no contribution);
-        # keep removed chains, which tell the "your annotation was deleted" story.
-        .where(
-            or_(
-                Tip.event_type == 'deleted',
-                func.lower(func.trim(func.coalesce(Tip.body, ''))).notin_(PLACEHOLDER_BODIES),
-            )
-        )
-        .order_by(desc(Tip.created_at))
-        .limit(max(1, min(limit, 1000)))
+        .where(mine)
+        .order_by(C.tip_created_at.desc(), C.chain_id.desc())
+        .limit(limit + 1)
     )
+    summary = None
+    if before:
+        try:
+            ts, last_chain = before.split('_', 1)
+            before_ts = datetime.fromisoformat(ts.replace('Z', '+00:00'))
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor format")
+        query = query.where(tuple_(C.tip_created_at, C.chain_id) < tuple_(before_ts, last_chain))
+    else:
+        is_removed = Tip.event_type == 'deleted'
+        counts = (await db.execute(
+            select(
+                func.count(),
+                func.count().filter(~is_removed, Tip.user_id == me),
+                func.count().filter(~is_removed, Tip.user_id != me),
+                func.count().filter(is_removed),
+                func.count(Tip.photo_id.distinct()),
+            )
+            .select_from(C)
+            .join(Tip, Tip.id == C.tip_id)
+            .where(mine)
+        )).one()
+        summary = {
+            "total": counts[0],
+            "standing": counts[1],           # live, and still my own work
+            "changed_by_others": counts[2],  # live, but someone else's edit now holds
+            "removed": counts[3],            # chain ends in a deletion
+            "photos": counts[4],
+        }
+
     rows = (await db.execute(query)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
 
     contributions = []
-    standing = changed = removed = 0
-    photo_ids = set()
-    for tip, my_roles, lat, lon, bearing, width in rows:
+    for tip, my_roles, _, _, lat, lon, bearing, width in rows:
         is_removed = tip.event_type == 'deleted'
-        mine_is_current = tip.user_id == me
-        if is_removed:
-            removed += 1
-        elif mine_is_current:
-            standing += 1
-        else:
-            changed += 1
-        photo_ids.add(tip.photo_id)
         contributions.append({
             "chain_tip_id": tip.id,
             "photo_id": tip.photo_id,
@@ -231,7 +231,7 @@ async def my_contributions(
             "status": "removed" if is_removed else "live",
             # Whether the current live version is still my own work — the signal a
             # future payout would credit.
-            "mine_is_current": mine_is_current,
+            "mine_is_current": tip.user_id == me,
             # The final surviving version's body: safe to show (it is the public,
             # live text). Null when the chain now ends in a deletion.
             "current_body": None if is_removed else tip.body,
@@ -244,16 +244,15 @@ async def my_contributions(
             "target": None if is_removed else tip.target,
         })
 
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = f"{format_utc(last.tip_created_at)}_{last.chain_id}"
+
     return {
         "contributions": contributions,
-        "summary": {
-            "total": len(contributions),
-            "standing": standing,          # live, and still my own work
-            "changed_by_others": changed,  # live, but someone else's edit now holds
-            "removed": removed,            # chain ends in a deletion
-            "photos": len(photo_ids),
-        },
-        "truncated": len(rows) >= min(limit, 1000),
+        "summary": summary,
+        "next_cursor": next_cursor,
     }
 
 
@@ -39,14 +39,12 @@ for level, loggers in y("""
 
 # log.warning("Importing FastAPI and related modules")
 
-import time
 from contextlib import asynccontextmanager
 from typing import Dict, Any
-from fastapi import FastAPI, HTTPException, status, Request, Depends
+from fastapi import FastAPI, status, Request, Depends
 from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
-from starlette.middleware.base import BaseHTTPMiddleware
 from sqlalchemy.ext.asyncio import AsyncSession
 
 import os
@@ -56,9 +54,13 @@ import sys
 common_path = os.path.join(os.path.dirname(__file__), '..', '..', 'common')
 sys.path.append(common_path)
 from common.database import get_db
-from common.config import is_rate_limiting_disabled, rate_limit_config, get_cors_origins
+from common.config import rate_limit_config, get_cors_origins
 from user_routes import start_session_cleanup
 import fcm_push
+import push_notifications
+import push_queue
+import photo_counts
+import photo_status_stream
 
 # Configuration
 USER_ACCOUNTS = os.getenv("USER_ACCOUNTS", "false").lower() in ("true", "1", "yes")
@@ -71,12 +73,19 @@ async def lifespan(app: FastAPI):
 	rate_limit_config.log_configuration()
 	await start_session_cleanup()
 	fcm_push.init()
+	await push_queue.start_dispatcher()
+	await photo_counts.start_repair_job()
+	await photo_status_stream.start_hub()
 	log.info("Application startup completed")
 	yield
 	# Shutdown
 	log.info("Application shutdown initiated")
 	from user_routes import stop_session_cleanup
 	await stop_session_cleanup()
+	await push_queue.stop_dispatcher()
+	await photo_counts.stop_repair_job()
+	await photo_status_stream.stop_hub()
+	await push_notifications.close_http_client()
 	log.info("Application shutdown completed")
 
 
@@ -94,198 +103,15 @@ app = FastAPI(
 )
 
 
-# Security Headers Middleware
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-	async def dispatch(self, request: Request, call_next):
-		response = await call_next(request)
-
-		# Security headers
-		response.headers["X-Content-Type-Options"] = "nosniff"
-		response.headers["X-Frame-Options"] = "DENY"
-		response.headers["X-XSS-Protection"] = "1; mode=block"
-		response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-		response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-		response.headers["Permissions-Policy"] = "geolocation=(self), camera=(self), microphone=()"
-		# The API has its own host (api.hillview.cz); the main site's robots.txt does
-		# not apply here. Keep API responses out of search indices — except /docs (the
-		# Swagger UI), which we do want discoverable.
-		if not request.url.path.startswith("/docs"):
-			response.headers["X-Robots-Tag"] = "noindex, nofollow"
-
-		# Remove server header
-		if "Server" in response.headers:
-			del response.headers["Server"]
-
-		# Content Security Policy (adjust based on your needs)
-		response.headers["Content-Security-Policy"] = (
-			"default-src 'self'; "
-			"script-src 'self' 'unsafe-inline'; "  # Adjust as needed
-			"style-src 'self' 'unsafe-inline'; "  # Adjust as needed
-			"img-src 'self' data: https:; "
-			"font-src 'self' data:; "
-			"connect-src 'self'; "
-			"frame-ancestors 'none';"
-		)
-
-		return response
-
-
-# Global Rate Limiting Middleware
-class GlobalRateLimitMiddleware(BaseHTTPMiddleware):
-	"""Global rate limiting middleware for basic protection."""
-
-	def __init__(self, app):
-		super().__init__(app)
-		from rate_limiter import general_rate_limiter
-		self.rate_limiter = general_rate_limiter
-
-		# Endpoints that bypass global rate limiting (have their own specific limits)
-		self.bypass_paths = {
-			"/api/auth/token",
-			"/api/auth/register",
-			"/api/auth/oauth-redirect",
-			"/api/auth/oauth-callback",
-			"/api/auth/oauth"
-		}
-
-	async def dispatch(self, request: Request, call_next):
-		# Check if rate limiting is globally disabled
-		if is_rate_limiting_disabled():
-			# log.debug(f"Rate limiting bypassed globally (NO_LIMITS=true) for {request.url.path}")
-			return await call_next(request)
-
-		# Skip rate limiting for certain paths and methods
-		if (request.url.path in self.bypass_paths or
-			request.method == "OPTIONS" or
-			request.url.path.startswith("/api/debug")):
-			return await call_next(request)
-
-		# Worker file uploads get their own limit
-		limit_type = 'worker_upload' if request.url.path == "/api/photos/upload-file" else 'general_api'
-
-		# Apply rate limiting
-		try:
-			await self.rate_limiter.enforce_rate_limit(request, limit_type)
-		except HTTPException as e:
-			# Return rate limit response
-			from fastapi.responses import JSONResponse
-			return JSONResponse(
-				status_code=e.status_code,
-				content={"detail": e.detail},
-				headers=e.headers
-			)
-
-		return await call_next(request)
-
-
-# Request logging middleware with real client IP
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-	async def dispatch(self, request: Request, call_next):
-		from rate_limiter import get_client_ip
-
-		# Get real client IP (handles proxy headers)
-		client_ip = get_client_ip(request)
-		start_time = time.time()
-
-		response = await call_next(request)
-
-		# Calculate response time
-		process_time = time.time() - start_time
-
-		# Log access in a format similar to standard access logs but with real client IP
-		log.info(f'{client_ip} - "{request.method} {request.url.path}" {response.status_code} {process_time:.3f}s')
-
-		return response
-
-
-# CORS request logging middleware
-class CORSLoggingMiddleware(BaseHTTPMiddleware):
-	async def dispatch(self, request: Request, call_next):
-		# Log CORS-related request details
-		origin = request.headers.get("origin")
-		access_control_request_method = request.headers.get("access-control-request-method")
-		access_control_request_headers = request.headers.get("access-control-request-headers")
-
-		if request.method == "OPTIONS" or origin:
-			#log.info(f"CORS Request: {request.method} {request.url}")
-			#log.info(f"  Origin: {origin}")
-			if access_control_request_method:
-				#log.info(f"  Access-Control-Request-Method: {access_control_request_method}")
-				pass
-			if access_control_request_headers:
-				#log.info(f"  Access-Control-Request-Headers: {access_control_request_headers}")
-				pass
-
-		response = await call_next(request)
-
-		# Log CORS-related response headers
-		if request.method == "OPTIONS" or origin:
-			access_control_allow_origin = response.headers.get("access-control-allow-origin")
-			access_control_allow_methods = response.headers.get("access-control-allow-methods")
-			access_control_allow_headers = response.headers.get("access-control-allow-headers")
-			access_control_allow_credentials = response.headers.get("access-control-allow-credentials")
-
-			#log.info(f"CORS Response: {response.status_code}")
-			#log.info(f"  Access-Control-Allow-Origin: {access_control_allow_origin}")
-			if access_control_allow_methods:
-				#log.info(f"  Access-Control-Allow-Methods: {access_control_allow_methods}")
-				pass
-			if access_control_allow_headers:
-				#log.info(f"  Access-Control-Allow-Headers: {access_control_allow_headers}")
-				pass
-			if access_control_allow_credentials:
-				#log.info(f"  Access-Control-Allow-Credentials: {access_control_allow_credentials}")
-				pass
-
-		return response
-
-
-# Reverse Proxy Middleware - Handle forwarded headers from Caddy
-class ReverseProxyMiddleware(BaseHTTPMiddleware):
-	async def dispatch(self, request: Request, call_next):
-		# Trust forwarded headers from reverse proxy (Caddy)
-		forwarded_proto = request.headers.get("X-Forwarded-Proto")
-		forwarded_host = request.headers.get("X-Forwarded-Host")
-
-		if forwarded_proto:
-			request.scope["scheme"] = forwarded_proto
-		if forwarded_host:
-			request.scope["server"] = (forwarded_host, None)
-
-		# Extract and store the real client IP from proxy headers
-		real_client_ip = None
-
-		# Check for proxy headers in order of preference
-		# X-Forwarded-For can contain multiple IPs, use the first (original client)
-		forwarded_for = request.headers.get("X-Forwarded-For")
-		if forwarded_for:
-			# X-Forwarded-For format: "client_ip, proxy1_ip, proxy2_ip, ..."
-			client_ip = forwarded_for.split(",")[0].strip()
-			if client_ip:
-				real_client_ip = client_ip
-
-		# Check X-Real-IP (typically set by nginx)
-		if not real_client_ip:
-			real_ip = request.headers.get("X-Real-IP")
-			if real_ip:
-				real_client_ip = real_ip.strip()
-
-		# Check CF-Connecting-IP (Cloudflare)
-		if not real_client_ip:
-			cf_connecting_ip = request.headers.get("CF-Connecting-IP")
-			if cf_connecting_ip:
-				real_client_ip = cf_connecting_ip.strip()
-
-		# Store the real client IP in request state for get_client_ip() to use
-		request.state.real_client_ip = real_client_ip
-
-		return await call_next(request)
-
-
-# Add middlewares (order matters - later added = executed first)
+# Add middlewares (order matters - later added = executed first). All pure ASGI,
+# see middleware.py.
 # Debug-only HTTP fault injection, shared with the worker; inert unless armed.
 from common import debug_faults
 debug_faults.install(app)
+from middleware import (
+	CORSLoggingMiddleware, RequestLoggingMiddleware, GlobalRateLimitMiddleware,
+	SecurityHeadersMiddleware, ReverseProxyMiddleware,
+)
 app.add_middleware(CORSLoggingMiddleware)
 app.add_middleware(RequestLoggingMiddleware)
 app.add_middleware(GlobalRateLimitMiddleware)
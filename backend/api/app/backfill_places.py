@@ -8,25 +8,38 @@ upload time.
 Geocoder-agnostic: talks to any Nominatim-compatible /reverse endpoint via
 --geocoder-url. The public OSM Nominatim (default) is fine for small validation
 runs but its usage policy FORBIDS bulk geocoding (~27k) — point --geocoder-url
-at a self-hosted Nominatim/Photon for the full run.
+at a self-hosted Nominatim/Photon for the full run, and raise --concurrency /
+drop --delay there. The defaults (1 request in flight, 1.1 s apart) are the
+public instance's limits.
+
+Pipelined: photos are read in keyset pages by id; each page's lookups start as
+soon as it is read (several pages overlap, sharing the --concurrency limit);
+pages are written back in order, one batched UPDATE and commit per page.
+Nearby photos share a lookup: one request per --cell-m grid cell, and photos
+in a cell already being looked up wait for that answer.
 
 Resumable: only touches photos with geocode IS NULL, so re-running continues.
+Within a run, --checkpoint records the last written id and the tallies after
+every page, so an interrupted run picks up where it stopped (rows that got a
+transport error stay NULL for the next full pass). A finished run removes it.
 
 Run inside the api container, e.g.:
   docker exec hillview_api sh -lc 'cd /app/app && \
     python3 backfill_places.py --filter curated --limit 60'
+  docker exec hillview_api sh -lc 'cd /app/app && \
+    python3 backfill_places.py --geocoder-url http://nominatim:8080 --concurrency 16 --delay 0'
 """
 import os
 import sys
-import time
 import json
 import re
 import math
 import unicodedata
 import asyncio
 import argparse
-import urllib.parse
-import urllib.request
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common'))
 
@@ -116,16 +129,21 @@ def km_between(lat1, lon1, lat2, lon2):
     return 6371.0 * 2 * math.asin(math.sqrt(a))
 
 
-def reverse_geocode(base_url: str, lat: float, lon: float, zoom: int, max_km: float):
-    q = urllib.parse.urlencode({
+USER_AGENT = 'hillview-place-backfill/1.0 (https://hillview.cz)'
+NO_COVERAGE = {'address': {}, 'display_name': None}
+
+
+async def reverse_geocode(client: httpx.AsyncClient, base_url: str, lat: float, lon: float, zoom: int) -> dict:
+    """Raw /reverse response for a point. Raises on transport / HTTP errors."""
+    r = await client.get(f"{base_url.rstrip('/')}/reverse", params={
         'lat': lat, 'lon': lon, 'format': 'json', 'zoom': zoom, 'addressdetails': 1,
     })
-    req = urllib.request.Request(
-        f"{base_url.rstrip('/')}/reverse?{q}",
-        headers={'User-Agent': 'hillview-place-backfill/1.0 (https://hillview.cz)'},
-    )
-    with urllib.request.urlopen(req, timeout=20) as r:
-        data = json.loads(r.read())
+    r.raise_for_status()
+    return r.json()
+
+
+def to_geo(data: dict, lat: float, lon: float, max_km: float):
+    """{address, display_name} from a /reverse response, or None for no coverage."""
     addr = data.get('address')
     if not addr:
         return None
@@ -141,6 +159,140 @@ def reverse_geocode(base_url: str, lat: float, lon: float, zoom: int, max_km: fl
     return {'address': addr, 'display_name': data.get('display_name')}
 
 
+def cell_key(lat: float, lon: float, cell_m: float) -> Tuple[int, int]:
+    """Grid cell of about cell_m x cell_m (narrower in longitude away from the
+    equator, which only makes sharing more conservative)."""
+    step = cell_m / 111_320.0
+    return round(lat / step), round(lon / step)
+
+
+class Geocoder:
+    """Reverse lookups with at most `concurrency` requests in flight, request
+    starts spaced at least `delay` s apart, and one request per `cell_m` grid
+    cell (0 = no sharing). The distance check runs per photo against its own
+    coordinates. A failed lookup isn't remembered, so the next photo in that
+    cell tries again."""
+
+    def __init__(self, client: httpx.AsyncClient, base_url: str, zoom: int, max_km: float,
+                 concurrency: int = 1, delay: float = 0.0, cell_m: float = 0.0):
+        self.client = client
+        self.base_url = base_url
+        self.zoom = zoom
+        self.max_km = max_km
+        self.delay = delay
+        self.cell_m = cell_m
+        self.requests = 0
+        self.shared = 0
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        self._pace = asyncio.Lock()
+        self._next_start = 0.0
+        self._cells: Dict[Tuple[int, int], asyncio.Future] = {}
+
+    async def _request(self, lat: float, lon: float) -> dict:
+        async with self._slots:
+            if self.delay > 0:
+                async with self._pace:
+                    loop = asyncio.get_running_loop()
+                    wait = self._next_start - loop.time()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    self._next_start = loop.time() + self.delay
+            self.requests += 1
+            return await reverse_geocode(self.client, self.base_url, lat, lon, self.zoom)
+
+    async def lookup(self, lat: float, lon: float):
+        """{address, display_name}, or None for no coverage. Raises on transport errors."""
+        if self.cell_m <= 0:
+            data = await self._request(lat, lon)
+        else:
+            key = cell_key(lat, lon, self.cell_m)
+            fut = self._cells.get(key)
+            if fut is None:
+                fut = asyncio.ensure_future(self._request(lat, lon))
+                self._cells[key] = fut
+                fut.add_done_callback(lambda f, key=key: self._forget_failed(key, f))
+            else:
+                self.shared += 1
+            # shield: one waiter being cancelled mustn't cancel the others' lookup
+            data = await asyncio.shield(fut)
+        return to_geo(data, lat, lon, self.max_km)
+
+    def _forget_failed(self, key, fut: asyncio.Future) -> None:
+        if fut.cancelled() or fut.exception() is not None:
+            if self._cells.get(key) is fut:
+                del self._cells[key]
+
+
+Row = Tuple[str, float, float]  # (photo id, lat, lon)
+
+
+async def geocode_page(geocoder: Geocoder, page: List[Row]) -> List[Tuple[Row, object]]:
+    """Look up a page concurrently: [(row, geo | None | Exception)] in page order."""
+    results = await asyncio.gather(*(geocoder.lookup(lat, lon) for _, lat, lon in page),
+                                   return_exceptions=True)
+    return list(zip(page, results))
+
+
+async def run_pipeline(pages: AsyncIterator[List[Row]], geocoder: Geocoder,
+                       write_page: Callable[[List[Tuple[Row, object]]], Awaitable[None]],
+                       depth: int = 3) -> None:
+    """Geocode pages as they are read, up to `depth` pages ahead of the writer,
+    and hand each page's results to write_page in page order."""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=depth)
+
+    async def produce():
+        async for page in pages:
+            await queue.put(asyncio.ensure_future(geocode_page(geocoder, page)))
+        await queue.put(None)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            task = await queue.get()
+            if task is None:
+                break
+            await write_page(await task)
+        await producer
+    finally:
+        producer.cancel()
+        while not queue.empty():
+            task = queue.get_nowait()
+            if task is not None:
+                task.cancel()
+
+
+class Checkpoint:
+    """Last written photo id and the run's tallies, in a JSON file. Only
+    resumed by a run with the same selection (geocoder, filter, retry mode)."""
+
+    def __init__(self, path: Optional[str], selection: dict):
+        self.path = path
+        self.selection = selection
+
+    def load(self) -> dict:
+        fresh = {'cursor': '', 'placed': 0, 'nocov': 0, 'errors': 0}
+        if not self.path or not os.path.exists(self.path):
+            return fresh
+        with open(self.path) as f:
+            saved = json.load(f)
+        if saved.get('selection') != self.selection:
+            print(f"Checkpoint {self.path} is for a different selection; starting over.", flush=True)
+            return fresh
+        return {k: saved.get(k, v) for k, v in fresh.items()}
+
+    def save(self, state: dict) -> None:
+        if not self.path:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({'selection': self.selection, **state}, f)
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
 def _interesting():
     return or_(
         Photo.featured == True,
@@ -154,93 +306,118 @@ def _interesting():
 async def rederive(opts):
     """Recompute place_name/place_slug from already-stored geocode JSONB — no
     network. Use after changing derive_place() to re-slug cheaply."""
-    changed = 0
     async with SessionLocal() as db:
         rows = (await db.execute(
             select(Photo.id, Photo.geocode).where(Photo.geocode.isnot(None))
         )).all()
+        updates = []
         for pid, geo in rows:
             addr = (geo or {}).get('address') or {}
             name, slug = derive_place(addr)
             pname, pslug = derive_parent(addr)
             if opts.dry_run:
                 print(f"  {pid} -> {name!r} [{slug}] / parent {pname!r} [{pslug}]", flush=True)
-            else:
-                await db.execute(update(Photo).where(Photo.id == pid).values(
-                    place_name=name, place_slug=slug,
-                    place_parent_name=pname, place_parent_slug=pslug))
-            changed += 1
-        if not opts.dry_run:
+            updates.append({'id': pid, 'place_name': name, 'place_slug': slug,
+                            'place_parent_name': pname, 'place_parent_slug': pslug})
+        if updates and not opts.dry_run:
+            for i in range(0, len(updates), opts.batch_size):
+                await db.execute(update(Photo), updates[i:i + opts.batch_size])
             await db.commit()
-    print(f"Re-derived {changed} rows.", flush=True)
+    print(f"Re-derived {len(updates)} rows.", flush=True)
 
 
-async def main(opts):
-    if opts.rederive:
-        return await rederive(opts)
-    placed = nocov = errors = 0
-    # Keyset pagination by id. Lets us *not* write anything on a transport error
-    # (so a transient 503 doesn't strand a photo — a later run retries it) while
-    # still advancing past it; with a plain `WHERE geocode IS NULL` the unwritten
-    # row would just be re-selected next batch and loop.
-    cursor = ''
-    async with SessionLocal() as db:
-        while opts.limit is None or (placed + nocov) < opts.limit:
-            conds = [
-                Photo.is_public == True,
-                Photo.deleted == False,
-                Photo.processing_status == "completed",
-                Photo.geometry.isnot(None),
-                # Default: rows never written. --retry-no-place also revisits rows
-                # left placeless before (out-of-coverage markers) — pair it with a
-                # global --geocoder-url.
-                Photo.place_slug.is_(None) if opts.retry_no_place else Photo.geocode.is_(None),
-                Photo.id > cursor,
-            ]
-            if opts.filter == 'curated':
-                conds.append(_interesting())
+async def photo_pages(opts, cursor: str) -> AsyncIterator[List[Row]]:
+    """Pages of photos still to geocode, by id after `cursor`. A short session
+    per page, so a long run doesn't hold a transaction open."""
+    remaining = opts.limit
+    while remaining is None or remaining > 0:
+        conds = [
+            Photo.is_public == True,
+            Photo.deleted == False,
+            Photo.processing_status == "completed",
+            Photo.geometry.isnot(None),
+            # Default: rows never written. --retry-no-place also revisits rows
+            # left placeless before (out-of-coverage markers) — pair it with a
+            # global --geocoder-url.
+            Photo.place_slug.is_(None) if opts.retry_no_place else Photo.geocode.is_(None),
+            Photo.id > cursor,
+        ]
+        if opts.filter == 'curated':
+            conds.append(_interesting())
+        n = opts.batch_size if remaining is None else min(opts.batch_size, remaining)
+        async with SessionLocal() as db:
             rows = (await db.execute(
                 select(Photo.id, ST_Y(Photo.geometry), ST_X(Photo.geometry))
-                .where(*conds).order_by(Photo.id).limit(200)
+                .where(*conds).order_by(Photo.id).limit(n)
             )).all()
-            if not rows:
-                break
-            for pid, lat, lon in rows:
-                cursor = pid
-                if opts.limit is not None and (placed + nocov) >= opts.limit:
-                    break
-                try:
-                    geo = reverse_geocode(opts.geocoder_url, lat, lon, opts.zoom, opts.max_km)
-                except Exception as e:
-                    # Hold off writing on a transport error — leave the row NULL so
-                    # a later run retries it.
-                    print(f"  {pid} geocode error (left for retry): {e}", flush=True)
-                    errors += 1
-                    time.sleep(opts.delay)
-                    continue
-                if geo is None:
-                    # Clean response but no usable/near place: out of coverage. Mark
-                    # so reruns skip it; revisit later via --retry-no-place + global.
-                    nocov += 1
-                    if not opts.dry_run:
-                        await db.execute(update(Photo).where(Photo.id == pid)
-                            .values(geocode={'address': {}, 'display_name': None}))
-                else:
-                    placed += 1
-                    name, slug = derive_place(geo['address'])
-                    pname, pslug = derive_parent(geo['address'])
-                    if opts.dry_run:
-                        print(f"  {lat:.5f},{lon:.5f} -> {name!r} [{slug}] / {pname!r} [{pslug}]", flush=True)
-                    else:
-                        await db.execute(update(Photo).where(Photo.id == pid).values(
-                            geocode=geo, place_name=name, place_slug=slug,
-                            place_parent_name=pname, place_parent_slug=pslug))
-                if (placed + nocov) % 25 == 0:
-                    print(f"  ...{placed} placed, {nocov} no-coverage, {errors} errors", flush=True)
-                time.sleep(opts.delay)
-            if not opts.dry_run:
+        if not rows:
+            return
+        # Keyset by id, so a row left unwritten (transport error) is passed
+        # rather than re-selected; a later run retries it.
+        cursor = rows[-1][0]
+        if remaining is not None:
+            remaining -= len(rows)
+        yield [(pid, lat, lon) for pid, lat, lon in rows]
+
+
+def page_updates(results, state: dict, dry_run: bool) -> List[dict]:
+    """Tally a geocoded page into state and build its UPDATE parameter rows."""
+    updates = []
+    for (pid, lat, lon), geo in results:
+        if isinstance(geo, Exception):
+            # Hold off writing on a transport error — leave the row NULL so
+            # a later run retries it.
+            print(f"  {pid} geocode error (left for retry): {geo!r}", flush=True)
+            state['errors'] += 1
+        elif geo is None:
+            # Clean response but no usable/near place: out of coverage. Mark
+            # so reruns skip it; revisit later via --retry-no-place + global.
+            state['nocov'] += 1
+            updates.append({'id': pid, 'geocode': NO_COVERAGE})
+        else:
+            state['placed'] += 1
+            name, slug = derive_place(geo['address'])
+            pname, pslug = derive_parent(geo['address'])
+            if dry_run:
+                print(f"  {lat:.5f},{lon:.5f} -> {name!r} [{slug}] / {pname!r} [{pslug}]", flush=True)
+            updates.append({'id': pid, 'geocode': geo, 'place_name': name, 'place_slug': slug,
+                            'place_parent_name': pname, 'place_parent_slug': pslug})
+    state['cursor'] = results[-1][0][0]
+    return updates
+
+
+async def main(opts):
+    if opts.rederive:
+        return await rederive(opts)
+    checkpoint = Checkpoint(None if opts.dry_run else opts.checkpoint, {
+        'geocoder_url': opts.geocoder_url, 'filter': opts.filter, 'retry_no_place': opts.retry_no_place,
+    })
+    state = checkpoint.load()
+    if state['cursor']:
+        print(f"Resuming after {state['cursor']}: {state['placed']} placed, "
+              f"{state['nocov']} no-coverage, {state['errors']} errors so far", flush=True)
+
+    async def write_page(results):
+        updates = page_updates(results, state, opts.dry_run)
+        if updates and not opts.dry_run:
+            async with SessionLocal() as db:
+                await db.execute(update(Photo), updates)
                 await db.commit()
-    print(f"Done: {placed} placed, {nocov} no-coverage, {errors} errors (retriable).", flush=True)
+        checkpoint.save(state)
+        print(f"  ...{state['placed']} placed, {state['nocov']} no-coverage, {state['errors']} errors, "
+              f"{geocoder.requests} requests ({geocoder.shared} shared)", flush=True)
+
+    async with httpx.AsyncClient(
+        headers={'User-Agent': USER_AGENT},
+        timeout=20,
+        limits=httpx.Limits(max_connections=max(1, opts.concurrency)),
+    ) as client:
+        geocoder = Geocoder(client, opts.geocoder_url, opts.zoom, opts.max_km,
+                            concurrency=opts.concurrency, delay=opts.delay, cell_m=opts.cell_m)
+        await run_pipeline(photo_pages(opts, state['cursor']), geocoder, write_page)
+    checkpoint.clear()
+    print(f"Done: {state['placed']} placed, {state['nocov']} no-coverage, "
+          f"{state['errors']} errors (retriable).", flush=True)
 
 
 if __name__ == '__main__':
@@ -250,7 +427,14 @@ if __name__ == '__main__':
     p.add_argument('--filter', choices=['all', 'curated'], default='all',
                    help="'curated' = only the interesting set (panos etc.) for validation")
     p.add_argument('--limit', type=int, default=None, help='max photos this run')
-    p.add_argument('--delay', type=float, default=1.1, help='seconds between requests')
+    p.add_argument('--delay', type=float, default=1.1,
+                   help='min seconds between request starts (0 for a self-hosted geocoder)')
+    p.add_argument('--concurrency', type=int, default=1, help='geocoder requests in flight')
+    p.add_argument('--cell-m', type=float, default=50.0,
+                   help='photos within the same grid cell of this size (m) share one lookup; 0 = off')
+    p.add_argument('--batch-size', type=int, default=500, help='photos per page (one UPDATE + commit each)')
+    p.add_argument('--checkpoint', default='backfill_places.checkpoint.json',
+                   help="progress file for resuming an interrupted run ('' = none)")
     p.add_argument('--zoom', type=int, default=16, help='Nominatim zoom (granularity)')
     p.add_argument('--max-km', type=float, default=5.0,
                    help='reject matches farther than this from the photo (guards '
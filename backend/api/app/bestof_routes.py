@@ -12,7 +12,7 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common'))
 from common.database import get_db
-from common.models import Photo, PhotoAnnotation, PhotoRating, PhotoRatingType, User
+from common.models import Photo, PhotoAnnotation, PhotoRatingCount, User
 from hillview_routes import legal_rights_to_license
 from common.utc import format_utc
 from auth import get_current_user_optional_with_query
@@ -37,22 +37,6 @@ async def get_best_photos(
 	await general_rate_limiter.enforce_rate_limit(request, 'public_read', current_user)
 
 	try:
-		# Subquery: thumbs-up count per photo
-		thumbs_up_sub = (
-			select(
-				PhotoRating.photo_id,
-				func.count(PhotoRating.id).label('thumbs_up_count')
-			)
-			.where(
-				and_(
-					PhotoRating.photo_source == 'hillview',
-					PhotoRating.rating == PhotoRatingType.THUMBS_UP
-				)
-			)
-			.group_by(PhotoRating.photo_id)
-			.subquery('thumbs_up_sub')
-		)
-
 		# Subquery: effective annotation count (from annotation controller)
 		annotation_sub = effective_annotation_count_subquery()
 
@@ -65,7 +49,7 @@ async def get_best_photos(
 
 		# Total score
 		score_expr = (
-			func.coalesce(thumbs_up_sub.c.thumbs_up_count, 0)
+			func.coalesce(PhotoRatingCount.thumbs_up, 0)
 			+ func.coalesce(annotation_sub.c.annotation_count, 0)
 			+ resolution_bonus
 		).label('score')
@@ -80,7 +64,10 @@ async def get_best_photos(
 				annotation_count_expr
 			)
 			.join(User, Photo.owner_id == User.id)
-			.outerjoin(thumbs_up_sub, Photo.id == thumbs_up_sub.c.photo_id)
+			.outerjoin(PhotoRatingCount, and_(
+				PhotoRatingCount.photo_source == 'hillview',
+				PhotoRatingCount.photo_id == Photo.id
+			))
 			.outerjoin(annotation_sub, Photo.id == annotation_sub.c.photo_id)
 			.where(Photo.deleted == False)
 			.order_by(score_expr.desc(), Photo.id.desc())
@@ -166,17 +166,20 @@ async def send_fcm_batch(
         'failure': int,
         'stale_tokens': List[str],   # original fcm:<...> strings the
                                      # caller should remove from storage
+        'failed_tokens': List[str],  # failed for a transient reason
+                                     # (quota, unavailable, batch error) —
+                                     # worth retrying later
     }
     """
     if not push_toggle.is_enabled():
         logger.info(f"FCM batch skipped: outgoing push disabled (push_toggle); would have sent {len(fcm_tokens)}")
-        return {'success': 0, 'failure': 0, 'stale_tokens': []}
+        return {'success': 0, 'failure': 0, 'stale_tokens': [], 'failed_tokens': []}
     if not is_fcm_configured():
         logger.error("FCM not configured")
-        return {'success': 0, 'failure': len(fcm_tokens), 'stale_tokens': []}
+        return {'success': 0, 'failure': len(fcm_tokens), 'stale_tokens': [], 'failed_tokens': []}
 
     if not fcm_tokens:
-        return {'success': 0, 'failure': 0, 'stale_tokens': []}
+        return {'success': 0, 'failure': 0, 'stale_tokens': [], 'failed_tokens': []}
 
     # Build data payload
     data = {}
@@ -209,6 +212,7 @@ async def send_fcm_batch(
     total_success = 0
     total_failure = 0
     stale_tokens: List[str] = []  # original "fcm:<token>" strings to be unregistered
+    failed_tokens: List[str] = []
 
     # Send in batches of FCM_BATCH_SIZE
     for i in range(0, len(messages), FCM_BATCH_SIZE):
@@ -224,14 +228,18 @@ async def send_fcm_batch(
                     logger.warning(f"FCM batch item {i + idx} failed: {exc}")
                     if _is_stale_token_error(exc):
                         stale_tokens.append(fcm_tokens[i + idx])
+                    else:
+                        failed_tokens.append(fcm_tokens[i + idx])
 
         except Exception as e:
             logger.error(f"FCM batch error: {e}")
             total_failure += len(batch)
+            failed_tokens.extend(fcm_tokens[i:i + FCM_BATCH_SIZE])
 
     logger.info(
         f"FCM batch sent: {total_success} success, {total_failure} failure"
         + (f", {len(stale_tokens)} stale (to be unregistered)" if stale_tokens else "")
     )
-    return {'success': total_success, 'failure': total_failure, 'stale_tokens': stale_tokens}
+    return {'success': total_success, 'failure': total_failure,
+            'stale_tokens': stale_tokens, 'failed_tokens': failed_tokens}
 
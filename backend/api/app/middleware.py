@@ -0,0 +1,242 @@
+"""HTTP middleware stack of the API, as pure ASGI middleware.
+
+These were BaseHTTPMiddleware subclasses. That base class runs the rest of the
+stack in a separate task and relays the response through a memory stream, once
+per layer, which every request pays for and which streaming responses (the SSE
+photo feeds) have to squeeze through five times. Each class here instead reads
+what it needs from the scope and, where it has to see or change the response,
+wraps send to handle the http.response.start message. Request and response
+bodies pass straight through. Non-HTTP scopes (lifespan, websocket) are not
+touched, as before.
+
+api.py adds them so that they run, outermost first: ReverseProxy,
+SecurityHeaders, GlobalRateLimit, RequestLogging, CORSLogging.
+"""
+import logging
+import time
+
+from fastapi import HTTPException
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from common.config import is_rate_limiting_disabled
+
+# The access line keeps the logger it had when it lived in api.py.
+access_log = logging.getLogger("api")
+cors_log = logging.getLogger(__name__)
+
+
+class ReverseProxyMiddleware:
+	"""Handle forwarded headers from the reverse proxy (Caddy): scheme, host,
+	and the real client IP, stored in request.state for get_client_ip()."""
+
+	def __init__(self, app):
+		self.app = app
+
+	async def __call__(self, scope, receive, send):
+		if scope["type"] != "http":
+			await self.app(scope, receive, send)
+			return
+
+		headers = Headers(scope=scope)
+		forwarded_proto = headers.get("X-Forwarded-Proto")
+		forwarded_host = headers.get("X-Forwarded-Host")
+
+		if forwarded_proto:
+			scope["scheme"] = forwarded_proto
+		if forwarded_host:
+			scope["server"] = (forwarded_host, None)
+
+		# Check for proxy headers in order of preference
+		real_client_ip = None
+
+		# X-Forwarded-For format: "client_ip, proxy1_ip, proxy2_ip, ..." — use the first
+		forwarded_for = headers.get("X-Forwarded-For")
+		if forwarded_for:
+			client_ip = forwarded_for.split(",")[0].strip()
+			if client_ip:
+				real_client_ip = client_ip
+
+		# X-Real-IP (typically set by nginx)
+		if not real_client_ip:
+			real_ip = headers.get("X-Real-IP")
+			if real_ip:
+				real_client_ip = real_ip.strip()
+
+		# CF-Connecting-IP (Cloudflare)
+		if not real_client_ip:
+			cf_connecting_ip = headers.get("CF-Connecting-IP")
+			if cf_connecting_ip:
+				real_client_ip = cf_connecting_ip.strip()
+
+		# request.state is backed by scope["state"]
+		scope.setdefault("state", {})["real_client_ip"] = real_client_ip
+
+		await self.app(scope, receive, send)
+
+
+class SecurityHeadersMiddleware:
+	"""Add security headers to every HTTP response and drop the Server header."""
+
+	STATIC_HEADERS = (
+		("X-Content-Type-Options", "nosniff"),
+		("X-Frame-Options", "DENY"),
+		("X-XSS-Protection", "1; mode=block"),
+		("Strict-Transport-Security", "max-age=31536000; includeSubDomains"),
+		("Referrer-Policy", "strict-origin-when-cross-origin"),
+		("Permissions-Policy", "geolocation=(self), camera=(self), microphone=()"),
+	)
+
+	# Content Security Policy (adjust based on your needs)
+	CONTENT_SECURITY_POLICY = (
+		"default-src 'self'; "
+		"script-src 'self' 'unsafe-inline'; "  # Adjust as needed
+		"style-src 'self' 'unsafe-inline'; "  # Adjust as needed
+		"img-src 'self' data: https:; "
+		"font-src 'self' data:; "
+		"connect-src 'self'; "
+		"frame-ancestors 'none';"
+	)
+
+	def __init__(self, app):
+		self.app = app
+
+	async def __call__(self, scope, receive, send):
+		if scope["type"] != "http":
+			await self.app(scope, receive, send)
+			return
+
+		# The API has its own host (api.hillview.cz); the main site's robots.txt does
+		# not apply here. Keep API responses out of search indices — except /docs (the
+		# Swagger UI), which we do want discoverable.
+		noindex = not scope["path"].startswith("/docs")
+
+		async def send_with_headers(message):
+			if message["type"] == "http.response.start":
+				headers = MutableHeaders(scope=message)
+				for name, value in self.STATIC_HEADERS:
+					headers[name] = value
+				if noindex:
+					headers["X-Robots-Tag"] = "noindex, nofollow"
+				if "Server" in headers:
+					del headers["Server"]
+				headers["Content-Security-Policy"] = self.CONTENT_SECURITY_POLICY
+			await send(message)
+
+		await self.app(scope, receive, send_with_headers)
+
+
+class GlobalRateLimitMiddleware:
+	"""Global rate limiting middleware for basic protection."""
+
+	# Endpoints that bypass global rate limiting (have their own specific limits)
+	BYPASS_PATHS = frozenset({
+		"/api/auth/token",
+		"/api/auth/register",
+		"/api/auth/oauth-redirect",
+		"/api/auth/oauth-callback",
+		"/api/auth/oauth",
+	})
+
+	def __init__(self, app, rate_limiter=None):
+		self.app = app
+		if rate_limiter is None:
+			from rate_limiter import general_rate_limiter
+			rate_limiter = general_rate_limiter
+		self.rate_limiter = rate_limiter
+
+	async def __call__(self, scope, receive, send):
+		if scope["type"] != "http" or is_rate_limiting_disabled():
+			await self.app(scope, receive, send)
+			return
+
+		# Skip rate limiting for certain paths and methods
+		path = scope["path"]
+		if path in self.BYPASS_PATHS or scope["method"] == "OPTIONS" or path.startswith("/api/debug"):
+			await self.app(scope, receive, send)
+			return
+
+		# Worker file uploads get their own limit
+		limit_type = 'worker_upload' if path == "/api/photos/upload-file" else 'general_api'
+
+		try:
+			await self.rate_limiter.enforce_rate_limit(Request(scope, receive), limit_type)
+		except HTTPException as e:
+			response = JSONResponse(
+				status_code=e.status_code,
+				content={"detail": e.detail},
+				headers=e.headers
+			)
+			await response(scope, receive, send)
+			return
+
+		await self.app(scope, receive, send)
+
+
+class RequestLoggingMiddleware:
+	"""Access log line with the real client IP, written when the response
+	starts (as call_next used to return), so a long stream logs on open."""
+
+	def __init__(self, app):
+		self.app = app
+
+	async def __call__(self, scope, receive, send):
+		if scope["type"] != "http":
+			await self.app(scope, receive, send)
+			return
+
+		from rate_limiter import get_client_ip
+
+		# Get real client IP (handles proxy headers)
+		client_ip = get_client_ip(Request(scope))
+		start_time = time.time()
+
+		async def send_and_log(message):
+			if message["type"] == "http.response.start":
+				process_time = time.time() - start_time
+				access_log.info(f'{client_ip} - "{scope["method"]} {scope["path"]}" {message["status"]} {process_time:.3f}s')
+			await send(message)
+
+		await self.app(scope, receive, send_and_log)
+
+
+class CORSLoggingMiddleware:
+	"""Traces CORS requests and the CORS headers they got back, at DEBUG level
+	on this module's logger. With DEBUG off (the default) every request passes
+	straight through; so do non-CORS requests.
+	"""
+
+	def __init__(self, app):
+		self.app = app
+
+	async def __call__(self, scope, receive, send):
+		if scope["type"] != "http" or not cors_log.isEnabledFor(logging.DEBUG):
+			await self.app(scope, receive, send)
+			return
+
+		headers = Headers(scope=scope)
+		origin = headers.get("origin")
+		if scope["method"] != "OPTIONS" and not origin:
+			await self.app(scope, receive, send)
+			return
+
+		cors_log.debug(
+			f"CORS Request: {scope['method']} {scope['path']} origin={origin} "
+			f"request-method={headers.get('access-control-request-method')} "
+			f"request-headers={headers.get('access-control-request-headers')}"
+		)
+
+		async def send_and_trace(message):
+			if message["type"] == "http.response.start":
+				response_headers = Headers(raw=message.get("headers", []))
+				cors_log.debug(
+					f"CORS Response: {message['status']} "
+					f"allow-origin={response_headers.get('access-control-allow-origin')} "
+					f"allow-methods={response_headers.get('access-control-allow-methods')} "
+					f"allow-headers={response_headers.get('access-control-allow-headers')} "
+					f"allow-credentials={response_headers.get('access-control-allow-credentials')}"
+				)
+			await send(message)
+
+		await self.app(scope, receive, send_and_trace)
@@ -0,0 +1,128 @@
+"""Per-owner photo counts by processing status (table user_photo_status_counts,
+migration 032).
+
+A trigger on photos keeps the counters in step with every authorize, process,
+delete and restore inside the writing transaction, so the gallery endpoints
+read a handful of rows instead of re-aggregating the owner's photos per page.
+
+The repair job re-derives the counts from photos and applies the difference.
+It runs in one statement, so actual and stored are read from one snapshot, and
+the drift is added to the row rather than overwriting it. A writer that commits
+in between has already moved both sides by the same amount, so its change is
+kept. It runs every REPAIR_INTERVAL_HOURS in whichever API process gets the
+advisory lock first, and on demand via POST /api/admin/photo-counts/repair.
+"""
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.database import SessionLocal
+from common.models import UserPhotoStatusCount
+
+logger = logging.getLogger(__name__)
+
+REPAIR_INTERVAL_HOURS = float(os.getenv("PHOTO_COUNTS_REPAIR_HOURS", "24"))
+REPAIR_LOCK_ID = 12346  # next to push_notifications.ACTIVITY_BROADCAST_LOCK_ID
+
+_repair_task: Optional[asyncio.Task] = None
+
+
+async def status_counts(db: AsyncSession, owner_id: str) -> Dict[Optional[str], int]:
+	"""{processing_status: n} for the owner's non-deleted photos."""
+	result = await db.execute(
+		select(UserPhotoStatusCount.status, UserPhotoStatusCount.n)
+		.where(UserPhotoStatusCount.owner_id == owner_id, UserPhotoStatusCount.n > 0)
+	)
+	return {status or None: n for status, n in result.all()}
+
+
+def summarize(counts_by_status: Dict[Optional[str], int]) -> Dict[str, int]:
+	"""The counts block the gallery endpoints return."""
+	return {
+		"total": sum(counts_by_status.values()),
+		"completed": counts_by_status.get("completed", 0),
+		"failed": counts_by_status.get("failed", 0),
+		"authorized": counts_by_status.get("authorized", 0),  # Upload authorized but not yet processed
+	}
+
+
+_REPAIR_SQL = text("""
+	WITH actual AS (
+		SELECT owner_id, coalesce(processing_status, '') AS status, count(*) AS n
+		FROM photos
+		WHERE deleted = false AND owner_id IS NOT NULL
+		  AND (CAST(:owner_id AS text) IS NULL OR owner_id = :owner_id)
+		GROUP BY 1, 2
+	), stored AS (
+		SELECT owner_id, status, n FROM user_photo_status_counts
+		WHERE CAST(:owner_id AS text) IS NULL OR owner_id = :owner_id
+	), drift AS (
+		SELECT owner_id, status, coalesce(a.n, 0) AS actual, coalesce(s.n, 0) AS stored
+		FROM actual a FULL JOIN stored s USING (owner_id, status)
+		WHERE coalesce(a.n, 0) <> coalesce(s.n, 0)
+	), fixed AS (
+		INSERT INTO user_photo_status_counts (owner_id, status, n)
+		SELECT owner_id, status, actual - stored FROM drift ORDER BY 1, 2
+		ON CONFLICT (owner_id, status) DO UPDATE SET n = user_photo_status_counts.n + EXCLUDED.n
+		RETURNING 1
+	)
+	SELECT owner_id, status, actual, stored FROM drift ORDER BY 1, 2
+""")
+
+
+async def repair(db: AsyncSession, owner_id: Optional[str] = None) -> List[Dict]:
+	"""Verify the counters (all owners, or one) against photos and fix any that
+	drifted, on the caller's transaction. Returns the rows that were off."""
+	rows = (await db.execute(_REPAIR_SQL, {'owner_id': owner_id})).all()
+	drift = [{'owner_id': r.owner_id, 'status': r.status or None, 'actual': r.actual, 'stored': r.stored}
+			 for r in rows]
+	if drift:
+		logger.warning(f"Repaired {len(drift)} photo status counter(s): {drift[:20]}")
+	return drift
+
+
+async def repair_once() -> Optional[List[Dict]]:
+	"""One scheduled pass. None if another process holds the repair lock."""
+	async with SessionLocal() as db:
+		locked = (await db.execute(text("SELECT pg_try_advisory_xact_lock(:id)"), {'id': REPAIR_LOCK_ID})).scalar()
+		if not locked:
+			return None
+		drift = await repair(db)
+		await db.commit()
+		return drift
+
+
+async def _repair_loop() -> None:
+	while True:
+		await asyncio.sleep(REPAIR_INTERVAL_HOURS * 3600)
+		try:
+			drift = await repair_once()
+			if drift is not None:
+				logger.info(f"Photo status counters verified, {len(drift)} repaired")
+		except Exception as e:
+			logger.error(f"Photo status counter repair error: {e}")
+
+
+async def start_repair_job() -> None:
+	"""Start the periodic counter verification (idempotent; off when the
+	interval is 0)."""
+	global _repair_task
+	if _repair_task is None and REPAIR_INTERVAL_HOURS > 0:
+		_repair_task = asyncio.create_task(_repair_loop())
+		logger.info(f"Started photo status counter repair job (every {REPAIR_INTERVAL_HOURS} h)")
+
+
+async def stop_repair_job() -> None:
+	global _repair_task
+	if _repair_task:
+		_repair_task.cancel()
+		try:
+			await _repair_task
+		except asyncio.CancelledError:
+			pass
+		_repair_task = None
+		logger.info("Stopped photo status counter repair job")
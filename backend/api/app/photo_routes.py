@@ -47,15 +47,20 @@ from datetime import datetime, timezone
 import aiofiles
 from pydantic import BaseModel
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from geoalchemy2.functions import ST_Point, ST_X, ST_Y
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common'))
 
-from push_notifications import send_activity_broadcast_notification, create_notification_for_user
+from push_notifications import create_notification_for_user
+from push_queue import enqueue_activity_broadcast
+from photo_counts import status_counts, summarize
+import photo_status_stream
+from rating_routes import get_ratings_for_photos
 from common.database import get_db
-from common.models import Photo, User, PhotoRating, UserPublicKey, PhotoAnnotation, PhotoModerationAudit, UserRole
+from common.models import Photo, User, UserPublicKey, PhotoModerationAudit, UserRole, SitemapEntry
 from common.config import get_write_pool
 from common.utc import format_utc
 from auth import get_current_active_user, get_current_user_optional_with_query
@@ -83,48 +88,7 @@ router = APIRouter(prefix="/api/photos", tags=["photos"])
 UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "./uploads"))
 UPLOAD_DIR.mkdir(exist_ok=True)
 
-from sqlalchemy import func, and_, or_
-
-async def get_ratings_for_photos(db: AsyncSession, photo_ids: list, user_id: str) -> dict:
-	"""Get ratings data for a list of photo IDs.
-
-	Returns dict mapping photo_id to {user_rating, rating_counts}
-	"""
-	if not photo_ids:
-		return {}
-
-	# Get all ratings for these photos
-	result = await db.execute(
-		select(
-			PhotoRating.photo_id,
-			PhotoRating.rating,
-			PhotoRating.user_id
-		).where(
-			and_(
-				PhotoRating.photo_source == 'hillview',
-				PhotoRating.photo_id.in_([str(pid) for pid in photo_ids])
-			)
-		)
-	)
-
-	# Build rating counts and user ratings
-	ratings_data = {}
-	for photo_id, rating, rating_user_id in result.fetchall():
-		if photo_id not in ratings_data:
-			ratings_data[photo_id] = {
-				'user_rating': None,
-				'rating_counts': {'thumbs_up': 0, 'thumbs_down': 0}
-			}
-
-		# Increment count
-		rating_key = rating.value.lower()
-		ratings_data[photo_id]['rating_counts'][rating_key] += 1
-
-		# Check if this is the current user's rating
-		if str(rating_user_id) == str(user_id):
-			ratings_data[photo_id]['user_rating'] = rating_key
-
-	return ratings_data
+from sqlalchemy import func, tuple_
 
 # Request models for processed photo data
 class ProcessedPhotoData(BaseModel):
@@ -293,12 +257,17 @@ async def save_processed_photo(
 
 	logger.info(f"Photo {photo_id} processing data saved successfully with verified client signature")
 
-	# Send activity broadcast notification - wrapped in try/except so notification
+	# The status change is committed (photos trigger logged it); push it to the
+	# owner's open status streams now rather than at the next poll.
+	photo_status_stream.wake()
+
+	# Queue the activity broadcast; the push dispatcher does the fan-out, so the
+	# worker's response doesn't wait on it. Wrapped in try/except so notification
 	# errors don't fail the photo upload
 	try:
-		await send_activity_broadcast_notification(db, photo.owner_id)
+		await enqueue_activity_broadcast(db, photo.owner_id)
 	except Exception as e:
-		logger.warning(f"Failed to send activity broadcast notification for photo {photo_id}: {e}")
+		logger.warning(f"Failed to queue activity broadcast notification for photo {photo_id}: {e}")
 		# Don't re-raise - photo upload succeeded, notification is non-critical
 
 	return {
@@ -503,19 +472,8 @@ async def list_photos(
 		if only_processed:
 			base_query = base_query.where(Photo.processing_status == "completed")
 
-		# Get counts by processing status (separate query for performance)
-		counts_result = await db.execute(
-			select(Photo.processing_status, func.count(Photo.id))
-			.where(Photo.owner_id == str(current_user.id), Photo.deleted == False)
-			.group_by(Photo.processing_status)
-		)
-		counts_by_status = dict(counts_result.fetchall())
-
-		# Calculate totals
-		total_count = sum(counts_by_status.values())
-		completed_count = counts_by_status.get("completed", 0)
-		failed_count = counts_by_status.get("failed", 0)
-		authorized_count = counts_by_status.get("authorized", 0)
+		# Counts by processing status (trigger-maintained counters)
+		counts = summarize(await status_counts(db, str(current_user.id)))
 
 		# Apply cursor-based pagination to main query
 		query = base_query
@@ -596,12 +554,7 @@ async def list_photos(
 				"has_more": has_more,
 				"limit": limit
 			},
-			"counts": {
-				"total": total_count,
-				"completed": completed_count,
-				"failed": failed_count,
-				"authorized": authorized_count  # Upload authorized but not yet processed
-			}
+			"counts": counts
 		}
 
 	except HTTPException:
@@ -624,26 +577,12 @@ async def get_photo_count(
 	await rate_limit_photo_operations(request, current_user.id)
 
 	try:
-		# Get counts by processing status
-		counts_result = await db.execute(
-			select(Photo.processing_status, func.count(Photo.id))
-			.where(Photo.owner_id == str(current_user.id), Photo.deleted == False)
-			.group_by(Photo.processing_status)
-		)
-		counts_by_status = dict(counts_result.fetchall())
-
-		# Calculate totals
-		total_count = sum(counts_by_status.values())
-		completed_count = counts_by_status.get("completed", 0)
-		failed_count = counts_by_status.get("failed", 0)
-		authorized_count = counts_by_status.get("authorized", 0)
+		# Counts by processing status (trigger-maintained counters)
+		counts_by_status = await status_counts(db, str(current_user.id))
 
 		return {
 			"counts": {
-				"total": total_count,
-				"completed": completed_count,
-				"failed": failed_count,
-				"authorized": authorized_count,
+				**summarize(counts_by_status),
 				"by_status": counts_by_status
 			}
 		}
@@ -702,21 +641,74 @@ async def get_photos_status(
 			detail="Failed to get photo statuses"
 		)
 
+@router.get("/status/stream")
+async def stream_photos_status(
+	request: Request,
+	after: Optional[str] = None,
+	current_user: Optional[User] = Depends(get_current_user_optional_with_query),
+	db: AsyncSession = Depends(get_db)
+):
+	"""Server-sent processing-status changes of the caller's photos.
+
+	Each change is a ``status`` event with the same fields as an item of POST
+	/status, and the SSE id of the change. The stream opens with a ``ready``
+	event carrying the id to resume from. A reconnect resumes after the
+	``Last-Event-ID`` header (sent by EventSource) or ``after``: missed changes
+	are replayed first, preceded by ``resync`` if some may have been pruned,
+	in which case POST /status once for the photos still pending. POST /status
+	remains the fallback for clients that can't hold a stream open.
+
+	Authenticated like the other streams: Authorization header, signed stream
+	credential or (legacy) ``token`` query parameter.
+	"""
+	if current_user is None:
+		raise HTTPException(
+			status_code=status.HTTP_401_UNAUTHORIZED,
+			detail="Authentication required",
+			headers={"WWW-Authenticate": "Bearer"},
+		)
+	await rate_limit_photo_operations(request, current_user.id)
+
+	resume_from = request.headers.get("Last-Event-ID") or after
+	try:
+		resume_after = int(resume_from) if resume_from else None
+	except ValueError:
+		raise HTTPException(
+			status_code=status.HTTP_400_BAD_REQUEST,
+			detail="Invalid cursor format"
+		)
+
+	user_id = str(current_user.id)
+	# The stream runs its own short sessions; don't hold this connection open
+	# for as long as the client stays connected.
+	await db.close()
+
+	return StreamingResponse(
+		photo_status_stream.event_stream(user_id, resume_after),
+		media_type="text/event-stream",
+		headers={
+			"Cache-Control": "no-cache, no-store, must-revalidate",
+			"Connection": "keep-alive",
+			"X-Accel-Buffering": "no",  # Disable nginx buffering
+		}
+	)
+
 @router.get("/sitemap-ids")
 async def get_sitemap_photo_ids(
-	offset: int = 0,
+	after: Optional[str] = None,
 	limit: int = 50000,
 	db: AsyncSession = Depends(get_db),
 ):
 	"""Public, completed photo identifiers for the XML sitemap (no auth — SEO).
 
-	Returns ``{"total", "photos": [{uid, lastmod, img}, ...]}`` for public,
-	non-deleted, completed hillview photos, newest first. ``img`` is the
-	preferred rendition URL for the sitemap's ``<image:image>`` entry (may be
-	null). Paginated so the frontend sitemap can be a sitemap-index of
-	fixed-size child pages and never hit the 50k-URLs-per-file limit.
-	``limit=0`` yields just the total (cheap count) for the index to compute
-	its page count.
+	Returns ``{"total", "photos": [{uid, lastmod, img}, ...], "next_cursor"}``
+	for public, non-deleted, completed hillview photos, newest first. ``img`` is
+	the preferred rendition URL for the sitemap's ``<image:image>`` entry (may
+	be null). Keyset-paginated: pass the previous page's ``next_cursor`` as
+	``after``; a page stays put when photos elsewhere in the list come or go,
+	so a sitemap index of fixed-size child pages stays stable for crawlers.
+	``total`` is only computed for the first page (no ``after``); ``limit=0``
+	yields just that.
 
 	CURATED: only photos with something worth indexing are listed — featured,
 	or carrying a title/description/keywords, or with at least one annotation.
@@ -724,50 +716,45 @@ async def get_sitemap_photo_ids(
 	site quality; they join automatically once they gain any such signal. They
 	stay indexable if found by other means (no noindex).
 
+	The curated set and image URLs are precomputed in ``sitemap_entries``, kept
+	current by triggers (see migration 033), so a page is an indexed range read.
+
 	NOTE: declared before ``/{photo_id}`` so FastAPI doesn't route this literal
 	path into the photo-detail handler.
 	"""
-	interesting = or_(
-		Photo.featured == True,
-		and_(Photo.title.isnot(None), Photo.title != ""),
-		and_(Photo.description.isnot(None), Photo.description != ""),
-		func.array_length(Photo.keywords, 1) > 0,
-		select(PhotoAnnotation.id).where(PhotoAnnotation.photo_id == Photo.id).exists(),
-	)
-	conds = [
-		Photo.is_public == True,
-		Photo.deleted == False,
-		Photo.processing_status == "completed",
-		interesting,
-	]
-	total = await db.scalar(select(func.count()).select_from(Photo).where(*conds))
-	rows = (await db.execute(
-		select(Photo.id, Photo.uploaded_at, Photo.sizes)
-		.where(*conds)
-		.order_by(Photo.uploaded_at.desc())
-		.offset(offset)
-		.limit(limit)
-	)).all()
+	limit = max(0, min(limit, 50000))
+	query = select(SitemapEntry.photo_id, SitemapEntry.uploaded_at, SitemapEntry.img)
+	total = None
+	if after:
+		try:
+			ts, last_id = after.split('_', 1)
+			after_ts = datetime.fromisoformat(ts.replace('Z', '+00:00'))
+		except ValueError:
+			raise HTTPException(
+				status_code=status.HTTP_400_BAD_REQUEST,
+				detail="Invalid cursor format"
+			)
+		query = query.where(tuple_(SitemapEntry.uploaded_at, SitemapEntry.photo_id) < tuple_(after_ts, last_id))
+	else:
+		total = await db.scalar(select(func.count()).select_from(SitemapEntry))
 
-	# Rendition preference for <image:image> entries: the big image-search crop
-	# when the worker produced one (wide sources), else the largest flat size.
-	img_pref = ('3840_crop', 'full', '4096', '3072', '2048', '1200_crop')
+	rows = []
+	if limit:
+		rows = (await db.execute(
+			query.order_by(SitemapEntry.uploaded_at.desc(), SitemapEntry.photo_id.desc()).limit(limit)
+		)).all()
 
-	def sitemap_img(sizes) -> Optional[str]:
-		if not isinstance(sizes, dict):
-			return None
-		for key in img_pref:
-			url = (sizes.get(key) or {}).get('url')
-			if url:
-				return url
-		return None
+	next_cursor = None
+	if len(rows) == limit and rows:
+		next_cursor = f"{format_utc(rows[-1].uploaded_at)}_{rows[-1].photo_id}"
 
 	return {
-		"total": total or 0,
+		"total": total,
 		"photos": [
-			{"uid": f"hillview-{pid}", "lastmod": format_utc(ts) if ts else None, "img": sitemap_img(sizes)}
-			for pid, ts, sizes in rows
+			{"uid": f"hillview-{pid}", "lastmod": format_utc(ts), "img": img}
+			for pid, ts, img in rows
 		],
+		"next_cursor": next_cursor,
 	}
 
 
@@ -0,0 +1,289 @@
+"""Per-owner processing-status stream (GET /api/photos/status/stream).
+
+Clients used to learn that an upload finished by POSTing their pending ids to
+/api/photos/status again and again. A trigger on photos (migration 037) now
+appends a photo_status_events row whenever a photo's processing_status or
+deleted flag changes, and the stream pushes those rows to the owner as SSE.
+
+One hub per API process reads new events and hands each one to that owner's
+open streams. The database then sees one indexed range read per POLL_SECONDS,
+however many clients are connected, and nothing at all while no stream is
+open. save_processed_photo wakes the hub after its commit, so changes made in
+this process go out at once. Changes made by other processes are picked up at
+the next poll.
+
+Event ids come from a sequence, so a transaction holding a lower id can commit
+after one holding a higher id. The hub doesn't move past a gap in the ids
+until the missing rows show up or the gap is GAP_GRACE_SECONDS old (a
+rolled-back insert leaves a permanent gap). An idle hub likewise starts reading
+behind the events of the last GAP_GRACE_SECONDS, not at the newest id. Every
+stream therefore sees events in id order, and the last id a client saw is a
+safe place to resume from (the SSE Last-Event-ID header, or ?after=).
+
+The POST /status endpoint stays as the fallback: for clients without
+EventSource, and after a `resync` event (a resume point older than the
+retained events).
+"""
+import asyncio
+import json
+import logging
+import os
+from datetime import timedelta
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, func, select
+
+from common.database import SessionLocal
+from common.models import PhotoStatusEvent
+from common.utc import utc_minus_timedelta
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = float(os.getenv("STATUS_STREAM_POLL_SECONDS", "1"))
+GAP_GRACE_SECONDS = 10
+KEEPALIVE_SECONDS = 25
+READ_BATCH = 1000
+# A stream that falls this far behind is closed; the client reconnects and
+# catches up from the table.
+MAX_QUEUED = 1000
+RETENTION = timedelta(days=1)
+PRUNE_EVERY_SECONDS = 3600
+
+
+def event_payload(event: PhotoStatusEvent) -> Dict:
+	"""Same fields as an item of POST /api/photos/status."""
+	return {
+		'type': 'status',
+		'id': event.photo_id,
+		'processing_status': event.processing_status,
+		'error': event.error,
+		'retry_after_minutes': event.retry_after_minutes,
+		'deleted': event.deleted,
+	}
+
+
+def sse(data: Dict, event_id: Optional[int] = None) -> str:
+	head = f"id: {event_id}\n" if event_id is not None else ""
+	return f"{head}data: {json.dumps(data)}\n\n"
+
+
+class Subscription:
+	def __init__(self, user_id: str):
+		self.user_id = user_id
+		self.queue: asyncio.Queue = asyncio.Queue()
+		self.lagged = False
+
+	def put(self, event_id: int, payload: Dict) -> bool:
+		"""Queue an event; False once the stream has fallen too far behind."""
+		if self.lagged:
+			return False
+		if self.queue.qsize() >= MAX_QUEUED:
+			self.lagged = True
+			self.queue.put_nowait(None)
+			return False
+		self.queue.put_nowait((event_id, payload))
+		return True
+
+
+class StatusHub:
+	"""Fans photo_status_events out to this process's open streams."""
+
+	def __init__(self):
+		# Every event id <= cursor has been handed out; None while no stream is open.
+		self.cursor: Optional[int] = None
+		# False while the cursor came from an empty table: the first event then
+		# can't be checked for a gap before it.
+		self._anchored = True
+		self._gap_since: Optional[float] = None
+		self._subscribers: Dict[str, Set[Subscription]] = {}
+		self._wakeup: Optional[asyncio.Event] = None
+
+	def _event(self) -> asyncio.Event:
+		if self._wakeup is None:
+			self._wakeup = asyncio.Event()
+		return self._wakeup
+
+	def wake(self) -> None:
+		self._event().set()
+
+	def set_cursor(self, last_id: Optional[int]) -> None:
+		self.cursor = last_id or 0
+		self._anchored = last_id is not None
+		self._gap_since = None
+
+	async def subscribe(self, user_id: str) -> Tuple[Subscription, int]:
+		"""Register a stream. Returns it with the cursor it starts after: older
+		events are read from the table, newer ones arrive on its queue."""
+		if self.cursor is None:
+			# Not max(id): a lower id may still be uncommitted, and a cursor past
+			# it would skip it for good. Start behind the last GAP_GRACE_SECONDS
+			# of events instead; the newer ones are read again and go through
+			# fan_out's gap handling like any other.
+			async with SessionLocal() as db:
+				last_id = (await db.execute(
+					select(func.max(PhotoStatusEvent.id))
+					.where(PhotoStatusEvent.at < func.now() - timedelta(seconds=GAP_GRACE_SECONDS))
+				)).scalar()
+			if self.cursor is None:
+				self.set_cursor(last_id)
+		sub = Subscription(user_id)
+		self._subscribers.setdefault(user_id, set()).add(sub)
+		return sub, self.cursor
+
+	def unsubscribe(self, sub: Subscription) -> None:
+		subs = self._subscribers.get(sub.user_id)
+		if subs is not None:
+			subs.discard(sub)
+			if not subs:
+				del self._subscribers[sub.user_id]
+		if not self._subscribers:
+			# Idle: stop reading, and start near the table's end next time.
+			self.cursor = None
+
+	def fan_out(self, events: List[PhotoStatusEvent], now: float) -> None:
+		"""Hand out events (ascending ids after the cursor) up to the first gap
+		that is still within its grace period."""
+		for event in events:
+			if self.cursor is None:
+				return
+			if event.id != self.cursor + 1 and self._anchored:
+				if self._gap_since is None:
+					self._gap_since = now
+				if now - self._gap_since < GAP_GRACE_SECONDS:
+					return
+			self._anchored = True
+			self._gap_since = None
+			self.cursor = event.id
+			subs = self._subscribers.get(event.user_id)
+			if subs:
+				payload = event_payload(event)
+				for sub in list(subs):
+					if not sub.put(event.id, payload):
+						subs.discard(sub)
+
+	async def poll_once(self) -> bool:
+		"""Read and hand out new events. True if a full batch was read."""
+		cursor = self.cursor
+		if cursor is None:
+			return False
+		async with SessionLocal() as db:
+			events = (await db.execute(
+				select(PhotoStatusEvent)
+				.where(PhotoStatusEvent.id > cursor)
+				.order_by(PhotoStatusEvent.id)
+				.limit(READ_BATCH)
+			)).scalars().all()
+		if self.cursor != cursor:
+			return False
+		self.fan_out(events, asyncio.get_running_loop().time())
+		return len(events) == READ_BATCH and self.cursor != cursor
+
+	async def run(self) -> None:
+		wakeup = self._event()
+		loop = asyncio.get_running_loop()
+		last_prune = None
+		while True:
+			try:
+				while self._subscribers and await self.poll_once():
+					pass
+				if last_prune is None or loop.time() - last_prune > PRUNE_EVERY_SECONDS:
+					last_prune = loop.time()
+					await prune_events()
+			except asyncio.CancelledError:
+				raise
+			except Exception as e:
+				logger.error(f"Photo status stream error: {e}")
+			try:
+				await asyncio.wait_for(wakeup.wait(), POLL_SECONDS)
+			except asyncio.TimeoutError:
+				pass
+			wakeup.clear()
+
+
+hub = StatusHub()
+_hub_task: Optional[asyncio.Task] = None
+
+
+def wake() -> None:
+	"""A photo's status was just committed in this process: read it now."""
+	hub.wake()
+
+
+async def prune_events() -> None:
+	async with SessionLocal() as db:
+		result = await db.execute(delete(PhotoStatusEvent).where(PhotoStatusEvent.at < utc_minus_timedelta(RETENTION)))
+		await db.commit()
+	if result.rowcount:
+		logger.info(f"Pruned {result.rowcount} photo status events")
+
+
+async def backlog(user_id: str, after: int, until: int) -> Tuple[List[PhotoStatusEvent], bool]:
+	"""The user's events in (after, until], and whether events after `after`
+	may already have been pruned (the client should then re-read its photos'
+	status once)."""
+	async with SessionLocal() as db:
+		oldest = (await db.execute(select(func.min(PhotoStatusEvent.id)))).scalar()
+		events = (await db.execute(
+			select(PhotoStatusEvent)
+			.where(
+				PhotoStatusEvent.user_id == user_id,
+				PhotoStatusEvent.id > after,
+				PhotoStatusEvent.id <= until
+			)
+			.order_by(PhotoStatusEvent.id)
+		)).scalars().all()
+	return events, after < until and (oldest is None or oldest > after + 1)
+
+
+async def event_stream(user_id: str, after: Optional[int]) -> AsyncIterator[str]:
+	"""SSE for one client: `ready` (carrying the resume id), then a `status`
+	event per change. With `after`, missed events are replayed first, or
+	`resync` is sent if they may have been pruned."""
+	sub, start = await hub.subscribe(user_id)
+	try:
+		last_id = start
+		if after is not None and after < start:
+			events, resync = await backlog(user_id, after, start)
+			if resync:
+				yield sse({'type': 'resync'})
+			for event in events:
+				yield sse(event_payload(event), event.id)
+		elif after is not None:
+			last_id = after
+		yield sse({'type': 'ready'}, last_id)
+
+		while True:
+			try:
+				item = await asyncio.wait_for(sub.queue.get(), KEEPALIVE_SECONDS)
+			except asyncio.TimeoutError:
+				yield ": keepalive\n\n"
+				continue
+			if item is None:
+				logger.info(f"Photo status stream for {user_id} fell behind; closing")
+				return
+			event_id, payload = item
+			if after is not None and event_id <= after:
+				continue
+			yield sse(payload, event_id)
+	finally:
+		hub.unsubscribe(sub)
+
+
+async def start_hub() -> None:
+	"""Start this process's status hub (idempotent)."""
+	global _hub_task
+	if _hub_task is None:
+		_hub_task = asyncio.create_task(hub.run())
+		logger.info("Started photo status stream hub")
+
+
+async def stop_hub() -> None:
+	global _hub_task
+	if _hub_task:
+		_hub_task.cancel()
+		try:
+			await _hub_task
+		except asyncio.CancelledError:
+			pass
+		_hub_task = None
+		logger.info("Stopped photo status stream hub")
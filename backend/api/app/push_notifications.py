@@ -1,19 +1,64 @@
-from typing import List, Optional, Dict, TypedDict
+from typing import List, Optional, Dict, Tuple, TypedDict
 from datetime import datetime, timedelta
 import asyncio
 import httpx
 import logging
+import os
 
 from common.models import PushRegistration, Notification, User, UserPublicKey
 from common.utc import utcnow
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import and_, delete as sa_delete, text
+from sqlalchemy import and_, delete as sa_delete, insert
 import push_toggle
-from fcm_push import send_fcm_push, send_fcm_batch, is_fcm_configured
+from fcm_push import send_fcm_push, is_fcm_configured
 
 logger = logging.getLogger(__name__)
 
+# Outgoing UnifiedPush POSTs in flight at once, across all fan-out work in this
+# process; also the size of the shared connection pool they go through.
+PUSH_CONCURRENCY = int(os.getenv("PUSH_CONCURRENCY", "32"))
+
+# Serializes activity-broadcast recipient resolution across dispatchers, so the
+# 12-hour "already notified" check can't race itself into duplicate rows.
+ACTIVITY_BROADCAST_LOCK_ID = 12345
+
+ACTIVITY_BROADCAST = {
+	'type': 'activity_broadcast',
+	'title': 'New photos uploaded',
+	'body': 'New photos have been uploaded to Hillview. Check them out!',
+	'route': '/activity',
+}
+
+_http_client: Optional[httpx.AsyncClient] = None
+_push_slots: Optional[asyncio.Semaphore] = None
+
+
+def http_client() -> httpx.AsyncClient:
+	"""The shared client every UnifiedPush POST goes through (keep-alive
+	connections are reused across endpoints on the same distributor)."""
+	global _http_client
+	if _http_client is None:
+		_http_client = httpx.AsyncClient(
+			timeout=10.0,
+			limits=httpx.Limits(max_connections=PUSH_CONCURRENCY,
+								max_keepalive_connections=PUSH_CONCURRENCY))
+	return _http_client
+
+
+async def close_http_client() -> None:
+	global _http_client
+	if _http_client is not None:
+		await _http_client.aclose()
+		_http_client = None
+
+
+def _slots() -> asyncio.Semaphore:
+	global _push_slots
+	if _push_slots is None:
+		_push_slots = asyncio.Semaphore(PUSH_CONCURRENCY)
+	return _push_slots
+
 
 class NotificationDict(TypedDict, total=False):
 	"""Notification data structure passed through the notification system."""
@@ -158,53 +203,54 @@ async def send_push_to_client(client_key_id: str, db: AsyncSession, notif: Notif
 		return
 
 	# Send push to the registered endpoint
-	async with httpx.AsyncClient(timeout=30.0) as client:
-		try:
-			# Check if this is an FCM token or UnifiedPush URL
-			if registration.push_endpoint.startswith('fcm:'):
-				if not is_fcm_configured():
-					logger.warning("FCM not configured")
-					return
-
-				# Send via FCM with notification content and route
-				fcm_result = await send_fcm_push(
-					fcm_token=registration.push_endpoint,
-					title=notif['title'],
-					body=notif['body'],
-					route=notif.get('route')
-				)
-
-				if fcm_result.get('success'):
-					logger.info(f"FCM sent successfully to {client_key_id}")
-					return True
-
-				# Firebase says this token is dead — remove the
-				# registration so we don't keep sending to it.
-				if fcm_result.get('stale'):
-					await _unregister_stale_endpoints(db, [registration.push_endpoint])
-
-				logger.warning(f"FCM failed for {client_key_id}")
+	client = http_client()
+	try:
+		# Check if this is an FCM token or UnifiedPush URL
+		if registration.push_endpoint.startswith('fcm:'):
+			if not is_fcm_configured():
+				logger.warning("FCM not configured")
 				return
 
-			# UnifiedPush HTTP endpoint - send poke to trigger fetch
-			response = await client.post(
-				registration.push_endpoint,
-				json={
-					"content": "activity_update",
-					"encrypted": False
-				},
-				headers={"Content-Type": "application/json"}
+			# Send via FCM with notification content and route
+			fcm_result = await send_fcm_push(
+				fcm_token=registration.push_endpoint,
+				title=notif['title'],
+				body=notif['body'],
+				route=notif.get('route')
 			)
 
-			if response.status_code == 200:
-				logger.info(f"UnifiedPush sent successfully to {client_key_id}")
+			if fcm_result.get('success'):
+				logger.info(f"FCM sent successfully to {client_key_id}")
 				return True
-			else:
-				logger.warning(f"UnifiedPush failed for {client_key_id}: {response.status_code}")
-				return
 
-		except Exception as e:
-			logger.error(f"Error sending push to {client_key_id}: {e}")
+			# Firebase says this token is dead — remove the
+			# registration so we don't keep sending to it.
+			if fcm_result.get('stale'):
+				await _unregister_stale_endpoints(db, [registration.push_endpoint])
+
+			logger.warning(f"FCM failed for {client_key_id}")
+			return
+
+		# UnifiedPush HTTP endpoint - send poke to trigger fetch
+		response = await client.post(
+			registration.push_endpoint,
+			json={
+				"content": "activity_update",
+				"encrypted": False
+			},
+			headers={"Content-Type": "application/json"},
+			timeout=30.0
+		)
+
+		if response.status_code == 200:
+			logger.info(f"UnifiedPush sent successfully to {client_key_id}")
+			return True
+		else:
+			logger.warning(f"UnifiedPush failed for {client_key_id}: {response.status_code}")
+			return
+
+	except Exception as e:
+		logger.error(f"Error sending push to {client_key_id}: {e}")
 
 
 # async def send_broadcast_notification(
@@ -254,44 +300,20 @@ async def send_push_to_client(client_key_id: str, db: AsyncSession, notif: Notif
 
 
 
-async def send_activity_broadcast_notification(
+async def resolve_activity_broadcast(
 	db: AsyncSession,
 	activity_originator_user_id: str
-):
-	"""Send an activity broadcast notification to all users and all anonymous clients.
-	Filters out users who got notified in the last 12 hours.
-	Uses batch sending for FCM efficiency.
-
-	Uses non-blocking advisory lock to prevent duplicate notifications from concurrent calls.
-	If lock cannot be acquired, skips notification (another request will handle it).
-	"""
-	# Use non-blocking transaction-level advisory lock to avoid duplicate notifications
-	# from concurrent requests. The xact lock auto-releases on commit/rollback,
-	# avoiding issues with session-level locks leaking across pooled connections.
-	lock_id = 12345  # Arbitrary unique ID for activity broadcast lock
-	lock_result = await db.execute(text(f"SELECT pg_try_advisory_xact_lock({lock_id})"))
-	acquired = lock_result.scalar()
-	logger.debug(f"Activity broadcast lock acquired: {acquired}")
-
-	if not acquired:
-		logger.debug("Activity broadcast lock not acquired, skipping (another request will handle it)")
-		return
+) -> Tuple[List[str], List[str]]:
+	"""Pick the recipients of an activity broadcast and record their notifications.
 
-	await _send_activity_broadcast_notification_impl(db, activity_originator_user_id)
-
-
-async def _send_activity_broadcast_notification_impl(
-	db: AsyncSession,
-	activity_originator_user_id: str
-):
-	"""Implementation of activity broadcast notification (called with lock held)."""
-	notification = {
-		'type': 'activity_broadcast',
-		'title': 'New photos uploaded',
-		'body': 'New photos have been uploaded to Hillview. Check them out!',
-		'route': '/activity',
-	}
+	Everyone with a push registration gets one, except the uploader and anyone
+	(user or anonymous client) notified within the last 12 hours. The
+	Notification rows go in as one bulk insert on the caller's transaction;
+	nothing is sent here. Callers hold ACTIVITY_BROADCAST_LOCK_ID.
 
+	Returns (fcm_tokens, unified_push_endpoints) to deliver to.
+	"""
+	notification = ACTIVITY_BROADCAST
 	twelve_hours_ago = utcnow() - timedelta(hours=12)
 
 	# Get eligible users with their push endpoints in one query
@@ -336,96 +358,75 @@ async def _send_activity_broadcast_notification_impl(
 	anon_endpoints_result = await db.execute(anon_endpoints_query)
 	anon_endpoints = anon_endpoints_result.fetchall()
 
-	# Create notification records for users (deduplicate by user_id)
-	seen_user_ids = set()
-	for user_id, _ in user_endpoints:
-		if user_id not in seen_user_ids:
-			seen_user_ids.add(user_id)
-			db.add(Notification(
-				user_id=user_id,
-				type=notification['type'],
-				title=notification['title'],
-				body=notification['body'],
-				action_data=notification.get('route'),
-			))
-
-	# Create notification records for anonymous clients
-	for client_key_id, _ in anon_endpoints:
-		db.add(Notification(
-			client_key_id=client_key_id,
-			type=notification['type'],
-			title=notification['title'],
-			body=notification['body'],
-			action_data=notification.get('route'),
-		))
-
-	await db.commit()
+	# One notification per user (a user may have several devices) and per
+	# anonymous client, inserted as a single executemany
+	content = {
+		'type': notification['type'],
+		'title': notification['title'],
+		'body': notification['body'],
+		'action_data': notification.get('route'),
+	}
+	user_ids = list(dict.fromkeys(user_id for user_id, _ in user_endpoints))
+	rows = [{'user_id': user_id, 'client_key_id': None, **content} for user_id in user_ids]
+	rows += [{'user_id': None, 'client_key_id': client_key_id, **content}
+			 for client_key_id, _ in anon_endpoints]
+	if rows:
+		await db.execute(insert(Notification), rows)
 
 	# Separate FCM and UnifiedPush endpoints
 	fcm_tokens = []
 	unified_push_endpoints = []
-
-	for _, endpoint in user_endpoints:
+	for _, endpoint in [*user_endpoints, *anon_endpoints]:
 		if endpoint.startswith('fcm:'):
 			fcm_tokens.append(endpoint)
 		else:
 			unified_push_endpoints.append(endpoint)
 
-	for _, endpoint in anon_endpoints:
-		if endpoint.startswith('fcm:'):
-			fcm_tokens.append(endpoint)
-		else:
-			unified_push_endpoints.append(endpoint)
-
-	# Batch send FCM
-	fcm_result: Dict[str, object] = {'success': 0, 'failure': 0, 'stale_tokens': []}
-	if fcm_tokens:
-		fcm_result = await send_fcm_batch(
-			fcm_tokens,
-			title=notification['title'],
-			body=notification['body'],
-			route=notification.get('route')
-		)
-
-	# Clean up any registrations Firebase reported as stale — next broadcast
-	# won't waste a send on them, and the backend's `push_registrations`
-	# table stays bounded in size.
-	stale_tokens = fcm_result.get('stale_tokens') or []
-	if stale_tokens:
-		await _unregister_stale_endpoints(db, stale_tokens)
-
-	# Send UnifiedPush concurrently
-	unified_push_results = await send_unified_push_batch(unified_push_endpoints)
-
 	logger.info(
-		f"Broadcast sent: {len(seen_user_ids)} users, {len(anon_endpoints)} clients | "
-		f"FCM: {fcm_result['success']}/{len(fcm_tokens)} | "
-		f"UnifiedPush: {unified_push_results['success']}/{len(unified_push_endpoints)}"
+		f"Broadcast resolved: {len(user_ids)} users, {len(anon_endpoints)} clients | "
+		f"FCM: {len(fcm_tokens)} | UnifiedPush: {len(unified_push_endpoints)}"
 	)
+	return fcm_tokens, unified_push_endpoints
 
 
-async def send_unified_push_batch(endpoints: List[str]) -> Dict[str, int]:
-	"""Send UnifiedPush pokes to multiple endpoints concurrently."""
+async def send_unified_push_batch(endpoints: List[str]) -> Dict[str, object]:
+	"""Send UnifiedPush pokes to multiple endpoints concurrently, at most
+	PUSH_CONCURRENCY at a time through the shared client.
+
+	Returns {'success': int, 'failure': int, 'retry': List[str]} — retry holds
+	the endpoints that failed transiently (network error, 429, 5xx); a 4xx
+	otherwise means the distributor rejected the endpoint, so it is not retried.
+	"""
 	if not endpoints:
-		return {'success': 0, 'failure': 0}
+		return {'success': 0, 'failure': 0, 'retry': []}
 
 	if not push_toggle.is_enabled():
 		logger.info(f"UnifiedPush batch skipped: outgoing push disabled (push_toggle); would have sent {len(endpoints)}")
-		return {'success': 0, 'failure': 0}
+		return {'success': 0, 'failure': 0, 'retry': []}
+
+	client = http_client()
+	slots = _slots()
+	retry: List[str] = []
 
 	async def send_one(endpoint: str) -> bool:
 		try:
-			async with httpx.AsyncClient(timeout=10.0) as client:
+			async with slots:
 				response = await client.post(
 					endpoint,
 					json={"content": "activity_update", "encrypted": False},
 					headers={"Content-Type": "application/json"}
 				)
-				return response.status_code == 200
+			if response.status_code == 200:
+				return True
+			logger.warning(f"UnifiedPush failed for {endpoint[:30]}...: {response.status_code}")
+			if response.status_code == 429 or response.status_code >= 500:
+				retry.append(endpoint)
+			return False
 		except Exception as e:
 			logger.warning(f"UnifiedPush failed for {endpoint[:30]}...: {e}")
+			retry.append(endpoint)
 			return False
 
 	results = await asyncio.gather(*[send_one(ep) for ep in endpoints], return_exceptions=True)
 	success = sum(1 for r in results if r is True)
-	return {'success': success, 'failure': len(endpoints) - success}
+	return {'success': success, 'failure': len(endpoints) - success, 'retry': retry}
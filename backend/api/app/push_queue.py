@@ -0,0 +1,272 @@
+"""Durable queue for push fan-out (table push_queue, migration 030).
+
+Request paths only enqueue: the worker's save-processed-photo callback used to
+resolve every recipient, insert their notifications and talk to FCM and every
+UnifiedPush distributor before answering, so its latency grew with the number
+of subscribers. Now it inserts one row and returns.
+
+A dispatcher task per API process drains the queue:
+  - activity_broadcast: resolves recipients under the broadcast advisory lock,
+    bulk-inserts their notifications and enqueues delivery chunks — one
+    transaction, together with deleting the job itself.
+  - fcm / unifiedpush: delivers one chunk of endpoints. Right after the send,
+    one statement settles the job: deleted, or narrowed to the endpoints that
+    failed transiently and backed off exponentially, until MAX_ATTEMPTS. A
+    failure after that (unregistering stale FCM tokens) retries only what is
+    still owed, never an endpoint already delivered to.
+
+Jobs are claimed with FOR UPDATE SKIP LOCKED and leased (locked_until) rather
+than held locked, so several API processes can drain side by side and a
+process that dies mid-job only delays it by LEASE. Given-up jobs (failed_at)
+are kept FAILED_RETENTION for inspection, then pruned.
+"""
+import asyncio
+import json
+import logging
+import os
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.database import SessionLocal
+from fcm_push import FCM_BATCH_SIZE, send_fcm_batch
+from push_notifications import (
+	ACTIVITY_BROADCAST, ACTIVITY_BROADCAST_LOCK_ID, _unregister_stale_endpoints,
+	resolve_activity_broadcast, send_unified_push_batch,
+)
+
+logger = logging.getLogger(__name__)
+
+UNIFIED_PUSH_CHUNK = int(os.getenv("PUSH_QUEUE_UNIFIED_PUSH_CHUNK", "200"))
+MAX_ATTEMPTS = int(os.getenv("PUSH_QUEUE_MAX_ATTEMPTS", "6"))
+BACKOFF_BASE_SECONDS = 30  # 30 s, 1 min, 2 min, 4 min, 8 min
+LEASE = timedelta(minutes=5)
+# Idle re-check interval: picks up retries falling due and jobs enqueued by
+# other API processes (same-process enqueues wake the dispatcher at once).
+POLL_SECONDS = float(os.getenv("PUSH_QUEUE_POLL_SECONDS", "10"))
+FAILED_RETENTION = timedelta(days=7)
+PRUNE_EVERY_SECONDS = 3600
+
+_wakeup: Optional[asyncio.Event] = None
+_dispatcher_task: Optional[asyncio.Task] = None
+
+
+def _event() -> asyncio.Event:
+	global _wakeup
+	if _wakeup is None:
+		_wakeup = asyncio.Event()
+	return _wakeup
+
+
+def backoff(attempts: int) -> timedelta:
+	"""Delay before the next try of a job that has failed `attempts` times."""
+	return timedelta(seconds=BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0))
+
+
+def delivery_jobs(fcm_tokens: List[str], unified_push_endpoints: List[str]) -> List[Dict]:
+	"""Endpoint lists → fcm / unifiedpush job payloads, one per send chunk."""
+	content = {
+		'title': ACTIVITY_BROADCAST['title'],
+		'body': ACTIVITY_BROADCAST['body'],
+		'route': ACTIVITY_BROADCAST.get('route'),
+	}
+	jobs = [{'kind': 'fcm', 'payload': {'tokens': fcm_tokens[i:i + FCM_BATCH_SIZE], **content}}
+			for i in range(0, len(fcm_tokens), FCM_BATCH_SIZE)]
+	jobs += [{'kind': 'unifiedpush',
+			  'payload': {'endpoints': unified_push_endpoints[i:i + UNIFIED_PUSH_CHUNK]}}
+			 for i in range(0, len(unified_push_endpoints), UNIFIED_PUSH_CHUNK)]
+	return jobs
+
+
+async def _insert_jobs(db: AsyncSession, jobs: List[Dict]) -> None:
+	"""Add jobs on the caller's transaction. An unclaimed job with the same
+	dedupe_key absorbs the new one."""
+	if not jobs:
+		return
+	await db.execute(text(
+		"INSERT INTO push_queue (kind, payload, dedupe_key) "
+		"VALUES (:kind, CAST(:payload AS json), :dedupe_key) "
+		"ON CONFLICT (dedupe_key) WHERE attempts = 0 AND dedupe_key IS NOT NULL DO NOTHING"),
+		[{'kind': j['kind'], 'payload': json.dumps(j['payload']), 'dedupe_key': j.get('dedupe_key')}
+		 for j in jobs])
+
+
+def wake() -> None:
+	"""Have this process's dispatcher look at the queue now."""
+	_event().set()
+
+
+async def enqueue_activity_broadcast(db: AsyncSession, activity_originator_user_id: str) -> None:
+	"""Queue an activity broadcast for new uploads by this user and commit.
+	Until the dispatcher claims it, further uploads by the same user fold into
+	the same job."""
+	await _insert_jobs(db, [{
+		'kind': 'activity_broadcast',
+		'payload': {'originator': activity_originator_user_id},
+		'dedupe_key': f"activity_broadcast:{activity_originator_user_id}",
+	}])
+	await db.commit()
+	wake()
+
+
+async def _claim(db: AsyncSession) -> Optional[Dict]:
+	row = (await db.execute(text(
+		"UPDATE push_queue SET locked_until = now() + CAST(:lease AS interval), attempts = attempts + 1 "
+		"WHERE id = (SELECT id FROM push_queue WHERE failed_at IS NULL AND run_after <= now() "
+		"  AND (locked_until IS NULL OR locked_until < now()) "
+		"  ORDER BY run_after, id FOR UPDATE SKIP LOCKED LIMIT 1) "
+		"RETURNING id, kind, payload, attempts"), {'lease': LEASE})).first()
+	await db.commit()
+	if row is None:
+		return None
+	payload = row.payload if isinstance(row.payload, dict) else json.loads(row.payload)
+	return {'id': row.id, 'kind': row.kind, 'payload': payload, 'attempts': row.attempts}
+
+
+async def _done(db: AsyncSession, job: Dict) -> None:
+	await db.execute(text("DELETE FROM push_queue WHERE id = :id"), {'id': job['id']})
+
+
+async def _settle(db: AsyncSession, job: Dict, left: Optional[Dict]) -> None:
+	"""Record a delivery job's outcome right after its send, in one statement
+	and commit: delete it, or narrow its payload to the endpoints still owed
+	(`left`) and back off — or give up on them after MAX_ATTEMPTS. Whatever
+	fails after this, a retry only resends to those."""
+	if left is None:
+		await _done(db, job)
+	else:
+		give_up = job['attempts'] >= MAX_ATTEMPTS
+		if give_up:
+			logger.warning(f"Push job {job['id']} ({job['kind']}) giving up after {job['attempts']} attempts")
+		await db.execute(text(
+			"UPDATE push_queue SET payload = CAST(:payload AS json), locked_until = NULL, "
+			"run_after = now() + CAST(:delay AS interval), "
+			"failed_at = CASE WHEN CAST(:give_up AS boolean) THEN now() END, "
+			"last_error = CASE WHEN CAST(:give_up AS boolean) THEN 'undelivered' ELSE last_error END "
+			"WHERE id = :id"),
+			{'id': job['id'], 'payload': json.dumps(left), 'delay': backoff(job['attempts']),
+			 'give_up': give_up})
+	await db.commit()
+
+
+async def _run_activity_broadcast(db: AsyncSession, job: Dict) -> None:
+	await db.execute(text("SELECT pg_advisory_xact_lock(:id)"), {'id': ACTIVITY_BROADCAST_LOCK_ID})
+	fcm_tokens, unified_push_endpoints = await resolve_activity_broadcast(
+		db, job['payload'].get('originator') or "")
+	await _insert_jobs(db, delivery_jobs(fcm_tokens, unified_push_endpoints))
+	await _done(db, job)
+	await db.commit()
+
+
+async def _run_fcm(db: AsyncSession, job: Dict) -> None:
+	p = job['payload']
+	result = await send_fcm_batch(p['tokens'], title=p['title'], body=p['body'], route=p.get('route'))
+	await _settle(db, job, {**p, 'tokens': result['failed_tokens']} if result.get('failed_tokens') else None)
+	# Firebase says these are dead — don't waste the next broadcast on them
+	if result.get('stale_tokens'):
+		await _unregister_stale_endpoints(db, result['stale_tokens'])
+	logger.info(f"Push job {job['id']}: FCM {result['success']}/{len(p['tokens'])}")
+
+
+async def _run_unifiedpush(db: AsyncSession, job: Dict) -> None:
+	endpoints = job['payload']['endpoints']
+	result = await send_unified_push_batch(endpoints)
+	await _settle(db, job, {'endpoints': result['retry']} if result['retry'] else None)
+	logger.info(f"Push job {job['id']}: UnifiedPush {result['success']}/{len(endpoints)}")
+
+
+HANDLERS = {
+	'activity_broadcast': _run_activity_broadcast,
+	'fcm': _run_fcm,
+	'unifiedpush': _run_unifiedpush,
+}
+
+
+async def _fail(job: Dict, error: str) -> None:
+	"""A job raised: back off and retry the whole job, or give up on it."""
+	give_up = job['attempts'] >= MAX_ATTEMPTS
+	async with SessionLocal() as db:
+		await db.execute(text(
+			"UPDATE push_queue SET locked_until = NULL, last_error = :error, "
+			"run_after = now() + CAST(:delay AS interval), "
+			"failed_at = CASE WHEN CAST(:give_up AS boolean) THEN now() END "
+			"WHERE id = :id"),
+			{'id': job['id'], 'error': error[:2000], 'delay': backoff(job['attempts']),
+			 'give_up': give_up})
+		await db.commit()
+	logger.error(f"Push job {job['id']} ({job['kind']}) failed"
+				 + (" for good" if give_up else f", retrying in {backoff(job['attempts'])}")
+				 + f": {error}")
+
+
+async def drain_once() -> bool:
+	"""Claim and run one due job. Returns False when nothing was due."""
+	async with SessionLocal() as db:
+		job = await _claim(db)
+		if job is None:
+			return False
+		handler = HANDLERS.get(job['kind'])
+		try:
+			if handler is None:
+				raise ValueError(f"unknown push job kind: {job['kind']}")
+			await handler(db, job)
+			return True
+		except Exception as e:
+			await db.rollback()
+			error = f"{type(e).__name__}: {e}"
+	await _fail(job, error)
+	return True
+
+
+async def prune_failed() -> None:
+	async with SessionLocal() as db:
+		result = await db.execute(text(
+			"DELETE FROM push_queue WHERE failed_at < now() - CAST(:retention AS interval)"),
+			{'retention': FAILED_RETENTION})
+		await db.commit()
+	if result.rowcount:
+		logger.info(f"Pruned {result.rowcount} failed push jobs")
+
+
+async def _dispatch_loop() -> None:
+	wakeup = _event()
+	loop = asyncio.get_running_loop()
+	last_prune = None
+	while True:
+		try:
+			while await drain_once():
+				pass
+			if last_prune is None or loop.time() - last_prune > PRUNE_EVERY_SECONDS:
+				last_prune = loop.time()
+				await prune_failed()
+		except asyncio.CancelledError:
+			raise
+		except Exception as e:
+			logger.error(f"Push dispatcher error: {e}")
+		try:
+			await asyncio.wait_for(wakeup.wait(), POLL_SECONDS)
+		except asyncio.TimeoutError:
+			pass
+		wakeup.clear()
+
+
+async def start_dispatcher() -> None:
+	"""Start this process's push dispatcher (idempotent)."""
+	global _dispatcher_task
+	if _dispatcher_task is None:
+		_dispatcher_task = asyncio.create_task(_dispatch_loop())
+		logger.info("Started push queue dispatcher")
+
+
+async def stop_dispatcher() -> None:
+	global _dispatcher_task
+	if _dispatcher_task:
+		_dispatcher_task.cancel()
+		try:
+			await _dispatcher_task
+		except asyncio.CancelledError:
+			pass
+		_dispatcher_task = None
+		logger.info("Stopped push queue dispatcher")
@@ -19,7 +19,7 @@ from common.security_utils import verify_ecdsa_signature, generate_client_key_id
 from common.utc import utcnow
 from auth import get_current_user, get_current_user_optional
 #from push_notifications import create_notification_for_user, create_notification_for_client, send_broadcast_notification
-from push_notifications import send_activity_broadcast_notification
+from push_queue import enqueue_activity_broadcast
 from internal_guard import require_internal_ip
 
 logger = logging.getLogger(__name__)
@@ -479,15 +479,15 @@ async def cleanup_expired_notifications(
 async def activity_broadcast_notification(
 	db: AsyncSession = Depends(get_db)
 ):
-	"""Send an activity broadcast notification to users who haven't been notified in the last 12 hours (internal/admin use).
+	"""Queue an activity broadcast notification to users who haven't been notified in the last 12 hours (internal/admin use).
 
 	This will send notifications to:
 	1. All active users who haven't received an activity broadcast in the last 12 hours
 	2. All anonymous clients who haven't received an activity broadcast in the last 12 hours
 	"""
-	await send_activity_broadcast_notification(db, activity_originator_user_id="")
+	await enqueue_activity_broadcast(db, activity_originator_user_id="")
 
 	return PushRegistrationResponse(
 		success=True,
-		message="Activity broadcast notification sent"
+		message="Activity broadcast notification queued"
 	)
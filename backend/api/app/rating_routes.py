@@ -1,18 +1,18 @@
 """Photo rating routes for thumbs up/down functionality."""
 import logging
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func, and_, delete
+from sqlalchemy import and_, delete
 
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common'))
 from common.database import get_db
-from common.models import PhotoRating, PhotoRatingType, User
+from common.models import PhotoRating, PhotoRatingCount, PhotoRatingType, User
 from auth import get_current_active_user, get_current_user_optional_with_query
 from rate_limiter import rate_limit_photo_operations
 
@@ -32,6 +32,15 @@ class RatingDeleteResponse(BaseModel):
     message: str
     rating_counts: Dict[str, int]
 
+class RatingBatchRequest(BaseModel):
+    source: str = 'hillview'
+    photo_ids: List[str]
+
+class RatingBatchResponse(BaseModel):
+    ratings: Dict[str, RatingResponse]  # Every requested photo id
+
+MAX_BATCH_PHOTOS = 500
+
 # Validate photo source
 VALID_SOURCES = {'hillview', 'mapillary', 'panoramax'}
 
@@ -64,26 +73,102 @@ async def get_rating_counts(
     photo_source: str, 
     photo_id: str
 ) -> Dict[str, int]:
-    """Get aggregated rating counts for a photo."""
+    """Get rating counts for a photo from its counters (photo_rating_counts)."""
     result = await db.execute(
         select(
-            PhotoRating.rating,
-            func.count(PhotoRating.id)
+            PhotoRatingCount.thumbs_up,
+            PhotoRatingCount.thumbs_down
         )
         .where(
             and_(
-                PhotoRating.photo_source == photo_source,
-                PhotoRating.photo_id == photo_id
+                PhotoRatingCount.photo_source == photo_source,
+                PhotoRatingCount.photo_id == photo_id
             )
         )
-        .group_by(PhotoRating.rating)
     )
-    
-    counts = {'thumbs_up': 0, 'thumbs_down': 0}
-    for rating, count in result.fetchall():
-        counts[rating.value.lower()] = count
-    
-    return counts
+    row = result.first()
+    if not row:
+        return {'thumbs_up': 0, 'thumbs_down': 0}
+    return {'thumbs_up': row[0], 'thumbs_down': row[1]}
+
+async def get_ratings_for_photos(
+    db: AsyncSession,
+    photo_ids: list,
+    user_id: Optional[str],
+    photo_source: str = 'hillview'
+) -> dict:
+    """Get ratings data for a list of photo IDs: two lookups however many ids.
+
+    Returns dict mapping every requested photo_id to {user_rating, rating_counts};
+    user_rating is None when user_id is None.
+    """
+    ids = list(dict.fromkeys(str(pid) for pid in photo_ids))
+    if not ids:
+        return {}
+
+    ratings_data = {
+        pid: {'user_rating': None, 'rating_counts': {'thumbs_up': 0, 'thumbs_down': 0}}
+        for pid in ids
+    }
+
+    result = await db.execute(
+        select(
+            PhotoRatingCount.photo_id,
+            PhotoRatingCount.thumbs_up,
+            PhotoRatingCount.thumbs_down
+        ).where(
+            and_(
+                PhotoRatingCount.photo_source == photo_source,
+                PhotoRatingCount.photo_id.in_(ids)
+            )
+        )
+    )
+    for photo_id, thumbs_up, thumbs_down in result.fetchall():
+        ratings_data[photo_id]['rating_counts'] = {'thumbs_up': thumbs_up, 'thumbs_down': thumbs_down}
+
+    if user_id:
+        result = await db.execute(
+            select(PhotoRating.photo_id, PhotoRating.rating).where(
+                and_(
+                    PhotoRating.user_id == user_id,
+                    PhotoRating.photo_source == photo_source,
+                    PhotoRating.photo_id.in_(ids)
+                )
+            )
+        )
+        for photo_id, rating in result.fetchall():
+            ratings_data[photo_id]['user_rating'] = rating.value.lower()
+
+    return ratings_data
+
+@router.post("/batch", response_model=RatingBatchResponse)
+async def get_photo_ratings_batch(
+    batch: RatingBatchRequest,
+    current_user: Optional[User] = Depends(get_current_user_optional_with_query),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get rating counts, and the caller's own rating, for many photos of one source."""
+
+    # Validate inputs
+    photo_source = validate_photo_source(batch.source)
+    if len(batch.photo_ids) > MAX_BATCH_PHOTOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many photo ids (max {MAX_BATCH_PHOTOS})"
+        )
+
+    try:
+        ratings_data = await get_ratings_for_photos(
+            db, batch.photo_ids, current_user.id if current_user else None, photo_source
+        )
+        return RatingBatchResponse(ratings=ratings_data)
+
+    except Exception as e:
+        logger.error(f"Error getting batch ratings: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get rating information"
+        )
 
 @router.post("/{source}/{photo_id}", response_model=RatingResponse)
 async def set_photo_rating(
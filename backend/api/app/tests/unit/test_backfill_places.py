@@ -0,0 +1,197 @@
+"""Unit tests for the place backfill pipeline (backfill_places.py).
+
+The geocoder side runs against a local fake Nominatim (/reverse on a
+loopback port); pages come from an in-memory source and the writer records
+what it would UPDATE, so no database is needed.
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+import pytest
+
+api_app_dir = os.path.join(os.path.dirname(__file__), '..', '..')
+sys.path.insert(0, os.path.abspath(api_app_dir))
+sys.path.insert(1, os.path.abspath(os.path.join(api_app_dir, '..', '..')))
+
+from backfill_places import Checkpoint, Geocoder, NO_COVERAGE, page_updates, run_pipeline
+
+
+class FakeNominatim(ThreadingHTTPServer):
+    """Answers /reverse with a town at the queried point, or no address for
+    points south of `coverage_south`; optionally snaps to a far point."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeNominatimHandler)
+        self.requests = []
+        self.coverage_south = 48.5
+        self.snap_to = None
+        self.fail = False
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class FakeNominatimHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        q = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self.server.requests.append(q)
+        if url.path != '/reverse' or self.server.fail:
+            self.send_response(503)
+            self.end_headers()
+            return
+        lat, lon = float(q['lat']), float(q['lon'])
+        if lat < self.server.coverage_south:
+            body = {'error': 'Unable to geocode'}
+        else:
+            at = self.server.snap_to or (lat, lon)
+            body = {
+                'lat': str(at[0]), 'lon': str(at[1]),
+                'address': {'town': 'Říčany', 'county': 'okres Praha-východ', 'country_code': 'cz'},
+                'display_name': 'Říčany, okres Praha-východ',
+            }
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def nominatim():
+    server = FakeNominatim()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+async def pages_of(rows, size):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+@pytest.mark.asyncio
+async def test_nearby_photos_share_one_lookup(nominatim):
+    async with httpx.AsyncClient() as client:
+        geocoder = Geocoder(client, nominatim.url, zoom=16, max_km=5, concurrency=8, cell_m=50)
+        # three photos a few metres apart, one ~1 km away
+        results = await asyncio.gather(
+            geocoder.lookup(49.99170, 14.67380),
+            geocoder.lookup(49.99172, 14.67382),
+            geocoder.lookup(49.99171, 14.67379),
+            geocoder.lookup(50.00100, 14.67380),
+        )
+    assert all(r['address']['town'] == 'Říčany' for r in results)
+    assert len(nominatim.requests) == 2
+    assert (geocoder.requests, geocoder.shared) == (2, 2)
+    assert nominatim.requests[0]['zoom'] == '16'
+
+
+@pytest.mark.asyncio
+async def test_no_sharing_when_cells_disabled(nominatim):
+    async with httpx.AsyncClient() as client:
+        geocoder = Geocoder(client, nominatim.url, zoom=16, max_km=5, concurrency=4, cell_m=0)
+        await asyncio.gather(*(geocoder.lookup(49.9917, 14.6738) for _ in range(3)))
+    assert len(nominatim.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_far_snap_and_missing_address_are_no_coverage(nominatim):
+    async with httpx.AsyncClient() as client:
+        geocoder = Geocoder(client, nominatim.url, zoom=16, max_km=5)
+        assert await geocoder.lookup(48.0, 14.0) is None
+        nominatim.snap_to = (50.08, 14.42)  # Prague, ~30 km from the photo
+        assert await geocoder.lookup(49.9917, 14.6738) is None
+        nominatim.snap_to = (49.99, 14.67)
+        assert (await geocoder.lookup(49.9917, 14.6738))['display_name'] == 'Říčany, okres Praha-východ'
+
+
+@pytest.mark.asyncio
+async def test_failed_lookup_is_retried_by_the_next_photo(nominatim):
+    async with httpx.AsyncClient() as client:
+        geocoder = Geocoder(client, nominatim.url, zoom=16, max_km=5, cell_m=50)
+        nominatim.fail = True
+        with pytest.raises(httpx.HTTPStatusError):
+            await geocoder.lookup(49.9917, 14.6738)
+        nominatim.fail = False
+        assert await geocoder.lookup(49.9917, 14.6738) is not None
+    assert len(nominatim.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_requests_are_paced(nominatim):
+    async with httpx.AsyncClient() as client:
+        geocoder = Geocoder(client, nominatim.url, zoom=16, max_km=5, concurrency=4, delay=0.05)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.gather(*(geocoder.lookup(49.9 + i / 100, 14.6) for i in range(4)))
+    assert loop.time() - start >= 0.15
+
+
+@pytest.mark.asyncio
+async def test_pipeline_writes_pages_in_order_with_updates(nominatim):
+    rows = [(f"p{i:03d}", 49.9 + i / 100, 14.6) for i in range(7)]
+    rows.append(("p900", 48.0, 14.0))  # out of coverage
+    state = {'cursor': '', 'placed': 0, 'nocov': 0, 'errors': 0}
+    written = []
+
+    async def write_page(results):
+        written.append(page_updates(results, state, dry_run=False))
+
+    async with httpx.AsyncClient() as client:
+        geocoder = Geocoder(client, nominatim.url, zoom=16, max_km=5, concurrency=4)
+        await run_pipeline(pages_of(rows, 3), geocoder, write_page, depth=2)
+
+    assert [[u['id'] for u in page] for page in written] == [
+        ['p000', 'p001', 'p002'], ['p003', 'p004', 'p005'], ['p006', 'p900'],
+    ]
+    assert written[0][0]['place_name'] == 'Říčany'
+    assert written[2][1] == {'id': 'p900', 'geocode': NO_COVERAGE}
+    assert state == {'cursor': 'p900', 'placed': 7, 'nocov': 1, 'errors': 0}
+
+
+@pytest.mark.asyncio
+async def test_transport_errors_are_left_unwritten(nominatim):
+    nominatim.fail = True
+    state = {'cursor': '', 'placed': 0, 'nocov': 0, 'errors': 0}
+    written = []
+
+    async def write_page(results):
+        written.append(page_updates(results, state, dry_run=False))
+
+    async with httpx.AsyncClient() as client:
+        geocoder = Geocoder(client, nominatim.url, zoom=16, max_km=5)
+        await run_pipeline(pages_of([("p1", 49.9, 14.6), ("p2", 49.95, 14.6)], 10), geocoder, write_page)
+
+    assert written == [[]]
+    assert state == {'cursor': 'p2', 'placed': 0, 'nocov': 0, 'errors': 2}
+
+
+def test_checkpoint_resumes_only_the_same_selection(tmp_path):
+    path = str(tmp_path / 'backfill.json')
+    selection = {'geocoder_url': 'http://nominatim:8080', 'filter': 'all', 'retry_no_place': False}
+    state = {'cursor': 'p123', 'placed': 10, 'nocov': 2, 'errors': 1}
+
+    Checkpoint(path, selection).save(state)
+    assert Checkpoint(path, selection).load() == state
+    assert Checkpoint(path, {**selection, 'filter': 'curated'}).load()['cursor'] == ''
+
+    Checkpoint(path, selection).clear()
+    assert not os.path.exists(path)
+    assert Checkpoint(path, selection).load()['cursor'] == ''
+    assert Checkpoint(None, selection).load()['placed'] == 0
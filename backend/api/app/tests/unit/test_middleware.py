@@ -0,0 +1,167 @@
+"""Unit tests for the API's pure ASGI middleware stack (middleware.py).
+
+The stack is mounted on a bare Starlette app in the same order api.py uses, so
+the headers, proxy handling, rate limiting and access log are checked without
+the database or the routers.
+"""
+import logging
+import os
+import sys
+
+import pytest
+from fastapi import HTTPException
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+api_app_dir = os.path.join(os.path.dirname(__file__), '..', '..')
+sys.path.insert(0, os.path.abspath(api_app_dir))
+sys.path.insert(1, os.path.abspath(os.path.join(api_app_dir, '..', '..')))
+
+import middleware
+from middleware import (
+    CORSLoggingMiddleware, RequestLoggingMiddleware, GlobalRateLimitMiddleware,
+    SecurityHeadersMiddleware, ReverseProxyMiddleware,
+)
+
+
+class FakeLimiter:
+    """Records calls; rejects when told to."""
+
+    def __init__(self):
+        self.calls = []
+        self.reject = False
+
+    async def enforce_rate_limit(self, request, limit_type):
+        self.calls.append((request.url.path, limit_type))
+        if self.reject:
+            raise HTTPException(status_code=429, detail="slow down", headers={"Retry-After": "60"})
+
+
+async def whoami(request):
+    return JSONResponse({
+        "scheme": request.url.scheme,
+        "server": request.scope["server"][0],
+        "real_client_ip": getattr(request.state, "real_client_ip", "unset"),
+    })
+
+
+async def with_server_header(request):
+    return PlainTextResponse("ok", headers={"Server": "leaky/1.0"})
+
+
+async def stream(request):
+    async def chunks():
+        for i in range(3):
+            yield f"data: {i}\n\n"
+    return StreamingResponse(chunks(), media_type="text/event-stream")
+
+
+@pytest.fixture
+def limiter():
+    return FakeLimiter()
+
+
+@pytest.fixture
+def client(limiter, monkeypatch):
+    monkeypatch.setattr(middleware, "is_rate_limiting_disabled", lambda: False)
+    app = Starlette(routes=[
+        Route("/api/whoami", whoami),
+        Route("/api/server", with_server_header),
+        Route("/api/stream", stream),
+        Route("/docs", with_server_header),
+        Route("/api/auth/token", whoami, methods=["GET", "OPTIONS"]),
+    ])
+    # Same order as api.py: later added = executed first
+    app.add_middleware(CORSLoggingMiddleware)
+    app.add_middleware(RequestLoggingMiddleware)
+    app.add_middleware(GlobalRateLimitMiddleware, rate_limiter=limiter)
+    app.add_middleware(SecurityHeadersMiddleware)
+    app.add_middleware(ReverseProxyMiddleware)
+    with TestClient(app) as c:
+        yield c
+
+
+def test_security_headers_added_and_server_removed(client):
+    response = client.get("/api/server")
+    assert response.status_code == 200
+    assert response.headers["X-Content-Type-Options"] == "nosniff"
+    assert response.headers["X-Frame-Options"] == "DENY"
+    assert response.headers["Strict-Transport-Security"] == "max-age=31536000; includeSubDomains"
+    assert response.headers["X-Robots-Tag"] == "noindex, nofollow"
+    assert "frame-ancestors 'none'" in response.headers["Content-Security-Policy"]
+    assert "Server" not in response.headers
+
+
+def test_docs_stay_indexable(client):
+    response = client.get("/docs")
+    assert "X-Robots-Tag" not in response.headers
+    assert response.headers["X-Frame-Options"] == "DENY"
+
+
+def test_forwarded_headers(client):
+    response = client.get("/api/whoami", headers={
+        "X-Forwarded-Proto": "https",
+        "X-Forwarded-Host": "api.example.org",
+        "X-Forwarded-For": "203.0.113.7",
+        "X-Real-IP": "198.51.100.1",
+    })
+    assert response.json() == {"scheme": "https", "server": "api.example.org", "real_client_ip": "203.0.113.7"}
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"X-Real-IP": " 198.51.100.1 "}, "198.51.100.1"),
+    ({"CF-Connecting-IP": "192.0.2.9"}, "192.0.2.9"),
+    ({}, None),
+])
+def test_real_client_ip_fallbacks(client, headers, expected):
+    assert client.get("/api/whoami", headers=headers).json()["real_client_ip"] == expected
+
+
+def test_rate_limit_applied_and_rejection_keeps_security_headers(client, limiter):
+    assert client.get("/api/whoami").status_code == 200
+    assert limiter.calls == [("/api/whoami", "general_api")]
+
+    limiter.reject = True
+    response = client.get("/api/whoami")
+    assert response.status_code == 429
+    assert response.json() == {"detail": "slow down"}
+    assert response.headers["Retry-After"] == "60"
+    assert response.headers["X-Frame-Options"] == "DENY"
+
+
+def test_rate_limit_bypasses(client, limiter, monkeypatch):
+    limiter.reject = True
+    assert client.get("/api/auth/token").status_code == 200
+    assert client.options("/api/auth/token").status_code != 429
+    monkeypatch.setattr(middleware, "is_rate_limiting_disabled", lambda: True)
+    assert client.get("/api/whoami").status_code == 200
+    assert limiter.calls == []
+
+
+def test_access_log_line(client, caplog):
+    with caplog.at_level(logging.INFO, logger="api"):
+        client.get("/api/whoami", headers={"X-Forwarded-For": "203.0.113.7"})
+    lines = [r.getMessage() for r in caplog.records if r.name == "api"]
+    assert len(lines) == 1
+    assert lines[0].startswith('203.0.113.7 - "GET /api/whoami" 200 ')
+
+
+def test_streaming_passes_through(client):
+    response = client.get("/api/stream", headers={"Origin": "https://hillview.cz"})
+    assert response.status_code == 200
+    assert response.text == "data: 0\n\ndata: 1\n\ndata: 2\n\n"
+    assert response.headers["X-Content-Type-Options"] == "nosniff"
+
+
+def test_cors_trace_only_at_debug(client, caplog):
+    headers = {"Origin": "https://hillview.cz"}
+    with caplog.at_level(logging.INFO, logger="middleware"):
+        client.get("/api/whoami", headers=headers)
+    assert not [r for r in caplog.records if r.name == "middleware"]
+    with caplog.at_level(logging.DEBUG, logger="middleware"):
+        client.get("/api/whoami", headers=headers)
+    lines = [r.getMessage() for r in caplog.records if r.name == "middleware"]
+    assert lines[0].startswith("CORS Request: GET /api/whoami origin=https://hillview.cz")
+    assert lines[1].startswith("CORS Response: 200 ")
@@ -35,7 +35,7 @@ client = TestClient(app)
 
 # Import models and types
 from common.models import PhotoRating, PhotoRatingType
-from rating_routes import validate_photo_source, validate_rating_type, get_rating_counts
+from rating_routes import validate_photo_source, validate_rating_type, get_rating_counts, get_ratings_for_photos
 
 
 class TestPhotoRatingModels:
@@ -273,7 +273,7 @@ class TestRatingBusinessLogic:
         """Test get_rating_counts with no ratings"""
         mock_db = AsyncMock()
         mock_result = Mock()
-        mock_result.fetchall.return_value = []
+        mock_result.first.return_value = None  # no counter row yet
         mock_db.execute.return_value = mock_result
 
         counts = await get_rating_counts(mock_db, "hillview", "test_photo")
@@ -286,12 +286,8 @@ class TestRatingBusinessLogic:
         mock_db = AsyncMock()
         mock_result = Mock()
 
-        # Mock result with both rating types
-        mock_results = [
-            (PhotoRatingType.THUMBS_UP, 3),
-            (PhotoRatingType.THUMBS_DOWN, 1)
-        ]
-        mock_result.fetchall.return_value = mock_results
+        # Mock counter row with both rating types
+        mock_result.first.return_value = (3, 1)
         mock_db.execute.return_value = mock_result
 
         counts = await get_rating_counts(mock_db, "hillview", "test_photo")
@@ -304,17 +300,45 @@ class TestRatingBusinessLogic:
         mock_db = AsyncMock()
         mock_result = Mock()
 
-        # Mock result with only thumbs up
-        mock_results = [
-            (PhotoRatingType.THUMBS_UP, 5)
-        ]
-        mock_result.fetchall.return_value = mock_results
+        # Mock counter row with only thumbs up
+        mock_result.first.return_value = (5, 0)
         mock_db.execute.return_value = mock_result
 
         counts = await get_rating_counts(mock_db, "hillview", "test_photo")
 
         assert counts == {"thumbs_up": 5, "thumbs_down": 0}
     
+    @pytest.mark.asyncio
+    async def test_get_ratings_for_photos_fills_every_id(self):
+        """Test batch lookup: counters, the user's own rating, zeros for the rest"""
+        counts_result = Mock()
+        counts_result.fetchall.return_value = [("p1", 2, 1)]
+        mine_result = Mock()
+        mine_result.fetchall.return_value = [("p1", PhotoRatingType.THUMBS_DOWN)]
+        mock_db = AsyncMock()
+        mock_db.execute.side_effect = [counts_result, mine_result]
+
+        data = await get_ratings_for_photos(mock_db, ["p1", "p2", "p1"], "user123", "mapillary")
+
+        assert data == {
+            "p1": {"user_rating": "thumbs_down", "rating_counts": {"thumbs_up": 2, "thumbs_down": 1}},
+            "p2": {"user_rating": None, "rating_counts": {"thumbs_up": 0, "thumbs_down": 0}},
+        }
+        assert mock_db.execute.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_get_ratings_for_photos_anonymous(self):
+        """Test batch lookup without a user skips the own-rating query"""
+        counts_result = Mock()
+        counts_result.fetchall.return_value = []
+        mock_db = AsyncMock()
+        mock_db.execute.return_value = counts_result
+
+        data = await get_ratings_for_photos(mock_db, ["p1"], None)
+
+        assert data == {"p1": {"user_rating": None, "rating_counts": {"thumbs_up": 0, "thumbs_down": 0}}}
+        assert mock_db.execute.await_count == 1
+
     def test_rating_request_model_validation(self):
         """Test RatingRequest model validation"""
         from rating_routes import RatingRequest
@@ -354,6 +378,14 @@ class TestRatingBusinessLogic:
 class TestRatingEndpointIntegration:
     """Integration tests for rating endpoints"""
     
+    def test_batch_validation(self):
+        """Test batch endpoint rejects unknown sources and oversized batches"""
+        response = client.post("/api/ratings/batch", json={"source": "invalid_source", "photo_ids": ["a"]})
+        assert response.status_code == 400
+
+        response = client.post("/api/ratings/batch", json={"photo_ids": [str(i) for i in range(501)]})
+        assert response.status_code == 400
+
     def test_rating_workflow_without_auth(self):
         """Test that rating mutations fail without auth (GET is covered by test_get_photo_rating_no_auth)"""
         photo_id = "integration_test_photo"
@@ -0,0 +1,187 @@
+"""Unit tests for the photo status stream hub: id-ordered fan-out across
+sequence gaps, per-owner routing, slow streams, and resuming a stream."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import photo_status_stream
+from photo_status_stream import GAP_GRACE_SECONDS, StatusHub, Subscription
+
+
+def ev(event_id, user_id="u1", status="completed"):
+	return SimpleNamespace(id=event_id, user_id=user_id, photo_id=f"p{event_id}",
+						   processing_status=status, error=None, retry_after_minutes=None, deleted=False)
+
+
+def subscribe(hub, user_id):
+	sub = Subscription(user_id)
+	hub._subscribers.setdefault(user_id, set()).add(sub)
+	return sub
+
+
+def drain(sub):
+	items = []
+	while not sub.queue.empty():
+		items.append(sub.queue.get_nowait())
+	return items
+
+
+@pytest.mark.asyncio
+async def test_fan_out_routes_by_owner_in_id_order():
+	hub = StatusHub()
+	hub.set_cursor(10)
+	a, b = subscribe(hub, "u1"), subscribe(hub, "u2")
+	hub.fan_out([ev(11), ev(12, "u2"), ev(13), ev(14, "u3")], now=0)
+	assert [i for i, _ in drain(a)] == [11, 13]
+	assert [(i, p["id"]) for i, p in drain(b)] == [(12, "p12")]
+	assert hub.cursor == 14
+
+
+@pytest.mark.asyncio
+async def test_fan_out_waits_at_a_gap_until_filled_or_stale():
+	hub = StatusHub()
+	hub.set_cursor(10)
+	sub = subscribe(hub, "u1")
+
+	# 12 committed before 11: hold at 10
+	hub.fan_out([ev(12)], now=100)
+	assert hub.cursor == 10 and drain(sub) == []
+
+	# 11 shows up: both go out, in order
+	hub.fan_out([ev(11), ev(12)], now=101)
+	assert [i for i, _ in drain(sub)] == [11, 12]
+
+	# 13 never commits (rolled back): passed once the gap is old enough
+	hub.fan_out([ev(14)], now=200)
+	hub.fan_out([ev(14)], now=200 + GAP_GRACE_SECONDS / 2)
+	assert drain(sub) == []
+	hub.fan_out([ev(14)], now=200 + GAP_GRACE_SECONDS)
+	assert [i for i, _ in drain(sub)] == [14]
+
+
+@pytest.mark.asyncio
+async def test_cursor_from_empty_table_takes_first_event():
+	hub = StatusHub()
+	hub.set_cursor(None)
+	sub = subscribe(hub, "u1")
+	hub.fan_out([ev(5000), ev(5002)], now=0)
+	assert [i for i, _ in drain(sub)] == [5000]
+	assert hub.cursor == 5000
+
+
+class FakeSession:
+	def __init__(self, last_id, seen):
+		self.last_id, self.seen = last_id, seen
+
+	async def __aenter__(self):
+		return self
+
+	async def __aexit__(self, *exc):
+		return False
+
+	async def execute(self, stmt):
+		self.seen.append(str(stmt))
+		return SimpleNamespace(scalar=lambda: self.last_id)
+
+
+@pytest.mark.asyncio
+async def test_idle_hub_starts_behind_recent_events(monkeypatch):
+	seen = []
+	monkeypatch.setattr(photo_status_stream, "SessionLocal", lambda: FakeSession(40, seen))
+	hub = StatusHub()
+	sub, start = await hub.subscribe("u1")
+	# The anchor is the newest event older than the gap grace, not max(id)
+	assert start == 40 and "photo_status_events.at <" in seen[0]
+
+	# 41 was still uncommitted when 42 was read: 42 waits for it
+	hub.fan_out([ev(42)], now=0)
+	assert drain(sub) == []
+	hub.fan_out([ev(41), ev(42)], now=1)
+	assert [i for i, _ in drain(sub)] == [41, 42]
+
+
+@pytest.mark.asyncio
+async def test_slow_stream_is_cut_off(monkeypatch):
+	monkeypatch.setattr(photo_status_stream, "MAX_QUEUED", 2)
+	hub = StatusHub()
+	hub.set_cursor(0)
+	sub = subscribe(hub, "u1")
+	hub.fan_out([ev(1), ev(2), ev(3), ev(4)], now=0)
+	assert [item and item[0] for item in drain(sub)] == [1, 2, None]
+	assert "u1" not in hub._subscribers or not hub._subscribers["u1"]
+	assert hub.cursor == 4
+
+
+@pytest.mark.asyncio
+async def test_idle_hub_forgets_cursor():
+	hub = StatusHub()
+	hub.set_cursor(7)
+	sub = subscribe(hub, "u1")
+	hub.unsubscribe(sub)
+	assert hub.cursor is None and hub._subscribers == {}
+
+
+async def collect(stream, n):
+	out = []
+	async for chunk in stream:
+		out.append(chunk)
+		if len(out) == n:
+			break
+	await stream.aclose()
+	return out
+
+
+@pytest.mark.asyncio
+async def test_stream_replays_missed_events_then_goes_live(monkeypatch):
+	hub = StatusHub()
+	monkeypatch.setattr(photo_status_stream, "hub", hub)
+
+	async def fake_subscribe(user_id):
+		hub.set_cursor(20)
+		return subscribe(hub, user_id), 20
+
+	async def fake_backlog(user_id, after, until):
+		assert (user_id, after, until) == ("u1", 15, 20)
+		return [ev(17), ev(19)], False
+
+	monkeypatch.setattr(hub, "subscribe", fake_subscribe)
+	monkeypatch.setattr(photo_status_stream, "backlog", fake_backlog)
+
+	stream = photo_status_stream.event_stream("u1", 15)
+	first = [await stream.__anext__() for _ in range(3)]
+	assert first[0].startswith("id: 17\ndata: ") and '"type": "status"' in first[0]
+	assert first[1].startswith("id: 19\n")
+	assert first[2] == 'id: 20\ndata: {"type": "ready"}\n\n'
+
+	hub.fan_out([ev(21), ev(22, "u2")], now=0)
+	live = await asyncio.wait_for(stream.__anext__(), 1)
+	assert live.startswith("id: 21\n") and '"id": "p21"' in live
+	await stream.aclose()
+	assert hub._subscribers == {}
+
+
+@pytest.mark.asyncio
+async def test_stream_reports_pruned_gap_and_skips_seen_ids(monkeypatch):
+	hub = StatusHub()
+	monkeypatch.setattr(photo_status_stream, "hub", hub)
+
+	async def fake_subscribe(user_id):
+		hub.set_cursor(20)
+		return subscribe(hub, user_id), 20
+
+	async def fake_backlog(user_id, after, until):
+		return [], True
+
+	monkeypatch.setattr(hub, "subscribe", fake_subscribe)
+	monkeypatch.setattr(photo_status_stream, "backlog", fake_backlog)
+
+	out = await collect(photo_status_stream.event_stream("u1", 3), 2)
+	assert out == ['data: {"type": "resync"}\n\n', 'id: 20\ndata: {"type": "ready"}\n\n']
+
+	# Resuming ahead of this process's cursor: nothing replayed, older live ids skipped
+	stream = photo_status_stream.event_stream("u1", 25)
+	assert await stream.__anext__() == 'id: 25\ndata: {"type": "ready"}\n\n'
+	hub.fan_out([ev(i) for i in range(21, 27)], now=0)
+	assert (await asyncio.wait_for(stream.__anext__(), 1)).startswith("id: 26\n")
+	await stream.aclose()
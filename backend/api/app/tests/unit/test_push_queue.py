@@ -0,0 +1,108 @@
+"""Unit tests for the push fan-out queue: delivery chunking, backoff, and which
+UnifiedPush failures are worth a retry, and that a delivery job records what
+is still owed before anything after its send can fail."""
+import json
+
+import httpx
+import pytest
+
+import push_notifications
+import push_queue
+from fcm_push import FCM_BATCH_SIZE
+
+
+def test_delivery_jobs_chunk_per_channel(monkeypatch):
+	monkeypatch.setattr(push_queue, "UNIFIED_PUSH_CHUNK", 3)
+	fcm = [f"fcm:t{i}" for i in range(FCM_BATCH_SIZE + 1)]
+	up = [f"https://up.example/{i}" for i in range(7)]
+	jobs = push_queue.delivery_jobs(fcm, up)
+	assert [j["kind"] for j in jobs] == ["fcm", "fcm", "unifiedpush", "unifiedpush", "unifiedpush"]
+	assert sum(len(j["payload"]["tokens"]) for j in jobs[:2]) == len(fcm)
+	assert [len(j["payload"]["endpoints"]) for j in jobs[2:]] == [3, 3, 1]
+	assert jobs[0]["payload"]["route"] == push_notifications.ACTIVITY_BROADCAST["route"]
+	assert push_queue.delivery_jobs([], []) == []
+
+
+def test_backoff_doubles():
+	waits = [push_queue.backoff(n).total_seconds() for n in range(1, 5)]
+	assert waits == [push_queue.BACKOFF_BASE_SECONDS * 2 ** k for k in range(4)]
+
+
+@pytest.mark.asyncio
+async def test_unified_push_batch_retries_only_transient_failures(monkeypatch):
+	status = {"ok": 200, "gone": 404, "busy": 503, "slow": 429}
+
+	def handler(request: httpx.Request) -> httpx.Response:
+		name = request.url.path.strip("/")
+		if name == "down":
+			raise httpx.ConnectError("refused")
+		return httpx.Response(status[name])
+
+	monkeypatch.setattr(push_notifications.push_toggle, "is_enabled", lambda: True)
+	monkeypatch.setattr(push_notifications, "_http_client",
+						httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+	endpoints = [f"https://up.example/{n}" for n in ("ok", "gone", "busy", "slow", "down")]
+	result = await push_notifications.send_unified_push_batch(endpoints)
+	assert result["success"] == 1 and result["failure"] == 4
+	assert sorted(result["retry"]) == sorted(endpoints[2:])
+
+
+class _FakeDb:
+	"""Records the statements a handler runs and when it commits."""
+
+	def __init__(self):
+		self.log = []
+
+	async def execute(self, stmt, params=None):
+		self.log.append((str(stmt), params))
+
+	async def commit(self):
+		self.log.append(("COMMIT", None))
+
+
+def _fcm_job(tokens):
+	return {'id': 7, 'kind': 'fcm', 'attempts': 1,
+			'payload': {'tokens': tokens, 'title': "t", 'body': "b", 'route': None}}
+
+
+@pytest.mark.asyncio
+async def test_fcm_progress_is_recorded_before_anything_can_fail(monkeypatch):
+	async def send(tokens, **kw):
+		return {'success': 1, 'failure': 2, 'stale_tokens': ["fcm:dead"], 'failed_tokens': ["fcm:busy"]}
+
+	async def unregister(db, endpoints):
+		raise RuntimeError("unregister failed")
+
+	monkeypatch.setattr(push_queue, "send_fcm_batch", send)
+	monkeypatch.setattr(push_queue, "_unregister_stale_endpoints", unregister)
+	db = _FakeDb()
+	with pytest.raises(RuntimeError):
+		await push_queue._run_fcm(db, _fcm_job(["fcm:ok", "fcm:dead", "fcm:busy"]))
+	# the job was narrowed to the one transient failure and committed, so the
+	# retry after the unregister error cannot resend to fcm:ok
+	(sql, params), (commit, _) = db.log
+	assert sql.startswith("UPDATE push_queue SET payload") and commit == "COMMIT"
+	assert json.loads(params['payload'])['tokens'] == ["fcm:busy"]
+	assert params['give_up'] is False and params['delay'] == push_queue.backoff(1)
+
+
+@pytest.mark.asyncio
+async def test_delivered_job_is_deleted_and_exhausted_one_given_up(monkeypatch):
+	async def send(endpoints):
+		return {'success': len(endpoints) - 1, 'failure': 1, 'retry': endpoints[-1:]}
+
+	monkeypatch.setattr(push_queue, "send_unified_push_batch", send)
+	db = _FakeDb()
+	job = {'id': 8, 'kind': 'unifiedpush', 'attempts': push_queue.MAX_ATTEMPTS,
+		   'payload': {'endpoints': ["https://up.example/a", "https://up.example/b"]}}
+	await push_queue._run_unifiedpush(db, job)
+	assert db.log[0][1]['give_up'] is True
+	assert json.loads(db.log[0][1]['payload']) == {'endpoints': ["https://up.example/b"]}
+
+	async def send_all(endpoints):
+		return {'success': len(endpoints), 'failure': 0, 'retry': []}
+
+	monkeypatch.setattr(push_queue, "send_unified_push_batch", send_all)
+	db = _FakeDb()
+	await push_queue._run_unifiedpush(db, dict(job, attempts=1))
+	assert db.log[0][0].startswith("DELETE FROM push_queue") and db.log[1][0] == "COMMIT"
@@ -13,16 +13,17 @@ from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.responses import RedirectResponse, HTMLResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import or_, func, desc
+from sqlalchemy import or_, func, desc, case, false
 from geoalchemy2.functions import ST_X, ST_Y, ST_Point
 from pydantic import BaseModel, ConfigDict
 
 # Add common module path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'common'))
 from common.database import get_db
-from common.models import User, UserPublicKey, Photo, UserRole
+from common.models import User, UserPublicKey, Photo, UserRole, UserGalleryStats, HiddenPhoto, HiddenUser
 from common.utc import utcnow, format_utc, utc_from_timestamp, utc_plus_timedelta
 from photos import delete_all_user_photo_files
+from photo_counts import status_counts
 from jwt_service import create_upload_authorization_token, REFRESH_TOKEN_EXPIRE_MINUTES
 from auth import (
 	authenticate_user, create_access_token, create_refresh_token, get_current_active_user,
@@ -1857,78 +1858,116 @@ async def cleanup_orphaned_photos(
 @router.get("/users/")
 async def get_users(
     request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size (default: all users)"),
+    offset: int = Query(0, ge=0, description="Number of users to skip"),
     db: AsyncSession = Depends(get_db),
     current_user: Optional[User] = Depends(get_current_user_optional_with_query)
 ):
-    """Get list of all users with their photo counts and latest photos."""
+    """Get list of all users with their photo counts and latest photos.
+
+    Reads the trigger-maintained user_gallery_stats rows (one per user) in
+    (photo count desc, user id) order. Those counts are global; a viewer who
+    has hidden photos or users gets them adjusted on the fly: hidden users show
+    no photos, and each owner's count drops by the viewer's hidden photos of
+    theirs — both cheap, as they're driven by the viewer's own hide lists.
+    """
     # Apply rate limiting with optional user context (better limits for authenticated users)
     await general_rate_limiter.enforce_rate_limit(request, 'public_read', current_user)
 
     try:
         from hidden_content_filters import apply_hidden_content_filters
 
-        # Get users with photo counts and latest photo info
-        # First, get photo counts per user (excluding deleted photos)
-        photo_counts_query = select(
-            Photo.owner_id,
-            func.count(Photo.id).label('photo_count'),
-            func.max(Photo.uploaded_at).label('latest_photo_at')
-        ).where(Photo.deleted == False).group_by(Photo.owner_id)
-
-        # Apply hidden content filtering to photo counts
-        photo_counts_query = apply_hidden_content_filters(
-            photo_counts_query,
-            current_user.id if current_user else None,
-            'hillview'
-        )
-
-        photo_counts_result = await db.execute(photo_counts_query)
-        photo_stats = {row.owner_id: {'count': row.photo_count, 'latest_at': row.latest_photo_at}
-                      for row in photo_counts_result.all()}
+        stats = UserGalleryStats
+        viewer_id = current_user.id if current_user else None
+        hidden_photo_ids = hidden_owner_ids = None
+        if viewer_id:
+            hidden_photo_ids = select(HiddenPhoto.photo_id).where(
+                HiddenPhoto.user_id == viewer_id,
+                HiddenPhoto.photo_source == 'hillview'
+            )
+            hidden_owner_ids = select(HiddenUser.target_user_id).where(
+                HiddenUser.hiding_user_id == viewer_id,
+                HiddenUser.target_user_source == 'hillview'
+            )
+            hides_anything = (await db.execute(select(
+                or_(hidden_photo_ids.exists(), hidden_owner_ids.exists())
+            ))).scalar()
+            if not hides_anything:
+                hidden_photo_ids = hidden_owner_ids = None
+
+        if hidden_photo_ids is None:
+            # Nothing to adjust: the stored row is what this viewer sees
+            photo_count = stats.photo_count
+            owner_hidden = latest_hidden = false()
+        else:
+            hidden_per_owner = select(
+                Photo.owner_id,
+                func.count(Photo.id).label('n')
+            ).where(
+                Photo.id.in_(hidden_photo_ids),
+                Photo.deleted == False
+            ).group_by(Photo.owner_id).subquery()
+            owner_hidden = User.id.in_(hidden_owner_ids)
+            latest_hidden = stats.latest_photo_id.in_(hidden_photo_ids)
+            photo_count = case(
+                (owner_hidden, 0),
+                else_=stats.photo_count - func.coalesce(hidden_per_owner.c.n, 0)
+            )
 
-        # Get all active users
-        users_query = select(User).where(User.is_active == True)
-        users_result = await db.execute(users_query)
-        users = users_result.scalars().all()
+        query = select(
+            User.id,
+            User.username,
+            photo_count.label('photo_count'),
+            stats.latest_photo_at,
+            stats.latest_photo_url,
+            owner_hidden.label('owner_hidden'),
+            latest_hidden.label('latest_hidden')
+        ).join(stats, stats.user_id == User.id).where(User.is_active == True)
+        if hidden_photo_ids is not None:
+            query = query.outerjoin(hidden_per_owner, hidden_per_owner.c.owner_id == User.id)
+        # (photo_count DESC, user_id) is ix_user_gallery_stats_order, so an
+        # unadjusted page is read straight off the index
+        query = query.order_by(photo_count.desc(), stats.user_id).offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+
+        rows = (await db.execute(query)).all()
+
+        # Owners whose latest photo this viewer has hidden: find their latest
+        # visible one instead (one query for the whole page)
+        fallback_owners = [row.id for row in rows if row.latest_hidden and not row.owner_hidden]
+        fallback = {}
+        if fallback_owners:
+            latest_query = select(
+                Photo.owner_id,
+                Photo.uploaded_at,
+                Photo.sizes
+            ).where(
+                Photo.owner_id.in_(fallback_owners),
+                Photo.deleted == False
+            ).distinct(Photo.owner_id).order_by(
+                Photo.owner_id,
+                Photo.uploaded_at.desc().nullslast(),
+                Photo.id.desc()
+            )
+            latest_query = apply_hidden_content_filters(latest_query, viewer_id, 'hillview')
+            for owner_id, uploaded_at, sizes in (await db.execute(latest_query)).all():
+                fallback[owner_id] = (uploaded_at, (sizes or {}).get('320', {}).get('url'))
 
-        # For each user, get their latest photo URL
         user_list = []
-        for user in users:
-            stats = photo_stats.get(user.id, {'count': 0, 'latest_at': None})
-
-            latest_photo_url = None
-            if stats['latest_at']:
-                # Get the latest photo for this user (excluding deleted)
-                latest_photo_query = select(Photo).where(
-                    Photo.owner_id == user.id,
-                    Photo.uploaded_at == stats['latest_at'],
-                    Photo.deleted == False
-                ).limit(1)
-
-                # Apply hidden content filtering
-                latest_photo_query = apply_hidden_content_filters(
-                    latest_photo_query,
-                    current_user.id if current_user else None,
-                    'hillview'
-                )
-
-                latest_photo_result = await db.execute(latest_photo_query)
-                latest_photo = latest_photo_result.scalar_one_or_none()
-
-                if latest_photo and latest_photo.sizes:
-                    latest_photo_url = latest_photo.sizes.get('320', {}).get('url')
-
-            user_data = {
-                "id": user.id,
-                "username": user.username,
-                "photo_count": stats['count'],
-                "latest_photo_at": format_utc(stats['latest_at']),
-                "latest_photo_url": latest_photo_url
-            }
-            user_list.append(user_data)
-
-        # Sort by photo count (descending) then by username
-        user_list.sort(key=lambda x: (-x['photo_count'], x['username']))
+        for row in rows:
+            latest_at, latest_url = row.latest_photo_at, row.latest_photo_url
+            if row.owner_hidden:
+                latest_at = latest_url = None
+            elif row.latest_hidden:
+                latest_at, latest_url = fallback.get(row.id, (None, None))
+            user_list.append({
+                "id": row.id,
+                "username": row.username,
+                "photo_count": row.photo_count,
+                "latest_photo_at": format_utc(latest_at),
+                "latest_photo_url": latest_url
+            })
 
         return user_list
 
@@ -2021,15 +2060,27 @@ async def get_user_photos(
             }
             photo_list.append(photo_data)
 
-        # Get total count for this user
-        count_query = select(func.count(Photo.id)).where(Photo.owner_id == user_id)
-        count_query = apply_hidden_content_filters(
-            count_query,
-            current_user.id if current_user else None,
-            'hillview'
-        )
-        count_result = await db.execute(count_query)
-        total_count = count_result.scalar()
+        # Total count for this user from the status counters, less whatever the
+        # viewer has hidden (driven by the viewer's hide lists, not a recount)
+        total_count = sum((await status_counts(db, user_id)).values())
+        if current_user and total_count:
+            hidden_owner = (await db.execute(select(HiddenUser.id).where(
+                HiddenUser.hiding_user_id == current_user.id,
+                HiddenUser.target_user_id == user_id,
+                HiddenUser.target_user_source == 'hillview'
+            ).limit(1))).first()
+            if hidden_owner:
+                total_count = 0
+            else:
+                hidden_count = await db.scalar(select(func.count(Photo.id)).where(
+                    Photo.id.in_(select(HiddenPhoto.photo_id).where(
+                        HiddenPhoto.user_id == current_user.id,
+                        HiddenPhoto.photo_source == 'hillview'
+                    )),
+                    Photo.owner_id == user_id,
+                    Photo.deleted == False
+                ))
+                total_count -= hidden_count or 0
 
         # Prepare pagination info
         next_cursor = None
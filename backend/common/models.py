@@ -4,7 +4,7 @@ from typing import Optional, List, Any
 import uuid
 import enum
 
-from sqlalchemy import String, Float, Integer, Boolean, DateTime, Text, JSON, Enum, ForeignKey, CheckConstraint, ARRAY, Index, text
+from sqlalchemy import String, Float, Integer, BigInteger, Boolean, DateTime, Text, JSON, Enum, ForeignKey, CheckConstraint, ARRAY, Index, text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from sqlalchemy.sql import func
@@ -277,6 +277,18 @@ class PhotoRating(Base):
 	)
 
 
+class PhotoRatingCount(Base):
+	"""Thumbs up / down totals for one photo of any source, kept current inside
+	the writing transaction by a statement trigger on photo_ratings
+	(migration 036)."""
+	__tablename__ = "photo_rating_counts"
+
+	photo_source: Mapped[str] = mapped_column(String(20), primary_key=True)
+	photo_id: Mapped[str] = mapped_column(String(255), primary_key=True)
+	thumbs_up: Mapped[int] = mapped_column(Integer, default=0, server_default=text('0'))
+	thumbs_down: Mapped[int] = mapped_column(Integer, default=0, server_default=text('0'))
+
+
 class FlaggedPhoto(Base):
 	__tablename__ = "flagged_photos"
 
@@ -468,11 +480,32 @@ class PhotoAnnotation(Base):
 	# NULL for ordinary user annotations. (See graduation create-annotation ops.)
 	source_annotation_id: Mapped[Optional[str]] = mapped_column(String, index=True, nullable=True)
 
+	# The chain this version belongs to: id of the chain's first row. Set and
+	# carried forward by triggers (migration 035), never by the app.
+	chain_id: Mapped[Optional[str]] = mapped_column(String, index=True, nullable=True)
+
 	# Relationships
 	photo: Mapped["Photo"] = relationship()
 	user: Mapped["User"] = relationship()
 
 
+class AnnotationContribution(Base):
+	"""One annotation chain a user has authored a version of: the roles they
+	played in it and the chain's current tip. Maintained by triggers on
+	photo_annotations (migration 035); read in keyset pages by
+	GET /api/annotations/contributions."""
+	__tablename__ = "annotation_contributions"
+	__table_args__ = (
+		Index('ix_annotation_contributions_order', 'user_id', text('tip_created_at DESC'), text('chain_id DESC')),
+	)
+
+	user_id: Mapped[str] = mapped_column(String, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+	chain_id: Mapped[str] = mapped_column(String, primary_key=True, index=True)
+	roles: Mapped[list[str]] = mapped_column(ARRAY(Text))
+	tip_id: Mapped[str] = mapped_column(String)
+	tip_created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+
+
 class PushRegistration(Base):
 	__tablename__ = "push_registrations"
 
@@ -511,6 +544,130 @@ class Notification(Base):
 	)
 
 
+class PushJob(Base):
+	"""A unit of push fan-out work, drained by the API's push dispatcher
+	(api/app/push_queue.py) instead of on the request that caused it.
+
+	kind 'activity_broadcast' resolves recipients and writes their Notification
+	rows; kinds 'fcm' / 'unifiedpush' each deliver one chunk of endpoints. A
+	dispatcher leases a job by setting locked_until, so one that dies mid-job
+	only delays it. A delivery job with failed endpoints stays on its row,
+	its payload narrowed to those and run_after pushed out (exponential
+	backoff); failed_at marks a job given up on, pruned after a retention.
+	dedupe_key collapses repeat enqueues while a job is still unclaimed
+	(attempts = 0) — a burst of uploads by one user is one broadcast.
+	"""
+	__tablename__ = "push_queue"
+	__table_args__ = (
+		Index('ix_push_queue_due', 'run_after', 'id', postgresql_where=text('failed_at IS NULL')),
+		Index('ix_push_queue_dedupe', 'dedupe_key', unique=True,
+			postgresql_where=text('attempts = 0 AND dedupe_key IS NOT NULL')),
+	)
+
+	id: Mapped[int] = mapped_column(Integer, primary_key=True)
+	kind: Mapped[str] = mapped_column(String(50))  # activity_broadcast | fcm | unifiedpush
+	payload: Mapped[dict] = mapped_column(JSON)
+	dedupe_key: Mapped[Optional[str]] = mapped_column(String(200))
+	attempts: Mapped[int] = mapped_column(Integer, default=0, server_default=text('0'))
+	run_after: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+	locked_until: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+	last_error: Mapped[Optional[str]] = mapped_column(Text)
+	failed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+	created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class UserGalleryStats(Base):
+	"""Per-user row behind the GET /users/ listing: non-deleted photo count and
+	the latest upload with its thumbnail URL. Maintained by triggers on photos
+	(insert / update / delete) and users (insert) — see migration 031 — so every
+	user has a row and no route has to remember to update it. Photo writes
+	apply deltas from the statement's rows (migration 038), not recounts.
+	Counts ignore per-viewer hiding; the listing applies that on read."""
+	__tablename__ = "user_gallery_stats"
+	__table_args__ = (
+		Index('ix_user_gallery_stats_order', text('photo_count DESC'), 'user_id'),
+	)
+
+	user_id: Mapped[str] = mapped_column(String, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+	photo_count: Mapped[int] = mapped_column(Integer, default=0, server_default=text('0'))
+	latest_photo_id: Mapped[Optional[str]] = mapped_column(String)
+	latest_photo_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+	latest_photo_url: Mapped[Optional[str]] = mapped_column(Text)  # sizes['320']['url'] of the latest photo
+	updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class UserPhotoStatusCount(Base):
+	"""Number of an owner's non-deleted photos in one processing_status (NULL
+	stored as ''), kept current inside the writing transaction by a statement
+	trigger on photos (migration 032). Read by the gallery counts; verified
+	against photos and repaired by api/app/photo_counts.py."""
+	__tablename__ = "user_photo_status_counts"
+
+	owner_id: Mapped[str] = mapped_column(String, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+	status: Mapped[str] = mapped_column(String, primary_key=True)
+	n: Mapped[int] = mapped_column(Integer, default=0, server_default=text('0'))
+
+
+class SitemapEntry(Base):
+	"""A curated public photo as listed in the XML sitemap, with its
+	<image:loc> URL already chosen. Maintained by triggers on photos and
+	photo_annotations from the sitemap_source view (migration 033); read in
+	keyset pages by GET /api/photos/sitemap-ids."""
+	__tablename__ = "sitemap_entries"
+	__table_args__ = (
+		Index('ix_sitemap_entries_order', text('uploaded_at DESC'), text('photo_id DESC')),
+	)
+
+	photo_id: Mapped[str] = mapped_column(String, ForeignKey("photos.id", ondelete="CASCADE"), primary_key=True)
+	uploaded_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+	img: Mapped[Optional[str]] = mapped_column(Text)
+
+
+class ActivityEvent(Base):
+	"""Append-only server activity log behind the admin dashboard feed.
+
+	One row per inserted contact message, photo moderation audit, annotation
+	event, flag, upload and user moderation, written by AFTER INSERT triggers on
+	those tables (migration 034) with the actor and render context snapshotted,
+	so the feed is a keyset walk here rather than a merge of six queries. Later
+	changes to those rows (a message handled, a flag resolved, a photo deleted)
+	are not logged; the feed reads them from the source rows.
+	"""
+	__tablename__ = "activity_events"
+	__table_args__ = (
+		Index('ix_activity_events_order', text('at DESC'), text('id DESC')),
+	)
+
+	id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+	at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+	kind: Mapped[str] = mapped_column(String(16))  # contact | moderation | annotation | flag | upload | user
+	event_type: Mapped[Optional[str]] = mapped_column(String(32))
+	ref_id: Mapped[str] = mapped_column(String)  # id of the source row
+	actor: Mapped[Optional[str]] = mapped_column(String)  # display name snapshot
+	actor_role: Mapped[Optional[str]] = mapped_column(String)  # lowercase role value snapshot
+	ctx: Mapped[dict] = mapped_column(JSONB, server_default=text("'{}'::jsonb"))  # what the summary/link need
+
+
+class PhotoStatusEvent(Base):
+	"""A photo's processing_status or deleted flag changed. Appended by a
+	statement trigger on photos (migration 037), pruned after a day by
+	api/app/photo_status_stream.py; streamed to the owner in id order by
+	GET /api/photos/status/stream."""
+	__tablename__ = "photo_status_events"
+	__table_args__ = (
+		Index('ix_photo_status_events_user_id', 'user_id', 'id'),
+	)
+
+	id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+	user_id: Mapped[str] = mapped_column(String, ForeignKey("users.id", ondelete="CASCADE"))
+	photo_id: Mapped[str] = mapped_column(String)
+	processing_status: Mapped[Optional[str]] = mapped_column(String)
+	error: Mapped[Optional[str]] = mapped_column(Text)
+	retry_after_minutes: Mapped[Optional[int]] = mapped_column(Integer)
+	deleted: Mapped[bool] = mapped_column(Boolean, default=False)
+	at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
 class ShareLink(Base):
 	"""A short share link (/shared/{slug}) minted when a user clicks the share button.
 
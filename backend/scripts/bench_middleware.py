@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: per-request overhead of the API middleware stack.
+
+Serves a trivial JSON endpoint through three apps and drives each with
+concurrent requests over an in-process ASGI transport (no sockets, no
+database):
+
+  bare    -- no middleware, the baseline
+  before  -- the five BaseHTTPMiddleware classes api.py used to have
+             (reproduced below, same work per request)
+  after   -- the pure ASGI classes from api/app/middleware.py
+
+Everything runs on one event loop, so per-request latency mostly measures
+queueing (and the in-process transport only interleaves requests where the
+app itself yields, e.g. in BaseHTTPMiddleware's tasks). The figure reported
+is cost per request, wall time / requests, and overhead is that minus bare's.
+The rate limiter is a no-op stub in both stacks and the access log is
+silenced, so what's left is the middleware plumbing plus the header work.
+
+Usage:
+    ./bench_middleware.py                       # 5000 requests, 50 concurrent
+    ./bench_middleware.py -n 20000 -c 200
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api', 'app'))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+import middleware
+from rate_limiter import get_client_ip
+
+
+class NoLimit:
+	async def enforce_rate_limit(self, request, limit_type):
+		pass
+
+
+# --- before: the BaseHTTPMiddleware versions, same work per request ---
+
+class LegacySecurityHeaders(BaseHTTPMiddleware):
+	async def dispatch(self, request, call_next):
+		response = await call_next(request)
+		for name, value in middleware.SecurityHeadersMiddleware.STATIC_HEADERS:
+			response.headers[name] = value
+		if not request.url.path.startswith("/docs"):
+			response.headers["X-Robots-Tag"] = "noindex, nofollow"
+		if "Server" in response.headers:
+			del response.headers["Server"]
+		response.headers["Content-Security-Policy"] = middleware.SecurityHeadersMiddleware.CONTENT_SECURITY_POLICY
+		return response
+
+
+class LegacyGlobalRateLimit(BaseHTTPMiddleware):
+	def __init__(self, app):
+		super().__init__(app)
+		self.rate_limiter = NoLimit()
+
+	async def dispatch(self, request, call_next):
+		if request.url.path in middleware.GlobalRateLimitMiddleware.BYPASS_PATHS or request.method == "OPTIONS":
+			return await call_next(request)
+		try:
+			await self.rate_limiter.enforce_rate_limit(request, 'general_api')
+		except HTTPException as e:
+			return JSONResponse(status_code=e.status_code, content={"detail": e.detail}, headers=e.headers)
+		return await call_next(request)
+
+
+class LegacyRequestLogging(BaseHTTPMiddleware):
+	async def dispatch(self, request, call_next):
+		client_ip = get_client_ip(request)
+		start_time = time.time()
+		response = await call_next(request)
+		process_time = time.time() - start_time
+		middleware.access_log.info(f'{client_ip} - "{request.method} {request.url.path}" {response.status_code} {process_time:.3f}s')
+		return response
+
+
+class LegacyCORSLogging(BaseHTTPMiddleware):
+	async def dispatch(self, request, call_next):
+		origin = request.headers.get("origin")
+		response = await call_next(request)
+		if request.method == "OPTIONS" or origin:
+			response.headers.get("access-control-allow-origin")
+		return response
+
+
+class LegacyReverseProxy(BaseHTTPMiddleware):
+	async def dispatch(self, request, call_next):
+		forwarded_proto = request.headers.get("X-Forwarded-Proto")
+		if forwarded_proto:
+			request.scope["scheme"] = forwarded_proto
+		forwarded_for = request.headers.get("X-Forwarded-For")
+		request.state.real_client_ip = forwarded_for.split(",")[0].strip() if forwarded_for else None
+		return await call_next(request)
+
+
+def build_app(stack: str) -> FastAPI:
+	app = FastAPI()
+
+	@app.get("/api/ping")
+	async def ping():
+		return {"ok": True}
+
+	if stack == "before":
+		for cls in (LegacyCORSLogging, LegacyRequestLogging, LegacyGlobalRateLimit,
+					LegacySecurityHeaders, LegacyReverseProxy):
+			app.add_middleware(cls)
+	elif stack == "after":
+		app.add_middleware(middleware.CORSLoggingMiddleware)
+		app.add_middleware(middleware.RequestLoggingMiddleware)
+		app.add_middleware(middleware.GlobalRateLimitMiddleware, rate_limiter=NoLimit())
+		app.add_middleware(middleware.SecurityHeadersMiddleware)
+		app.add_middleware(middleware.ReverseProxyMiddleware)
+	return app
+
+
+async def run(stack: str, requests: int, concurrency: int) -> float:
+	"""Requests per second through the given stack."""
+	transport = httpx.ASGITransport(app=build_app(stack))
+	headers = {"X-Forwarded-For": "203.0.113.7", "X-Forwarded-Proto": "https"}
+	remaining = iter(range(requests))
+
+	async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+		async def worker():
+			for _ in remaining:
+				response = await client.get("/api/ping", headers=headers)
+				assert response.status_code == 200
+
+		# warm up
+		for _ in range(50):
+			await client.get("/api/ping", headers=headers)
+		start = time.perf_counter()
+		await asyncio.gather(*(worker() for _ in range(concurrency)))
+		wall = time.perf_counter() - start
+
+	return requests / wall
+
+
+def main():
+	ap = argparse.ArgumentParser(description="Per-request overhead of the API middleware stack.")
+	ap.add_argument("-n", "--requests", type=int, default=5000)
+	ap.add_argument("-c", "--concurrency", type=int, default=50)
+	args = ap.parse_args()
+
+	middleware.access_log.setLevel(logging.WARNING)
+
+	results = {stack: asyncio.run(run(stack, args.requests, args.concurrency))
+			   for stack in ("bare", "before", "after")}
+	bare = 1e6 / results["bare"]
+	print(f"{args.requests} requests, {args.concurrency} concurrent\n")
+	print(f"{'stack':<8}{'req/s':>8}{'us/req':>8}{'overhead us':>13}")
+	for stack, rps in results.items():
+		cost = 1e6 / rps
+		print(f"{stack:<8}{rps:>8.0f}{cost:>8.0f}{cost - bare:>13.0f}")
+
+
+if __name__ == "__main__":
+	main()
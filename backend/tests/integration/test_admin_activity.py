@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Integration tests for the admin activity feed (GET /admin/activity).
+"""
+
+import pytest
+import requests
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.base_test import BaseAuthTest
+from utils.test_utils import API_URL, upload_test_image
+from utils.image_utils import create_test_image_full_gps
+
+
+class TestAdminActivity(BaseAuthTest):
+	"""Tests for the activity feed backed by the activity event log."""
+
+	def _feed(self, **params):
+		response = requests.get(f"{API_URL}/admin/activity", params=params, headers=self.admin_headers)
+		assert response.status_code == 200
+		return response.json()
+
+	@pytest.mark.asyncio
+	async def test_upload_appears_and_runs_squash(self):
+		"""Test that uploads are logged at write time and a burst squashes into one row."""
+		for i in range(2):
+			image_data = create_test_image_full_gps(
+				width=120, height=90, color=(20 + 90 * i, 80, 160),
+				lat=50.0 + i / 100, lon=14.0, bearing=10.0
+			)
+			await upload_test_image(f"activity_{i}.jpg", image_data, f"Activity {i}", self.test_token)
+
+		top = self._feed(limit=5)["events"][0]
+		assert top["kind"] == "upload"
+		assert top["actor"] == "test"
+		assert top["count"] >= 2
+
+	@pytest.mark.asyncio
+	async def test_keyset_paging(self):
+		"""Test that next_cursor pages back without repeating rows."""
+		page1 = self._feed(limit=2)
+		if not page1["next_cursor"]:
+			pytest.skip("not enough activity to page")
+		page2 = self._feed(limit=2, before=page1["next_cursor"])
+		assert page2["events"]
+		assert page2["events"][0]["at"] <= page1["events"][-1]["since"]
+		ids1 = {(e["kind"], e["id"]) for e in page1["events"]}
+		ids2 = {(e["kind"], e["id"]) for e in page2["events"]}
+		assert ids1.isdisjoint(ids2)
+
+	@pytest.mark.asyncio
+	async def test_contact_row_shows_current_status(self):
+		"""Test that a contact message handled after it arrived shows its new status."""
+		response = requests.post(f"{API_URL}/contact", json={
+			"contact": "activity@example.com", "message": "Status should follow the message."
+		})
+		assert response.status_code == 200
+		message_id = str(response.json()["id"])
+		assert self._feed(limit=5)["events"][0]["event_type"] == "new"
+
+		response = requests.patch(f"{API_URL}/admin/contact/messages/{message_id}",
+			json={"status": "read"}, headers=self.admin_headers)
+		assert response.status_code == 200
+		top = self._feed(limit=5)["events"][0]
+		assert (top["kind"], top["id"], top["event_type"]) == ("contact", message_id, "read")
+
+	@pytest.mark.asyncio
+	async def test_deleted_upload_leaves_feed(self):
+		"""Test that an upload drops out of the feed once the photo is deleted."""
+		image_data = create_test_image_full_gps(
+			width=120, height=90, color=(200, 40, 40), lat=50.2, lon=14.1, bearing=20.0
+		)
+		photo_id = await upload_test_image("activity_deleted.jpg", image_data, "Activity deleted", self.test_token)
+
+		def uploads():
+			return {e["id"] for e in self._feed(limit=20)["events"] if e["kind"] == "upload"}
+
+		assert photo_id in uploads()
+
+		response = requests.delete(f"{API_URL}/photos/{photo_id}", headers=self.test_headers)
+		assert response.status_code == 200
+		assert photo_id not in uploads()
+
+	@pytest.mark.asyncio
+	async def test_requires_admin(self):
+		"""Test that non-admins can't read the feed."""
+		response = requests.get(f"{API_URL}/admin/activity", headers=self.test_headers)
+		assert response.status_code == 403
+
+
+if __name__ == "__main__":
+	pytest.main([__file__, "-v", "-s"])
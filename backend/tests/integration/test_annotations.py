@@ -9,6 +9,7 @@ Covers:
 - DELETE /api/annotations/{id} (tombstone delete)
 - Hidden user filtering in annotation listing
 - Supersede chain conflict detection (409)
+- GET /api/annotations/contributions (chain tips, keyset paging)
 """
 
 import requests
@@ -189,6 +190,77 @@ class TestAnnotationCRUD(BaseUserManagementTest):
         assert response.status_code == 404
 
 
+class TestAnnotationContributions(BaseUserManagementTest):
+    """Test the caller's contributions view over materialised chain tips."""
+
+    def setup_method(self, method=None):
+        super().setup_method(method)
+        self.create_test_photos(self.test_users, self.auth_tokens)
+        result = query_hillview_endpoint(token=self.test_token, params={
+            "top_left_lat": 90, "top_left_lon": -180,
+            "bottom_right_lat": -90, "bottom_right_lon": 180,
+            "client_id": "test_annotations_contributions",
+        })
+        assert result and result.get("data"), "No photos after create_test_photos — check worker"
+        self.photo_id = result["data"][0]["id"]
+
+    def _create(self, body, headers):
+        response = requests.post(
+            f"{API_URL}/annotations/photos/{self.photo_id}",
+            json={"body": body},
+            headers=headers,
+        )
+        assert response.status_code == 201
+        return response.json()["id"]
+
+    def _contributions(self, **params):
+        response = requests.get(f"{API_URL}/annotations/contributions", params=params, headers=self.test_headers)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    def test_chain_collapses_to_current_tip(self):
+        """Edits by me and by others collapse to one row showing the current tip."""
+        ann_id = self._create("Contribution original", self.test_headers)
+        mine = requests.put(f"{API_URL}/annotations/{ann_id}", json={"body": "Contribution edited"},
+                            headers=self.test_headers).json()["id"]
+        theirs = requests.put(f"{API_URL}/annotations/{mine}", json={"body": "Contribution replaced"},
+                              headers=self.admin_headers).json()["id"]
+        removed_id = self._create("Contribution removed", self.test_headers)
+        assert requests.delete(f"{API_URL}/annotations/{removed_id}", headers=self.admin_headers).status_code == 204
+
+        data = self._contributions()
+        by_tip = {c["chain_tip_id"]: c for c in data["contributions"]}
+        assert ann_id not in by_tip and mine not in by_tip
+        edited = by_tip[theirs]
+        assert edited["my_roles"] == ["created", "updated"]
+        assert edited["current_body"] == "Contribution replaced"
+        assert edited["mine_is_current"] is False
+        removed = [c for c in data["contributions"] if c["status"] == "removed"]
+        assert removed and removed[0]["current_body"] is None
+        assert data["summary"]["changed_by_others"] >= 1
+        assert data["summary"]["removed"] >= 1
+
+    def test_keyset_paging(self):
+        """next_cursor pages through every chain once, newest tip first."""
+        created = [self._create(f"Paged contribution {i}", self.test_headers) for i in range(3)]
+
+        page1 = self._contributions(limit=2)
+        assert page1["summary"]["total"] >= 3
+        assert page1["next_cursor"]
+        page2 = self._contributions(limit=2, before=page1["next_cursor"])
+        assert page2["summary"] is None
+        ids1 = [c["chain_tip_id"] for c in page1["contributions"]]
+        ids2 = [c["chain_tip_id"] for c in page2["contributions"]]
+        assert ids1 == [created[2], created[1]]
+        assert ids2[0] == created[0]
+
+    def test_invalid_cursor(self):
+        """A malformed cursor is rejected."""
+        response = requests.get(f"{API_URL}/annotations/contributions", params={"before": "nonsense"},
+                                headers=self.test_headers)
+        assert response.status_code == 400
+
+
 class TestAnnotationHiddenUserFiltering(BaseUserManagementTest):
     """Test that hidden user annotations are filtered from listings."""
 
@@ -125,6 +125,45 @@ class TestPhotoDeletion(BasePhotoTest):
         if photo_id in self.uploaded_photo_ids:
             self.uploaded_photo_ids.remove(photo_id)
 
+    @pytest.mark.asyncio
+    async def test_photo_counts_follow_upload_and_delete(self):
+        """Test that the status counters move with upload and deletion and agree with photos."""
+        def counts():
+            response = requests.get(f"{API_URL}/photos/count", headers=self.test_headers)
+            self.assert_success(response)
+            return response.json()["counts"]
+
+        before = counts()
+
+        image_data = create_test_image_full_gps(
+            width=200, height=150, color=(30, 120, 210),
+            lat=48.1486, lon=17.1077, bearing=270.0
+        )
+        photo_id = await upload_test_image(
+            "counts_test.jpg", image_data, "Counter test", self.test_token
+        )
+        self.uploaded_photo_ids.append(photo_id)
+        wait_for_photo_processing(photo_id, self.test_token, timeout=30)
+
+        after_upload = counts()
+        assert after_upload["total"] == before["total"] + 1
+        assert after_upload["completed"] == before["completed"] + 1
+        assert after_upload["total"] == sum(after_upload["by_status"].values())
+
+        listed = requests.get(f"{API_URL}/photos/?limit=1", headers=self.test_headers).json()
+        assert listed["counts"]["total"] == after_upload["total"]
+
+        delete_response = requests.delete(f"{API_URL}/photos/{photo_id}", headers=self.test_headers)
+        self.assert_success(delete_response)
+        self.uploaded_photo_ids.remove(photo_id)
+        assert counts()["total"] == before["total"]
+
+        # Nothing for the repair job to fix
+        admin_headers = self.get_auth_headers(self.get_admin_token())
+        repair = requests.post(f"{API_URL}/admin/photo-counts/repair", headers=admin_headers)
+        self.assert_success(repair)
+        assert repair.json()["repaired"] == 0
+
     @pytest.mark.asyncio
     async def test_delete_photo_unauthorized(self):
         """Test photo deletion without authentication."""
@@ -301,6 +301,37 @@ class TestPhotoRatingSystem(BaseAuthTest):
         # Cleanup
         requests.delete(f"{self.api_url}/ratings/{self.hillview_source}/{duplicate_photo_id}", headers=self.test_headers)
     
+    def test_counters_follow_changes_and_batch_read(self):
+        """Test that counts track rate / change / delete and the batch endpoint reads them"""
+        print("\n=== Testing Rating Counters and Batch Read ===")
+
+        counted_photo_id = "counter_test_photo"
+        unrated_photo_id = "counter_test_unrated_photo"
+        url = f"{self.api_url}/ratings/{self.mapillary_source}/{counted_photo_id}"
+        headers = {**self.test_headers, "Content-Type": "application/json"}
+        requests.delete(url, headers=self.test_headers)
+        base = requests.get(url).json()["rating_counts"]
+
+        data = requests.post(url, json={"rating": "thumbs_up"}, headers=headers).json()
+        assert data["rating_counts"] == {"thumbs_up": base["thumbs_up"] + 1, "thumbs_down": base["thumbs_down"]}
+
+        data = requests.post(url, json={"rating": "thumbs_down"}, headers=headers).json()
+        assert data["rating_counts"] == {"thumbs_up": base["thumbs_up"], "thumbs_down": base["thumbs_down"] + 1}
+
+        response = requests.post(
+            f"{self.api_url}/ratings/batch",
+            json={"source": self.mapillary_source, "photo_ids": [counted_photo_id, unrated_photo_id]},
+            headers=headers
+        )
+        self.assert_success(response, "Batch read should succeed")
+        ratings = response.json()["ratings"]
+        assert ratings[counted_photo_id]["user_rating"] == "thumbs_down"
+        assert ratings[counted_photo_id]["rating_counts"] == data["rating_counts"]
+        assert ratings[unrated_photo_id] == {"user_rating": None, "rating_counts": {"thumbs_up": 0, "thumbs_down": 0}}
+
+        data = requests.delete(url, headers=self.test_headers).json()
+        assert data["rating_counts"] == base
+
     def test_delete_nonexistent_rating(self):
         """Test deleting a rating that doesn't exist"""
         print("\n=== Testing Delete Nonexistent Rating ===")
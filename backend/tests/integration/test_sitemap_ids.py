@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Integration tests for GET /photos/sitemap-ids (the precomputed sitemap set).
+"""
+
+import pytest
+import requests
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.base_test import BasePhotoTest
+from utils.test_utils import API_URL, upload_test_image, wait_for_photo_processing
+from utils.image_utils import create_test_image_full_gps
+
+
+class TestSitemapIds(BasePhotoTest):
+	"""Tests for the sitemap photo listing."""
+
+	async def _upload(self, name: str, color, description: str, is_public: bool = True) -> str:
+		image_data = create_test_image_full_gps(
+			width=200, height=150, color=color,
+			lat=49.1951, lon=16.6068, bearing=90.0
+		)
+		photo_id = await upload_test_image(name, image_data, description, self.test_token, is_public=is_public)
+		wait_for_photo_processing(photo_id, self.test_token, timeout=30)
+		return photo_id
+
+	@pytest.mark.asyncio
+	async def test_curated_photos_listed_and_keyset_paged(self):
+		"""Test that described public photos appear and cursor pages don't overlap."""
+		first = await self._upload("sitemap_a.jpg", (200, 40, 40), "Sitemap photo A")
+		second = await self._upload("sitemap_b.jpg", (40, 200, 40), "Sitemap photo B")
+		hidden = await self._upload("sitemap_private.jpg", (40, 40, 200), "Private", is_public=False)
+
+		response = requests.get(f"{API_URL}/photos/sitemap-ids")
+		assert response.status_code == 200
+		data = response.json()
+		uids = [p["uid"] for p in data["photos"]]
+		assert f"hillview-{first}" in uids and f"hillview-{second}" in uids
+		assert f"hillview-{hidden}" not in uids
+		assert data["total"] == len(uids)
+
+		# Newest first, one per page, following next_cursor
+		page1 = requests.get(f"{API_URL}/photos/sitemap-ids?limit=1").json()
+		assert page1["photos"][0]["uid"] == f"hillview-{second}"
+		assert page1["next_cursor"]
+		page2 = requests.get(
+			f"{API_URL}/photos/sitemap-ids",
+			params={"limit": 1, "after": page1["next_cursor"]}
+		).json()
+		assert page2["photos"][0]["uid"] == f"hillview-{first}"
+		assert page2["total"] is None
+
+		# Deleting a photo takes it out of the set
+		delete_response = requests.delete(f"{API_URL}/photos/{second}", headers=self.test_headers)
+		self.assert_success(delete_response)
+		uids = [p["uid"] for p in requests.get(f"{API_URL}/photos/sitemap-ids").json()["photos"]]
+		assert f"hillview-{second}" not in uids
+
+	@pytest.mark.asyncio
+	async def test_invalid_cursor(self):
+		"""Test that a malformed cursor is rejected."""
+		response = requests.get(f"{API_URL}/photos/sitemap-ids?after=nonsense")
+		assert response.status_code == 400
+
+
+if __name__ == "__main__":
+	pytest.main([__file__, "-v", "-s"])
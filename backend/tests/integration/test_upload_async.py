@@ -14,11 +14,14 @@ Covered here:
   reaches the API and surfaces as processing_status='error' when polling
 - auth/validation: invalid upload JWT is rejected with 401, missing
   client_signature form field with 422
+- status stream: the completion is also pushed on GET /photos/status/stream,
+  and replayed to a client resuming from an earlier event id
 
 Queue-full (503) behavior for /upload_async is covered separately in
 test_worker_backpressure.py.
 """
 
+import json
 import os
 import sys
 
@@ -37,6 +40,27 @@ from utils.test_utils import API_URL, wait_for_photo_processing
 WORKER_URL = os.getenv("TEST_WORKER_URL", "http://localhost:8056")
 
 
+async def read_status_stream(token: str, after: int, until_photo: str, timeout: float = 30.0) -> list:
+	"""Events of GET /photos/status/stream resumed after `after`, up to the
+	first status event for `until_photo`."""
+	events = []
+	async with httpx.AsyncClient(timeout=timeout) as client:
+		async with client.stream("GET", f"{API_URL}/photos/status/stream",
+								 headers={"Authorization": f"Bearer {token}", "Last-Event-ID": str(after)}) as response:
+			assert response.status_code == 200, f"Stream rejected: {response.status_code}"
+			assert response.headers["content-type"].startswith("text/event-stream")
+			event_id = None
+			async for line in response.aiter_lines():
+				if line.startswith("id: "):
+					event_id = int(line[4:])
+				elif line.startswith("data: "):
+					events.append((event_id, json.loads(line[6:])))
+					event_id = None
+					if events[-1][1].get("id") == until_photo:
+						break
+	return events
+
+
 async def post_upload_async(upload_client, image_data: bytes, auth_data: dict,
 							client_keys: dict, filename: str) -> httpx.Response:
 	"""POST directly to the worker's /upload_async with a valid client signature.
@@ -121,6 +145,45 @@ class TestUploadAsync(BasePhotoTest):
 		assert photo["processing_status"] == "error", f"Expected error, got {photo['processing_status']}"
 		assert "No EXIF data found" in (photo.get("error") or ""), f"Expected EXIF error message, got: {photo.get('error')}"
 
+	@pytest.mark.asyncio
+	async def test_upload_async_completion_on_status_stream(self):
+		"""The completion shows up on the owner's status stream: a client
+		resuming from before the upload gets it replayed, with its event id."""
+		upload_client = SecureUploadClient(api_url=API_URL)
+		client_keys = upload_client.generate_client_keys()
+
+		filename = "async_upload_stream.jpg"
+		image_data = create_test_image_full_gps(200, 150, (0, 255, 255), 50.0755, 14.4378, 180.0)
+		auth_data = await self._authorize(upload_client, client_keys, filename, image_data)
+
+		response = await post_upload_async(upload_client, image_data, auth_data, client_keys, filename)
+		assert response.status_code == 200, f"Async upload rejected: {response.status_code} - {response.text}"
+		wait_for_photo_processing(auth_data["photo_id"], self.test_token, timeout=60)
+
+		events = await read_status_stream(self.test_token, 0, auth_data["photo_id"])
+		event_id, status = events[-1]
+		assert status["type"] == "status"
+		assert status["id"] == auth_data["photo_id"]
+		assert status["processing_status"] == "completed"
+		assert status["deleted"] is False
+		assert event_id is not None
+
+		# Resuming from that id: nothing older is replayed
+		async with httpx.AsyncClient(timeout=30.0) as client:
+			async with client.stream("GET", f"{API_URL}/photos/status/stream",
+									 headers={"Authorization": f"Bearer {self.test_token}",
+											  "Last-Event-ID": str(event_id)}) as stream:
+				async for line in stream.aiter_lines():
+					if line.startswith("data: "):
+						assert line == 'data: {"type": "ready"}'
+						break
+
+	@pytest.mark.asyncio
+	async def test_status_stream_requires_auth(self):
+		async with httpx.AsyncClient() as client:
+			response = await client.get(f"{API_URL}/photos/status/stream")
+		assert response.status_code == 401
+
 	@pytest.mark.asyncio
 	async def test_upload_async_rejects_invalid_jwt(self):
 		"""An invalid upload authorization JWT is rejected with 401 before any
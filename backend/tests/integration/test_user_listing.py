@@ -75,7 +75,7 @@ class TestUserListing(BasePhotoTest):
 
 	@pytest.mark.asyncio
 	async def test_list_users_returns_all(self):
-		"""Test that user listing returns all users (no pagination on this endpoint)."""
+		"""Test that user listing returns all users when no page size is given."""
 		response = requests.get(f"{API_URL}/users/")
 
 		assert response.status_code == 200
@@ -85,6 +85,42 @@ class TestUserListing(BasePhotoTest):
 		assert len(data) >= 3
 
 
+	@pytest.mark.asyncio
+	async def test_list_users_limit_offset(self):
+		"""Test that limit/offset page through the same ordering as the full list."""
+		full = requests.get(f"{API_URL}/users/").json()
+		assert len(full) >= 3
+
+		page1 = requests.get(f"{API_URL}/users/?limit=2").json()
+		page2 = requests.get(f"{API_URL}/users/?limit=2&offset=2").json()
+		assert [u["id"] for u in page1 + page2] == [u["id"] for u in full[:4]]
+
+		counts = [u["photo_count"] for u in full]
+		assert counts == sorted(counts, reverse=True)
+
+	@pytest.mark.asyncio
+	async def test_list_users_tracks_uploads(self):
+		"""Test that a finished upload shows up in the uploader's count and thumbnail."""
+		def own_entry():
+			users = requests.get(f"{API_URL}/users/").json()
+			return next(u for u in users if u["username"] == "test")
+
+		before = own_entry()["photo_count"]
+		image_data = create_test_image_full_gps(
+			width=200, height=150, color=(60, 160, 90),
+			lat=50.0755, lon=14.4378, bearing=45.0
+		)
+		photo_id = await upload_test_image(
+			"user_listing_stats.jpg", image_data,
+			"User listing stats", self.test_token
+		)
+		wait_for_photo_processing(photo_id, self.test_token, timeout=30)
+
+		after = own_entry()
+		assert after["photo_count"] == before + 1
+		assert after["latest_photo_url"]
+
+
 class TestUserPhotos(BasePhotoTest):
 	"""Tests for the user photos endpoint."""
 
@@ -23,6 +23,12 @@ def render_panorama(payload: dict) -> None:
     raise NotImplementedError("producer-side stub")
 
 
+@remoulade.actor(queue_name="terrain", time_limit=6 * 60 * 60 * 1000, max_retries=0)
+def render_sequence(payload: dict) -> None:
+    """Executed by the terrain worker (a whole sequence per job); the API only .send()s it."""
+    raise NotImplementedError("producer-side stub")
+
+
 # Own queue, not `matching`: a walk-sized reconstruction runs 50 min - 1.3 h and is the
 # heaviest thing in the stack, so it needs its own consumer, its own memory ceiling, and a
 # time_limit the matching actor's 30 min would blow.
@@ -43,6 +49,7 @@ def init_broker() -> bool:
         return False
     broker = RabbitmqBroker(url=f"amqp://{url}?timeout=15", confirm_delivery=True)
     remoulade.set_broker(broker)
-    remoulade.declare_actors([match_pair, render_panorama, reconstruct_cluster])
+    remoulade.declare_actors([match_pair, render_panorama, render_sequence,
+                               reconstruct_cluster])
     _ready = True
     return True
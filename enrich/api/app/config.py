@@ -15,6 +15,8 @@ HILLVIEW_DB_URL = os.getenv(
 )
 OXIGRAPH_URL = os.getenv("OXIGRAPH_URL", "http://127.0.0.1:7878")
 ARTIFACTS_DIR = os.getenv("ARTIFACTS_DIR", str(Path(__file__).parents[1] / "artifacts"))
+# GraphStore.query(cached=True) result entries kept (LRU); 0 disables the cache
+SPARQL_CACHE_ENTRIES = int(os.getenv("SPARQL_CACHE_ENTRIES", "256"))
 ALLOW_RAW_UPDATE = os.getenv("ENRICH_ALLOW_RAW_UPDATE", "0") in ("1", "true", "yes")
 # schema file(s) applied idempotently at startup (see db.init_schema)
 SCHEMA_DIR = os.getenv("SCHEMA_DIR", str(Path(__file__).parents[2] / "db" / "init"))
@@ -1,10 +1,17 @@
 """Nominatim + Wikipedia lookups with a durable Postgres cache and polite pacing.
 Ported from scripts/enrich/resolve_anchors.py (Resolver) — unbounded queries, the
 plausibility post-filter moves to the API/UI (computed live from candidate coords
-vs the photo's position/bearing, where it's a tunable knob rather than baked-in)."""
+vs the photo's position/bearing, where it's a tunable knob rather than baked-in).
+
+Pacing is per PROVIDER (a token bucket each), and only remote calls take a token:
+cache hits return without touching it, and a Wikipedia lookup never queues behind
+Nominatim. Concurrent callers asking the same (kind, query) share one remote call,
+and resolve_many() runs a whole batch of lookups that way — deduped, concurrent,
+each provider still held to its own rate."""
 import asyncio
 import json
 import os
+import time
 import urllib.parse
 
 import httpx
@@ -13,10 +20,36 @@ from sqlalchemy import text
 from .db import wb_engine
 
 NOMINATIM_URL = os.getenv("NOMINATIM_URL", "https://nominatim.ueueeu.eu").rstrip("/")
-LOOKUP_DELAY = float(os.getenv("GEOCODE_DELAY", "0.7"))   # seconds between remote calls
+LOOKUP_DELAY = float(os.getenv("GEOCODE_DELAY", "0.7"))   # seconds between Nominatim calls
+WIKIPEDIA_RATE = float(os.getenv("GEOCODE_WIKIPEDIA_RATE", "2"))   # calls/s
+CONCURRENCY = int(os.getenv("GEOCODE_CONCURRENCY", "8"))   # resolve_many lookups in flight
 
 _client = httpx.AsyncClient(timeout=25, headers={"User-Agent": "hillview-enrich/0.3"})
-_pace = asyncio.Lock()
+
+
+class TokenBucket:
+    """`rate` calls/s with bursts of up to `burst`. acquire() reserves the next slot
+    synchronously (no await between reading and taking it, so coroutines can't race
+    for one token) and then sleeps until that slot comes round."""
+
+    def __init__(self, rate: float, burst: int = 1, clock=time.monotonic):
+        self.rate, self.burst, self._clock = rate, burst, clock
+        self._tokens, self._t = float(burst), clock()
+
+    async def acquire(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._t) * self.rate)
+        self._t = now
+        self._tokens -= 1
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+
+
+buckets = {
+    "nominatim": TokenBucket(1 / LOOKUP_DELAY),
+    "wikipedia": TokenBucket(WIKIPEDIA_RATE),
+}
+_inflight: dict[tuple[str, str], asyncio.Future] = {}
 
 
 async def _cached(kind: str, query: str):
@@ -37,21 +70,44 @@ async def _store(kind: str, query: str, result) -> None:
             {"k": kind, "q": query, "r": json.dumps(result)})
 
 
-async def nominatim_search(query: str) -> list[dict]:
-    """→ [{lat, lon, display_name, osm_type, osm_id, type, importance}] (≤8)."""
-    hit, cached = await _cached("nominatim", query)
+async def _lookup(kind: str, query: str, fetch):
+    """Cached result for (kind, query), else fetch() — once, however many callers
+    ask concurrently — and cache what it returns.
+
+    A failing fetch is cached as {"error": ...} so a flaky call doesn't wedge
+    re-runs; the cache row's fetched_at shows when, and deleting the row retries."""
+    hit, cached = await _cached(kind, query)
     if hit:
-        # error results are cached as a dict {"error": ...} — replay those as "no
-        # candidates", never as a candidate list (delete the row to force a retry)
-        return cached if isinstance(cached, list) else []
-    out = []
+        return cached
+    key = (kind, query)
+    if key in _inflight:
+        return await asyncio.shield(_inflight[key])
+    fut = _inflight[key] = asyncio.get_running_loop().create_future()
     try:
-        async with _pace:
-            r = await _client.get(f"{NOMINATIM_URL}/search", params={
-                "q": query, "format": "jsonv2", "limit": 8,
-                "countrycodes": "cz", "accept-language": "cs"})
-            await asyncio.sleep(LOOKUP_DELAY)
+        try:
+            result = await fetch()
+        except Exception as e:
+            result = {"error": str(e)[:200]}
+        await _store(kind, query, result)
+        fut.set_result(result)
+        return result
+    except BaseException as e:
+        fut.set_exception(e)
+        fut.exception()   # waiters re-raise it; nobody waiting is fine too
+        raise
+    finally:
+        del _inflight[key]
+
+
+async def nominatim_search(query: str) -> list[dict]:
+    """→ [{lat, lon, display_name, osm_type, osm_id, type, importance}] (≤8)."""
+    async def fetch():
+        await buckets["nominatim"].acquire()
+        r = await _client.get(f"{NOMINATIM_URL}/search", params={
+            "q": query, "format": "jsonv2", "limit": 8,
+            "countrycodes": "cz", "accept-language": "cs"})
         r.raise_for_status()
+        out = []
         for d in r.json():
             if not (d.get("osm_type") and d.get("osm_id")):
                 continue
@@ -62,13 +118,12 @@ async def nominatim_search(query: str) -> list[dict]:
                 "type": f"{d.get('category', d.get('class', ''))}/{d.get('type', '')}",
                 "importance": float(d.get("importance") or 0),
             })
-    except Exception as e:
-        # cache failures as empty so a flaky call doesn't wedge re-runs; the cache
-        # row's fetched_at shows when, and deleting the row retries.
-        await _store("nominatim", query, {"error": str(e)[:200]})
-        return []
-    await _store("nominatim", query, out)
-    return out
+        return out
+
+    res = await _lookup("nominatim", query, fetch)
+    # error results are cached as a dict {"error": ...} — replay those as "no
+    # candidates", never as a candidate list (delete the row to force a retry)
+    return res if isinstance(res, list) else []
 
 
 def parse_wikipedia_url(url: str) -> tuple[str, str, str, str]:
@@ -90,40 +145,58 @@ def parse_wikipedia_url(url: str) -> tuple[str, str, str, str]:
 
 async def wikipedia_coords(lang: str, title: str) -> dict | None:
     """→ {lat, lon} | None."""
-    key = f"{lang}:{title}"
-    hit, cached = await _cached("wikipedia", key)
-    if hit:
-        return cached if cached and "lat" in cached else None
-    res = None
-    try:
-        async with _pace:
-            r = await _client.get(f"https://{lang}.wikipedia.org/w/api.php", params={
-                "action": "query", "prop": "coordinates", "titles": title,
-                "format": "json"})
-            await asyncio.sleep(LOOKUP_DELAY)
+    async def fetch():
+        await buckets["wikipedia"].acquire()
+        r = await _client.get(f"https://{lang}.wikipedia.org/w/api.php", params={
+            "action": "query", "prop": "coordinates", "titles": title,
+            "format": "json"})
         r.raise_for_status()
         for pg in (r.json().get("query", {}).get("pages", {}) or {}).values():
             c = (pg.get("coordinates") or [None])[0]
             if c:
-                res = {"lat": c["lat"], "lon": c["lon"]}
-        if res is None:
-            # some wikis' infoboxes never register with the GeoData extension
-            # (e.g. cs: Žižkovská televizní věž); the REST summary pulls the
-            # Wikidata coordinate and follows redirects.
-            async with _pace:
-                r2 = await _client.get(
-                    f"https://{lang}.wikipedia.org/api/rest_v1/page/summary/"
-                    + urllib.parse.quote(title.replace(" ", "_"), safe=""))
-                await asyncio.sleep(LOOKUP_DELAY)
-            if r2.status_code == 200:
-                c = r2.json().get("coordinates")
-                if c:
-                    res = {"lat": c["lat"], "lon": c["lon"]}
-    except Exception as e:
-        await _store("wikipedia", key, {"error": str(e)[:200]})
-        return None
-    await _store("wikipedia", key, res or {})
-    return res
+                return {"lat": c["lat"], "lon": c["lon"]}
+        # some wikis' infoboxes never register with the GeoData extension
+        # (e.g. cs: Žižkovská televizní věž); the REST summary pulls the
+        # Wikidata coordinate and follows redirects.
+        await buckets["wikipedia"].acquire()
+        r2 = await _client.get(
+            f"https://{lang}.wikipedia.org/api/rest_v1/page/summary/"
+            + urllib.parse.quote(title.replace(" ", "_"), safe=""))
+        if r2.status_code == 200:
+            c = r2.json().get("coordinates")
+            if c:
+                return {"lat": c["lat"], "lon": c["lon"]}
+        return {}
+
+    res = await _lookup("wikipedia", f"{lang}:{title}", fetch)
+    return res if res and "lat" in res else None
+
+
+RESOLVERS = {"nominatim": nominatim_search, "wikipedia": wikipedia_coords}
+
+
+async def resolve_many(lookups, concurrency: int = CONCURRENCY, progress=None) -> dict:
+    """Run a batch of lookups — (kind, args) pairs, e.g. ("nominatim", (query,)) or
+    ("wikipedia", (lang, title)) — deduped, at most `concurrency` in flight, each
+    provider paced by its own bucket. → {(kind, args): result | Exception}; one
+    failed lookup doesn't sink the batch. `progress(done, total)` (async) is
+    awaited after each finishes."""
+    todo = list(dict.fromkeys(lookups))
+    gate = asyncio.Semaphore(max(1, concurrency))
+    out: dict = {}
+
+    async def one(job):
+        kind, args = job
+        async with gate:
+            try:
+                out[job] = await RESOLVERS[kind](*args)
+            except Exception as e:
+                out[job] = e
+        if progress is not None:
+            await progress(len(out), len(todo))
+
+    await asyncio.gather(*(one(j) for j in todo))
+    return out
 
 
 def osm_uri(osm_type: str, osm_id: int) -> str:
@@ -3,6 +3,10 @@
 Conventions (docs/enrichment-workbench.md): plain SPARQL 1.1 quads, every graph
 name a minted URI — no RDF-star, no reification, no blank nodes. Fact-graph
 content addressing lives in facts.py; this module is transport + namespaces."""
+import asyncio
+import re
+from collections import OrderedDict
+
 import httpx
 
 from . import config
@@ -78,6 +82,37 @@ def poi_iri(poi_id: str) -> str:
     return f"{BASE}/id/poi/{poi_id}"
 
 
+# Fact graphs per TriG request in GraphStore.load_facts — a parse run emits
+# thousands, which used to be one /store POST each.
+LOAD_CHUNK = 2000
+# IRIs per VALUES block when probing which fact graphs already exist.
+PROBE_CHUNK = 500
+
+
+def _graph_block(graph_iri: str, turtle: str) -> str:
+    """One TriG graph block. PREFIX directives are only legal at the top of a
+    TriG document, so they are dropped here (every caller writes full IRIs;
+    PREFIXES is re-emitted once at the top by trig_documents)."""
+    body = "\n".join(line for line in turtle.splitlines()
+                     if not line.lstrip().upper().startswith(("PREFIX ", "@PREFIX ")))
+    return f"<{graph_iri}> {{\n{body}\n}}\n"
+
+
+def trig_documents(fact_graphs: dict[str, str], meta_turtle: str | None,
+                   chunk: int = LOAD_CHUNK) -> list[str]:
+    """{graph_iri: turtle} + meta turtle → TriG documents of at most `chunk`
+    fact graphs each. The meta graph rides in the LAST document, so its
+    fact→run links are only written once every fact graph has landed (the same
+    order the per-graph loads used)."""
+    items = list(fact_graphs.items())
+    docs = []
+    for i in range(0, max(len(items), 1), chunk):
+        docs.append([_graph_block(g, t) for g, t in items[i:i + chunk]])
+    if meta_turtle:
+        docs[-1].append(_graph_block(GRAPH_META, meta_turtle))
+    return [PREFIXES + "\n" + "".join(blocks) for blocks in docs if blocks]
+
+
 def photo_web_url(photo_id: str) -> str:
     """The human-facing web page for a photo — an explicit external reference,
     used as the OBJECT of hv:webPage, never as an identifier. The web app keys
@@ -85,13 +120,116 @@ def photo_web_url(photo_id: str) -> str:
     return f"{WEB_BASE}/photo/hillview-{photo_id}"
 
 
+# Graph names a query reads / an update writes. Anything the patterns can't pin to
+# fixed IRIs (GRAPH ?g, prefixed names, the default graph, DROP ALL, ...) counts
+# as "every graph".
+_READ_GRAPH = re.compile(r"\b(?:GRAPH|FROM\s+NAMED|FROM)\s+<([^>]*)>", re.I)
+_ANY_GRAPH = re.compile(r"\bGRAPH\s+(?!<)", re.I)
+_WRITE_GRAPH = re.compile(r"\b(?:GRAPH|WITH|INTO|TO)\s+<([^>]*)>", re.I)
+_WRITE_ANY = re.compile(r"\b(?:GRAPH\s+(?!<)|DEFAULT\b|ALL\b|NAMED\b)", re.I)
+
+
+def read_graphs(sparql: str) -> frozenset[str] | None:
+    """The named graphs a query reads, or None when it may read any of them."""
+    if _ANY_GRAPH.search(sparql):
+        return None
+    graphs = frozenset(_READ_GRAPH.findall(sparql))
+    return graphs or None
+
+
+def written_graphs(sparql: str) -> frozenset[str] | None:
+    """The named graphs an update writes, or None when that can't be told."""
+    if _WRITE_ANY.search(sparql):
+        return None
+    graphs = frozenset(_WRITE_GRAPH.findall(sparql))
+    return graphs or None
+
+
+def _trig_graphs(trig: str) -> frozenset[str] | None:
+    """Graph names of the `<iri> {` blocks _graph_block writes; None for a TriG
+    document laid out any other way."""
+    heads = [line for line in trig.splitlines() if line.rstrip().endswith("{")]
+    if not heads or not all(h.startswith("<") and h.endswith("> {") for h in heads):
+        return None
+    return frozenset(h[1:-3] for h in heads)
+
+
 class GraphStore:
-    def __init__(self, base_url: str | None = None, client: httpx.AsyncClient | None = None):
+    """Oxigraph over HTTP, plus an opt-in result cache for read-heavy queries.
+
+    Every write through the store bumps a generation counter for each graph it
+    touches (all of them, when an update's targets can't be read off its text).
+    A cached result remembers the generations of the graphs its query reads and
+    is served only while they are unchanged, so it goes stale exactly when one
+    of those graphs is written. Writes that bypass this process (oxigraph's own
+    UI, another API replica) are not seen — keep `cached=True` to the pages
+    whose graphs only change through the workbench."""
+
+    def __init__(self, base_url: str | None = None, client: httpx.AsyncClient | None = None,
+                 cache_entries: int | None = None):
         self.base = (base_url or config.OXIGRAPH_URL).rstrip("/")
         self._client = client or httpx.AsyncClient(timeout=60)
+        self._cache_entries = (config.SPARQL_CACHE_ENTRIES if cache_entries is None
+                               else cache_entries)
+        self._cache: OrderedDict[str, tuple[tuple, dict]] = OrderedDict()
+        self._inflight: dict[tuple, asyncio.Future] = {}
+        self._gens: dict[str, int] = {}
+        self._epoch = 0      # bumped by writes to unknown graphs
+        self._writes = 0     # bumped by every write
+        self.cache_stats = {"hits": 0, "misses": 0}
+
+    def _generation(self, graphs: frozenset[str] | None) -> tuple:
+        if graphs is None:
+            return (self._writes,)
+        return (self._epoch, *(self._gens.get(g, 0) for g in sorted(graphs)))
 
-    async def query(self, sparql: str) -> dict:
-        """SELECT/ASK → SPARQL-JSON dict."""
+    def _bump(self, graphs: frozenset[str] | None) -> None:
+        self._writes += 1
+        if graphs is None:
+            self._epoch += 1
+        else:
+            for g in graphs:
+                self._gens[g] = self._gens.get(g, 0) + 1
+
+    async def query(self, sparql: str, cached: bool = False) -> dict:
+        """SELECT/ASK → SPARQL-JSON dict. cached=True serves a repeat of the same
+        query (up to whitespace) from memory while the graphs it reads are
+        unchanged; the result is shared, so callers must not mutate it."""
+        if not cached or self._cache_entries <= 0:
+            return await self._query(sparql)
+        key = " ".join(sparql.split())
+        gen = self._generation(read_graphs(key))
+        hit = self._cache.get(key)
+        if hit is not None and hit[0] == gen:
+            self._cache.move_to_end(key)
+            self.cache_stats["hits"] += 1
+            return hit[1]
+        # identical concurrent misses share one request
+        pending = self._inflight.get((key, gen))
+        if pending is not None:
+            return await asyncio.shield(pending)
+        self.cache_stats["misses"] += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[(key, gen)] = fut
+        try:
+            res = await self._query(sparql)
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()          # retrieved: waiters (if any) re-raise it
+            raise
+        else:
+            fut.set_result(res)
+            # stored under the generation seen BEFORE the request: a write that
+            # landed meanwhile has already moved past it, so the entry is stale
+            self._cache[key] = (gen, res)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_entries:
+                self._cache.popitem(last=False)
+            return res
+        finally:
+            self._inflight.pop((key, gen), None)
+
+    async def _query(self, sparql: str) -> dict:
         r = await self._client.post(
             f"{self.base}/query",
             content=sparql.encode(),
@@ -102,23 +240,68 @@ class GraphStore:
         return r.json()
 
     async def update(self, sparql: str) -> None:
-        r = await self._client.post(
-            f"{self.base}/update",
-            content=sparql.encode(),
-            headers={"Content-Type": "application/sparql-update"},
-        )
+        try:
+            r = await self._client.post(
+                f"{self.base}/update",
+                content=sparql.encode(),
+                headers={"Content-Type": "application/sparql-update"},
+            )
+        finally:
+            # even a failed request may have been applied
+            self._bump(written_graphs(sparql))
         r.raise_for_status()
 
     async def load_turtle(self, graph_iri: str, turtle: str) -> None:
         """Bulk-load triples into one named graph (Graph Store protocol POST)."""
-        r = await self._client.post(
-            f"{self.base}/store",
-            params={"graph": graph_iri},
-            content=turtle.encode(),
-            headers={"Content-Type": "text/turtle"},
-        )
+        try:
+            r = await self._client.post(
+                f"{self.base}/store",
+                params={"graph": graph_iri},
+                content=turtle.encode(),
+                headers={"Content-Type": "text/turtle"},
+            )
+        finally:
+            self._bump(frozenset([graph_iri]))
+        r.raise_for_status()
+
+    async def load_trig(self, trig: str) -> None:
+        """Bulk-load a multi-graph TriG document into the dataset (no ?graph=:
+        every quad carries its own graph name)."""
+        try:
+            r = await self._client.post(
+                f"{self.base}/store",
+                content=trig.encode(),
+                headers={"Content-Type": "application/trig"},
+            )
+        finally:
+            self._bump(_trig_graphs(trig))
         r.raise_for_status()
 
+    async def existing_graphs(self, graph_iris: list[str]) -> set[str]:
+        """The subset of graph_iris that already hold at least one triple."""
+        found: set[str] = set()
+        for i in range(0, len(graph_iris), PROBE_CHUNK):
+            values = " ".join(f"<{g}>" for g in graph_iris[i:i + PROBE_CHUNK])
+            res = await self.query(
+                f"SELECT DISTINCT ?g WHERE {{ VALUES ?g {{ {values} }} "
+                f"GRAPH ?g {{ ?s ?p ?o }} }}")
+            found.update(b["g"]["value"] for b in res["results"]["bindings"])
+        return found
+
+    async def load_facts(self, fact_graphs: dict[str, str],
+                         meta_turtle: str | None = None) -> int:
+        """Load content-addressed fact graphs plus meta in a few TriG requests.
+
+        A fact graph's IRI is the hash of its content, so one that already
+        exists holds exactly these triples — it is skipped rather than re-sent.
+        The meta graph is always loaded (its fact→run links accumulate per run).
+        Returns the number of fact graphs actually uploaded."""
+        present = await self.existing_graphs(list(fact_graphs))
+        todo = {g: t for g, t in fact_graphs.items() if g not in present}
+        for doc in trig_documents(todo, meta_turtle):
+            await self.load_trig(doc)
+        return len(todo)
+
     async def ping(self) -> None:
         await self.query("ASK { }")
 
@@ -51,6 +51,44 @@ def dest_point(lat: float, lon: float, bearing: float, meters: float) -> tuple[f
     return math.degrees(p2), (math.degrees(l2) + 540.0) % 360.0 - 180.0
 
 
+def ray_scores(photos: list[dict], samples: list[tuple[float, float, float]], *,
+               slack: float, half: float, default_far: float,
+               overlap: bool = True) -> tuple[list[float], list[list[int] | None]]:
+    """Ray-mode scores for many candidates at once: in_pie against every ray sample
+    as one (photos × samples) array pass instead of a Python call per pair.
+
+    photos: [{lat, lon, bearing, far_m}]; samples: [(m_along_ray, lat, lon)].
+    → (distance from each photo to the nearest sample in m, [min_m, max_m] of the
+    samples inside its pie or None — all None when overlap is False)."""
+    import numpy as np
+    if not photos or not samples:
+        return [], [None] * len(photos)
+    la1 = np.radians([p["lat"] for p in photos])[:, None]
+    lo1 = np.array([p["lon"] for p in photos], float)[:, None]
+    m = np.array([s[0] for s in samples], float)
+    la2 = np.radians([s[1] for s in samples])[None, :]
+    lo2 = np.array([s[2] for s in samples], float)[None, :]
+    dl = np.radians(lo2 - lo1)
+    a = np.sin((la2 - la1) / 2) ** 2 + np.cos(la1) * np.cos(la2) * np.sin(dl / 2) ** 2
+    dist = 2 * 6371.0 * np.arcsin(np.sqrt(a)) * 1000
+    ray_dist = dist.min(axis=1).tolist()
+    if not overlap:
+        return ray_dist, [None] * len(photos)
+    brg = (np.degrees(np.arctan2(
+        np.sin(dl) * np.cos(la2),
+        np.cos(la1) * np.sin(la2) - np.sin(la1) * np.cos(la2) * np.cos(dl))) + 360.0) % 360.0
+    facing = np.array([p["bearing"] for p in photos], float)[:, None]
+    off = (brg - facing + 180.0) % 360.0 - 180.0
+    far = np.array([(p.get("far_m") or default_far) * slack for p in photos])[:, None]
+    inside = (dist <= far) & (dist >= 1) & (np.abs(off) <= half)
+    ranges = []
+    for row in inside:
+        hits = m[row]
+        ranges.append([round(float(hits.min())), round(float(hits.max()))]
+                      if hits.size else None)
+    return ray_dist, ranges
+
+
 # --- match evidence vs the rect it was computed against ------------------------
 # A match_results row stores params.rect: the annotation rect the matcher actually
 # saw. Reshaping the annotation afterwards (native edit, or an accepted
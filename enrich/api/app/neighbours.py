@@ -0,0 +1,111 @@
+"""Photo neighbourhoods: the precomputed candidate pools behind matching's ray mode.
+
+photo_neighbours holds, per ORIGIN photo, every matching-eligible photo within
+RADIUS_M with its distance and bearings (db/init/010_photo_neighbours.sql). An
+origin's pairs are built on its first view_candidates request; after that the
+mirror sync keeps them current through refresh(), which re-scores only the photos
+a pass changed. Reading a pool is then an indexed range scan on (photo_id, dist_m)
+instead of a geography scan plus a Python haversine per candidate."""
+import os
+
+from sqlalchemy import text
+
+from .db import wb_engine
+
+RADIUS_M = float(os.getenv("MATCHING_NEIGHBOUR_RADIUS_M", "20000"))
+
+# a photo view_candidates can offer: live, positioned, with a compass
+ELIGIBLE = ("p.deleted = false AND p.missing_since IS NULL "
+            "AND p.geometry IS NOT NULL AND p.compass_angle IS NOT NULL")
+
+CAND_COLS = ("p.id, ST_X(p.geometry) AS lon, ST_Y(p.geometry) AS lat, p.compass_angle, "
+             "(p.analysis->>'farthest_object_distance')::float AS far_m, p.title, "
+             "p.width, p.height")
+
+# origin o → neighbour p scores, same formulas as calibrate.py
+PAIR_COLS = ("hv_haversine_m(ST_X(o.geometry), ST_Y(o.geometry), "
+             "ST_X(p.geometry), ST_Y(p.geometry)) AS dist_m, "
+             "hv_bearing_deg(ST_X(o.geometry), ST_Y(o.geometry), "
+             "ST_X(p.geometry), ST_Y(p.geometry)) AS bearing, "
+             "hv_bearing_deg(ST_X(p.geometry), ST_Y(p.geometry), "
+             "ST_X(o.geometry), ST_Y(o.geometry)) AS back_bearing")
+
+
+async def _build(conn, origin_ids: list[str]) -> None:
+    """(Re)build the neighbourhoods of these origins, inside conn's transaction."""
+    await conn.execute(text(
+        "DELETE FROM photo_neighbours WHERE photo_id = ANY(:ids)"), {"ids": origin_ids})
+    await conn.execute(text(
+        f"INSERT INTO photo_neighbours "
+        f"(photo_id, neighbour_id, dist_m, bearing, back_bearing) "
+        f"SELECT o.id, p.id, {PAIR_COLS} "
+        f"FROM photo_mirror o JOIN photo_mirror p ON p.id != o.id AND {ELIGIBLE} "
+        f"AND ST_DWithin(p.geometry::geography, o.geometry::geography, :rad) "
+        f"WHERE o.id = ANY(:ids) AND o.geometry IS NOT NULL "
+        f"ON CONFLICT DO NOTHING"), {"ids": origin_ids, "rad": RADIUS_M})
+    await conn.execute(text(
+        "INSERT INTO photo_neighbourhoods (photo_id, radius_m) "
+        "SELECT unnest(CAST(:ids AS text[])), :rad "
+        "ON CONFLICT (photo_id) DO UPDATE SET radius_m = EXCLUDED.radius_m, "
+        "built_at = now()"), {"ids": origin_ids, "rad": RADIUS_M})
+
+
+async def ensure(photo_id: str) -> None:
+    """Build this origin's neighbourhood unless it already has a current one."""
+    async with wb_engine.begin() as conn:
+        # serialize concurrent first requests for the same origin
+        await conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:id))"),
+                           {"id": photo_id})
+        have = (await conn.execute(text(
+            "SELECT radius_m FROM photo_neighbourhoods WHERE photo_id = :id"),
+            {"id": photo_id})).scalar()
+        if have is None or have < RADIUS_M:
+            await _build(conn, [photo_id])
+
+
+async def pool(photo_id: str, radius_m: float, where: str = "", params: dict | None = None):
+    """Candidates within radius_m of the origin photo, nearest first:
+    CAND_COLS + dist_m, bearing (origin → candidate), back_bearing. `where` adds
+    SQL conditions on those (`n.` = the pair row). Past RADIUS_M it falls back to
+    scanning photo_mirror, with the same columns."""
+    args = {"pid": photo_id, "rad": radius_m, **(params or {})}
+    extra = f" AND {where}" if where else ""
+    if radius_m <= RADIUS_M:
+        await ensure(photo_id)
+        sql = (f"SELECT {CAND_COLS}, n.dist_m, n.bearing, n.back_bearing "
+               f"FROM photo_neighbours n JOIN photo_mirror p ON p.id = n.neighbour_id "
+               f"WHERE n.photo_id = :pid AND n.dist_m <= :rad{extra} ORDER BY n.dist_m")
+    else:
+        sql = (f"SELECT * FROM (SELECT {CAND_COLS}, {PAIR_COLS} "
+               f"FROM photo_mirror o JOIN photo_mirror p ON p.id != o.id AND {ELIGIBLE} "
+               f"AND ST_DWithin(p.geometry::geography, o.geometry::geography, :rad) "
+               f"WHERE o.id = :pid) n WHERE n.dist_m <= :rad{extra} ORDER BY n.dist_m")
+    async with wb_engine.connect() as conn:
+        return (await conn.execute(text(sql), args)).all()
+
+
+async def refresh(photo_ids: list[str]) -> dict:
+    """Bring stored neighbourhoods up to date after a sync pass touched these
+    photos (changed, stamped missing, or reappeared): their pairs with every
+    built origin are re-scored or dropped, and any of them that is itself an
+    origin gets rebuilt (it may have moved)."""
+    if not photo_ids:
+        return {"pairs": 0, "origins_rebuilt": 0}
+    async with wb_engine.begin() as conn:
+        await conn.execute(text(
+            "DELETE FROM photo_neighbours WHERE neighbour_id = ANY(:ids)"),
+            {"ids": photo_ids})
+        pairs = (await conn.execute(text(
+            f"INSERT INTO photo_neighbours "
+            f"(photo_id, neighbour_id, dist_m, bearing, back_bearing) "
+            f"SELECT o.id, p.id, {PAIR_COLS} "
+            f"FROM photo_neighbourhoods h JOIN photo_mirror o ON o.id = h.photo_id "
+            f"JOIN photo_mirror p ON p.id = ANY(:ids) AND p.id != o.id AND {ELIGIBLE} "
+            f"AND ST_DWithin(p.geometry::geography, o.geometry::geography, h.radius_m) "
+            f"ON CONFLICT DO NOTHING"), {"ids": photo_ids})).rowcount
+        origins = [r[0] for r in (await conn.execute(text(
+            "SELECT photo_id FROM photo_neighbourhoods WHERE photo_id = ANY(:ids)"),
+            {"ids": photo_ids})).all()]
+        if origins:
+            await _build(conn, origins)
+    return {"pairs": pairs, "origins_rebuilt": len(origins)}
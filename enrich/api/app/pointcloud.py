@@ -0,0 +1,142 @@
+"""Point clouds for the recon viewer: PLY in, packed level-of-detail tiers out.
+
+The viewer eats packed little-endian [float32 x,y,z][uint8 r,g,b] — 15 bytes a point
+against ~90 for reconstruct.py's ASCII PLY. The packed file is written ONCE per cloud, in
+a seeded random order, so every prefix of it is a uniform subsample of the whole scene:
+the LOD tiers are just prefix lengths growing by LOD_FACTOR from LOD_BASE. The viewer
+paints tier 0 (64 k points, ~1 MB) immediately and streams the rest in behind it, and a
+`max_points` cap is a prefix too — no per-cap conversion.
+
+read_ply is vectorized for both PLY encodings: binary via a numpy record dtype built
+from the header, ASCII via one np.fromstring over the vertex block (~4× the line-by-line
+parser on a 700 k-point cloud; binary is a straight read). Either way it runs once per
+cloud, at upload, not per view.
+"""
+import numpy as np
+
+STRIDE = 15
+POINT_DTYPE = np.dtype([("xyz", "<f4", (3,)), ("rgb", "u1", (3,))])
+LOD_BASE = 65_536
+LOD_FACTOR = 4
+
+PLY_TYPES = {
+    "char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2", "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4", "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4", "double": "f8", "float64": "f8",
+}
+COLOR_PROPS = (("red", "green", "blue"), ("r", "g", "b"),
+               ("diffuse_red", "diffuse_green", "diffuse_blue"))
+DEFAULT_RGB = 200
+
+
+def _header(f) -> tuple[str, list[tuple[str, int, list[tuple[str, str]]]]]:
+    """→ (format, [(element, count, [(property, ply type)])]); leaves f at the body."""
+    if f.readline().strip() != b"ply":
+        raise ValueError("not a PLY file")
+    fmt, elements = None, []
+    for raw in f:
+        parts = raw.decode("ascii", "replace").split()
+        if not parts or parts[0] in ("comment", "obj_info"):
+            continue
+        if parts[0] == "end_header":
+            break
+        if parts[0] == "format":
+            fmt = parts[1]
+        elif parts[0] == "element":
+            elements.append((parts[1], int(parts[2]), []))
+        elif parts[0] == "property":
+            if not elements:
+                raise ValueError("PLY property before any element")
+            if parts[1] == "list":
+                elements[-1][2].append((parts[-1], "list"))
+            else:
+                elements[-1][2].append((parts[2], parts[1]))
+    else:
+        raise ValueError("PLY header has no end_header")
+    if fmt not in ("ascii", "binary_little_endian", "binary_big_endian"):
+        raise ValueError(f"unsupported PLY format {fmt!r}")
+    return fmt, elements
+
+
+def _record_dtype(props, endian: str) -> np.dtype:
+    try:
+        return np.dtype([(name, endian + PLY_TYPES[t]) for name, t in props])
+    except KeyError:
+        raise ValueError("PLY element with list or unknown property types")
+
+
+def _to_rgb(cols: np.ndarray, unit: bool) -> np.ndarray:
+    """Colour columns → uint8; `unit` = float-typed colours, 0..1 when they fit there."""
+    if unit and cols.size and float(np.nanmax(cols)) <= 1.0:
+        cols = cols * 255.0
+    return np.clip(np.nan_to_num(cols), 0, 255).astype(np.uint8)
+
+
+def read_ply(path: str) -> tuple[np.ndarray, np.ndarray]:
+    """PLY vertices → (xyz float32 (n, 3), rgb uint8 (n, 3)). Missing colours → grey."""
+    with open(path, "rb") as f:
+        fmt, elements = _header(f)
+        body_at = f.tell()
+    names = [e[0] for e in elements]
+    if "vertex" not in names:
+        raise ValueError("PLY has no vertex element")
+    vi = names.index("vertex")
+    _, n, props = elements[vi]
+    if any(t == "list" for _, t in props):
+        raise ValueError("PLY vertex element has list properties")
+    prop_names = [p for p, _ in props]
+    if not all(c in prop_names for c in ("x", "y", "z")):
+        raise ValueError("PLY vertices lack x/y/z")
+    xyz_cols = ["x", "y", "z"]
+    rgb_cols = next((list(c) for c in COLOR_PROPS if all(p in prop_names for p in c)),
+                    None)
+    unit = bool(rgb_cols) and PLY_TYPES.get(dict(props)[rgb_cols[0]], "")[:1] == "f"
+
+    if fmt == "ascii":
+        with open(path, "rb") as f:
+            f.seek(body_at)
+            body = f.read()
+        skip = sum(e[1] for e in elements[:vi])
+        rows = np.flatnonzero(np.frombuffer(body, np.uint8) == 10)
+        start = rows[skip - 1] + 1 if skip else 0
+        stop = rows[skip + n - 1] + 1 if len(rows) >= skip + n else len(body)
+        vals = np.fromstring(body[start:stop].decode("ascii"), dtype=np.float64, sep=" ")
+        if vals.size != n * len(props):
+            raise ValueError(f"PLY vertex block has {vals.size} values, "
+                             f"expected {n} × {len(props)}")
+        vals = vals.reshape(n, len(props))
+        xyz = vals[:, [prop_names.index(c) for c in xyz_cols]].astype(np.float32)
+        cols = vals[:, [prop_names.index(c) for c in rgb_cols]] if rgb_cols else None
+    else:
+        endian = "<" if fmt == "binary_little_endian" else ">"
+        offset = body_at + sum(_record_dtype(p, endian).itemsize * c
+                               for _, c, p in elements[:vi])
+        rec = np.fromfile(path, dtype=_record_dtype(props, endian), count=n, offset=offset)
+        if len(rec) != n:
+            raise ValueError(f"PLY truncated: {len(rec)} of {n} vertices")
+        xyz = np.stack([rec[c] for c in xyz_cols], axis=1).astype("<f4")
+        cols = np.stack([rec[c] for c in rgb_cols], axis=1) if rgb_cols else None
+    rgb = (_to_rgb(cols, unit) if cols is not None
+           else np.full((n, 3), DEFAULT_RGB, np.uint8))
+    return np.ascontiguousarray(xyz, "<f4"), rgb
+
+
+def lod_tiers(n: int) -> list[int]:
+    """Cumulative tier ends: LOD_BASE, ×LOD_FACTOR, … capped by (and ending at) n."""
+    ends, k = [], LOD_BASE
+    while k < n:
+        ends.append(k)
+        k *= LOD_FACTOR
+    return ends + [n] if n else []
+
+
+def pack_lod(xyz: np.ndarray, rgb: np.ndarray) -> tuple[bytes, list[int]]:
+    """→ (packed points in LOD order, lod_tiers). The order is a permutation seeded by
+    the point count, so rebuilding the same cloud gives the same bytes."""
+    n = len(xyz)
+    order = np.random.default_rng(n).permutation(n)
+    out = np.empty(n, POINT_DTYPE)
+    out["xyz"] = xyz[order]
+    out["rgb"] = rgb[order]
+    return out.tobytes(), lod_tiers(n)
@@ -9,7 +9,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from sqlalchemy import text
 
-from .. import facts, graph
+from .. import facts, graph, suggestions
 from ..db import wb_engine
 from ..runs import create_run, fail_run, finish_run
 
@@ -121,7 +121,7 @@ def _short(iri_val: str) -> str:
 async def _facts_by_annotation(ann_ids: list[str]) -> dict[str, list[dict]]:
     if not ann_ids:
         return {}
-    res = await graph.store.query(_fact_query(ann_ids))
+    res = await graph.store.query(_fact_query(ann_ids), cached=True)
     out: dict[str, list[dict]] = {}
     for b in res["results"]["bindings"]:
         ann_id = b["ann"]["value"].rsplit("/", 1)[-1]
@@ -169,7 +169,7 @@ async def list_annotations(pano: bool = False, current: bool = True,
 SELECT DISTINCT ?ann WHERE {{
   GRAPH <{graph.GRAPH_META}> {{ ?f hv:about ?ann }}
   {cond}
-}}""")
+}}""", cached=True)
         ids = [b["ann"]["value"].rsplit("/", 1)[-1] for b in res["results"]["bindings"]]
         if not ids:
             return {"total": 0, "items": []}
@@ -283,9 +283,7 @@ SELECT ?f WHERE {{
                               note=req.note)
     try:
         payload = facts.build_triples_payload({ann_id: [triple]}, run_id)
-        for g_iri, nt in payload["fact_graphs"].items():
-            await graph.store.load_turtle(g_iri, nt)
-        await graph.store.load_turtle(graph.GRAPH_META, payload["meta_turtle"])
+        await graph.store.load_facts(payload["fact_graphs"], payload["meta_turtle"])
         await graph.store.update(facts.curate_update(new_fact, "approved", now, note=req.note))
         for f in prior:
             await graph.store.update(facts.curate_update(
@@ -338,14 +336,13 @@ SELECT ?f WHERE {{
                               note=req.note)
     try:
         payload = facts.build_triples_payload({ann_id: [triple]}, run_id)
-        for g_iri, nt in payload["fact_graphs"].items():
-            await graph.store.load_turtle(g_iri, nt)
-        await graph.store.load_turtle(graph.GRAPH_META, payload["meta_turtle"])
+        await graph.store.load_facts(payload["fact_graphs"], payload["meta_turtle"])
         await graph.store.update(facts.curate_update(
             new_fact, "approved", now, note=req.note))
         for f in prior:
             await graph.store.update(facts.curate_update(
                 f, "rejected", now, note=f"superseded by label edit → {label}"))
+        await suggestions.mark_annotations([ann_id])
         await finish_run(run_id, stats={"fact": new_fact, "superseded": len(prior)},
                          graph_iri=graph.run_iri(run_id))
         return {"run_id": str(run_id), "fact": new_fact, "label": label,
@@ -6,7 +6,7 @@ import datetime
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
-from .. import facts, graph
+from .. import facts, graph, suggestions
 
 router = APIRouter()
 
@@ -26,4 +26,5 @@ async def curate(req: CurateRequest):
     now = datetime.datetime.now(datetime.timezone.utc).isoformat()
     await graph.store.update(
         facts.curate_update(req.fact, req.decision, decided_at_iso=now, note=req.note))
+    await suggestions.mark_facts([req.fact])
     return {"fact": req.fact, "decision": req.decision, "decided_at": now}
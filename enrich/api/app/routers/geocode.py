@@ -14,7 +14,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from sqlalchemy import text
 
-from .. import calibrate, facts, geocode, graph
+from .. import calibrate, facts, geocode, graph, suggestions
 from ..db import wb_engine
 from ..runs import create_run, fail_run, finish_run
 
@@ -112,27 +112,52 @@ async def geocode_run(req: GeocodeRequest):
     async def _job():
         async with geocode_lock:
             try:
+                import json
                 import re
+                import urllib.parse
                 triples_by_ann: dict[str, list] = {}
                 stats = {"annotations": len(todo), "done": 0, "candidates": 0,
                          "wiki_hits": 0}
                 stats["errors"] = 0
+                # every distinct lookup of the run at once: the same label on many
+                # annotations (or the same wiki page) is one query, not one each
+                wanted: dict[str, tuple] = {}
                 for ann_id, d in todo.items():
+                    search = ("nominatim", (d["label"],)) if d.get("label") else None
+                    page = None
+                    if d.get("wiki_url"):
+                        m = re.match(r"https?://(\w{2,3})\.wikipedia\.org/wiki/(.+)",
+                                     d["wiki_url"])
+                        if m:
+                            page = ("wikipedia", (m.group(1), urllib.parse.unquote(
+                                m.group(2)).replace("_", " ")))
+                    wanted[ann_id] = (search, page)
+                stats["lookups"] = len({j for pair in wanted.values() for j in pair if j})
+                stats["lookups_done"] = 0
+
+                async def progress(done, total):
+                    stats["lookups_done"] = done
+                    if done % 25 == 0:
+                        async with wb_engine.begin() as conn:
+                            await conn.execute(text(
+                                "UPDATE runs SET stats = CAST(:s AS jsonb) "
+                                "WHERE id = :id"),
+                                {"s": json.dumps(stats), "id": run_id})
+
+                found = await geocode.resolve_many(
+                    [j for pair in wanted.values() for j in pair if j], progress=progress)
+                for ann_id, (search, page) in wanted.items():
+                    d = todo[ann_id]
                     try:
-                        cands = (await geocode.nominatim_search(d["label"])
-                                 if d.get("label") else [])
+                        cands = found[search] if search else []
+                        wc = found[page] if page else None
+                        for r in (cands, wc):
+                            if isinstance(r, Exception):
+                                raise r
                         wiki_cand = None
-                        if d.get("wiki_url"):
-                            m = re.match(r"https?://(\w{2,3})\.wikipedia\.org/wiki/(.+)",
-                                         d["wiki_url"])
-                            if m:
-                                import urllib.parse
-                                wc = await geocode.wikipedia_coords(
-                                    m.group(1),
-                                    urllib.parse.unquote(m.group(2)).replace("_", " "))
-                                if wc:
-                                    wiki_cand = {"url": d["wiki_url"], **wc}
-                                    stats["wiki_hits"] += 1
+                        if wc:
+                            wiki_cand = {"url": d["wiki_url"], **wc}
+                            stats["wiki_hits"] += 1
                         triples = facts.geocode_facts_for(
                             ann_id, cands, wiki_cand, geo_point=d.get("coords"))
                         if triples:
@@ -144,18 +169,11 @@ async def geocode_run(req: GeocodeRequest):
                         stats["errors"] += 1
                         print(f"geocode {ann_id}: {type(e).__name__}: {e}", flush=True)
                     stats["done"] += 1
-                    if stats["done"] % 25 == 0:
-                        async with wb_engine.begin() as conn:
-                            await conn.execute(text(
-                                "UPDATE runs SET stats = CAST(:s AS jsonb) "
-                                "WHERE id = :id"),
-                                {"s": __import__("json").dumps(stats),
-                                 "id": run_id})
 
                 payload = facts.build_triples_payload(triples_by_ann, run_id)
-                for g_iri, nt in payload["fact_graphs"].items():
-                    await graph.store.load_turtle(g_iri, nt)
-                await graph.store.load_turtle(graph.GRAPH_META, payload["meta_turtle"])
+                await graph.store.load_facts(payload["fact_graphs"], payload["meta_turtle"])
+                # new coords metadata can move an already-approved anchor
+                await suggestions.mark_facts(payload["fact_graphs"])
                 stats["facts"] = payload["n_facts"]
                 await finish_run(run_id, stats=stats, graph_iri=graph.run_iri(run_id))
             except Exception as e:
@@ -370,12 +388,11 @@ async def attach_wikipedia(ann_id: str, req: WikipediaRequest):
                               note=req.note)
     try:
         payload = facts.build_triples_payload({ann_id: triples}, run_id)
-        for g_iri, nt in payload["fact_graphs"].items():
-            await graph.store.load_turtle(g_iri, nt)
-        await graph.store.load_turtle(graph.GRAPH_META, payload["meta_turtle"])
+        await graph.store.load_facts(payload["fact_graphs"], payload["meta_turtle"])
         await graph.store.update(facts.curate_update(
             page_fact, "approved",
             datetime.now(timezone.utc).isoformat(), note=req.note))
+        await suggestions.mark_facts(payload["fact_graphs"])
         await finish_run(run_id, stats={"facts": payload["n_facts"],
                                         "url": wiki_url,
                                         "coords": bool(poi)},
@@ -414,9 +431,7 @@ async def pin_anchor(ann_id: str, req: AnchorRequest):
                               note=req.note)
     try:
         payload = facts.build_triples_payload({ann_id: triples}, run_id)
-        for g_iri, nt in payload["fact_graphs"].items():
-            await graph.store.load_turtle(g_iri, nt)
-        await graph.store.load_turtle(graph.GRAPH_META, payload["meta_turtle"])
+        await graph.store.load_facts(payload["fact_graphs"], payload["meta_turtle"])
         # approve the anchorCandidate fact itself
         anchor_fact = graph.fact_iri(facts.fact_hash(
             facts.iri(graph.annotation_iri(ann_id)),
@@ -424,6 +439,7 @@ async def pin_anchor(ann_id: str, req: AnchorRequest):
         await graph.store.update(facts.curate_update(
             anchor_fact, "approved",
             datetime.now(timezone.utc).isoformat(), note=req.note))
+        await suggestions.mark_facts(payload["fact_graphs"])
         await finish_run(run_id, stats={"facts": payload["n_facts"],
                                         "candidate": cand_uri},
                          graph_iri=graph.run_iri(run_id))
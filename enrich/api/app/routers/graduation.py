@@ -1,10 +1,12 @@
 """Graduation: what approved curation would push back into Hillview.
 
 GET /api/graduation/suggestions — per-annotation body-rewrite proposals derived
-from APPROVED labelText / anchorCandidate facts vs the mirrored body. Purely a
-derived view: nothing here writes anywhere. The suggested body is the portable
-projection of the approved facts ("Name | context | wiki | lat N, lon E"), built
-to round-trip through parse_body — the export package (.trig + ops manifest) and
+from APPROVED labelText / anchorCandidate facts vs the mirrored body. A derived
+view: nothing here writes to the graph or the mirror; the computed items are kept
+in graduation_suggestions and only recomputed for what changed
+(app/suggestions.py). The suggested body is the portable projection of the
+approved facts ("Name | context | wiki | lat N, lon E"), built to round-trip
+through parse_body — the export package (.trig + ops manifest) and
 the Hillview-side applier are the next milestones.
 """
 import re
@@ -15,6 +17,7 @@ from pydantic import BaseModel
 from sqlalchemy import text
 
 from .. import facts, graph
+from .. import suggestions as stored   # GET /suggestions below takes the name
 from ..db import wb_engine
 from ..parser import parse_body
 from ..runs import create_run, fail_run, finish_run
@@ -78,19 +81,24 @@ def suggest_body(body: str | None, label: str | None,
     return " | ".join(segs), changes
 
 
-async def _approved_context() -> tuple[dict, dict, dict]:
+async def _approved_context(ann_ids=None) -> tuple[dict, dict, dict]:
     """The approved-fact context shared by set-body suggestions and native
-    creates: (by_ann facts map, coords_map, meta_facts)."""
+    creates: (by_ann facts map, coords_map, meta_facts). ann_ids restricts it to
+    those annotations; None scans every approved fact."""
     ann_prefix = graph.annotation_iri("")
+    values = ""
+    if ann_ids is not None:
+        iris = " ".join(f"<{graph.annotation_iri(a)}>" for a in sorted(ann_ids))
+        values = f"VALUES ?s {{ {iris} }}\n  "
     res = await graph.store.query(f"""{graph.PREFIXES}
 SELECT ?s ?p ?v ?f ?decidedAt WHERE {{
-  GRAPH ?f {{ ?s ?p ?v }}
+  {values}GRAPH ?f {{ ?s ?p ?v }}
   FILTER(?p IN (hv:labelText, hv:anchorCandidate, hv:wikipediaPage))
   GRAPH <{graph.GRAPH_CURATION}> {{
     ?f hv:status hv:approved .
     OPTIONAL {{ ?f hv:decidedAt ?decidedAt }}
   }}
-}}""")
+}}""", cached=True)
     by_ann: dict[str, dict] = {}
     for b in res["results"]["bindings"]:
         subj = b["s"]["value"]
@@ -122,7 +130,8 @@ SELECT ?s ?p ?v ?f ?decidedAt WHERE {{
     if non_geo:
         values = " ".join(f"<{c}>" for c in non_geo)
         cres = await graph.store.query(f"""{graph.PREFIXES}
-SELECT ?cand ?f ?p ?w WHERE {{ VALUES ?cand {{ {values} }} GRAPH ?f {{ ?cand ?p ?w }} }}""")
+SELECT ?cand ?f ?p ?w WHERE {{ VALUES ?cand {{ {values} }} GRAPH ?f {{ ?cand ?p ?w }} }}""",
+                                       cached=True)
         for b in cres["results"]["bindings"]:
             cand = b["cand"]["value"]
             meta_facts.setdefault(cand, []).append(b["f"]["value"])
@@ -158,46 +167,76 @@ def _build_item(r, d: dict, coords_map: dict, meta_facts: dict) -> dict:
             "decided_at": d.get("decided_at") or None,
             "fact_iris": [f["fact"] for f in d["facts"]]
             + (meta_facts.get(anchor_uri, []) if anchor_uri else []),
+            "candidates": d.get("anchors", []),
             "anchor": ({"uri": anchor_uri, "lat": anchor[0], "lon": anchor[1]}
                        if anchor else None)}
 
 
-async def _compute_suggestions() -> tuple[list[dict], list[dict]]:
-    """→ (pending, landed) for MIRRORED (hillview-origin) annotations. pending =
-    approved facts imply a body change; landed = already reflected. Native
-    (workbench-drawn) annotations are handled as create ops, not here."""
-    by_ann, coords_map, meta_facts = await _approved_context()
-    if not by_ann:
-        return [], []
-    async with wb_engine.connect() as conn:
+async def _dirty_annotations(conn, fact_iris: set[str]) -> set[str]:
+    """Marked fact graphs → the annotations whose suggestion they can change: the
+    fact's subject when it is an annotation, else (an anchor candidate's metadata)
+    every stored suggestion anchored to that candidate."""
+    ann_prefix = graph.annotation_iri("")
+    subjects: set[str] = set()
+    iris = sorted(fact_iris)
+    for i in range(0, len(iris), graph.PROBE_CHUNK):
+        values = " ".join(f"<{f}>" for f in iris[i:i + graph.PROBE_CHUNK])
+        res = await graph.store.query(
+            f"SELECT DISTINCT ?s WHERE {{ VALUES ?f {{ {values} }} "
+            f"GRAPH ?f {{ ?s ?p ?o }} }}")
+        subjects.update(b["s"]["value"] for b in res["results"]["bindings"])
+    anns = {s[len(ann_prefix):] for s in subjects if s.startswith(ann_prefix)}
+    return anns | await stored.anchored_to(
+        conn, sorted(s for s in subjects if not s.startswith(ann_prefix)))
+
+
+async def _refresh_suggestions() -> dict:
+    """Recompute the stored suggestions of every annotation marked dirty since
+    the last call (all of them on a first run or a rebuild)."""
+    async with wb_engine.begin() as conn:
+        # one recompute at a time; a concurrent caller then finds nothing to do
+        await conn.execute(text(
+            "SELECT pg_advisory_xact_lock(hashtext('graduation_suggestions'))"))
+        full, ann_ids, fact_iris = await stored.claim(conn)
+        if not full:
+            ann_ids |= await _dirty_annotations(conn, fact_iris)
+            full = len(ann_ids) > stored.FULL_REBUILD_OVER
+        if not full and not ann_ids:
+            return {"full": False, "recomputed": 0}
+        by_ann, coords_map, meta_facts = await _approved_context(
+            None if full else ann_ids)
         rows = (await conn.execute(text(
             "SELECT a.id, a.body, a.photo_id, a.target, p.sizes "
             "FROM annotation_mirror a JOIN photo_mirror p ON p.id = a.photo_id "
             "WHERE a.id = ANY(:ids) AND a.is_current AND a.missing_since IS NULL "
             "AND a.origin = 'hillview'"),
-            {"ids": list(by_ann)})).all()
-    pending, landed = [], []
-    for r in rows:
-        item = _build_item(r, by_ann[r.id], coords_map, meta_facts)
-        (pending if item["changes"] else landed).append(item)
-    def _key(i):
-        return (i["decided_at"] or "", i["annotation_id"])
-    pending.sort(key=_key, reverse=True)
-    landed.sort(key=_key, reverse=True)
-    return pending, landed
+            {"ids": list(by_ann)})).all() if by_ann else []
+        items = [_build_item(r, by_ann[r.id], coords_map, meta_facts) for r in rows]
+        await stored.save(conn, items, None if full else ann_ids)
+    return {"full": full, "recomputed": len(by_ann) if full else len(ann_ids)}
+
+
+async def _compute_suggestions() -> tuple[list[dict], list[dict]]:
+    """→ (pending, landed) for MIRRORED (hillview-origin) annotations. pending =
+    approved facts imply a body change; landed = already reflected. Native
+    (workbench-drawn) annotations are handled as create ops, not here."""
+    await _refresh_suggestions()
+    return await stored.load()
 
 
 async def _native_create_ops() -> list[dict]:
     """Workbench-native annotations (origin='workbench', not yet graduated) as
     create-annotation items. Body = its facts serialized (or its raw body if
     uncurated). Sorted newest-curation first, like suggestions."""
-    by_ann, coords_map, meta_facts = await _approved_context()
     async with wb_engine.connect() as conn:
         rows = (await conn.execute(text(
             "SELECT a.id, a.body, a.photo_id, a.target, p.sizes "
             "FROM annotation_mirror a JOIN photo_mirror p ON p.id = a.photo_id "
             "WHERE a.origin = 'workbench' AND a.is_current "
             "AND a.missing_since IS NULL"))).all()
+    if not rows:
+        return []
+    by_ann, coords_map, meta_facts = await _approved_context({r.id for r in rows})
     out = []
     for r in rows:
         d = by_ann.get(r.id, {"facts": [], "decided_at": ""})
@@ -234,7 +273,7 @@ SELECT ?s ?v ?f ?decidedAt WHERE {{
     ?f hv:status hv:approved .
     OPTIONAL {{ ?f hv:decidedAt ?decidedAt }}
   }}
-}}""")
+}}""", cached=True)
     props = {}
     for b in res["results"]["bindings"]:
         s = b["s"]["value"]
@@ -269,8 +308,9 @@ SELECT ?s ?v ?f ?decidedAt WHERE {{
 
 
 def _public(item: dict) -> dict:
-    """Drop internal-only fields (fact_iris) from a suggestion for the GET view."""
-    return {k: v for k, v in item.items() if k != "fact_iris"}
+    """Drop internal-only fields (fact_iris, candidates) from a suggestion for
+    the GET view."""
+    return {k: v for k, v in item.items() if k not in ("fact_iris", "candidates")}
 
 
 @router.get("/graduation/suggestions")
@@ -284,6 +324,14 @@ async def suggestions():
             "target_changes": [_public(i) for i in targets]}
 
 
+@router.post("/graduation/rebuild")
+async def rebuild():
+    """Recompute every stored suggestion — for graph edits that bypassed the
+    marking writers (raw /api/sparql updates, an Oxigraph restore)."""
+    await stored.mark_all()
+    return await _refresh_suggestions()
+
+
 def _nt_term(b: dict) -> str:
     """SPARQL-JSON term → N-Triples/TriG term (no blank nodes by design)."""
     if b["type"] == "uri":
@@ -10,7 +10,7 @@ from fastapi.responses import FileResponse
 from pydantic import BaseModel
 from sqlalchemy import text
 
-from .. import config, facts, graph, matching
+from .. import config, facts, graph, matching, neighbours
 from ..db import wb_engine
 from ..runs import create_run, finish_run
 from .calibrate import _calibration_rows
@@ -206,7 +206,7 @@ async def view_candidates(ann_id: str, slack: float = 2.0, half: float = 60,
     else:
         # ray mode: pano position + calibration (or compass + assumed FOV) +
         # rect-x → sight ray with angular uncertainty
-        from ..calibrate import ang_norm, bearing_deg, haversine_km, rect_x
+        from ..calibrate import ang_norm, rect_x
         from .proto import _calibration_for
         async with wb_engine.connect() as conn:
             row = (await conn.execute(text(
@@ -241,7 +241,16 @@ async def view_candidates(ann_id: str, slack: float = 2.0, half: float = 60,
         pano = {"id": row.photo_id, "lat": row.lat, "lon": row.lon,
                 "compass_angle": row.compass_angle}
 
-        rows = await _photo_pool(row.photo_id, row.lon, row.lat, far_m + 5000)
+        # the pano's precomputed neighbourhood: distance and bearing come stored;
+        # without the overlap test the wedge itself is an indexed filter (loose by
+        # a hair — the exact test below decides)
+        where, wp = "", {}
+        if not overlap:
+            where = ("n.dist_m BETWEEN :near - 1e-6 AND :far + 1e-6 AND "
+                     "abs((n.bearing - :az + 180.0) - 360.0 * floor("
+                     "(n.bearing - :az + 180.0) / 360.0) - 180.0) <= :rh + 1e-6")
+            wp = {"near": near_m, "far": far_m, "az": azimuth, "rh": ray_half}
+        rows = await neighbours.pool(row.photo_id, far_m + 5000, where, wp)
         # ray sample points for the pie-overlap test
         step = max(200.0, (far_m - near_m) / 32)
         samples = []
@@ -250,25 +259,18 @@ async def view_candidates(ann_id: str, slack: float = 2.0, half: float = 60,
             slat, slon = matching.dest_point(row.lat, row.lon, azimuth, m)
             samples.append((m, slat, slon))
             m += step
+        # proximity to the ray = proximity to the unknown → the ranking that
+        # matters (dist to pano is meaningless here: the pano's neighbors
+        # trivially see the near end of a long ray)
+        ray_dists, hit_ranges = matching.ray_scores(
+            [{"lat": r.lat, "lon": r.lon, "bearing": r.compass_angle, "far_m": r.far_m}
+             for r in rows], samples,
+            slack=slack, half=half, default_far=default_far, overlap=overlap)
         cands = []
-        for r in rows:
-            d_m = haversine_km(row.lon, row.lat, r.lon, r.lat) * 1000
-            off_ray = ang_norm(bearing_deg(row.lon, row.lat, r.lon, r.lat) - azimuth)
+        for r, ray_dist, hit_range in zip(rows, ray_dists, hit_ranges):
+            d_m = r.dist_m
+            off_ray = ang_norm(r.bearing - azimuth)
             in_wedge = near_m <= d_m <= far_m and abs(off_ray) <= ray_half
-            # proximity to the ray = proximity to the unknown → the ranking that
-            # matters (dist to pano is meaningless here: the pano's neighbors
-            # trivially see the near end of a long ray)
-            ray_dist = min(haversine_km(r.lon, r.lat, slon, slat) * 1000
-                           for _, slat, slon in samples)
-            hit_range = None
-            if overlap:
-                photo = {"lat": r.lat, "lon": r.lon, "bearing": r.compass_angle,
-                         "far_m": r.far_m}
-                hits = [m for m, slat, slon in samples
-                        if matching.in_pie(photo, slat, slon, slack=slack,
-                                           half=half, default_far=default_far)]
-                if hits:
-                    hit_range = [round(min(hits)), round(max(hits))]
             qualifies = bool(hit_range) if overlap else in_wedge
             if not qualifies:
                 continue
@@ -55,19 +55,19 @@ async def parse_run(req: ParseRequest):
                   for r in rows]
         payload = facts.build_run_payload(parsed, run_id)
 
-        # load every fact graph (content-addressed; re-emitting == same graph, idempotent)
-        for g_iri, nt in payload["fact_graphs"].items():
-            await graph.store.load_turtle(g_iri, nt)
-        # meta graph: run resource + fact->run + fact->annotation links (accumulates)
+        # fact graphs (content-addressed; re-emitting == same graph, idempotent —
+        # already-present ones are skipped) + meta graph: run resource +
+        # fact->run + fact->annotation links (accumulates), in a few TriG loads
         started = datetime.datetime.now(datetime.timezone.utc).isoformat()
-        await graph.store.load_turtle(
-            graph.GRAPH_META,
+        n_new = await graph.store.load_facts(
+            payload["fact_graphs"],
             payload["meta_turtle"] + facts.run_meta_turtle(
                 run_id, started, json.dumps({"scope": req.scope})))
 
         stats = {
             "annotations": len(parsed),
             "facts": payload["n_facts"],
+            "facts_new": n_new,
             "oops": sum(1 for p in parsed if p["parsed"].oops),
             "unnamed": sum(1 for p in parsed if p["parsed"].unnamed),
             "uncertain": sum(1 for p in parsed if p["parsed"].uncertain),
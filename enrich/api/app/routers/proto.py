@@ -189,10 +189,8 @@ async def place_poi(photo_id: str, req: PlacePoiRequest):
             fact_graphs[g] = f"{s} {p} {o} .\n"
             meta_lines.append(f"{facts.iri(g)} <http://www.w3.org/ns/prov#wasGeneratedBy> {facts.iri(run)} .")
             meta_lines.append(f"{facts.iri(g)} {facts._p('about')} {proto} .")
-        for g_iri, nt in fact_graphs.items():
-            await graph.store.load_turtle(g_iri, nt)
-        await graph.store.load_turtle(graph.GRAPH_META,
-                                      graph.PREFIXES + "\n" + "\n".join(meta_lines))
+        await graph.store.load_facts(fact_graphs,
+                                     graph.PREFIXES + "\n" + "\n".join(meta_lines))
         await finish_run(run_id, stats={"facts": len(fact_graphs)},
                          graph_iri=graph.run_iri(run_id))
         out["saved"] = {"run_id": str(run_id),
@@ -14,6 +14,7 @@ table lives in the metrics.json artifact rather than the DB column: it is the
 false-link/Doppelganger view and can reach a quarter-megabyte, so it is fetched per run
 rather than on every list.
 """
+import asyncio
 import datetime
 import json
 import os
@@ -24,11 +25,11 @@ import uuid
 
 from fastapi import (APIRouter, File, Form, Header, HTTPException, Request,
                      UploadFile)
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy import text
 
-from .. import config
+from .. import config, pointcloud
 from ..db import wb_engine
 
 router = APIRouter()
@@ -195,60 +196,103 @@ async def cloud_artifact(run_id: str, request: Request):
     return FileResponse(path, media_type="application/octet-stream")
 
 
-def _ply_to_packed(ply_path: str, max_points: int) -> bytes:
-    """ASCII PLY -> packed little-endian [float32 x,y,z][uint8 r,g,b] per point.
+def _lod_cache(src: str) -> dict:
+    """Packed LOD copy of a PLY (see app/pointcloud.py), built on first use and reused
+    until the PLY itself changes — a re-delivered result replaces points.ply, and its
+    mtime/size no longer matching the manifest is what triggers the rebuild.
 
-    The viewer cannot eat the PLY directly at these sizes: reconstruct.py writes ASCII, so
-    a 700 k-point sparse cloud is ~65 MB and a dense one runs to hundreds. Packed, a point
-    costs 15 bytes instead of ~90, and gzip takes it further. Points beyond max_points are
-    dropped by even stride rather than truncation, so a downsampled cloud still covers the
-    whole scene instead of half of it.
-    """
-    import struct
-    header, pts = True, []
-    n_declared = 0
-    with open(ply_path) as f:
-        for line in f:
-            if header:
-                if line.startswith("element vertex"):
-                    n_declared = int(line.split()[-1])
-                elif line.startswith("end_header"):
-                    header = False
-                continue
-            pts.append(line)
-    n = n_declared or len(pts)
-    # ceil, not floor: floor(715532/400000) == 1 leaves the cap unenforced
-    step = max(1, -(-n // max_points)) if max_points else 1
-    out = bytearray()
-    for i in range(0, len(pts), step):
-        p = pts[i].split()
-        if len(p) < 6:
-            continue
-        out += struct.pack("<fff3B", float(p[0]), float(p[1]), float(p[2]),
-                           int(float(p[3])), int(float(p[4])), int(float(p[5])))
-    return bytes(out)
+    Written beside the artifact as <ply>.lod.bin + <ply>.lod.json; the manifest goes
+    last, so a present manifest always describes a complete bin."""
+    st = os.stat(src)
+    key = {"source_mtime_ns": st.st_mtime_ns, "source_size": st.st_size}
+    try:
+        with open(src + ".lod.json") as f:
+            m = json.load(f)
+        if all(m.get(k) == v for k, v in key.items()) and os.path.exists(src + ".lod.bin"):
+            return m
+    except (OSError, json.JSONDecodeError):
+        pass
+    xyz, rgb = pointcloud.read_ply(src)
+    data, tiers = pointcloud.pack_lod(xyz, rgb)
+    _write_atomic(src + ".lod.bin", data)
+    m = {**key, "n": len(xyz), "stride": pointcloud.STRIDE, "tiers": tiers}
+    _write_atomic(src + ".lod.json", json.dumps(m).encode())
+    _drop_legacy_bins(src)
+    return m
+
+
+def _drop_legacy_bins(src: str) -> None:
+    """Remove the <ply>.<max_points>.bin copies the pre-LOD cloud.bin endpoint cached
+    per requested size; nothing reads them any more."""
+    folder, base = os.path.split(src)
+    for name in os.listdir(folder or "."):
+        mid = name[len(base) + 1:-len(".bin")]
+        if name.startswith(base + ".") and name.endswith(".bin") and mid.isdigit():
+            try:
+                os.remove(os.path.join(folder, name))
+            except OSError:
+                pass
 
 
-@router.get("/recon/runs/{run_id}/cloud.bin")
-async def cloud_packed(run_id: str, request: Request, max_points: int = 1_500_000,
-                       dense: bool = False):
-    """The point cloud in the viewer's format, converted on first request and cached.
-
-    Cached beside the artifact because the conversion is a full parse of a many-megabyte
-    text file — fine once, not per page load.
-    """
-    col = "cloud_path"
-    path = await _artifact(run_id, col)
-    src = path
+async def _cloud_lod(run_id: str, dense: bool) -> tuple[str, dict, bool]:
+    """→ (packed bin path, manifest, dense actually served)."""
+    src = await _artifact(run_id, "cloud_path")
     if dense:
-        cand = os.path.join(os.path.dirname(path), "dense.ply")
+        cand = os.path.join(os.path.dirname(src), "dense.ply")
         if os.path.exists(cand):
             src = cand
-    cache = f"{src}.{max_points}.bin"
-    if not os.path.exists(cache):
-        _write_atomic(cache, _ply_to_packed(src, max_points))
-    return FileResponse(cache, media_type="application/octet-stream",
-                        headers={"X-Point-Stride": "15"})
+    try:
+        m = await asyncio.to_thread(_lod_cache, src)
+    except FileNotFoundError:
+        raise HTTPException(404, "artifact not available")
+    except ValueError as e:
+        raise HTTPException(422, f"unreadable point cloud: {e}")
+    return src + ".lod.bin", m, src.endswith("dense.ply")
+
+
+def _file_range(path: str, start: int, stop: int, chunk: int = 1 << 20):
+    with open(path, "rb") as f:
+        f.seek(start)
+        left = stop - start
+        while left > 0:
+            buf = f.read(min(chunk, left))
+            if not buf:
+                return
+            left -= len(buf)
+            yield buf
+
+
+@router.get("/recon/runs/{run_id}/cloud/lod")
+async def cloud_lod(run_id: str, dense: bool = False):
+    """Level-of-detail index for cloud.bin: cumulative point counts per tier. The viewer
+    paints tier 0 and streams the rest behind it — every tier is a uniform subsample
+    of what remains, so each one just densifies the scene."""
+    _, m, used_dense = await _cloud_lod(run_id, dense)
+    return {"n": m["n"], "stride": m["stride"], "tiers": m["tiers"],
+            "dense": used_dense}
+
+
+@router.get("/recon/runs/{run_id}/cloud.bin")
+async def cloud_packed(run_id: str, max_points: int = 1_500_000,
+                       dense: bool = False, tier: int | None = None):
+    """The point cloud in the viewer's format: one LOD tier (`tier`), or the first
+    `max_points` points — a prefix of the LOD order, so still spread over the whole
+    scene rather than half of it. 0 = all."""
+    path, m, _ = await _cloud_lod(run_id, dense)
+    n, tiers = m["n"], m["tiers"]
+    if tier is not None:
+        if not 0 <= tier < len(tiers):
+            raise HTTPException(404, f"no tier {tier} (cloud has {len(tiers)})")
+        lo, hi = (tiers[tier - 1] if tier else 0), tiers[tier]
+    else:
+        lo, hi = 0, min(n, max_points) if max_points > 0 else n
+    headers = {"X-Point-Stride": str(m["stride"])}
+    if lo == 0 and hi == n:
+        return FileResponse(path, media_type="application/octet-stream", headers=headers)
+    stride = m["stride"]
+    headers["Content-Length"] = str((hi - lo) * stride)
+    return StreamingResponse(_file_range(path, lo * stride, hi * stride),
+                             media_type="application/octet-stream", headers=headers)
 
 
 @router.get("/recon/runs/{run_id}/cameras")
@@ -644,6 +688,12 @@ async def result(result_json: str = Form(...),
         await conn.execute(text(
             f"UPDATE recon_runs SET {', '.join(sets)} "
             f"WHERE id = CAST(:id AS uuid){where}"), args)
+    if "cloud_path" in cols:
+        # pack now, so the first view of a fresh run opens as fast as later ones
+        try:
+            await asyncio.to_thread(_lod_cache, _artifact_abspath(cols["cloud_path"]))
+        except (OSError, ValueError) as e:
+            print(f"recon: packing {rid} cloud failed: {e}", flush=True)
     return {"ok": True}
 
 
@@ -674,7 +724,6 @@ async def _queue_state() -> dict | None:
     now = time.monotonic()
     if _queue_state_cache and now - _queue_state_cache[0] < QUEUE_STATE_TTL_S:
         return _queue_state_cache[1]
-    import asyncio
     state = await asyncio.to_thread(_queue_state_now)
     _queue_state_cache = (now, state)
     return state
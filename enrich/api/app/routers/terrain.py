@@ -102,6 +102,62 @@ async def enqueue(req: EnqueueRequest):
     return {"queued": str(rid)}
 
 
+class EnqueueSequenceRequest(BaseModel):
+    photo_ids: list[str]             # shot order; nearby ones share a march
+    params: dict = {}
+
+
+MAX_SEQUENCE = 500
+
+
+@router.post("/terrain/enqueue_sequence")
+async def enqueue_sequence(req: EnqueueSequenceRequest):
+    """One render row per photo, ONE worker job for all of them: the worker
+    batches neighbouring viewpoints onto a shared grid and march. A batch
+    shares its azimuth sweep, so there is no per-photo pie here — the full
+    circle unless the caller pins az_start/az_end."""
+    from .. import actors
+    if not actors.init_broker():
+        raise HTTPException(503, "no RABBITMQ_URL configured")
+    if not req.photo_ids or len(req.photo_ids) > MAX_SEQUENCE:
+        raise HTTPException(422, f"need 1..{MAX_SEQUENCE} photo_ids")
+    params = {k: v for k, v in (req.params or {}).items() if k in ALLOWED_PARAMS}
+    # the GPS hint is per viewpoint: it travels on the items, not the shared
+    # params (the worker resolves each observer's datum on its own)
+    gps = {k: params.pop(k) for k in ("gps_altitude_m", "gps_datum") if k in params}
+    async with wb_engine.connect() as conn:
+        rows = {r.id: r for r in (await conn.execute(text(
+            "SELECT id, ST_Y(geometry) AS lat, ST_X(geometry) AS lon, altitude "
+            "FROM photo_mirror WHERE id = ANY(:ids) AND geometry IS NOT NULL"),
+            {"ids": list(req.photo_ids)})).all()}
+    photos = [rows[pid] for pid in dict.fromkeys(req.photo_ids) if pid in rows]
+    if not photos:
+        raise HTTPException(404, "no photo with a position")
+
+    items, queued = [], []
+    async with wb_engine.begin() as conn:
+        for ph in photos:
+            # GPS altitude stays a per-viewpoint HINT (see enqueue); an
+            # explicit one from the caller wins, as it does there
+            row_params = dict(params, **gps)
+            if ph.altitude is not None and "gps_altitude_m" not in gps:
+                row_params["gps_altitude_m"] = ph.altitude
+            rid = (await conn.execute(text(
+                "INSERT INTO terrain_renders (photo_id, lat, lon, params) "
+                "VALUES (:pid, :lat, :lon, CAST(:p AS jsonb)) RETURNING id"),
+                {"pid": ph.id, "lat": ph.lat, "lon": ph.lon,
+                 "p": json.dumps(row_params)})).scalar_one()
+            item = {"result_id": str(rid), "lat": ph.lat, "lon": ph.lon}
+            item.update((k, row_params[k]) for k in ("gps_altitude_m", "gps_datum")
+                        if k in row_params)
+            items.append(item)
+            queued.append({"photo_id": ph.id, "queued": str(rid)})
+    actors.render_sequence.send({"params": params, "items": items})
+    print(f"terrain: enqueued sequence of {len(items)}", flush=True)
+    return {"queued": queued,
+            "skipped": [pid for pid in req.photo_ids if pid not in rows]}
+
+
 @router.post("/terrain/result")
 async def result(result_json: str = Form(...),
                  depth: UploadFile | None = File(None),
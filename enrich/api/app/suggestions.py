@@ -0,0 +1,102 @@
+"""Graduation suggestions, persisted: graduation_suggestions keeps the last
+computed item per mirrored annotation, graduation_dirty says what changed since
+(db/init/011_graduation_suggestions.sql).
+
+Anything that can change a suggestion marks it here AFTER its write has landed:
+curation of a fact (mark_facts — its subject is resolved at recompute time, so a
+candidate's metadata fact reaches every annotation anchored to that candidate),
+or the mirror sync changing an annotation row (mark_annotations).
+routers/graduation.py claims the marks and recomputes only those annotations, so
+a suggestions view costs what changed, not the whole curated history. Raw
+updates through /api/sparql can't be attributed; mark_all() (POST
+/api/graduation/rebuild) forces a full pass."""
+import json
+
+from sqlalchemy import text
+
+from .db import wb_engine
+
+# past this many dirty annotations one full pass is cheaper than a VALUES list
+FULL_REBUILD_OVER = 2000
+
+
+async def _mark(kind: str, refs) -> None:
+    refs = sorted(set(refs))
+    if not refs:
+        return
+    async with wb_engine.begin() as conn:
+        await conn.execute(text(
+            "INSERT INTO graduation_dirty (kind, ref) "
+            "SELECT :k, unnest(CAST(:refs AS text[])) ON CONFLICT DO NOTHING"),
+            {"k": kind, "refs": refs})
+
+
+async def mark_annotations(ann_ids) -> None:
+    await _mark("annotation", ann_ids)
+
+
+async def mark_facts(fact_iris) -> None:
+    await _mark("fact", fact_iris)
+
+
+async def mark_all() -> None:
+    await _mark("all", ["*"])
+
+
+async def claim(conn) -> tuple[bool, set[str], set[str]]:
+    """Take every pending mark, inside conn's transaction (a failed recompute
+    rolls them back). → (full rebuild?, annotation ids, fact IRIs)."""
+    rows = (await conn.execute(text(
+        "DELETE FROM graduation_dirty RETURNING kind, ref"))).all()
+    anns = {r.ref for r in rows if r.kind == "annotation"}
+    fact_iris = {r.ref for r in rows if r.kind == "fact"}
+    return any(r.kind == "all" for r in rows), anns, fact_iris
+
+
+async def anchored_to(conn, candidates: list[str]) -> set[str]:
+    """Annotations whose stored suggestion has one of these approved candidates."""
+    if not candidates:
+        return set()
+    rows = (await conn.execute(text(
+        "SELECT annotation_id FROM graduation_suggestions "
+        "WHERE candidates && CAST(:c AS text[])"), {"c": candidates})).all()
+    return {r[0] for r in rows}
+
+
+async def save(conn, items: list[dict], scope: set[str] | None) -> None:
+    """Replace the stored suggestions for `scope` (None = all of them) with
+    `items` — scope members without an item have no suggestion any more."""
+    if scope is None:
+        await conn.execute(text("DELETE FROM graduation_suggestions"))
+    elif scope:
+        await conn.execute(text(
+            "DELETE FROM graduation_suggestions WHERE annotation_id = ANY(:ids)"),
+            {"ids": sorted(scope)})
+    if not items:
+        return
+    await conn.execute(text(
+        "INSERT INTO graduation_suggestions "
+        "(annotation_id, photo_id, pending, decided_at, candidates, item) "
+        "VALUES (:id, :photo_id, :pending, :decided_at, CAST(:cands AS text[]), "
+        "CAST(:item AS jsonb))"),
+        [{"id": i["annotation_id"], "photo_id": i["photo_id"],
+          "pending": bool(i["changes"]), "decided_at": i["decided_at"],
+          "cands": i["candidates"],
+          "item": json.dumps({k: v for k, v in i.items()
+                              if k not in ("sizes", "candidates")})}
+         for i in items])
+
+
+async def load() -> tuple[list[dict], list[dict]]:
+    """→ (pending, landed), newest curation first, with current photo sizes."""
+    async with wb_engine.connect() as conn:
+        rows = (await conn.execute(text(
+            "SELECT s.pending, s.item, p.sizes FROM graduation_suggestions s "
+            "JOIN photo_mirror p ON p.id = s.photo_id "
+            # C collation: the same order the in-Python sort gave
+            "ORDER BY coalesce(s.decided_at, '') COLLATE \"C\" DESC, "
+            "s.annotation_id COLLATE \"C\" DESC"))).all()
+    pending, landed = [], []
+    for r in rows:
+        (pending if r.pending else landed).append({**r.item, "sizes": r.sizes})
+    return pending, landed
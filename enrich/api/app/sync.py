@@ -8,6 +8,18 @@ Rationale: the source has no updated-at column — analysis, geocode, deleted,
 is_current, compass_angle all mutate silently — so a full scan is the only thing
 that can see a mutation at all. See docs/enrichment-workbench.md.
 
+The scan is still full-fidelity, but it is bucketed: rows are grouped by the
+first BUCKET_CHARS hex chars of md5(id) and each side aggregates its row hashes
+per bucket server-side (a one-level hash tree). Only those few hundred digests
+cross the wire; id -> hash pairs are pulled just for the buckets whose digests
+differ, so transfer and memory follow the size of the change, not of the table.
+
+Changed rows are then copied in a pipeline: a producer streams them off a
+server-side cursor on the source in BATCH-row partitions into a bounded queue,
+and a consumer COPYs each partition into a temp staging table on the mirror,
+merging the lot with one INSERT … ON CONFLICT at the end. Source reads and
+mirror writes overlap, and each side uses one connection per pass.
+
 REMOVED 2026-08-06 — the `append` tier, which INSERTed rows newer than a
 watermark (COALESCE(record_created_ts, uploaded_at) / created_at). It was a
 latency optimization for a live-DB source that never materialized, and against a
@@ -32,10 +44,18 @@ import sys
 
 from sqlalchemy import text
 
+from . import neighbours, suggestions
 from .db import hv_engine, wb_engine
 from .runs import create_run, fail_run, finish_run
 
 BATCH = 1000
+# source partitions buffered between the producer and the COPY consumer
+QUEUE_DEPTH = 4
+
+# 2 hex chars = 256 buckets, ~120 photos each at the current ~30k.
+BUCKET_CHARS = 2
+# differing buckets whose id -> hash maps are diffed together
+BUCKET_GROUP = 32
 
 # ---------------------------------------------------------------------------
 # column plumbing
@@ -76,21 +96,44 @@ def _select_sql(table: str, plain: list[str], json_cols: list[str],
     return f"SELECT {', '.join(cols)} FROM {table} t"
 
 
-def _upsert_sql(mirror: str, plain: list[str], json_cols: list[str],
-                has_geom: bool) -> str:
-    """INSERT … ON CONFLICT DO UPDATE. Always an upsert: a row already in the
-    mirror is exactly the case that needs writing (its source changed), which is
-    what the removed append tier got backwards."""
+STAGE = "_sync_stage"
+
+
+def _stage_cols(plain: list[str], json_cols: list[str], has_geom: bool) -> list[str]:
+    """Staging-table columns, in the order _select_sql produces them."""
+    return list(plain) + list(json_cols) + (["geom_hex"] if has_geom else []) + ["row_hash"]
+
+
+def _stage_sql(mirror: str, plain: list[str], json_cols: list[str],
+               has_geom: bool) -> str:
+    """Temp staging table: plain columns typed like the mirror's, JSON and
+    geometry kept as text (COPY goes binary, and asyncpg has no geometry codec);
+    the merge casts them."""
+    cols = list(plain)
+    cols += [f"NULL::text AS {c}" for c in json_cols]
+    if has_geom:
+        cols.append("NULL::text AS geom_hex")
+    cols.append("NULL::text AS row_hash")
+    return (f"CREATE TEMP TABLE {STAGE} ON COMMIT DROP AS "
+            f"SELECT {', '.join(cols)} FROM {mirror} WITH NO DATA")
+
+
+def _merge_sql(mirror: str, plain: list[str], json_cols: list[str],
+               has_geom: bool) -> str:
+    """INSERT … SELECT FROM staging ON CONFLICT DO UPDATE. Always an upsert: a
+    row already in the mirror is exactly the case that needs writing (its source
+    changed), which is what the removed append tier got backwards."""
     cols = list(plain) + list(json_cols) + (["geometry"] if has_geom else [])
     cols += ["row_hash", "synced_at", "missing_since"]
-    vals = [f":{c}" for c in plain]
-    vals += [f"CAST(:{c} AS jsonb)" for c in json_cols]
+    vals = list(plain)
+    vals += [f"CAST({c} AS jsonb)" for c in json_cols]
     if has_geom:
-        vals.append("CAST(:geom_hex AS geometry)")
-    vals += [":row_hash", "now()", "NULL"]
+        vals.append("CAST(geom_hex AS geometry)")
+    vals += ["row_hash", "now()", "NULL"]
     sets = [f"{c} = EXCLUDED.{c}" for c in cols if c != "synced_at"]
     sets.append("synced_at = now()")
-    return (f"INSERT INTO {mirror} ({', '.join(cols)}) VALUES ({', '.join(vals)}) "
+    return (f"INSERT INTO {mirror} ({', '.join(cols)}) "
+            f"SELECT {', '.join(vals)} FROM {STAGE} "
             f"ON CONFLICT (id) DO UPDATE SET " + ", ".join(sets))
 
 
@@ -109,55 +152,121 @@ SPECS = {
 }
 
 
-def _params(row, spec) -> dict:
-    d = {c: row._mapping[c] for c in spec["plain"] + spec["json_cols"]}
-    if spec["has_geom"]:
-        d["geom_hex"] = row._mapping["geom_hex"]
-    d["row_hash"] = row._mapping["row_hash"]
-    return d
+def _record(row, cols: list[str]) -> tuple:
+    return tuple(row._mapping[c] for c in cols)
 
 
 # ---------------------------------------------------------------------------
-# the sync pass (non-destructive repair)
+# bucket digests (one-level hash tree)
 # ---------------------------------------------------------------------------
 
-async def sync_reconcile() -> dict:
-    stats = {}
-    for mirror, spec in SPECS.items():
-        # 1. id -> hash maps on both sides
+def _bucket(col: str) -> str:
+    return f"substr(md5({col}::text), 1, {BUCKET_CHARS})"
+
+
+def _mirror_live(native: bool) -> str:
+    """Mirror rows expected to have a source twin: not stamped missing, and
+    (for annotations) not workbench-native. Those are exactly the rows the
+    source digest covers, so equal digests mean nothing to do in that bucket:
+    a vanished row, a reappeared row and a changed hash all break equality."""
+    return "missing_since IS NULL" + (" AND origin = 'hillview'" if native else "")
+
+
+async def _source_buckets(spec) -> dict[str, tuple[str, int]]:
+    # COLLATE "C": both databases must order ids identically, whatever their
+    # default collations are
+    async with hv_engine.connect() as hv:
+        rows = (await hv.execute(text(
+            f"SELECT b, md5(string_agg(h, '' ORDER BY id COLLATE \"C\")), count(*) "
+            f"FROM (SELECT t.id::text AS id, {_bucket('t.id')} AS b, "
+            f"      md5(to_jsonb(t)::text) AS h FROM {spec['source']} t) s "
+            f"GROUP BY b"))).all()
+    return {b: (digest, n) for b, digest, n in rows}
+
+
+async def _mirror_buckets(mirror: str, native: bool) -> dict[str, str]:
+    async with wb_engine.connect() as wb:
+        rows = (await wb.execute(text(
+            f"SELECT {_bucket('id')} AS b, "
+            f"md5(string_agg(row_hash, '' ORDER BY id COLLATE \"C\")) "
+            f"FROM {mirror} WHERE {_mirror_live(native)} GROUP BY b"))).all()
+    return dict(rows)
+
+
+def _dirty_buckets(src_b: dict[str, tuple[str, int]], mir_b: dict[str, str]) -> list[str]:
+    """Buckets whose digests differ, including ones present on one side only."""
+    return sorted(b for b in src_b.keys() | mir_b.keys()
+                  if src_b.get(b, (None,))[0] != mir_b.get(b))
+
+
+async def _upsert_changed(mirror: str, spec, changed: list[str]) -> None:
+    """Copy changed/new rows from the source (missing_since cleared by the
+    upsert itself). Producer and consumer run concurrently; the queue bounds
+    how far the source read can run ahead of the mirror write."""
+    if not changed:
+        return
+    cols_args = (spec["plain"], spec["json_cols"], spec["has_geom"])
+    sel = _select_sql(spec["source"], *cols_args)
+    cols = _stage_cols(*cols_args)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_DEPTH)
+
+    async def produce():
         async with hv_engine.connect() as hv:
-            src = dict((await hv.execute(text(
-                f"SELECT id, md5(to_jsonb(t)::text) FROM {spec['source']} t"))).all())
-        # annotation_mirror can hold workbench-native rows (origin<>'hillview')
-        # that have no source row — they must never be stamped missing
-        native = mirror == "annotation_mirror"
-        oc = ", origin" if native else ""
-        async with wb_engine.connect() as wb:
-            mir = {r[0]: (r[1], r[2], (r[3] if native else "hillview"))
-                   for r in (await wb.execute(text(
-                       f"SELECT id, row_hash, missing_since{oc} FROM {mirror}"))).all()}
-
-        changed = [i for i, h in src.items() if i not in mir or mir[i][0] != h]
-        missing = [i for i in mir
-                   if i not in src and mir[i][1] is None and mir[i][2] == "hillview"]
-        reappeared = [i for i, h in src.items()
-                      if i in mir and mir[i][1] is not None and mir[i][0] == h]
-
-        # 2. upsert changed/new rows (missing_since cleared by the upsert itself)
-        sel = _select_sql(spec["source"], spec["plain"], spec["json_cols"],
-                          spec["has_geom"])
-        ups = _upsert_sql(mirror, spec["plain"], spec["json_cols"],
-                          spec["has_geom"])
-        for i in range(0, len(changed), BATCH):
-            ids = changed[i:i + BATCH]
-            async with hv_engine.connect() as hv:
-                rows = (await hv.execute(text(f"{sel} WHERE t.id = ANY(:ids)"),
-                                         {"ids": ids})).all()
-            if rows:
-                async with wb_engine.begin() as wb:
-                    await wb.execute(text(ups), [_params(r, spec) for r in rows])
-
-        # 3. stamp vanished rows (never delete); clear reappeared-identical rows
+            # stream() = server-side cursor: the source never materializes the
+            # whole change set, and neither do we
+            result = await hv.stream(text(f"{sel} WHERE t.id = ANY(:ids)"),
+                                     {"ids": changed})
+            async for part in result.partitions(BATCH):
+                await queue.put([_record(r, cols) for r in part])
+        await queue.put(None)
+
+    async def consume():
+        async with wb_engine.begin() as wb:
+            await wb.execute(text(_stage_sql(mirror, *cols_args)))
+            raw = (await wb.get_raw_connection()).driver_connection
+            staged = 0
+            while (records := await queue.get()) is not None:
+                await raw.copy_records_to_table(STAGE, records=records, columns=cols)
+                staged += len(records)
+            if staged:
+                await wb.execute(text(_merge_sql(mirror, *cols_args)))
+
+    # TaskGroup: if either side fails the other is cancelled instead of
+    # blocking forever on the queue
+    async with asyncio.TaskGroup() as tg:
+        tg.create_task(produce())
+        tg.create_task(consume())
+
+
+async def _reconcile_buckets(mirror: str, spec, buckets: list[str]) -> tuple[dict, list]:
+    """The row-level diff, restricted to `buckets`. → (counts, ids it touched)."""
+    # annotation_mirror can hold workbench-native rows (origin<>'hillview')
+    # that have no source row — they must never be stamped missing
+    native = mirror == "annotation_mirror"
+    oc = ", origin" if native else ""
+
+    # 1. id -> hash maps on both sides, for these buckets only
+    async with hv_engine.connect() as hv:
+        src = dict((await hv.execute(text(
+            f"SELECT id, md5(to_jsonb(t)::text) FROM {spec['source']} t "
+            f"WHERE {_bucket('t.id')} = ANY(:b)"), {"b": buckets})).all())
+    async with wb_engine.connect() as wb:
+        mir = {r[0]: (r[1], r[2], (r[3] if native else "hillview"))
+               for r in (await wb.execute(text(
+                   f"SELECT id, row_hash, missing_since{oc} FROM {mirror} "
+                   f"WHERE {_bucket('id')} = ANY(:b)"), {"b": buckets})).all()}
+
+    changed = [i for i, h in src.items() if i not in mir or mir[i][0] != h]
+    missing = [i for i in mir
+               if i not in src and mir[i][1] is None and mir[i][2] == "hillview"]
+    reappeared = [i for i, h in src.items()
+                  if i in mir and mir[i][1] is not None and mir[i][0] == h]
+
+    # 2. upsert changed/new rows
+    await _upsert_changed(mirror, spec, changed)
+
+    # 3. stamp vanished rows (never delete); clear reappeared-identical rows
+    if missing or reappeared:
         async with wb_engine.begin() as wb:
             if missing:
                 await wb.execute(text(
@@ -168,6 +277,47 @@ async def sync_reconcile() -> dict:
                 await wb.execute(text(
                     f"UPDATE {mirror} SET missing_since = NULL WHERE id = ANY(:ids)"),
                     {"ids": reappeared})
+    return ({"changed": len(changed), "missing_stamped": len(missing),
+             "reappeared": len(reappeared)}, changed + missing + reappeared)
+
+
+# ---------------------------------------------------------------------------
+# the sync pass (non-destructive repair)
+# ---------------------------------------------------------------------------
+
+async def sync_reconcile() -> dict:
+    stats = {}
+    for mirror, spec in SPECS.items():
+        native = mirror == "annotation_mirror"
+
+        # 1. compare per-bucket digests; only differing buckets are descended
+        src_b = await _source_buckets(spec)
+        mir_b = await _mirror_buckets(mirror, native)
+        dirty = _dirty_buckets(src_b, mir_b)
+
+        # 2. row-level diff + upsert + stamping, a group of buckets at a time
+        st = {"source_rows": sum(n for _, n in src_b.values()),
+              "changed": 0, "missing_stamped": 0, "reappeared": 0,
+              "buckets": len(src_b.keys() | mir_b.keys()),
+              "buckets_changed": len(dirty)}
+        touched = []
+        for i in range(0, len(dirty), BUCKET_GROUP):
+            part, ids = await _reconcile_buckets(mirror, spec, dirty[i:i + BUCKET_GROUP])
+            for k, v in part.items():
+                st[k] += v
+            touched += ids
+
+        # matching's precomputed neighbourhoods follow the photos that moved,
+        # appeared or vanished — only those, never a full rebuild
+        if mirror == "photo_mirror":
+            st["neighbours"] = await neighbours.refresh(touched)
+        # likewise graduation suggestions, for annotations whose body, target or
+        # liveness changed
+        else:
+            await suggestions.mark_annotations(touched)
+
+        # 3. workbench-native bookkeeping + sync_state
+        async with wb_engine.begin() as wb:
             # retire a workbench-native annotation once its graduated hillview copy
             # has landed (a mirrored row now references it) — no duplicate, and the
             # export stops re-emitting it
@@ -185,11 +335,8 @@ async def sync_reconcile() -> dict:
                 "VALUES (:t, now(), CAST(:s AS jsonb)) "
                 "ON CONFLICT (table_name) DO UPDATE SET "
                 "last_reconcile_at = now(), stats = EXCLUDED.stats"),
-                {"t": mirror, "s": __import__("json").dumps(
-                    {"source_rows": len(src), "changed": len(changed),
-                     "missing_stamped": len(missing), "reappeared": len(reappeared)})})
-        stats[mirror] = {"source_rows": len(src), "changed": len(changed),
-                         "missing_stamped": len(missing), "reappeared": len(reappeared)}
+                {"t": mirror, "s": __import__("json").dumps(st)})
+        stats[mirror] = st
     return stats
 
 
@@ -0,0 +1,99 @@
+"""geocode pacing: each provider holds its own rate while the other runs alongside,
+cache hits never wait for a token, and resolve_many sends one request per distinct
+lookup. Runs against an httpx MockTransport fake provider that records when each
+request arrived, and an in-memory stand-in for the geocode_cache table."""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app import geocode
+
+RATE = {"nominatim": 20.0, "wikipedia": 10.0}
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    seen = {"nominatim": [], "wikipedia": []}
+    queries = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host.endswith("wikipedia.org"):
+            seen["wikipedia"].append(time.monotonic())
+            title = request.url.params["titles"]
+            return httpx.Response(200, json={"query": {"pages": {"1": {
+                "coordinates": [{"lat": 50.0, "lon": 14.0 + len(title) / 100}]}}}})
+        seen["nominatim"].append(time.monotonic())
+        queries.append(request.url.params["q"])
+        return httpx.Response(200, json=[{
+            "lat": "50.1", "lon": "14.4", "osm_type": "node", "osm_id": len(queries),
+            "display_name": request.url.params["q"], "category": "place", "type": "peak"}])
+
+    cache: dict = {}
+
+    async def _cached(kind, query):
+        return ((kind, query) in cache, cache.get((kind, query)))
+
+    async def _store(kind, query, result):
+        cache[(kind, query)] = result
+
+    monkeypatch.setattr(geocode, "_client",
+                        httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(geocode, "_cached", _cached)
+    monkeypatch.setattr(geocode, "_store", _store)
+    monkeypatch.setattr(geocode, "buckets",
+                        {k: geocode.TokenBucket(r) for k, r in RATE.items()})
+    return seen, queries, cache
+
+
+def _assert_paced(stamps, rate):
+    gaps = [b - a for a, b in zip(stamps, stamps[1:])]
+    assert gaps and min(gaps) >= 1 / rate * 0.9, gaps
+
+
+async def test_providers_paced_independently(fake):
+    seen, _, _ = fake
+    t0 = time.monotonic()
+    await geocode.resolve_many(
+        [("nominatim", (f"Peak {i}",)) for i in range(8)]
+        + [("wikipedia", ("cs", f"Hora {i}")) for i in range(4)])
+    took = time.monotonic() - t0
+    _assert_paced(seen["nominatim"], RATE["nominatim"])
+    _assert_paced(seen["wikipedia"], RATE["wikipedia"])
+    # side by side, not one queue: 7 Nominatim gaps (0.35 s) + 3 wiki gaps (0.3 s)
+    assert took < 0.55
+
+
+async def test_cache_hits_skip_the_bucket(fake):
+    seen, _, cache = fake
+    cache[("nominatim", "Ještěd")] = [{"lat": 50.73, "lon": 15.0}]
+    backlog = asyncio.gather(*(geocode.nominatim_search(f"Q{i}") for i in range(6)))
+    await asyncio.sleep(0)
+    t0 = time.monotonic()
+    assert await geocode.nominatim_search("Ještěd") == [{"lat": 50.73, "lon": 15.0}]
+    assert time.monotonic() - t0 < 0.02       # while six remote calls are queued
+    await backlog
+    assert len(seen["nominatim"]) == 6
+
+
+async def test_resolve_many_dedupes_within_a_run(fake):
+    seen, queries, _ = fake
+    jobs = [("nominatim", ("Sněžka",))] * 5 + [("nominatim", ("Ještěd",))] * 3 \
+        + [("wikipedia", ("cs", "Sněžka"))] * 2
+    done = []
+
+    async def progress(n, total):
+        done.append((n, total))
+
+    out = await geocode.resolve_many(jobs, progress=progress)
+    assert sorted(queries) == ["Ještěd", "Sněžka"] and len(seen["wikipedia"]) == 1
+    assert set(out) == set(jobs) and out[("wikipedia", ("cs", "Sněžka"))]["lat"] == 50.0
+    assert done[-1] == (3, 3)
+
+
+async def test_concurrent_callers_share_one_request(fake):
+    seen, _, _ = fake
+    a, b = await asyncio.gather(geocode.nominatim_search("Bezděz"),
+                                geocode.nominatim_search("Bezděz"))
+    assert a == b and len(seen["nominatim"]) == 1
@@ -0,0 +1,67 @@
+"""Incremental graduation: marked fact graphs resolve to the annotations whose
+suggestion they can change, and the approved-fact context can be pulled for just
+those. Runs against an httpx MockTransport standing in for Oxigraph."""
+import json
+
+import httpx
+import pytest
+
+from app import graph
+from app.routers import graduation
+
+LABEL_FACT = graph.fact_iri("1" * 16)
+META_FACT = graph.fact_iri("2" * 16)
+OSM = "https://www.openstreetmap.org/node/42"
+
+
+def _binding(**kw):
+    return {k: {"type": "uri", "value": v} for k, v in kw.items()}
+
+
+@pytest.fixture
+def oxigraph(monkeypatch):
+    seen = []
+    subjects = {LABEL_FACT: graph.annotation_iri("a1"), META_FACT: OSM}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        q = request.content.decode()
+        seen.append(q)
+        if "SELECT DISTINCT ?s" in q:
+            rows = [_binding(s=s) for f, s in subjects.items() if f"<{f}>" in q]
+        else:
+            rows = [_binding(s=graph.annotation_iri("a1"), p=f"{graph.NS}labelText",
+                             f=LABEL_FACT) | {"v": {"type": "literal", "value": "Sněžka"}}]
+        return httpx.Response(200, content=json.dumps(
+            {"head": {"vars": []}, "results": {"bindings": rows}}))
+
+    monkeypatch.setattr(graph, "store", graph.GraphStore(
+        "http://oxigraph.test", httpx.AsyncClient(transport=httpx.MockTransport(handler))))
+    return seen
+
+
+async def test_marked_facts_resolve_to_annotations(oxigraph, monkeypatch):
+    asked = []
+
+    async def anchored_to(conn, candidates):
+        asked.extend(candidates)
+        return {"a7", "a9"}
+
+    monkeypatch.setattr(graduation.stored, "anchored_to", anchored_to)
+    got = await graduation._dirty_annotations(None, {LABEL_FACT, META_FACT})
+    # the label fact names its annotation; the metadata fact's candidate reaches
+    # every suggestion anchored to it
+    assert got == {"a1", "a7", "a9"} and asked == [OSM]
+
+
+async def test_approved_context_restricted_to_annotations(oxigraph):
+    by_ann, _, _ = await graduation._approved_context({"a1", "a2"})
+    assert by_ann["a1"]["label"] == "Sněžka"
+    assert (f"VALUES ?s {{ <{graph.annotation_iri('a1')}> "
+            f"<{graph.annotation_iri('a2')}> }}") in oxigraph[0]
+    await graduation._approved_context()
+    assert "VALUES ?s" not in oxigraph[1]
+
+
+def test_public_hides_internal_fields():
+    item = {"annotation_id": "a1", "fact_iris": [LABEL_FACT], "candidates": [OSM]}
+    assert graduation._public(item) == {"annotation_id": "a1"}
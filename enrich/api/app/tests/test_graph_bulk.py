@@ -0,0 +1,76 @@
+"""GraphStore.load_facts: a whole run's fact graphs + meta go up as a few TriG
+documents, and fact graphs already in the store are not re-sent. Runs against
+an httpx MockTransport standing in for Oxigraph."""
+import json
+
+import httpx
+
+from app import facts, graph
+from app.parser import parse_body
+
+
+def _payload(n: int) -> dict:
+    anns = [{"id": f"a{i}", "photo_id": "p1", "parsed": parse_body(f"Peak {i}")}
+            for i in range(n)]
+    return facts.build_run_payload(anns, "run-1")
+
+
+def _fake_oxigraph(present: set[str]):
+    calls = {"query": 0, "store": []}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/query":
+            calls["query"] += 1
+            body = request.content.decode()
+            hits = [{"g": {"type": "uri", "value": g}} for g in present
+                    if f"<{g}>" in body]
+            return httpx.Response(200, content=json.dumps(
+                {"head": {"vars": ["g"]}, "results": {"bindings": hits}}))
+        assert request.url.path == "/store"
+        assert "graph" not in request.url.params
+        assert request.headers["content-type"] == "application/trig"
+        calls["store"].append(request.content.decode())
+        return httpx.Response(204)
+
+    store = graph.GraphStore("http://oxigraph.test",
+                             httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return store, calls
+
+
+def test_trig_documents_chunk_and_meta_last():
+    p = _payload(5)
+    n = len(p["fact_graphs"])
+    docs = graph.trig_documents(p["fact_graphs"], p["meta_turtle"], chunk=4)
+    assert len(docs) == -(-n // 4)
+    assert all(d.startswith(graph.PREFIXES) for d in docs)
+    blocks = [line for d in docs for line in d.splitlines()
+              if line.startswith(f"<{graph.BASE}/id/fact/") and line.endswith("{")]
+    assert sorted(b[1:-3] for b in blocks) == sorted(p["fact_graphs"])
+    assert f"<{graph.GRAPH_META}> {{" in docs[-1]
+    assert not any(f"<{graph.GRAPH_META}> {{" in d for d in docs[:-1])
+    # PREFIX lines only at document top, never inside a graph block
+    for d in docs:
+        assert d.count("PREFIX hv:") == 1
+
+
+def test_trig_documents_meta_only():
+    docs = graph.trig_documents({}, "<urn:a> <urn:b> <urn:c> .\n")
+    assert len(docs) == 1 and f"<{graph.GRAPH_META}>" in docs[0]
+    assert graph.trig_documents({}, None) == []
+
+
+async def test_load_facts_skips_present_graphs():
+    p = _payload(300)
+    fact_iris = list(p["fact_graphs"])
+    store, calls = _fake_oxigraph(present={fact_iris[0], fact_iris[1]})
+
+    n = await store.load_facts(p["fact_graphs"], p["meta_turtle"])
+
+    assert n == len(fact_iris) - 2
+    assert len(calls["store"]) == 1          # 598 graphs, one request
+    assert calls["query"] == 2               # probed in PROBE_CHUNK-sized groups
+    uploaded = calls["store"][0]
+    assert f"<{fact_iris[0]}> {{" not in uploaded
+    assert f"<{fact_iris[2]}> {{" in uploaded
+    assert f"<{graph.GRAPH_META}> {{" in uploaded
+    await store.aclose()
@@ -0,0 +1,109 @@
+"""GraphStore.query(cached=True): a repeat of the same query is served from memory
+until a write through the store touches a graph it reads. Runs against an httpx
+MockTransport standing in for Oxigraph."""
+import asyncio
+import json
+
+import httpx
+
+from app import facts, graph
+
+META_Q = f"""{graph.PREFIXES}
+SELECT ?ann WHERE {{ GRAPH <{graph.GRAPH_META}> {{ ?f hv:about ?ann }} }}"""
+CURATION_Q = f"""SELECT ?f WHERE {{
+  GRAPH <{graph.GRAPH_CURATION}> {{ ?f ?p ?o }} }}"""
+ANY_Q = "SELECT ?f WHERE { GRAPH ?f { ?s ?p ?o } }"
+FACT = graph.fact_iri("0123456789abcdef")
+
+
+def _fake_oxigraph(delay: float = 0):
+    calls = {"query": 0, "update": 0, "store": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path.strip("/")
+        calls[path] += 1
+        if path != "query":
+            return httpx.Response(204)
+        await asyncio.sleep(delay)
+        return httpx.Response(200, content=json.dumps(
+            {"head": {"vars": ["n"]}, "results": {"bindings": [
+                {"n": {"type": "literal", "value": str(calls["query"])}}]}}))
+
+    store = graph.GraphStore("http://oxigraph.test",
+                             httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return store, calls
+
+
+def _n(res: dict) -> str:
+    return res["results"]["bindings"][0]["n"]["value"]
+
+
+def test_read_and_written_graphs():
+    assert graph.read_graphs(META_Q) == {graph.GRAPH_META}
+    assert graph.read_graphs(ANY_Q) is None
+    assert graph.read_graphs("SELECT * WHERE { ?s ?p ?o }") is None
+    assert graph.written_graphs(facts.curate_update(FACT, "approved", "2026-01-01T00:00:00Z")) \
+        == {graph.GRAPH_CURATION}
+    assert graph.written_graphs(f"DROP SILENT GRAPH <{FACT}>") == {FACT}
+    assert graph.written_graphs("DROP ALL") is None
+    assert graph.written_graphs("INSERT DATA { <urn:a> <urn:b> <urn:c> }") is None
+
+
+async def test_repeat_query_is_served_from_cache():
+    store, calls = _fake_oxigraph()
+    first = await store.query(META_Q, cached=True)
+    # same query modulo whitespace
+    again = await store.query("  " + META_Q.replace("\n", "\n   "), cached=True)
+    assert again is first and calls["query"] == 1
+    await store.query(META_Q)                      # uncached calls always go out
+    assert calls["query"] == 2
+    assert store.cache_stats == {"hits": 1, "misses": 1}
+
+
+async def test_writes_invalidate_only_the_graphs_they_touch():
+    store, calls = _fake_oxigraph()
+    meta = _n(await store.query(META_Q, cached=True))
+    cur = _n(await store.query(CURATION_Q, cached=True))
+    anyg = _n(await store.query(ANY_Q, cached=True))
+
+    await store.update(facts.curate_update(FACT, "approved", "2026-01-01T00:00:00Z"))
+    assert _n(await store.query(META_Q, cached=True)) == meta
+    assert _n(await store.query(CURATION_Q, cached=True)) != cur
+    assert _n(await store.query(ANY_Q, cached=True)) != anyg
+
+    meta_docs = graph.trig_documents({FACT: "<urn:a> <urn:b> <urn:c> ."},
+                                     "<urn:f> <urn:about> <urn:x> .")
+    await store.load_trig(meta_docs[0])
+    assert _n(await store.query(META_Q, cached=True)) != meta
+
+    cur = _n(await store.query(CURATION_Q, cached=True))
+    await store.load_turtle(FACT, "<urn:a> <urn:b> <urn:d> .")
+    assert _n(await store.query(CURATION_Q, cached=True)) == cur
+
+    # an update whose targets can't be read off it invalidates everything
+    await store.update("INSERT DATA { <urn:a> <urn:b> <urn:c> }")
+    assert _n(await store.query(CURATION_Q, cached=True)) != cur
+
+
+async def test_write_during_query_is_not_cached_as_current():
+    store, calls = _fake_oxigraph(delay=0.05)
+    pending = asyncio.ensure_future(store.query(CURATION_Q, cached=True))
+    await asyncio.sleep(0.01)
+    await store.update(facts.curate_update(FACT, "rejected", "2026-01-01T00:00:00Z"))
+    stale = await pending
+    assert await store.query(CURATION_Q, cached=True) is not stale
+    assert calls["query"] == 2
+
+
+async def test_concurrent_misses_share_one_request():
+    store, calls = _fake_oxigraph(delay=0.02)
+    a, b, c = await asyncio.gather(*(store.query(ANY_Q, cached=True) for _ in range(3)))
+    assert a is b is c and calls["query"] == 1
+
+
+async def test_cache_is_bounded():
+    store, calls = _fake_oxigraph()
+    store._cache_entries = 2
+    for q in ("SELECT 1 {}", "SELECT 2 {}", "SELECT 3 {}", "SELECT 1 {}"):
+        await store.query(q, cached=True)
+    assert calls["query"] == 4 and len(store._cache) == 2
@@ -0,0 +1,125 @@
+"""pointcloud.read_ply reads ASCII and binary PLY to the same arrays the old line-by-line
+parser produced, pack_lod's tiers are prefixes of one seeded random order, and the
+recon router's LOD cache replaces the old per-size cloud.bin copies."""
+import numpy as np
+import pytest
+
+from app import pointcloud
+
+
+def _cloud(n=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    xyz = rng.normal(size=(n, 3)).astype(np.float32) * 50
+    rgb = rng.integers(0, 256, size=(n, 3), dtype=np.uint8)
+    return xyz, rgb
+
+
+def _write_ascii(path, xyz, rgb, faces=0):
+    with open(path, "w") as f:
+        f.write("ply\nformat ascii 1.0\ncomment reconstruct.py\n"
+                f"element vertex {len(xyz)}\n"
+                "property float x\nproperty float y\nproperty float z\n"
+                "property uchar red\nproperty uchar green\nproperty uchar blue\n")
+        if faces:
+            f.write(f"element face {faces}\nproperty list uchar int vertex_indices\n")
+        f.write("end_header\n")
+        for p, c in zip(xyz, rgb):
+            f.write(" ".join(f"{float(v)!r}" for v in p) + f" {c[0]} {c[1]} {c[2]}\n")
+        for i in range(faces):
+            f.write(f"3 {i} {i + 1} {i + 2}\n")
+
+
+def _write_binary(path, xyz, rgb, endian="<"):
+    rec = np.empty(len(xyz), [("x", endian + "f4"), ("y", endian + "f4"),
+                              ("z", endian + "f4"), ("nx", endian + "f4"),
+                              ("red", "u1"), ("green", "u1"), ("blue", "u1")])
+    rec["x"], rec["y"], rec["z"] = xyz.T
+    rec["nx"] = 0
+    rec["red"], rec["green"], rec["blue"] = rgb.T
+    fmt = "binary_little_endian" if endian == "<" else "binary_big_endian"
+    with open(path, "wb") as f:
+        f.write((f"ply\nformat {fmt} 1.0\nelement vertex {len(xyz)}\n"
+                 "property float x\nproperty float y\nproperty float z\n"
+                 "property float nx\nproperty uchar red\nproperty uchar green\n"
+                 "property uchar blue\nend_header\n").encode())
+        f.write(rec.tobytes())
+
+
+def _legacy_parse(path):
+    """The per-line parser this replaced, as the oracle."""
+    pts, header = [], True
+    with open(path) as f:
+        for line in f:
+            if header:
+                header = not line.startswith("end_header")
+                continue
+            p = line.split()
+            if len(p) >= 6:
+                pts.append(p)
+    xyz = np.array([[float(v) for v in p[:3]] for p in pts], np.float32)
+    rgb = np.array([[int(float(v)) for v in p[3:6]] for p in pts], np.uint8)
+    return xyz, rgb
+
+
+def test_ascii_matches_legacy_parser(tmp_path):
+    xyz, rgb = _cloud()
+    path = str(tmp_path / "points.ply")
+    _write_ascii(path, xyz, rgb)
+    got_xyz, got_rgb = pointcloud.read_ply(path)
+    want_xyz, want_rgb = _legacy_parse(path)
+    assert got_xyz.tobytes() == want_xyz.tobytes()
+    assert np.array_equal(got_rgb, want_rgb)
+
+
+@pytest.mark.parametrize("endian", ["<", ">"])
+def test_binary_reads_same_points(tmp_path, endian):
+    xyz, rgb = _cloud()
+    path = str(tmp_path / "points.ply")
+    _write_binary(path, xyz, rgb, endian)
+    got_xyz, got_rgb = pointcloud.read_ply(path)
+    assert np.array_equal(got_xyz, xyz) and np.array_equal(got_rgb, rgb)
+
+
+def test_ascii_stops_at_vertex_block(tmp_path):
+    xyz, rgb = _cloud(50)
+    path = str(tmp_path / "mesh.ply")
+    _write_ascii(path, xyz, rgb, faces=10)
+    got_xyz, _ = pointcloud.read_ply(path)
+    assert np.array_equal(got_xyz, xyz)
+
+
+def test_truncated_ascii_raises(tmp_path):
+    xyz, rgb = _cloud(20)
+    path = tmp_path / "points.ply"
+    _write_ascii(str(path), xyz, rgb)
+    path.write_bytes(path.read_bytes()[:-40])
+    with pytest.raises(ValueError):
+        pointcloud.read_ply(str(path))
+
+
+def test_lod_tiers_are_prefixes_of_one_order():
+    n = pointcloud.LOD_BASE * 5 + 7
+    xyz = np.arange(n * 3, dtype=np.float32).reshape(n, 3)
+    rgb = np.zeros((n, 3), np.uint8)
+    data, tiers = pointcloud.pack_lod(xyz, rgb)
+    assert tiers == [pointcloud.LOD_BASE, pointcloud.LOD_BASE * 4, n]
+    assert len(data) == n * pointcloud.STRIDE
+    packed = np.frombuffer(data, pointcloud.POINT_DTYPE)
+    # a permutation of every point, reproducible, and tier 0 spans the whole cloud
+    ids = (packed["xyz"][:, 0] // 3).astype(np.int64)
+    assert np.array_equal(np.sort(ids), np.arange(n))
+    assert pointcloud.pack_lod(xyz, rgb)[0] == data
+    assert ids[:tiers[0]].max() > n * 0.99 and ids[:tiers[0]].min() < n * 0.01
+    assert pointcloud.lod_tiers(10) == [10] and pointcloud.lod_tiers(0) == []
+
+
+def test_lod_cache_drops_legacy_size_bins(tmp_path):
+    from app.routers import recon
+    src = tmp_path / "points.ply"
+    _write_ascii(src, *_cloud(50))
+    for name in ("points.ply.200000.bin", "points.ply.5000.bin", "other.ply.200000.bin"):
+        (tmp_path / name).write_bytes(b"old")
+    m = recon._lod_cache(str(src))
+    assert m["n"] == 50
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "other.ply.200000.bin", "points.ply", "points.ply.lod.bin", "points.ply.lod.json"]
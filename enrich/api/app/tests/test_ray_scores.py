@@ -0,0 +1,47 @@
+"""matching.ray_scores is the per-pair in_pie loop ray mode used to run, as one array
+pass: same nearest-sample distances, same pie-hit ranges."""
+import random
+
+from app import matching
+from app.calibrate import haversine_km
+
+PANO = (50.08, 14.42)
+
+
+def _loop(photos, samples, slack, half, default_far):
+    """The replaced per-candidate loop, as the oracle."""
+    dists, ranges = [], []
+    for p in photos:
+        dists.append(min(haversine_km(p["lon"], p["lat"], slon, slat) * 1000
+                         for _, slat, slon in samples))
+        hits = [m for m, slat, slon in samples
+                if matching.in_pie(p, slat, slon, slack=slack, half=half,
+                                   default_far=default_far)]
+        ranges.append([round(min(hits)), round(max(hits))] if hits else None)
+    return dists, ranges
+
+
+def test_ray_scores_match_in_pie_loop():
+    rng = random.Random(7)
+    photos = [{"lat": PANO[0] + rng.uniform(-0.1, 0.1),
+               "lon": PANO[1] + rng.uniform(-0.15, 0.15),
+               "bearing": rng.uniform(0, 360),
+               "far_m": rng.choice([None, 800.0, 3000.0, 9000.0])} for _ in range(300)]
+    samples = []
+    for m in range(200, 15001, 460):
+        samples.append((float(m), *matching.dest_point(*PANO, 71.0, m)))
+    kw = dict(slack=2.0, half=60, default_far=2000)
+    dists, ranges = matching.ray_scores(photos, samples, **kw)
+    want_d, want_r = _loop(photos, samples, **kw)
+    assert max(abs(a - b) for a, b in zip(dists, want_d)) < 1e-6
+    assert ranges == want_r
+    assert any(ranges) and not all(ranges)
+
+
+def test_ray_scores_without_overlap_or_candidates():
+    samples = [(200.0, *matching.dest_point(*PANO, 10.0, 200))]
+    d, r = matching.ray_scores([{"lat": PANO[0], "lon": PANO[1], "bearing": 0,
+                                 "far_m": None}], samples, slack=2, half=60,
+                               default_far=2000, overlap=False)
+    assert round(d[0]) == 200 and r == [None]
+    assert matching.ray_scores([], samples, slack=2, half=60, default_far=2000) == ([], [])
@@ -0,0 +1,214 @@
+"""Mirror sync. The generated staging/merge SQL, and a failing source read
+cancelling the COPY consumer, are checked against fake engines. Against a real
+Postgres: the bucket digests (md5 hash tree, COLLATE "C" ordering, the source
+id's ::text cast) agree between source and mirror for equal rows, one edited,
+added or deleted row dirties exactly one bucket, which _reconcile_buckets then
+repairs, and a failed copy leaves the mirror untouched.
+
+The Postgres tests need a scratch database: set ENRICH_TEST_DB_URL (a
+postgresql+asyncpg:// URL). Each test works in its own schema and drops it
+afterwards; both the source and the mirror engine point at it."""
+import asyncio
+import os
+import uuid
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import sync
+
+PHOTO_ARGS = (sync.PHOTO_PLAIN, sync.PHOTO_JSON, True)
+
+
+def test_stage_sql_types_plain_like_mirror_and_json_as_text():
+    sql = sync._stage_sql("photo_mirror", *PHOTO_ARGS)
+    assert sql.startswith(f"CREATE TEMP TABLE {sync.STAGE} ON COMMIT DROP AS SELECT id, ")
+    assert sql.endswith(" FROM photo_mirror WITH NO DATA")
+    for c in sync.PHOTO_JSON:
+        assert f"NULL::text AS {c}" in sql
+    assert "NULL::text AS geom_hex, NULL::text AS row_hash" in sql
+    # COPY relies on the staging columns lining up with the source select
+    select_cols = sync._select_sql("photo_annotations", sync.ANN_PLAIN, sync.ANN_JSON, False)
+    names = [c.split(" AS ")[-1] for c in select_cols[len("SELECT "):].split(" FROM ")[0].split(", ")]
+    assert names == sync._stage_cols(sync.ANN_PLAIN, sync.ANN_JSON, False)
+    assert sync._select_sql("photos", *PHOTO_ARGS).split(" FROM ")[0].endswith(
+        "AS geom_hex, md5(to_jsonb(t)::text) AS row_hash")
+    assert sync._stage_cols(*PHOTO_ARGS)[-2:] == ["geom_hex", "row_hash"]
+
+
+def test_merge_sql_casts_and_upserts():
+    sql = sync._merge_sql("annotation_mirror", sync.ANN_PLAIN, sync.ANN_JSON, False)
+    assert sql.startswith("INSERT INTO annotation_mirror (id, photo_id, ")
+    assert f"CAST(target AS jsonb), row_hash, now(), NULL FROM {sync.STAGE} " in sql
+    assert "geometry" not in sql
+    sets = sql.split(" ON CONFLICT (id) DO UPDATE SET ")[1].split(", ")
+    assert "target = EXCLUDED.target" in sets
+    assert "missing_since = EXCLUDED.missing_since" in sets
+    assert sets[-1] == "synced_at = now()"
+    assert "id = EXCLUDED.id" in sets
+
+    geo = sync._merge_sql("photo_mirror", *PHOTO_ARGS)
+    assert "CAST(geom_hex AS geometry)" in geo and "geometry = EXCLUDED.geometry" in geo
+
+
+class _Ctx:
+    def __init__(self, conn, exits=None):
+        self.conn, self.exits = conn, exits
+
+    async def __aenter__(self):
+        return self.conn
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self.exits is not None:
+            self.exits.append(exc_type)
+
+
+class _FakeSource:
+    """Streams one partition, then the source connection drops."""
+
+    def connect(self):
+        return _Ctx(self)
+
+    async def stream(self, stmt, params):
+        return self
+
+    async def partitions(self, n):
+        yield [dict(id="p1")]
+        await asyncio.sleep(0.01)
+        raise ConnectionError("source went away")
+
+
+class _FakeMirror:
+    def __init__(self):
+        self.sql, self.copied, self.exits = [], [], []
+        self.driver_connection = self
+
+    def begin(self):
+        return _Ctx(self, self.exits)
+
+    async def execute(self, stmt, params=None):
+        self.sql.append(str(stmt))
+
+    async def get_raw_connection(self):
+        return self
+
+    async def copy_records_to_table(self, table, records, columns):
+        self.copied.append(records)
+
+
+async def test_source_failure_cancels_copy_and_rolls_back(monkeypatch):
+    mirror = _FakeMirror()
+    monkeypatch.setattr(sync, "hv_engine", _FakeSource())
+    monkeypatch.setattr(sync, "wb_engine", mirror)
+    monkeypatch.setattr(sync, "_record", lambda row, cols: (row["id"],))
+
+    with pytest.raises(ExceptionGroup) as err:
+        await asyncio.wait_for(
+            sync._upsert_changed("photo_mirror", sync.SPECS["photo_mirror"], ["p1", "p2"]), 5)
+    assert err.group_contains(ConnectionError)
+    # the consumer had staged the first partition, was cancelled waiting for
+    # the next, and left its transaction by exception (engine.begin() rolls
+    # back); the merge never ran
+    assert mirror.copied == [[("p1",)]]
+    assert mirror.exits == [asyncio.CancelledError]
+    assert len(mirror.sql) == 1 and "ON COMMIT DROP" in mirror.sql[0]
+
+
+DB_URL = os.getenv("ENRICH_TEST_DB_URL")
+needs_db = pytest.mark.skipif(not DB_URL, reason="ENRICH_TEST_DB_URL not set")
+
+SPEC = dict(source="src_photos", plain=["id", "title", "rank"], json_cols=["meta"],
+            has_geom=False)
+MIRROR = "photo_mirror_t"
+
+# mixed case, non-ASCII and punctuation: ordering that only agrees under "C"
+IDS = [f"{p}{i}" for i in range(40) for p in ("a", "B", "č", "_")]
+
+
+@pytest.fixture
+async def db(monkeypatch):
+    schema = f"sync_test_{uuid.uuid4().hex[:8]}"
+    admin = create_async_engine(DB_URL)
+    async with admin.begin() as conn:
+        await conn.execute(text(f"CREATE SCHEMA {schema}"))
+    engine = create_async_engine(
+        DB_URL, connect_args={"server_settings": {"search_path": schema}})
+    async with engine.begin() as conn:
+        # the source's id is varchar, the mirror's text: digests must not care
+        await conn.execute(text(
+            "CREATE TABLE src_photos (id varchar(64) PRIMARY KEY, title text, "
+            "rank int, meta jsonb)"))
+        await conn.execute(text(
+            f"CREATE TABLE {MIRROR} (id text PRIMARY KEY, title text, rank int, "
+            "meta jsonb, row_hash text, synced_at timestamptz, missing_since timestamptz)"))
+        await conn.execute(text(
+            "INSERT INTO src_photos SELECT id, 'photo ' || id, length(id), "
+            "jsonb_build_object('id', id, 'tags', jsonb_build_array(1, 2)) "
+            "FROM unnest(CAST(:ids AS text[])) id"), {"ids": IDS})
+    monkeypatch.setattr(sync, "hv_engine", engine)
+    monkeypatch.setattr(sync, "wb_engine", engine)
+    try:
+        yield engine
+    finally:
+        await engine.dispose()
+        async with admin.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        await admin.dispose()
+
+
+async def _dirty():
+    return sync._dirty_buckets(await sync._source_buckets(SPEC),
+                               await sync._mirror_buckets(MIRROR, False))
+
+
+async def _mirrored(db):
+    await sync._upsert_changed(MIRROR, SPEC, IDS)
+    assert await _dirty() == []
+
+
+@needs_db
+async def test_equal_rows_hash_identically(db):
+    await _mirrored(db)
+    src_b = await sync._source_buckets(SPEC)
+    assert sum(n for _, n in src_b.values()) == len(IDS)
+    assert {b: d for b, (d, _) in src_b.items()} == await sync._mirror_buckets(MIRROR, False)
+
+
+@needs_db
+@pytest.mark.parametrize("change, sql", [
+    ("edited", "UPDATE src_photos SET meta = meta || '{\"x\": 1}' WHERE id = 'č7'"),
+    ("added", "INSERT INTO src_photos VALUES ('Ž1', 'new', 2, NULL)"),
+    ("deleted", "DELETE FROM src_photos WHERE id = 'B3'"),
+])
+async def test_one_row_change_dirties_one_bucket(db, change, sql):
+    await _mirrored(db)
+    async with db.begin() as conn:
+        await conn.execute(text(sql))
+
+    dirty = await _dirty()
+    assert len(dirty) == 1
+
+    counts, touched = await sync._reconcile_buckets(MIRROR, SPEC, dirty)
+    key = {"edited": "changed", "added": "changed", "deleted": "missing_stamped"}[change]
+    assert counts[key] == 1 and len(touched) == 1
+    assert await _dirty() == []
+
+
+@needs_db
+async def test_failed_copy_leaves_mirror_untouched(db, monkeypatch):
+    monkeypatch.setattr(sync, "BATCH", 10)
+    record = sync._record
+    seen = []
+
+    def failing_record(row, cols):
+        seen.append(row)
+        if len(seen) > 50:
+            raise ValueError("bad row")
+        return record(row, cols)
+
+    monkeypatch.setattr(sync, "_record", failing_record)
+    with pytest.raises(ExceptionGroup):
+        await sync._upsert_changed(MIRROR, SPEC, IDS)
+    async with db.connect() as conn:
+        assert (await conn.execute(text(f"SELECT count(*) FROM {MIRROR}"))).scalar() == 0
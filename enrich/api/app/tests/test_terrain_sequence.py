@@ -0,0 +1,81 @@
+"""POST /terrain/enqueue_sequence: the GPS hint is per viewpoint. The photo's
+altitude and the caller's gps_datum ride on every item the worker reads, and a
+caller-supplied gps_altitude_m wins over the photo's, as in /terrain/enqueue.
+Runs against a fake workbench DB and a recording stand-in for the actor."""
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app import actors
+from app.routers import terrain
+
+PHOTOS = {"p1": SimpleNamespace(id="p1", lat=50.1, lon=14.4, altitude=412.0),
+          "p2": SimpleNamespace(id="p2", lat=50.2, lon=14.5, altitude=None)}
+
+
+class _Result:
+    def __init__(self, rows=None, rid=None):
+        self.rows, self.rid = rows, rid
+
+    def all(self):
+        return self.rows
+
+    def scalar_one(self):
+        return self.rid
+
+
+class _FakeWb:
+    def __init__(self):
+        self.inserted = []
+
+    def connect(self):
+        return self
+
+    begin = connect
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt, params):
+        if str(stmt).startswith("INSERT"):
+            self.inserted.append(params)
+            return _Result(rid=f"00000000-0000-0000-0000-00000000000{len(self.inserted)}")
+        return _Result(rows=[PHOTOS[i] for i in params["ids"] if i in PHOTOS])
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    messages = []
+    monkeypatch.setattr(actors, "init_broker", lambda: True)
+    monkeypatch.setattr(actors.render_sequence, "send", messages.append)
+    monkeypatch.setattr(terrain, "wb_engine", _FakeWb())
+    return messages
+
+
+async def _enqueue(params):
+    return await terrain.enqueue_sequence(terrain.EnqueueSequenceRequest(
+        photo_ids=["p1", "p2", "gone"], params=params))
+
+
+async def test_gps_datum_rides_on_every_item(sent):
+    out = await _enqueue({"gps_datum": "ellipsoidal", "max_distance_m": 20000})
+    assert out["skipped"] == ["gone"]
+    (msg,) = sent
+    assert msg["params"] == {"max_distance_m": 20000}
+    assert [(it.get("gps_altitude_m"), it["gps_datum"]) for it in msg["items"]] == \
+        [(412.0, "ellipsoidal"), (None, "ellipsoidal")]
+    stored = [json.loads(p["p"]) for p in terrain.wb_engine.inserted]
+    assert stored[0] == {"max_distance_m": 20000, "gps_datum": "ellipsoidal",
+                         "gps_altitude_m": 412.0}
+
+
+async def test_caller_gps_altitude_wins(sent):
+    await _enqueue({"gps_altitude_m": 600.0})
+    items = sent[0]["items"]
+    assert [it["gps_altitude_m"] for it in items] == [600.0, 600.0]
+    assert all("gps_datum" not in it for it in items)
+    assert "gps_altitude_m" not in sent[0]["params"]
@@ -0,0 +1,52 @@
+-- Photo neighbourhoods for the matching bench's view_candidates.
+--
+-- A ray-mode request pools every photo within ~20 km of the pano and scores each
+-- against it; on a dense area that was the same geography scan and the same
+-- distance/bearing arithmetic on every page open. The pairs are computed once per
+-- origin photo (lazily, on its first request) and kept current by the mirror sync,
+-- which re-scores only the photos it changed (app/neighbours.py). What is stored is
+-- the knob-independent part: distance and bearings. The pie/ray tests depend on
+-- request knobs and stay per request.
+--
+-- hv_haversine_m / hv_bearing_deg are calibrate.haversine_km (×1000) and
+-- calibrate.bearing_deg verbatim, so a stored score equals what Python would compute.
+
+CREATE OR REPLACE FUNCTION hv_haversine_m(lo1 float8, la1 float8, lo2 float8, la2 float8)
+RETURNS float8 LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+  SELECT 2 * 6371.0 * asin(sqrt(
+    sin(radians(la2 - la1) / 2) ^ 2
+    + cos(radians(la1)) * cos(radians(la2)) * sin(radians(lo2 - lo1) / 2) ^ 2)) * 1000
+$$;
+
+CREATE OR REPLACE FUNCTION hv_bearing_deg(lo1 float8, la1 float8, lo2 float8, la2 float8)
+RETURNS float8 LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+  SELECT b - 360.0 * floor(b / 360.0) FROM (SELECT degrees(atan2(
+    sin(radians(lo2 - lo1)) * cos(radians(la2)),
+    cos(radians(la1)) * sin(radians(la2))
+      - sin(radians(la1)) * cos(radians(la2)) * cos(radians(lo2 - lo1)))) + 360.0 AS b) s
+$$;
+
+-- which origins have a neighbourhood, and out to what radius
+CREATE TABLE IF NOT EXISTS photo_neighbourhoods (
+  photo_id  text PRIMARY KEY,
+  radius_m  double precision NOT NULL,
+  built_at  timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS photo_neighbours (
+  photo_id      text NOT NULL,               -- origin
+  neighbour_id  text NOT NULL,               -- a matching candidate near it
+  dist_m        double precision NOT NULL,
+  bearing       double precision NOT NULL,   -- origin → neighbour
+  back_bearing  double precision NOT NULL,   -- neighbour → origin
+  PRIMARY KEY (photo_id, neighbour_id)
+);
+-- the read: one origin's pairs, nearest first
+CREATE INDEX IF NOT EXISTS ix_photo_neighbours_dist ON photo_neighbours (photo_id, dist_m);
+-- the sync refresh: every pair a changed photo takes part in
+CREATE INDEX IF NOT EXISTS ix_photo_neighbours_nbr ON photo_neighbours (neighbour_id);
+
+-- ST_DWithin on geometry::geography cannot use ix_photo_mirror_geom; this is the
+-- index those pool queries (and the neighbourhood builds) actually need
+CREATE INDEX IF NOT EXISTS ix_photo_mirror_geog ON photo_mirror
+  USING gist ((geometry::geography));
@@ -0,0 +1,39 @@
+-- Graduation suggestions, persisted.
+--
+-- GET /graduation/suggestions used to rebuild every pending and landed item on
+-- each call: all approved facts, every anchor candidate's metadata graphs, every
+-- matching annotation row, suggest_body on each. Now the last computed item per
+-- mirrored annotation is kept here, and only annotations named in
+-- graduation_dirty are recomputed (app/suggestions.py, routers/graduation.py).
+
+CREATE TABLE IF NOT EXISTS graduation_suggestions (
+  annotation_id  text PRIMARY KEY,
+  photo_id       text NOT NULL,
+  pending        boolean NOT NULL,            -- approved facts imply a body change
+  decided_at     text,                        -- latest curation touch (ISO-8601 UTC)
+  candidates     text[] NOT NULL DEFAULT '{}', -- approved anchorCandidate URIs
+  item           jsonb NOT NULL,              -- _build_item output, minus photo sizes
+  computed_at    timestamptz NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_graduation_suggestions_order
+  ON graduation_suggestions (pending, decided_at DESC);
+-- a candidate's metadata facts changed: which suggestions use it
+CREATE INDEX IF NOT EXISTS ix_graduation_suggestions_cands
+  ON graduation_suggestions USING gin (candidates);
+
+-- What changed since the last computation. Writers add rows after their write has
+-- landed; the recompute claims (deletes) them in its own transaction.
+--   kind = 'annotation': ref is an annotation id (mirror body/target/liveness)
+--   kind = 'fact':       ref is a fact-graph IRI (curated, or newly loaded)
+--   kind = 'all':        full rebuild (first run, or POST /api/graduation/rebuild)
+CREATE TABLE IF NOT EXISTS graduation_dirty (
+  kind       text NOT NULL,
+  ref        text NOT NULL,
+  marked_at  timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (kind, ref)
+);
+
+-- nothing computed yet: the first request does one full build
+INSERT INTO graduation_dirty (kind, ref)
+  SELECT 'all', '*' WHERE NOT EXISTS (SELECT 1 FROM graduation_suggestions)
+  ON CONFLICT DO NOTHING;
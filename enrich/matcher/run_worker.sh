@@ -28,6 +28,9 @@ systemd-run --user --unit=enrich-matcher \
   -p RestartSec=30 \
   --setenv=RABBITMQ_URL="${RABBITMQ_URL:-enrich:enrich@127.0.0.1:5672}" \
   --setenv=MATCHER_REQUIRED_GB="${MATCHER_REQUIRED_GB:-6}" \
+  --setenv=MATCHER_TILE_CACHE_MB="${MATCHER_TILE_CACHE_MB:-256}" \
+  --setenv=MATCHER_TILE_DISK_MB="${MATCHER_TILE_DISK_MB:-2048}" \
+  --setenv=MATCHER_TILE_IN_FLIGHT="${MATCHER_TILE_IN_FLIGHT:-8}" \
   "$VENV_PY" -m remoulade worker --threads 1
 
 echo "enrich-matcher unit started (MemoryHigh=$MEM_HIGH, MemoryMax=$MEM_MAX)"
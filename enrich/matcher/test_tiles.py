@@ -0,0 +1,146 @@
+"""DZI tile fetching against a local static file server: crops assemble to the
+source pixels, repeat crops come from the memory / disk cache instead of the
+network, and concurrency stays under the in-flight cap."""
+import functools
+import math
+import os
+import shutil
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+pytest.importorskip("requests")
+
+import tiles  # noqa: E402
+
+TS, OV = 64, 1
+
+
+def _write_pyramid(root, img):
+    """Minimal DZI layout (<level>/<col>_<row>.png, overlap OV) of img."""
+    W, H = img.size
+    maxlevel = math.ceil(math.log2(max(W, H)))
+    for level in range(maxlevel, maxlevel - 3, -1):
+        ds = 2 ** (maxlevel - level)
+        lvl = img.resize((math.ceil(W / ds), math.ceil(H / ds)))
+        os.makedirs(os.path.join(root, str(level)))
+        for c in range(math.ceil(lvl.width / TS)):
+            for r in range(math.ceil(lvl.height / TS)):
+                x0, y0 = c * TS - (OV if c else 0), r * TS - (OV if r else 0)
+                tile = lvl.crop((x0, y0, min(lvl.width, (c + 1) * TS + OV),
+                                 min(lvl.height, (r + 1) * TS + OV)))
+                tile.save(os.path.join(root, str(level), f"{c}_{r}.png"))
+
+
+@pytest.fixture
+def server(tmp_path):
+    root = tmp_path / "tiles"
+    img = Image.effect_noise((300, 200), 64).convert("RGB")
+    _write_pyramid(str(root), img)
+    log = {"paths": [], "live": 0, "peak": 0, "delay": 0.0}
+    lock = threading.Lock()
+
+    class Handler(SimpleHTTPRequestHandler):
+        def do_GET(self):
+            with lock:
+                log["paths"].append(self.path)
+                log["live"] += 1
+                log["peak"] = max(log["peak"], log["live"])
+            try:
+                time.sleep(log["delay"])
+                super().do_GET()
+            finally:
+                with lock:
+                    log["live"] -= 1
+
+        def log_message(self, *a):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0),
+                                functools.partial(Handler, directory=str(root)))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    pyr = {"tiles_url": f"http://127.0.0.1:{httpd.server_port}/", "format": "png",
+           "tile_size": TS, "overlap": OV, "width": img.width, "height": img.height}
+    yield pyr, img, log
+    httpd.shutdown()
+
+
+def test_region_matches_source_pixels(server, tmp_path):
+    pyr, img, log = server
+    f = tiles.TileFetcher(tiles.TileCache(2**20, 2**20, str(tmp_path / "c")))
+    crop, bounds = tiles.dzi_region(pyr, 0.1, 0.2, 0.8, 0.9, 4096, f)
+    px = (30, 40, 240, 180)
+    assert bounds == (px[0] / 300, px[1] / 200, px[2] / 300, px[3] / 200)
+    assert crop.tobytes() == img.crop(px).tobytes()
+    assert len(log["paths"]) == 12      # cols 0..3 × rows 0..2, full-res level
+    f.close()
+
+
+def test_repeat_crops_hit_memory_then_disk(server, tmp_path):
+    pyr, _, log = server
+    disk = str(tmp_path / "c")
+    f = tiles.TileFetcher(tiles.TileCache(2**20, 2**20, disk))
+    first, _ = tiles.dzi_region(pyr, 0.0, 0.0, 0.5, 0.5, 4096, f)
+    n = len(log["paths"])
+    again, _ = tiles.dzi_region(pyr, 0.0, 0.0, 0.5, 0.5, 4096, f)
+    assert len(log["paths"]) == n and f.cache.hits["mem"] == n
+    f.close()
+    # a fresh process (empty memory tier) reads the same tiles off disk
+    g = tiles.TileFetcher(tiles.TileCache(2**20, 2**20, disk))
+    cold, _ = tiles.dzi_region(pyr, 0.0, 0.0, 0.5, 0.5, 4096, g)
+    assert len(log["paths"]) == n and g.cache.hits["disk"] == n
+    assert first.tobytes() == again.tobytes() == cold.tobytes()
+    g.close()
+
+
+def test_regenerated_pyramid_misses_the_cache(server, tmp_path):
+    pyr, _, log = server
+    disk = str(tmp_path / "c")
+    f = tiles.TileFetcher(tiles.TileCache(2**20, 2**20, disk))
+    tiles.dzi_region(pyr, 0.0, 0.0, 1.0, 1.0, 4096, f)
+    f.close()
+    # re-processed at the same tiles_url, at a different size
+    img = Image.effect_noise((320, 200), 64).convert("RGB")
+    shutil.rmtree(tmp_path / "tiles")
+    _write_pyramid(str(tmp_path / "tiles"), img)
+    new = dict(pyr, width=img.width, height=img.height)
+    g = tiles.TileFetcher(tiles.TileCache(2**20, 2**20, disk))
+    n = len(log["paths"])
+    crop, _ = tiles.dzi_region(new, 0.0, 0.0, 1.0, 1.0, 4096, g)
+    assert len(log["paths"]) > n and g.cache.hits["disk"] == 0
+    assert crop.tobytes() == img.tobytes()
+    g.close()
+
+
+def test_in_flight_cap(server, tmp_path):
+    pyr, _, log = server
+    log["delay"] = 0.05
+    f = tiles.TileFetcher(tiles.TileCache(0), max_in_flight=3)
+    tiles.dzi_region(pyr, 0.0, 0.0, 1.0, 1.0, 4096, f)
+    assert len(log["paths"]) == 20 and 1 < log["peak"] <= 3
+    f.close()
+
+
+def test_cache_budgets_evict_lru(tmp_path):
+    disk = str(tmp_path / "c")
+    c = tiles.TileCache(250, 250, disk)
+    for i in range(4):
+        c.put(("p", 12, i, 0, "png"), bytes(100))
+    assert c.stats()["mem_tiles"] == 2 and c.stats()["disk_tiles"] == 2
+    assert c.get(("p", 12, 0, 0, "png")) is None
+    assert c.get(("p", 12, 3, 0, "png")) == bytes(100)
+    # the on-disk index is rebuilt from what survived
+    assert tiles.TileCache(0, 250, disk).stats()["disk_tiles"] == 2
+
+
+def test_missing_tile_is_skipped_and_not_cached(server, tmp_path):
+    pyr, img, log = server
+    f = tiles.TileFetcher(tiles.TileCache(2**20))
+    bad = dict(pyr, format="webp")          # nothing on the server in webp
+    crop, _ = tiles.dzi_region(bad, 0.0, 0.0, 0.3, 0.3, 4096, f)
+    assert crop.getextrema() == ((0, 0), (0, 0), (0, 0))
+    assert f.cache.stats()["mem_tiles"] == 0
+    f.close()
@@ -0,0 +1,234 @@
+"""DZI tile fetching for the matcher: concurrent, pooled, cached.
+
+A high-zoom crop of a gigapixel pano touches dozens of tiles, and the pairs of
+one transfer job keep cropping the same photos at the same levels — fetched
+serially and uncached, tile I/O outweighed MASt3R inference. Here:
+
+- `TileCache`  — two tiers of ENCODED tile bytes keyed by (photo, level, col,
+  row), "photo" being the pyramid's tiles_url plus its size (and version, if
+  the pyramid carries one), so a pyramid regenerated at the same URL misses
+  rather than serving stale tiles: an in-memory LRU and an on-disk store
+  (survives worker restarts), each with its own byte budget (0 disables the
+  tier). Encoded webp is ~10× smaller than the decoded RGB.
+- `TileFetcher` — a thread pool sized to the in-flight cap over one pooled
+  keep-alive HTTP session; tiles decode in the pool threads too.
+- `dzi_region` — the crop assembly (ported from scripts/enrich/viz_app.py).
+
+Stdlib + PIL + requests only, no broker import: the tests run it against a
+local static file server.
+"""
+import hashlib
+import io
+import math
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+USER_AGENT = "hillview-matcher/0.1"
+
+
+class TileCache:
+    """Bounded memory + disk cache of encoded tile bytes. Thread-safe.
+
+    Disk entries live at <dir>/<sha1(photo)[:16]>/<level>/<col>_<row>.<fmt>,
+    written via tmp + os.replace so a crashed write never leaves a torn tile;
+    eviction drops the least recently used file (index rebuilt from mtimes at
+    start, hits touch the file)."""
+
+    def __init__(self, mem_bytes: int, disk_bytes: int = 0,
+                 disk_dir: str | None = None):
+        self.mem_bytes = max(0, int(mem_bytes))
+        self.disk_bytes = max(0, int(disk_bytes)) if disk_dir else 0
+        self.disk_dir = disk_dir
+        self._lock = threading.Lock()
+        self._mem: OrderedDict = OrderedDict()      # key → bytes
+        self._mem_used = 0
+        self._disk: OrderedDict = OrderedDict()     # path → size
+        self._disk_used = 0
+        self.hits = {"mem": 0, "disk": 0}
+        self.misses = 0
+        if self.disk_bytes:
+            self._scan_disk()
+
+    def _scan_disk(self):
+        found = []
+        for root, _dirs, files in os.walk(self.disk_dir):
+            for f in files:
+                p = os.path.join(root, f)
+                if ".tmp" in f:
+                    try:
+                        os.remove(p)
+                    except OSError:
+                        pass
+                    continue
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    continue
+                found.append((st.st_mtime_ns, p, st.st_size))
+        for _, p, size in sorted(found):
+            self._disk[p] = size
+            self._disk_used += size
+        self._evict_disk()
+
+    def _path(self, key) -> str:
+        photo, level, col, row, fmt = key
+        h = hashlib.sha1(photo.encode()).hexdigest()[:16]
+        return os.path.join(self.disk_dir, h, str(level), f"{col}_{row}.{fmt}")
+
+    def get(self, key) -> bytes | None:
+        with self._lock:
+            data = self._mem.get(key)
+            if data is not None:
+                self._mem.move_to_end(key)
+                self.hits["mem"] += 1
+                return data
+            path = self._path(key) if self.disk_bytes else None
+            if path is None or path not in self._disk:
+                self.misses += 1
+                return None
+            self._disk.move_to_end(path)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._disk_used -= self._disk.pop(path, 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits["disk"] += 1
+            self._put_mem(key, data)
+        return data
+
+    def put(self, key, data: bytes) -> None:
+        with self._lock:
+            self._put_mem(key, data)
+        if not self.disk_bytes or len(data) > self.disk_bytes:
+            return
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            return
+        with self._lock:
+            self._disk_used += len(data) - self._disk.pop(path, 0)
+            self._disk[path] = len(data)
+            self._evict_disk()
+
+    def _put_mem(self, key, data: bytes):
+        if len(data) > self.mem_bytes:
+            return
+        self._mem_used += len(data) - len(self._mem.pop(key, b""))
+        self._mem[key] = data
+        while self._mem_used > self.mem_bytes:
+            _, old = self._mem.popitem(last=False)
+            self._mem_used -= len(old)
+
+    def _evict_disk(self):
+        while self._disk_used > self.disk_bytes and self._disk:
+            path, size = self._disk.popitem(last=False)
+            self._disk_used -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"mem_tiles": len(self._mem), "mem_mb": round(self._mem_used / 2**20, 1),
+                    "disk_tiles": len(self._disk),
+                    "disk_mb": round(self._disk_used / 2**20, 1),
+                    "hits_mem": self.hits["mem"], "hits_disk": self.hits["disk"],
+                    "misses": self.misses}
+
+
+class TileFetcher:
+    """Fetch + decode tiles concurrently, at most `max_in_flight` requests at
+    once (the pool size IS the cap), through `cache`. A tile that fails to
+    fetch or decode comes back None and is not cached."""
+
+    def __init__(self, cache: TileCache, max_in_flight: int = 8, timeout: float = 60):
+        import requests
+        self.cache = cache
+        self.timeout = timeout
+        self.max_in_flight = max(1, int(max_in_flight))
+        self._pool = ThreadPoolExecutor(self.max_in_flight,
+                                        thread_name_prefix="dzi-tile")
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4,
+                                                pool_maxsize=self.max_in_flight)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._session.headers["User-Agent"] = USER_AGENT
+
+    def _one(self, url: str, key):
+        from PIL import Image
+        data = self.cache.get(key)
+        fresh = data is None
+        if fresh:
+            try:
+                r = self._session.get(url, timeout=self.timeout)
+                r.raise_for_status()
+                data = r.content
+            except Exception:
+                return None
+        try:
+            img = Image.open(io.BytesIO(data)).convert("RGB")
+        except Exception:
+            return None
+        if fresh:
+            self.cache.put(key, data)
+        return img
+
+    def fetch(self, items: list) -> list:
+        """items: [(url, key)] → [PIL.Image | None] in the same order."""
+        return list(self._pool.map(lambda it: self._one(*it), items))
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        self._session.close()
+
+
+def dzi_region(pyr, nx0, ny0, nx1, ny1, max_px, fetcher: TileFetcher):
+    """Crop from DZI pyramid tiles.
+
+    Picks the pyramid level so the crop's long side lands ≤ max_px — a wide
+    target window would otherwise pull hundreds of full-res tiles into a
+    multi-GB canvas only to be shrunk to 512 by MASt3R anyway.
+    Returns (image, (nx0, ny0, nx1, ny1)) — the bounds actually delivered,
+    normalized to the source photo (clamping can shrink the request).
+    """
+    from PIL import Image
+    base, fmt = pyr["tiles_url"].rstrip("/"), pyr.get("format", "webp")
+    TS, OV = int(pyr["tile_size"]), int(pyr["overlap"])
+    W, H = int(pyr["width"]), int(pyr["height"])
+    photo = f"{base}|{W}x{H}|{pyr.get('version', '')}"
+    maxlevel = math.ceil(math.log2(max(W, H)))
+    nx0, nx1 = sorted((max(0.0, nx0), min(1.0, nx1)))
+    ny0, ny1 = sorted((max(0.0, ny0), min(1.0, ny1)))
+    ds = 1
+    while max((nx1 - nx0) * W, (ny1 - ny0) * H) / ds > max_px and ds < 1 << maxlevel:
+        ds *= 2
+    level = maxlevel - int(math.log2(ds))
+    Wl, Hl = math.ceil(W / ds), math.ceil(H / ds)
+    px0, px1 = sorted((max(0, int(nx0 * Wl)), min(Wl, int(nx1 * Wl))))
+    py0, py1 = sorted((max(0, int(ny0 * Hl)), min(Hl, int(ny1 * Hl))))
+    c0, c1, r0, r1 = px0 // TS, (px1 - 1) // TS, py0 // TS, (py1 - 1) // TS
+    ox, oy = c0 * TS, r0 * TS
+    canvas = Image.new("RGB", ((c1 - c0 + 1) * TS + OV + 1, (r1 - r0 + 1) * TS + OV + 1))
+    cells = [(c, r) for c in range(c0, c1 + 1) for r in range(r0, r1 + 1)]
+    tiles = fetcher.fetch([(f"{base}/{level}/{c}_{r}.{fmt}", (photo, level, c, r, fmt))
+                           for c, r in cells])
+    for (c, r), tile in zip(cells, tiles):
+        if tile is not None:
+            canvas.paste(tile, (c * TS - (OV if c > 0 else 0) - ox,
+                                r * TS - (OV if r > 0 else 0) - oy))
+    img = canvas.crop((px0 - ox, py0 - oy, px1 - ox, py1 - oy))
+    return img, (px0 / Wl, py0 / Hl, px1 / Wl, py1 / Hl)
@@ -8,10 +8,13 @@ credentials — the same shape a rented GPU box will use, pointed at a tunneled
 Run (from repo root, using the existing enrich experiments venv):
     scripts/enrich/.venv/bin/python -m remoulade enrich.matcher.worker --processes 1 --threads 1
 or:  cd enrich/matcher && ../../scripts/enrich/.venv/bin/python -m remoulade worker --processes 1 --threads 1
+
+Pyramid crops go through tiles.py: MATCHER_TILE_IN_FLIGHT (8) concurrent tile
+requests, a MATCHER_TILE_CACHE_MB (256) in-memory and MATCHER_TILE_DISK_MB
+(2048, 0 = off) on-disk tile cache under MATCHER_TILE_CACHE_DIR.
 """
 import io
 import json
-import math
 import os
 import socket
 import sys
@@ -21,6 +24,10 @@ import remoulade
 from remoulade.brokers.rabbitmq import RabbitmqBroker
 
 HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+import tiles  # noqa: E402
 REPO = os.path.abspath(os.path.join(HERE, "..", ".."))
 ENRICH_SCRIPTS = os.path.join(REPO, "scripts", "enrich")
 MAST3R_REPO = os.getenv("MAST3R_REPO", os.path.join(ENRICH_SCRIPTS, "mast3r_repo"))
@@ -29,6 +36,13 @@ RABBITMQ_URL = os.getenv("RABBITMQ_URL", "enrich:enrich@127.0.0.1:5672")
 MAXKP = 1536
 MARGIN = 0.10
 MAXDIM = 2048   # cap crop long side; MASt3R works at 512 so full-res is wasted
+# DZI tile cache (encoded bytes) + fetch concurrency — see tiles.py. The disk
+# tier outlives the process, so a restarted worker resumes warm.
+TILE_CACHE_MB = float(os.getenv("MATCHER_TILE_CACHE_MB", "256"))
+TILE_DISK_MB = float(os.getenv("MATCHER_TILE_DISK_MB", "2048"))
+TILE_CACHE_DIR = os.getenv("MATCHER_TILE_CACHE_DIR", os.path.join(
+    os.getenv("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "enrich-matcher", "dzi"))
+TILE_IN_FLIGHT = int(os.getenv("MATCHER_TILE_IN_FLIGHT", "8"))
 
 broker = RabbitmqBroker(url=f"amqp://{RABBITMQ_URL}?timeout=15", confirm_delivery=True)
 remoulade.set_broker(broker)
@@ -78,6 +92,18 @@ def _load_model():
     return _model
 
 
+_tile_fetcher = None
+
+
+def tile_fetcher() -> tiles.TileFetcher:
+    global _tile_fetcher
+    if _tile_fetcher is None:
+        cache = tiles.TileCache(int(TILE_CACHE_MB * 2**20), int(TILE_DISK_MB * 2**20),
+                                TILE_CACHE_DIR if TILE_DISK_MB > 0 else None)
+        _tile_fetcher = tiles.TileFetcher(cache, max_in_flight=TILE_IN_FLIGHT)
+    return _tile_fetcher
+
+
 def _fetch(url, timeout=90):
     from PIL import Image
     req = urllib.request.Request(url, headers={"User-Agent": "hillview-matcher/0.1"})
@@ -85,41 +111,10 @@ def _fetch(url, timeout=90):
 
 
 def _dzi_region(pyr, nx0, ny0, nx1, ny1, max_px=MAXDIM):
-    """Crop from DZI pyramid tiles (ported from scripts/enrich/viz_app.py).
-
-    Picks the pyramid level so the crop's long side lands ≤ max_px — a wide
-    target window would otherwise pull hundreds of full-res tiles into a
-    multi-GB canvas only to be shrunk to 512 by MASt3R anyway.
-    Returns (image, (nx0, ny0, nx1, ny1)) — the bounds actually delivered,
-    normalized to the source photo (clamping can shrink the request).
-    """
-    from PIL import Image
-    base, fmt = pyr["tiles_url"].rstrip("/"), pyr.get("format", "webp")
-    TS, OV = int(pyr["tile_size"]), int(pyr["overlap"])
-    W, H = int(pyr["width"]), int(pyr["height"])
-    maxlevel = math.ceil(math.log2(max(W, H)))
-    nx0, nx1 = sorted((max(0.0, nx0), min(1.0, nx1)))
-    ny0, ny1 = sorted((max(0.0, ny0), min(1.0, ny1)))
-    ds = 1
-    while max((nx1 - nx0) * W, (ny1 - ny0) * H) / ds > max_px and ds < 1 << maxlevel:
-        ds *= 2
-    level = maxlevel - int(math.log2(ds))
-    Wl, Hl = math.ceil(W / ds), math.ceil(H / ds)
-    px0, px1 = sorted((max(0, int(nx0 * Wl)), min(Wl, int(nx1 * Wl))))
-    py0, py1 = sorted((max(0, int(ny0 * Hl)), min(Hl, int(ny1 * Hl))))
-    c0, c1, r0, r1 = px0 // TS, (px1 - 1) // TS, py0 // TS, (py1 - 1) // TS
-    ox, oy = c0 * TS, r0 * TS
-    canvas = Image.new("RGB", ((c1 - c0 + 1) * TS + OV + 1, (r1 - r0 + 1) * TS + OV + 1))
-    for c in range(c0, c1 + 1):
-        for r in range(r0, r1 + 1):
-            try:
-                tile = _fetch(f"{base}/{level}/{c}_{r}.{fmt}", timeout=60)
-            except Exception:
-                continue
-            canvas.paste(tile, (c * TS - (OV if c > 0 else 0) - ox,
-                                r * TS - (OV if r > 0 else 0) - oy))
-    img = canvas.crop((px0 - ox, py0 - oy, px1 - ox, py1 - oy))
-    return img, (px0 / Wl, py0 / Hl, px1 / Wl, py1 / Hl)
+    """Crop from DZI pyramid tiles → (image, delivered normalized bounds); see
+    tiles.dzi_region. Tiles come through the process-wide fetcher, so pairs
+    cropping the same photo at the same level reuse what earlier ones pulled."""
+    return tiles.dzi_region(pyr, nx0, ny0, nx1, ny1, max_px, tile_fetcher())
 
 
 MAX_ASPECT = 2.0   # pano rects are extreme strips (20:1+); MASt3R's 512px
@@ -356,6 +351,8 @@ def match_pair(payload: dict) -> None:
                                     if k != "pts_loaded"}
         print(f"  {rid}: raw={raw} inliers={inliers} "
               f"proj={proj['method'] if proj else None}", flush=True)
+        if _tile_fetcher is not None:
+            print(f"  dzi tiles: {_tile_fetcher.cache.stats()}", flush=True)
     except Exception as e:
         result.update({"status": "error", "error": f"{type(e).__name__}: {e}"})
         print(f"  {rid} FAILED: {e}", flush=True)
@@ -22,10 +22,11 @@ Accuracy notes (the two things that matter at 100 km):
 Algorithm (vectorised horizon march):
   march a shared, geometrically-growing distance schedule; at each distance,
   sample the DEM at every azimuth at once and record the apparent elevation
-  angle. The running max over distance (np.maximum.accumulate) is the horizon
-  profile-so-far; for each pixel row (an elevation angle), the visible surface
-  is the FIRST march step whose running max reaches that angle — one
-  searchsorted per column. O(steps·az) samples, all numpy.
+  angle. The running max over distance is the horizon profile-so-far; for
+  each pixel row (an elevation angle), the visible surface is the FIRST
+  march step whose running max reaches that angle — recorded as the march
+  rises past rows and resolved for all columns at once (HorizonMarch).
+  O(steps·az) samples, all numpy.
 
 Pure numpy core; rasterio is an optional import used only by the GeoTIFF
 loaders (the worker's path). The ops pipeline that produces the DEM mosaic
@@ -35,6 +36,9 @@ the borders) is documented in README.md next door.
 from __future__ import annotations
 
 import math
+import os
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass, field
 
 import numpy as np
@@ -43,6 +47,8 @@ R_EARTH_M = 6_371_000.0
 DEFAULT_REFRACTION_K = 0.13
 DEPTH_SCALE_M = 4.0           # uint16 depth quantisation: 4 m steps, 262 km range
 DEPTH_SKY = 0                 # reserved uint16 value for "no terrain hit"
+SAMPLE_BLOCK = 1 << 16        # march samples per numpy call (steps × columns)
+NEAR_FIELD_M = 300.0          # elev_fit's "near" horizon: the march nearer than this
 
 
 def effective_radius(refraction_k: float = DEFAULT_REFRACTION_K) -> float:
@@ -112,44 +118,165 @@ class DemCoverageError(ValueError):
     config errors (wrong CRS, rotated grid) stay plain ValueError and loud."""
 
 
-def load_geotiff_window(path: str, lat: float, lon: float, radius_m: float) -> DemGrid:
-    """Windowed read of an EPSG:4326 GeoTIFF/VRT/COG around the viewpoint.
-
-    The mosaic-building pipeline (gdalwarp -t_srs EPSG:4326 …) guarantees a
+def _check_grid(src) -> None:
+    """The mosaic-building pipeline (gdalwarp -t_srs EPSG:4326 …) guarantees a
     north-up 4326 grid; anything else is rejected loudly rather than rendered
-    subtly wrong.
-    """
-    import rasterio                      # optional dep: worker environment only
-    from rasterio.windows import from_bounds
+    subtly wrong."""
+    if src.crs is None or src.crs.to_epsg() != 4326:
+        raise ValueError(f"DEM must be EPSG:4326, got {src.crs} — re-run the mosaic pipeline")
+    t = src.transform
+    if abs(t.b) > 1e-12 or abs(t.d) > 1e-12 or t.e >= 0:
+        raise ValueError("DEM must be a north-up, non-rotated grid")
+
+
+def _viewpoint_window(transform, width: int, height: int,
+                      lat: float, lon: float, radius_m: float):
+    """Pixel window (integer offsets/lengths) of radius_m around the viewpoint,
+    clipped to the raster extent."""
+    from rasterio.errors import WindowError
+    from rasterio.windows import Window, from_bounds, intersection
     dr = radius_m / 111_320.0
     dlon_r = radius_m / (111_320.0 * max(0.1, math.cos(math.radians(lat))))
+    win = from_bounds(lon - dlon_r, lat - dr, lon + dlon_r, lat + dr,
+                      transform=transform).round_offsets().round_lengths()
+    # CLIP to the raster extent: reading an overhanging window returns the
+    # intersection's data, but window_transform() of the UNCLIPPED window
+    # would georeference it from the overhanging corner — silently shifting
+    # the whole grid whenever the request crosses a mosaic edge.
+    try:
+        win = intersection(win, Window(0, 0, width, height))
+    except WindowError as e:  # no overlap at all (viewpoint outside layer)
+        raise DemCoverageError(f"window outside the DEM extent: {e}") from e
+    if win.width < 2 or win.height < 2:
+        raise DemCoverageError("requested window barely intersects the DEM extent")
+    return win
+
+
+def _read_elev(src, win) -> np.ndarray:
+    data = src.read(1, window=win, masked=True).astype(np.float32)
+    return np.where(np.ma.getmaskarray(data), np.nan, np.ma.getdata(data))
+
+
+def _grid_for(elev: np.ndarray, wt) -> DemGrid:
+    return DemGrid(elev=elev,
+                   lat_top=wt.f + wt.e / 2.0,       # edge → row-0 center
+                   lon_left=wt.c + wt.a / 2.0,
+                   dlat=-wt.e, dlon=wt.a)
+
+
+def load_geotiff_window(path: str, lat: float, lon: float, radius_m: float) -> DemGrid:
+    """Windowed read of an EPSG:4326 GeoTIFF/VRT/COG around the viewpoint."""
+    import rasterio                      # optional dep: worker environment only
     with rasterio.open(path) as src:
-        if src.crs is None or src.crs.to_epsg() != 4326:
-            raise ValueError(f"DEM must be EPSG:4326, got {src.crs} — re-run the mosaic pipeline")
-        t = src.transform
-        if abs(t.b) > 1e-12 or abs(t.d) > 1e-12 or t.e >= 0:
-            raise ValueError("DEM must be a north-up, non-rotated grid")
-        win = from_bounds(lon - dlon_r, lat - dr, lon + dlon_r, lat + dr,
-                          transform=t).round_offsets().round_lengths()
-        # CLIP to the raster extent: reading an overhanging window returns the
-        # intersection's data, but window_transform() of the UNCLIPPED window
-        # would georeference it from the overhanging corner — silently shifting
-        # the whole grid whenever the request crosses a mosaic edge.
-        from rasterio.errors import WindowError
-        from rasterio.windows import Window, intersection
-        try:
-            win = intersection(win, Window(0, 0, src.width, src.height))
-        except WindowError as e:  # no overlap at all (viewpoint outside layer)
-            raise DemCoverageError(f"window outside the DEM extent: {e}") from e
-        if win.width < 2 or win.height < 2:
-            raise DemCoverageError("requested window barely intersects the DEM extent")
-        data = src.read(1, window=win, masked=True).astype(np.float32)
-        elev = np.where(np.ma.getmaskarray(data), np.nan, np.ma.getdata(data))
-        wt = src.window_transform(win)
-        return DemGrid(elev=elev,
-                       lat_top=wt.f + wt.e / 2.0,       # edge → row-0 center
-                       lon_left=wt.c + wt.a / 2.0,
-                       dlat=-wt.e, dlon=wt.a)
+        _check_grid(src)
+        win = _viewpoint_window(src.transform, src.width, src.height, lat, lon, radius_m)
+        return _grid_for(_read_elev(src, win), src.window_transform(win))
+
+
+class DemTileCache:
+    """Process-wide LRU of DECODED DEM tiles, shared across render jobs.
+
+    load_geotiff_window decompresses the whole window on every call — the
+    re-renders of a viewpoint, and every neighbouring viewpoint of a
+    clustered batch, re-decode the same GLO-30/ČÚZK blocks. Here a
+    raster is cut into tile_px² pixel tiles; a window request is assembled
+    from cached tiles and only the missing ones are read. Tiles are keyed by
+    (path, mtime, size) as well, so an atomically refreshed VRT (os.replace
+    in _ensure_glo30_coverage) is a different raster and the stale tiles
+    simply age out. The budget counts tile bytes; least-recently-used tiles
+    are evicted past it. Thread-safe; reads happen outside the lock, so two
+    threads may occasionally decode the same tile (harmless). Raster
+    metadata is kept for the latest version of at most max_rasters paths."""
+
+    def __init__(self, budget_bytes: int, tile_px: int = 512, max_rasters: int = 64):
+        self.budget_bytes = int(budget_bytes)
+        self.tile_px = int(tile_px)
+        self.max_rasters = int(max_rasters)
+        self._tiles: OrderedDict = OrderedDict()
+        self._info: OrderedDict = OrderedDict()      # path -> (ver, transform, w, h)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "tiles": len(self._tiles),
+                    "bytes": self._bytes, "budget_bytes": self.budget_bytes}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tiles.clear()
+            self._info.clear()
+            self._bytes = 0
+
+    def _raster(self, path: str):
+        """→ (version key, transform, width, height); opens the file only the
+        first time a given version of it is seen."""
+        st = os.stat(path)
+        ver = (path, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            info = self._info.get(path)
+            if info is not None and info[0] == ver:
+                self._info.move_to_end(path)
+                return info
+        import rasterio
+        with rasterio.open(path) as src:
+            _check_grid(src)
+            info = (ver, src.transform, src.width, src.height)
+        with self._lock:
+            # a replaced file's older version is never asked for again
+            self._info[path] = info
+            self._info.move_to_end(path)
+            while len(self._info) > self.max_rasters:
+                self._info.popitem(last=False)
+        return info
+
+    def _tile(self, path: str, ver, tr: int, tc: int, width: int, height: int):
+        key = (ver, tr, tc)
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+                self.hits += 1
+                return tile
+            self.misses += 1
+        import rasterio
+        from rasterio.windows import Window
+        t = self.tile_px
+        win = Window(tc * t, tr * t, min(t, width - tc * t), min(t, height - tr * t))
+        with rasterio.open(path) as src:
+            tile = _read_elev(src, win)
+        with self._lock:
+            if key not in self._tiles:
+                self._tiles[key] = tile
+                self._bytes += tile.nbytes
+            while self._bytes > self.budget_bytes and len(self._tiles) > 1:
+                _, old = self._tiles.popitem(last=False)
+                self._bytes -= old.nbytes
+                self.evictions += 1
+        return tile
+
+    def load_window(self, path: str, lat: float, lon: float, radius_m: float) -> DemGrid:
+        """Same contract (and same pixels) as load_geotiff_window."""
+        if self.budget_bytes <= 0:
+            return load_geotiff_window(path, lat, lon, radius_m)
+        from rasterio.windows import transform as window_transform
+        ver, transform, width, height = self._raster(path)
+        win = _viewpoint_window(transform, width, height, lat, lon, radius_m)
+        r0, c0 = int(win.row_off), int(win.col_off)
+        r1, c1 = r0 + int(win.height), c0 + int(win.width)
+        t = self.tile_px
+        elev = np.empty((r1 - r0, c1 - c0), dtype=np.float32)
+        for tr in range(r0 // t, (r1 - 1) // t + 1):
+            for tc in range(c0 // t, (c1 - 1) // t + 1):
+                tile = self._tile(path, ver, tr, tc, width, height)
+                # overlap of this tile with the window, in raster pixels
+                ya, yb = max(r0, tr * t), min(r1, tr * t + tile.shape[0])
+                xa, xb = max(c0, tc * t), min(c1, tc * t + tile.shape[1])
+                elev[ya - r0:yb - r0, xa - c0:xb - c0] = \
+                    tile[ya - tr * t:yb - tr * t, xa - tc * t:xb - tc * t]
+        return _grid_for(elev, window_transform(win, transform))
 
 
 @dataclass
@@ -271,6 +398,93 @@ def distance_schedule(min_distance_m: float, max_distance_m: float,
     return np.asarray(out, dtype=np.float64)
 
 
+class HorizonMarch:
+    """Running horizon state of a march, and the resolve of it into pixels.
+
+    Pixel row r of a column shows the FIRST march step whose running horizon
+    reaches that row's elevation angle. Instead of keeping every (step,
+    column) sample and searchsorting each column at the end, the march
+    records only the EVENTS that matter: a step where a column's horizon
+    rises past one or more further pixel rows. q — the number of rows still
+    above the horizon — only ever decreases along a column, so an event
+    (step, column, q) says "rows q…(previous q)-1 of this column first see
+    terrain here". resolve() scatters the events into their rows (distinct
+    per column — no write conflicts) and a running minimum down the rows
+    fills the rest: one array operation over the whole panorama, whatever
+    its width, and memory in events rather than steps × columns.
+
+    near_horizon is the running horizon over the steps nearer than near_m —
+    what a column shows of its own foreground."""
+
+    def __init__(self, dists: np.ndarray, pix_rad: np.ndarray, n_az: int,
+                 near_m: float = 0.0):
+        self.dists = dists
+        self.n_rows = len(pix_rad)
+        self._neg_pix = -np.asarray(pix_rad, dtype=np.float64)   # ascending
+        self.horizon = np.full(n_az, -np.inf, dtype=np.float32)
+        self.near_horizon = self.horizon
+        self._n_near = int(np.searchsorted(dists, near_m))
+        self._q = np.full(n_az, self.n_rows, dtype=np.intp)
+        self._events: list[tuple] = []      # (steps, cols, q, surface elev)
+        self.steps = 0
+
+    def push(self, ang: np.ndarray, elv: np.ndarray) -> None:
+        """Next step's apparent angles (-inf where the DEM has no data) and
+        sampled elevations, one per column."""
+        self.push_block(ang[None], elv[None])
+
+    def push_block(self, ang: np.ndarray, elv: np.ndarray) -> None:
+        """The next len(ang) steps at once, (steps, cols) each."""
+        ang = ang.astype(np.float32)
+        hb = np.maximum.accumulate(np.concatenate([self.horizon[None], ang]), axis=0)
+        rose = hb[1:] > hb[:-1]
+        self.horizon = hb[-1]
+        if self.steps < self._n_near:
+            self.near_horizon = hb[min(len(ang), self._n_near - self.steps)]
+        if not rose.any():
+            self.steps += len(ang)
+            return
+        # q only where the horizon rose; elsewhere it carries over (running min)
+        qb = np.full((len(ang) + 1, len(self.horizon)), self.n_rows, dtype=np.intp)
+        qb[0] = self._q
+        qb[1:][rose] = np.searchsorted(self._neg_pix, -hb[1:][rose].astype(np.float64))
+        np.minimum.accumulate(qb, axis=0, out=qb)
+        new = qb[1:] < qb[:-1]
+        s, cols = np.nonzero(new)                 # step-major: event ids follow steps
+        if len(s):
+            self._events.append((self.steps + s, cols, qb[1:][new], elv[new]))
+        self._q = qb[-1]
+        self.steps += len(ang)
+
+    def resolve(self, lo: int = 0, hi: int | None = None):
+        """→ (depth, surface_elev) of rows lo…hi-1, (rows, cols) float32,
+        NaN = sky. The crop is exactly those rows of the full resolve."""
+        hi = self.n_rows if hi is None else hi
+        n_az = len(self.horizon)
+        if self._events:
+            step = np.concatenate([s for s, _, _, _ in self._events])
+            cols = np.concatenate([c for _, c, _, _ in self._events])
+            q = np.concatenate([q for _, _, q, _ in self._events])
+            surf = np.concatenate([e for _, _, _, e in self._events])
+        else:
+            step = cols = q = np.empty(0, dtype=np.intp)
+            surf = np.empty(0, dtype=np.float32)
+        n_ev = len(step)
+        # event ids grow with the step, so the running min is the first step.
+        # Events reaching down from above the crop all land on its top row:
+        # only each column's first one counts there.
+        first = np.full((hi - lo, n_az), n_ev, dtype=np.int32)  # n_ev = sky
+        inner = np.nonzero((q > lo) & (q < hi))[0]
+        first[q[inner] - lo, cols[inner]] = inner
+        above = np.nonzero(q <= lo)[0]
+        _, once = np.unique(cols[above], return_index=True)
+        first[0, cols[above[once]]] = above[once]
+        idx = np.minimum.accumulate(first, axis=0)
+        depth_of = np.append(self.dists[step], np.nan).astype(np.float32)
+        surf_of = np.append(surf, np.nan).astype(np.float32)
+        return np.take(depth_of, idx), np.take(surf_of, idx)
+
+
 def render(dem, lat: float, lon: float, *,
            terrain_dem=None,   # DemGrid/CompositeDem for observer grounding (DMR)
            observer_height_m: float = 2.0,
@@ -282,9 +496,12 @@ def render(dem, lat: float, lon: float, *,
            min_step_m: float | None = None, rel_step: float = 0.005,
            refraction_k: float = DEFAULT_REFRACTION_K,
            progress=None, checkpoint=None,
-           checkpoint_distances_m=(10_000.0, 25_000.0, 50_000.0)) -> Panorama:
+           checkpoint_distances_m=(10_000.0, 25_000.0, 50_000.0),
+           elev_fit=None) -> Panorama:
     """Render a depth panorama from (lat, lon) looking across [az_start, az_end).
 
+    A batch of one: render_many with a single viewpoint.
+
     progress: optional callable(fraction_done: float). The distance march is
     where the seconds go and every step costs the same (n_az samples), so the
     ITERATION fraction is an honest wall-clock estimate — geometric distance
@@ -294,23 +511,82 @@ def render(dem, lat: float, lon: float, *,
     progress hiccup can never fail a render).
 
     checkpoint: optional callable(pano: Panorama, fraction_done: float). The
-    horizon march is maximum.accumulate over distance, so truncating it at a
+    horizon march is a running max over distance, so truncating it at a
     distance milestone yields a VALID partial panorama — terrain grown
     outward, far ranges still hidden behind ridges. No algorithm change,
     just checkpointed emission: partials and the final result run the same
     finish phase. Milestones outside (min_distance, max_distance) are
     skipped; the final panorama is returned, not checkpointed."""
-    if observer_elevation_m is not None:
-        eye, eye_source = float(observer_elevation_m), "explicit"
-    else:
+    return render_many(
+        dem, [(lat, lon, observer_elevation_m)], terrain_dem=terrain_dem,
+        observer_height_m=observer_height_m,
+        az_start=az_start, az_end=az_end, az_step_deg=az_step_deg,
+        elev_min_deg=elev_min_deg, elev_max_deg=elev_max_deg,
+        elev_step_deg=elev_step_deg,
+        min_distance_m=min_distance_m, max_distance_m=max_distance_m,
+        min_step_m=min_step_m, rel_step=rel_step, refraction_k=refraction_k,
+        progress=progress,
+        checkpoint=(lambda panos, f: checkpoint(panos[0], f)) if checkpoint else None,
+        checkpoint_distances_m=checkpoint_distances_m, elev_fit=elev_fit)[0]
+
+
+def render_many(dem, viewpoints, *,
+                terrain_dem=None,
+                observer_height_m: float = 2.0,
+                az_start: float = 0.0, az_end: float = 360.0, az_step_deg: float = 0.05,
+                elev_min_deg: float = -8.0, elev_max_deg: float = 12.0,
+                elev_step_deg: float = 0.05,
+                min_distance_m: float = 50.0, max_distance_m: float = 100_000.0,
+                min_step_m: float | None = None, rel_step: float = 0.005,
+                refraction_k: float = DEFAULT_REFRACTION_K,
+                progress=None, checkpoint=None,
+                checkpoint_distances_m=(10_000.0, 25_000.0, 50_000.0),
+                elev_fit=None) -> list[Panorama]:
+    """Render N viewpoints on ONE shared grid in a single march.
+
+    viewpoints: (lat, lon) or (lat, lon, observer_elevation_m | None) each;
+    None grounds that observer like render() does. Nearby viewpoints (a
+    hike, a pano sequence) would otherwise each redo the same work, so the
+    batch shares it: the azimuth trig and the distance schedule are built
+    once, every step advances all N ray fans in one vectorised geodesic
+    over an (N, az) table, and the DEM is sampled once per step for all of
+    them. dem must cover every viewpoint's radius (the worker loads one
+    window around the batch). Each viewpoint keeps its own HorizonMarch, so
+    the panoramas are exactly what render() returns for them one by one on
+    the same distance schedule (the default min_step_m follows the finest
+    DEM cell over the whole batch).
+
+    checkpoint: optional callable(panos: list[Panorama], fraction_done).
+    progress: as in render().
+
+    elev_fit: optional callable(top_deg | None, near_deg | None) →
+    (elev_min_deg, elev_max_deg), fitting the elevation window to the
+    march's OWN horizon instead of a separate probe render. top_deg is the
+    highest horizon point over all viewpoints, near_deg the lowest row that
+    still sees past NEAR_FIELD_M (None: no terrain / none). The march runs
+    on the grid elev_min_deg..elev_max_deg spans; the fitted window snaps
+    outward to its rows and the panoramas are cropped to it — exactly what
+    a render of the snapped window returns. Partials are fitted to the
+    horizon marched so far."""
+    vps = [(float(v[0]), float(v[1]), v[2] if len(v) > 2 else None) for v in viewpoints]
+    if not vps:
+        return []
+    eyes, sources = [], []
+    gdem = terrain_dem if terrain_dem is not None else dem
+    for vlat, vlon, vel in vps:
+        if vel is not None:
+            eyes.append(float(vel))
+            sources.append("explicit")
+            continue
         # ground the observer on the TERRAIN model when available (a DSM's
         # "ground" under someone standing between trees is canopy)
-        gdem = terrain_dem if terrain_dem is not None else dem
-        ground = float(gdem.sample(np.array([lat]), np.array([lon]))[0])
+        ground = float(gdem.sample(np.array([vlat]), np.array([vlon]))[0])
         if not math.isfinite(ground):
-            raise ValueError("viewpoint is outside the DEM / on nodata")
-        eye, eye_source = resolve_eye_elevation(
-            ground, observer_height_m=observer_height_m)
+            raise ValueError("viewpoint is outside the DEM / on nodata"
+                             + (f": ({vlat:.5f}, {vlon:.5f})" if len(vps) > 1 else ""))
+        eye, source = resolve_eye_elevation(ground, observer_height_m=observer_height_m)
+        eyes.append(eye)
+        sources.append(source)
 
     n_az = max(1, int(round((az_end - az_start) / az_step_deg)))
     azimuths = (az_start + (np.arange(n_az) + 0.5) * az_step_deg) % 360.0
@@ -319,38 +595,54 @@ def render(dem, lat: float, lon: float, *,
     pix_rad = np.radians(elev_angles)
 
     if min_step_m is None:
-        min_step_m = max(5.0, dem.cell_size_m(lat) * 0.5)
+        min_step_m = max(5.0, min(dem.cell_size_m(v[0]) for v in vps) * 0.5)
     dists = distance_schedule(min_distance_m, max_distance_m, min_step_m, rel_step)
     r_eff2 = 2.0 * effective_radius(refraction_k)
 
-    # march: apparent elevation angle of every (step, azimuth) sample
-    ang = np.full((len(dists), n_az), -np.inf, dtype=np.float32)
-    elv = np.full((len(dists), n_az), np.nan, dtype=np.float32)
+    # shared step tables: per-azimuth and per-viewpoint trig, computed once
+    # (destination_point's formula, factored so each step is one broadcast)
+    br = np.radians(azimuths)
+    sin_br, cos_br = np.sin(br), np.cos(br)
+    lat1 = np.radians(np.array([v[0] for v in vps]))[:, None, None]
+    lon1 = np.radians(np.array([v[1] for v in vps]))[:, None, None]
+    sin_lat1, cos_lat1 = np.sin(lat1), np.cos(lat1)
+    eye_col = np.array(eyes, dtype=np.float32)[:, None, None]   # f32 like h
+
+    marches = [HorizonMarch(dists, pix_rad, n_az, NEAR_FIELD_M) for _ in vps]
     n_steps_total = len(dists)
     report_every = max(1, n_steps_total // 20)
 
-    def _finish(k: int) -> Panorama:
-        """Resolve the panorama from the first k march steps. k = total is
-        the final render; smaller k is a valid partial (the accumulate is
+    def _finish() -> list[Panorama]:
+        """Resolve the panoramas from the steps marched so far. All of them is
+        the final render; fewer is a valid partial (the running max is
         monotone, so wherever a partial sees terrain, the final sees the
         SAME depth — longer marches only ever fill in what was sky)."""
-        horizon = np.maximum.accumulate(ang[:k], axis=0)  # running horizon profile
-        depth = np.full((n_rows, n_az), np.nan, dtype=np.float32)
-        surf = np.full((n_rows, n_az), np.nan, dtype=np.float32)
-        for j in range(n_az):                       # tiny per-column work
-            idx = np.searchsorted(horizon[:, j], pix_rad)  # first step ≥ pixel angle
-            vis = idx < k
-            ii = idx[vis]
-            depth[vis, j] = dists[ii]
-            surf[vis, j] = elv[ii, j]
-        return Panorama(depth=depth, surface_elev=surf, azimuths=azimuths,
-                        elev_angles=elev_angles, lat=lat, lon=lon,
-                        eye_elevation_m=eye,
-                        params={"eye_source": eye_source,
-                                "refraction_k": refraction_k,
-                                "max_distance_m": max_distance_m,
-                                "az_step_deg": az_step_deg,
-                                "elev_step_deg": elev_step_deg})
+        lo, hi, fit = 0, n_rows, {}
+        if elev_fit is not None:
+            top = max(float(m.horizon.max()) for m in marches)
+            top_deg = math.degrees(top) if math.isfinite(top) else None
+            # a column's foreground ends where its horizon still rises past it
+            nears = [float(m.near_horizon[m.horizon > m.near_horizon].min())
+                     for m in marches if (m.horizon > m.near_horizon).any()]
+            near_deg = math.degrees(min(nears)) if nears else None
+            fit_min, fit_max = elev_fit(top_deg, near_deg)
+            lo = max(0, math.floor((elev_max_deg - fit_max) / elev_step_deg + 1e-9))
+            hi = min(n_rows, math.ceil((elev_max_deg - fit_min) / elev_step_deg - 1e-9))
+            lo, hi = min(lo, n_rows - 1), max(hi, min(lo, n_rows - 1) + 1)
+            if top_deg is not None:
+                fit["horizon_deg"] = round(top_deg, 2)
+        out = []
+        for (vlat, vlon, _), eye, source, march in zip(vps, eyes, sources, marches):
+            depth, surf = march.resolve(lo, hi)
+            out.append(Panorama(depth=depth, surface_elev=surf, azimuths=azimuths,
+                                elev_angles=elev_angles[lo:hi], lat=vlat, lon=vlon,
+                                eye_elevation_m=eye,
+                                params={"eye_source": source,
+                                        "refraction_k": refraction_k,
+                                        "max_distance_m": max_distance_m,
+                                        "az_step_deg": az_step_deg,
+                                        "elev_step_deg": elev_step_deg, **fit}))
+        return out
 
     cp_steps: set[int] = set()
     if checkpoint is not None:
@@ -359,20 +651,35 @@ def render(dem, lat: float, lon: float, *,
                     if min_distance_m < cd < max_distance_m}
         cp_steps = {k for k in cp_steps if 0 < k < n_steps_total}
 
-    for i, d in enumerate(dists):
-        plats, plons = destination_point(lat, lon, azimuths, d)
-        h = dem.sample(plats, plons)
-        a = np.arctan((h - eye) / d - d / r_eff2)
-        hit = np.isfinite(h)
-        ang[i, hit] = a[hit].astype(np.float32)
-        elv[i] = h
-        if progress is not None and ((i + 1) % report_every == 0
-                                     or i + 1 == n_steps_total):
-            progress((i + 1) / n_steps_total)
-        if (i + 1) in cp_steps:
-            checkpoint(_finish(i + 1), (i + 1) / n_steps_total)
-
-    return _finish(n_steps_total)
+    # Several distance steps per numpy call when the fans are narrow (coarse
+    # 1° sweeps, pie sectors): per-call overhead, not
+    # arithmetic, is what a 360-column step costs. Blocks end on every
+    # progress/checkpoint step, so callbacks fire exactly as step by step.
+    block = max(1, SAMPLE_BLOCK // (len(vps) * n_az))
+    stops = sorted(set(range(report_every, n_steps_total, report_every))
+                   | cp_steps | {n_steps_total})
+    i = 0
+    for stop in stops:
+        while i < stop:
+            j = min(stop, i + block)
+            d = dists[i:j, None]                        # (steps, 1)
+            dr = d / R_EARTH_M
+            sin_d, cos_d = np.sin(dr), np.cos(dr)
+            lat2 = np.arcsin(sin_lat1 * cos_d + cos_lat1 * sin_d * cos_br)
+            lon2 = lon1 + np.arctan2(sin_br * sin_d * cos_lat1,
+                                     cos_d - sin_lat1 * np.sin(lat2))
+            h = dem.sample(np.degrees(lat2), (np.degrees(lon2) + 540.0) % 360.0 - 180.0)
+            a = np.arctan((h - eye_col) / d - d / r_eff2)
+            a = np.where(np.isfinite(h), a, -np.inf)
+            for n, march in enumerate(marches):
+                march.push_block(a[n], h[n])
+            i = j
+        if progress is not None and (i % report_every == 0 or i == n_steps_total):
+            progress(i / n_steps_total)
+        if i in cp_steps:
+            checkpoint(_finish(), i / n_steps_total)
+
+    return _finish()
 
 
 # ---------------------------------------------------------------------------
@@ -39,6 +39,7 @@ systemd-run --user --unit=enrich-terrain \
   --setenv=TERRAIN_DTM_PATH_CUZK="${TERRAIN_DTM_PATH_CUZK:-}" \
   --setenv=TERRAIN_ATTRIBUTION_CUZK="${TERRAIN_ATTRIBUTION_CUZK:-}" \
   --setenv=TERRAIN_REQUIRED_GB="${TERRAIN_REQUIRED_GB:-2}" \
+  --setenv=TERRAIN_DEM_CACHE_MB="${TERRAIN_DEM_CACHE_MB:-768}" \
   "$VENV_PY" -m remoulade worker --threads 1
 
 echo "enrich-terrain unit started (MemoryHigh=$MEM_HIGH, MemoryMax=$MEM_MAX)"
@@ -305,3 +305,142 @@ def test_checkpoint_partials_are_prefixes_of_the_final():
     assert grown.any(), "the far peak should appear only in the final"
     assert float(np.nanmin(final.depth[grown])) > 10_000.0
     assert part.meta()["width"] == final.meta()["width"]
+
+
+def test_elev_fit_crop_equals_direct_render_of_the_window():
+    """The window fitted to the march's own horizon crops the provisional
+    grid to exactly what a render of that window gives — also when the
+    window cuts through terrain (events reaching into the crop from above)."""
+    dem = flat_dem(radius_m=40_000.0, base_elev=0.0)
+    add_peak(dem, 90.0, 22_000.0, 900.0)
+    add_peak(dem, 250.0, 9_000.0, 300.0, sigma_m=1500.0)
+    kw = dict(observer_elevation_m=30.0, az_step_deg=0.5, elev_step_deg=0.05,
+              max_distance_m=30_000.0)
+    seen = []
+
+    def policy(top, near):
+        seen.append((top, near))
+        return near - 0.5, top + 1.5
+
+    for fit in (policy, lambda top, near: (-0.73, 0.41)):
+        pano = render(dem, LAT0, LON0, elev_min_deg=-10.0, elev_max_deg=25.0,
+                      elev_fit=fit, **kw)
+        step = kw["elev_step_deg"]
+        top_edge = float(pano.elev_angles[0]) + step / 2
+        n = len(pano.elev_angles)
+        direct = render(dem, LAT0, LON0, elev_max_deg=top_edge,
+                        elev_min_deg=top_edge - n * step, **kw)
+        np.testing.assert_allclose(pano.elev_angles, direct.elev_angles, atol=1e-9)
+        assert encode_depth_u16(pano.depth) == encode_depth_u16(direct.depth)
+        np.testing.assert_array_equal(pano.surface_elev, direct.surface_elev)
+    (top, near), = seen
+    # the 900 m peak at 22 km tops the horizon; the flat ground's foreground
+    # ends a little below the eye-level horizon
+    assert 1.0 < top < 2.5 and pano.params["horizon_deg"] == round(top, 2)
+    assert -10.0 < near < 0.0
+    assert np.isfinite(pano.depth[0]).any()   # the tight crop starts in terrain
+
+
+def _finish_reference(ang, elv, dists, pix_rad):
+    """The original per-column searchsorted loop, kept as the oracle for
+    HorizonMarch.resolve: ang/elv are the full (steps, cols) march samples."""
+    k, n_az = ang.shape
+    horizon = np.maximum.accumulate(ang, axis=0)
+    depth = np.full((len(pix_rad), n_az), np.nan, dtype=np.float32)
+    surf = np.full((len(pix_rad), n_az), np.nan, dtype=np.float32)
+    for j in range(n_az):
+        idx = np.searchsorted(horizon[:, j], pix_rad)
+        vis = idx < k
+        ii = idx[vis]
+        depth[vis, j] = dists[ii]
+        surf[vis, j] = elv[ii, j]
+    return depth, surf
+
+
+def test_horizon_march_byte_identical_to_per_column_loop(monkeypatch):
+    """Ridge + hidden peak + flat ground + a nodata hole over the full circle,
+    partials included: the event resolve must give the same depth bytes and
+    surface elevations as the per-column loop over the full sample arrays."""
+    import renderer
+
+    class Recording(renderer.HorizonMarch):
+        def __init__(self, dists, pix_rad, n_az, *near):
+            super().__init__(dists, pix_rad, n_az, *near)
+            self.ang, self.elv, self.pix_rad = [], [], pix_rad
+
+        def push_block(self, ang, elv):
+            self.ang.extend(ang.astype(np.float32))
+            self.elv.extend(elv)
+            super().push_block(ang, elv)
+
+        def resolve(self, *crop):
+            out = super().resolve(*crop)
+            ref = _finish_reference(np.array(self.ang), np.array(self.elv),
+                                    self.dists, self.pix_rad)
+            assert encode_depth_u16(out[0]) == encode_depth_u16(ref[0])
+            np.testing.assert_array_equal(out[0], ref[0])
+            np.testing.assert_array_equal(out[1], ref[1])
+            checked.append(np.isfinite(out[0]).mean())
+            return out
+
+    checked = []
+    monkeypatch.setattr(renderer, "HorizonMarch", Recording)
+    dem = flat_dem(radius_m=40_000.0, base_elev=0.0)
+    add_peak(dem, 10.0, 8_000.0, 400.0, sigma_m=1500.0)
+    add_peak(dem, 12.0, 20_000.0, 900.0)
+    add_peak(dem, 200.0, 15_000.0, 600.0, sigma_m=3000.0)
+    dem.elev[150:170, 300:330] = np.nan
+    render(dem, LAT0, LON0, observer_elevation_m=30.0, az_step_deg=0.1,
+           elev_min_deg=-3.0, elev_max_deg=4.0, elev_step_deg=0.05,
+           max_distance_m=35_000.0, checkpoint=lambda p, f: None,
+           checkpoint_distances_m=(10_000.0, 25_000.0))
+    assert len(checked) == 3                          # 2 partials + final
+    assert all(0.0 < c < 1.0 for c in checked)        # terrain and sky both present
+
+
+def test_render_many_matches_single_renders():
+    """The batch shares step tables and DEM sampling, not results: each
+    panorama equals render() from that viewpoint on the same schedule,
+    grounded observers included."""
+    from renderer import render_many
+    dem = flat_dem(radius_m=40_000.0, base_elev=100.0)
+    add_peak(dem, 10.0, 8_000.0, 400.0, sigma_m=1500.0)
+    add_peak(dem, 200.0, 15_000.0, 600.0, sigma_m=3000.0)
+    kw = dict(az_step_deg=0.2, elev_min_deg=-3.0, elev_max_deg=4.0,
+              elev_step_deg=0.05, max_distance_m=30_000.0, min_step_m=80.0)
+    vps = [(LAT0, LON0, 130.0), (LAT0 + 0.003, LON0 + 0.002, None),
+           (LAT0 - 0.002, LON0 + 0.004)]
+    many = render_many(dem, vps, **kw)
+    assert len(many) == 3
+    for v, pano in zip(vps, many):
+        one = render(dem, v[0], v[1],
+                     observer_elevation_m=v[2] if len(v) > 2 else None, **kw)
+        assert (pano.lat, pano.lon) == (v[0], v[1])
+        assert pano.eye_elevation_m == one.eye_elevation_m
+        assert pano.params["eye_source"] == one.params["eye_source"]
+        assert encode_depth_u16(pano.depth) == encode_depth_u16(one.depth)
+        np.testing.assert_array_equal(pano.surface_elev, one.surface_elev)
+    assert render_many(dem, [], **kw) == []
+
+
+def test_step_blocks_match_step_by_step(monkeypatch):
+    """Narrow fans march several distance steps per numpy call; blocks end
+    on checkpoint steps, so partials and the final match one-step blocks."""
+    import renderer
+    dem = flat_dem(radius_m=40_000.0, base_elev=0.0)
+    add_peak(dem, 90.0, 22_000.0, 900.0)
+    dem.elev[180:190, 250:260] = np.nan
+    kw = dict(observer_elevation_m=30.0, az_start=60, az_end=120, az_step_deg=0.5,
+              elev_min_deg=-2.0, elev_max_deg=3.0, elev_step_deg=0.05,
+              max_distance_m=30_000.0, checkpoint_distances_m=(10_000.0,))
+    runs = []
+    for block in (1, renderer.SAMPLE_BLOCK):
+        monkeypatch.setattr(renderer, "SAMPLE_BLOCK", block)
+        parts = []
+        final = render(dem, LAT0, LON0, checkpoint=lambda p, f: parts.append((p, f)),
+                       **kw)
+        runs.append(parts + [(final, 1.0)])
+    for (a, fa), (b, fb) in zip(*runs):
+        assert fa == fb
+        assert encode_depth_u16(a.depth) == encode_depth_u16(b.depth)
+        np.testing.assert_array_equal(a.surface_elev, b.surface_elev)
@@ -38,3 +38,155 @@ def test_load_stack_all_layers_out_of_coverage_raises(tmp_path):
     _write_tif(far, 40.0, 5.0)
     with pytest.raises(RuntimeError, match="no DEM layer covers"):
         worker._load_stack(renderer, str(far), LAT0, LON0, 1000.0)
+
+
+def _write_ramp(path, n=300, cell=0.0005, offset=0.0):
+    """Non-constant fixture (value encodes row/col) with a nodata hole, so a
+    mis-stitched tile boundary or dropped mask would show."""
+    from rasterio.transform import from_origin
+    data = (np.arange(n * n, dtype=np.float32).reshape(n, n) + offset)
+    data[10:14, 200:260] = -9999
+    with rasterio.open(str(path), "w", driver="GTiff", width=n, height=n,
+                       count=1, dtype="float32", crs="EPSG:4326", nodata=-9999,
+                       transform=from_origin(LON0 - n / 2 * cell,
+                                             LAT0 + n / 2 * cell, cell, cell)) as d:
+        d.write(data, 1)
+
+
+def _same_grid(a, b):
+    np.testing.assert_array_equal(a.elev, b.elev)
+    assert (a.lat_top, a.lon_left, a.dlat, a.dlon) == \
+        pytest.approx((b.lat_top, b.lon_left, b.dlat, b.dlon), abs=1e-12)
+
+
+@pytest.mark.parametrize("lat,lon", [(LAT0, LON0), (LAT0 + 0.06, LON0 - 0.05)])
+def test_dem_cache_matches_uncached_read_and_hits(tmp_path, lat, lon):
+    p = tmp_path / "ramp.tif"
+    _write_ramp(p)
+    cache = renderer.DemTileCache(64 * 2**20, tile_px=64)
+    ref = renderer.load_geotiff_window(str(p), lat, lon, 3000.0)
+    _same_grid(cache.load_window(str(p), lat, lon, 3000.0), ref)
+    misses = cache.stats()["misses"]
+    assert misses > 1 and cache.stats()["hits"] == 0
+    _same_grid(cache.load_window(str(p), lat, lon, 3000.0), ref)
+    s = cache.stats()
+    assert s["misses"] == misses and s["hits"] == misses
+
+
+def test_dem_cache_evicts_to_budget(tmp_path):
+    p = tmp_path / "ramp.tif"
+    _write_ramp(p)
+    tile_bytes = 64 * 64 * 4
+    cache = renderer.DemTileCache(4 * tile_bytes, tile_px=64)
+    cache.load_window(str(p), LAT0, LON0, 5000.0)
+    s = cache.stats()
+    assert s["bytes"] <= 4 * tile_bytes and s["evictions"] > 0
+
+
+def test_dem_cache_sees_replaced_file(tmp_path):
+    p = tmp_path / "ramp.tif"
+    _write_ramp(p)
+    cache = renderer.DemTileCache(64 * 2**20, tile_px=64)
+    before = cache.load_window(str(p), LAT0, LON0, 2000.0)
+    new = tmp_path / "ramp.new.tif"
+    _write_ramp(new, offset=1000.0)
+    import os
+    os.replace(new, p)
+    after = cache.load_window(str(p), LAT0, LON0, 2000.0)
+    np.testing.assert_array_equal(after.elev, before.elev + 1000.0)
+
+
+def test_dem_cache_raster_metadata_is_bounded(tmp_path):
+    cache = renderer.DemTileCache(64 * 2**20, tile_px=64, max_rasters=2)
+    paths = []
+    for i in range(3):
+        paths.append(tmp_path / f"ramp{i}.tif")
+        _write_ramp(paths[-1], offset=i)
+        cache.load_window(str(paths[-1]), LAT0, LON0, 1000.0)
+    assert list(cache._info) == [str(paths[1]), str(paths[2])]
+    # a replaced file supersedes its old entry instead of adding one
+    new = tmp_path / "ramp.new.tif"
+    _write_ramp(new, offset=1000.0)
+    import os
+    os.replace(new, paths[2])
+    cache.load_window(str(paths[2]), LAT0, LON0, 1000.0)
+    assert len(cache._info) == 2
+    assert cache._info[str(paths[2])][0][1] == os.stat(paths[2]).st_mtime_ns
+
+
+def test_dem_cache_log_is_per_job(tmp_path, monkeypatch, capsys):
+    p = tmp_path / "ramp.tif"
+    _write_ramp(p)
+    cache = renderer.DemTileCache(64 * 2**20, tile_px=64)
+    monkeypatch.setattr(worker, "_dem_cache", cache)
+    cache.load_window(str(p), LAT0, LON0, 3000.0)           # an earlier job
+    before = cache.stats()
+    cache.load_window(str(p), LAT0, LON0, 3000.0)
+    worker._log_dem_cache(before)
+    assert f"{before['misses']} hits / 0 misses / 0 evictions this job" \
+        in capsys.readouterr().out
+
+
+def test_dem_cache_disabled_falls_back(tmp_path):
+    p = tmp_path / "ramp.tif"
+    _write_ramp(p)
+    cache = renderer.DemTileCache(0)
+    _same_grid(cache.load_window(str(p), LAT0, LON0, 2000.0),
+               renderer.load_geotiff_window(str(p), LAT0, LON0, 2000.0))
+    assert cache.stats()["misses"] == 0
+
+
+def test_sequence_batches_split_on_spread_and_size():
+    step = 0.002                                  # ≈ 222 m of latitude
+    items = [{"lat": LAT0 + i * step, "lon": LON0} for i in range(7)]
+    items.append({"lat": LAT0 + 0.1, "lon": LON0})  # a jump: new batch
+    batches = worker._sequence_batches(items, spread_m=1000.0, size=3)
+    assert [len(b) for b in batches] == [3, 3, 1, 1]
+    assert [it for b in batches for it in b] == items   # shot order kept
+    assert len(worker._sequence_batches(items[:5], spread_m=500.0, size=10)) == 2
+
+
+def test_render_batch_per_item_results(tmp_path, monkeypatch):
+    pytest.importorskip("PIL")
+    dsm = tmp_path / "dsm.tif"
+    _write_tif(dsm, LAT0, LON0, n=201, cell=0.0005, value=250.0)
+    monkeypatch.setattr(worker, "DSM_PATH", str(dsm))
+    monkeypatch.setattr(worker, "DTM_PATH", "")
+    items = [{"lat": LAT0, "lon": LON0},
+             {"lat": LAT0 + 0.002, "lon": LON0 + 0.001, "gps_altitude_m": 400.0},
+             {"lat": LAT0 + 0.06, "lon": LON0}]        # past the DEM edge: fails alone
+    outs = worker._render_batch(items, {"max_distance_m": 3000.0,
+                                        "az_step_deg": 1.0, "elev_step_deg": 0.25})
+    assert isinstance(outs[2], RuntimeError)
+    for it, out in zip(items[:2], outs[:2]):
+        meta, depth, preview = out
+        assert (meta["lat"], meta["lon"]) == (it["lat"], it["lon"])
+        assert meta["batch"] == 3 and meta["elev_fit"].startswith("auto")
+        assert len(depth) == 2 * meta["width"] * meta["height"]
+        assert preview[:2] == b"\xff\xd8"
+    assert outs[0][0]["eye_elevation_m"] == pytest.approx(252.0)
+    assert outs[1][0]["eye_source"] != outs[0][0]["eye_source"]
+
+
+def test_render_marches_once_and_fits_its_own_horizon(tmp_path, monkeypatch):
+    pytest.importorskip("PIL")
+    dsm = tmp_path / "dsm.tif"
+    _write_tif(dsm, LAT0, LON0, n=201, cell=0.0005, value=250.0)
+    monkeypatch.setattr(worker, "DSM_PATH", str(dsm))
+    monkeypatch.setattr(worker, "DTM_PATH", "")
+    marches = []
+    real = renderer.render_many
+    monkeypatch.setattr(renderer, "render_many",
+                        lambda *a, **kw: marches.append(kw) or real(*a, **kw))
+    meta, _, _ = worker._render(LAT0, LON0, {"max_distance_m": 3000.0,
+                                             "az_step_deg": 1.0})
+    assert len(marches) == 1                 # no separate probe march
+    assert (marches[0]["elev_min_deg"], marches[0]["elev_max_deg"]) == worker.FIT_GRID_DEG
+    # flat ground just below eye level: top = horizon + 1.5°, and the
+    # near-field foreground is trimmed off the bottom
+    assert meta["elev_fit"].startswith("auto (")
+    assert meta["elev_max_deg"] == pytest.approx(meta["horizon_deg"] + 1.5, abs=0.025)
+    assert meta["elev_min_deg"] == pytest.approx(-1.0, abs=0.025)
+    pinned, _, _ = worker._render(LAT0, LON0, {"max_distance_m": 3000.0,
+                                               "az_step_deg": 1.0, "elev_max_deg": 5.0})
+    assert pinned["elev_fit"] == "explicit" and len(marches) == 2
\ No newline at end of file
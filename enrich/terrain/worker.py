@@ -19,6 +19,13 @@ Environment:
                        OBSERVER (standing on a DSM means standing on canopy)
     TERRAIN_GEOID_OFFSET_M  ellipsoidal→orthometric offset for GPS altitude
                        plausibility (default 44.5, the CZ undulation)
+    TERRAIN_DEM_CACHE_MB    budget of the in-process decoded-DEM tile cache
+                       shared across jobs (default 768; 0 disables it)
+    TERRAIN_SEQUENCE_BATCH  viewpoints rendered per shared march in a
+                       render_sequence job (default 4 — each panorama's
+                       buffers stay resident until the batch posts)
+    TERRAIN_SEQUENCE_SPREAD_M  max distance between viewpoints of one batch
+                       (default 1000 — the DEM window grows by it)
     RABBITMQ_URL       default enrich:enrich@127.0.0.1:5672
     TERRAIN_CALLBACK_URL    where results are POSTed
                        (default http://127.0.0.1:8070/api/terrain/result)
@@ -72,6 +79,21 @@ ATTRIBUTION = os.getenv("TERRAIN_ATTRIBUTION", "")
 AUTO_CUZK_FETCH = os.getenv("TERRAIN_AUTO_CUZK_FETCH", "")
 AUTO_CUZK_RADIUS_M = float(os.getenv("TERRAIN_AUTO_CUZK_RADIUS_M", "5000"))
 CUZK_DSM_VRT = os.getenv("TERRAIN_CUZK_DSM_VRT", "/dem/cuzk/dsm10.vrt")
+DEM_CACHE_MB = float(os.getenv("TERRAIN_DEM_CACHE_MB", "768"))
+SEQUENCE_BATCH = int(os.getenv("TERRAIN_SEQUENCE_BATCH", "4"))
+SEQUENCE_SPREAD_M = float(os.getenv("TERRAIN_SEQUENCE_SPREAD_M", "1000"))
+
+# decoded DEM tiles, shared by every job this process runs (created lazily:
+# renderer is imported inside the job functions)
+_dem_cache = None
+
+
+def dem_cache():
+    global _dem_cache
+    if _dem_cache is None:
+        import renderer
+        _dem_cache = renderer.DemTileCache(int(DEM_CACHE_MB * 2**20))
+    return _dem_cache
 
 broker = RabbitmqBroker(url=f"amqp://{RABBITMQ_URL}?timeout=15", confirm_delivery=True)
 remoulade.set_broker(broker)
@@ -118,15 +140,19 @@ def _parse_layers(spec: str) -> list[tuple[str, float | None]]:
     return out
 
 
-def _load_stack(renderer, spec: str, lat: float, lon: float, radius_m: float):
+def _load_stack(renderer, spec: str, lat: float, lon: float, radius_m: float,
+                spread_m: float = 0.0):
     # a ring that doesn't reach this viewpoint (ČÚZK covers a bbox, GLO-30
     # the country + margin) is SKIPPED, not fatal — first-finite-wins falls
-    # through to the next layer, which is the whole point of the ring design
+    # through to the next layer, which is the whole point of the ring design.
+    # spread_m widens every ring for a batch of viewpoints around (lat, lon),
+    # so each of them still gets its full ring radius.
     grids, skipped = [], []
+    cache = dem_cache()
     for p, cap in _parse_layers(spec):
         try:
-            grids.append(renderer.load_geotiff_window(
-                p, lat, lon, min(radius_m, cap) if cap else radius_m))
+            grids.append(cache.load_window(
+                p, lat, lon, (min(radius_m, cap) if cap else radius_m) + spread_m))
         except renderer.DemCoverageError:
             skipped.append(p)
     if not grids:
@@ -222,86 +248,193 @@ def _ensure_glo30_coverage(lat: float, lon: float, radius_m: float) -> None:
         print(f"terrain: glo30 VRT refreshed (+{new} tiles)", flush=True)
 
 
-def _render(lat: float, lon: float, params: dict, progress=None, checkpoint=None):
-    import math
-
-    import numpy as np
-    import renderer
+def _render_setup(params: dict):
+    """Client params → (kwargs for render(), gps hint, stack tuple). Shared by
+    single renders and sequence batches."""
     params = dict(params or {})
-    dsm_path, dtm_path, attribution, stack = _resolve_stack(params)
-    if not dsm_path:
+    stack = _resolve_stack(params)
+    if not stack[0]:
         raise RuntimeError("TERRAIN_DSM_PATH not set (see enrich/terrain/README.md)")
-    gps_alt, gps_datum = params.pop("gps_altitude_m", None), params.pop("gps_datum", "auto")
+    gps = (params.pop("gps_altitude_m", None), params.pop("gps_datum", "auto"))
     kwargs = {k: v for k, v in params.items() if k in RENDER_KEYS}
     # worker default grid: 2× the renderer's 0.05° in both axes — combined
     # with elevation auto-fit and pie-limited sweeps the pixels go where the
     # view is, so the finer default stays affordable
     kwargs.setdefault("az_step_deg", 0.025)
     kwargs.setdefault("elev_step_deg", 0.025)
+    return kwargs, gps, stack
+
+
+def _ground_eye(renderer, gdem, lat: float, lon: float, kwargs: dict,
+                gps: tuple) -> tuple[float, float, str]:
+    """Refinement #1+2: ground the observer on bare earth, resolve GPS hints.
+    → (ground_m, eye_m, eye_source)."""
+    import math
+
+    import numpy as np
+    ground = float(gdem.sample(np.array([lat]), np.array([lon]))[0])
+    if not math.isfinite(ground):
+        raise RuntimeError("viewpoint outside the DEM / on nodata")
+    if "observer_elevation_m" in kwargs:
+        return ground, float(kwargs["observer_elevation_m"]), "explicit"
+    eye, eye_source = renderer.resolve_eye_elevation(
+        ground, observer_height_m=float(kwargs.get("observer_height_m", 2.0)),
+        gps_altitude_m=gps[0], gps_datum=gps[1],
+        geoid_offset_m=GEOID_OFFSET_M)
+    return ground, eye, eye_source
+
+
+# the provisional grid a fitted render marches on: the widest window a fit
+# can return (the old probe's −10..+25° plus the sky headroom)
+FIT_GRID_DEG = (-10.0, 26.5)
+FIT_MAX_ROWS = 4000.0
+
+
+def _fit_elevation(kwargs: dict):
+    """Auto-fit the elevation window when the caller didn't pin one: the
+    static default (−8..+12°) wastes most rows on empty sky from lowland
+    viewpoints. The render marches the provisional FIT_GRID_DEG window and
+    crops it to the fit of its own horizon (renderer elev_fit) — one march
+    per job, no separate probe. The top clamps to the highest horizon point
+    + margin (sky labels float above the skyline, so leave them headroom).
+    A batch shares one grid, so its window is the union over its
+    viewpoints. Mutates kwargs → the elev_fit callable, None if explicit."""
+    if "elev_max_deg" in kwargs or "elev_min_deg" in kwargs:
+        return None
+    kwargs["elev_min_deg"], kwargs["elev_max_deg"] = FIT_GRID_DEG
+    step = float(kwargs["elev_step_deg"])
+
+    def fit(top_elev: float | None, near_elev: float | None) -> tuple[float, float]:
+        hi = max((top_elev or 0.0) + 1.5, 1.0)
+        # bottom fit: trim the featureless foreground (rows where every
+        # column is nearer than 300 m — grass at your feet) too
+        lo = -8.0 if near_elev is None else max(min(-1.0, near_elev - 0.5), -10.0)
+        # row budget: fine sector steps × a tall fitted window would blow
+        # past mobile GPU texture limits (seen: 7500 rows at 0.0025°). Keep
+        # the skyline, crop the foreground.
+        if (hi - lo) / step > FIT_MAX_ROWS:
+            lo = hi - FIT_MAX_ROWS * step
+        return lo, hi
+    return fit
+
+
+def _fit_label(pano, fit) -> str:
+    """meta.elev_fit provenance: the window a render ended up with."""
+    if fit is None:
+        return "explicit"
+    step = float(pano.params["elev_step_deg"])
+    lo = float(pano.elev_angles[-1]) - step / 2
+    hi = float(pano.elev_angles[0]) + step / 2
+    return (f"auto ({lo:.1f}..{hi:.1f}°, "
+            f"horizon {pano.params.get('horizon_deg', 0.0):.2f}°)")
+
+
+def _log_dem_cache(before: dict) -> None:
+    """This job's hits/misses/evictions (the cache's counters are process-wide
+    and cumulative), plus the cache's current fill."""
+    cs = dem_cache().stats()
+    d = {k: cs[k] - before[k] for k in ("hits", "misses", "evictions")}
+    print(f"  dem cache: {d['hits']} hits / {d['misses']} misses / "
+          f"{d['evictions']} evictions this job, "
+          f"{cs['bytes'] / 2**20:.0f}/{cs['budget_bytes'] / 2**20:.0f} MB", flush=True)
+
+
+def _render(lat: float, lon: float, params: dict, progress=None, checkpoint=None):
+    import renderer
+    kwargs, gps, (dsm_path, dtm_path, attribution, stack) = _render_setup(params)
+    cache_before = dem_cache().stats()
     max_d = float(kwargs.get("max_distance_m", 100_000.0))
     _ensure_glo30_coverage(lat, lon, max_d * 1.05)
     dem = _load_stack(renderer, dsm_path, lat, lon, max_d * 1.05)
 
-    # refinement #1+2: ground the observer on bare earth, resolve GPS hints
     ground_src = "dtm" if dtm_path else "dsm"
     gdem = _load_stack(renderer, dtm_path, lat, lon, 500.0) if dtm_path else dem
-    ground = float(gdem.sample(np.array([lat]), np.array([lon]))[0])
-    if not math.isfinite(ground):
-        raise RuntimeError("viewpoint outside the DEM / on nodata")
-    if "observer_elevation_m" not in kwargs:
-        eye, eye_source = renderer.resolve_eye_elevation(
-            ground, observer_height_m=float(kwargs.get("observer_height_m", 2.0)),
-            gps_altitude_m=gps_alt, gps_datum=gps_datum,
-            geoid_offset_m=GEOID_OFFSET_M)
-        kwargs["observer_elevation_m"] = eye
-    else:
-        eye_source = "explicit"
-
-    # Auto-fit the elevation window when the caller didn't pin one: the
-    # static default (−8..+12°) wastes most rows on empty sky from lowland
-    # viewpoints. A coarse probe (1° azimuth grid ≈ 5% of the render cost)
-    # finds the highest horizon point; the top clamps to it + margin (sky
-    # labels float above the skyline, so leave them headroom).
-    elev_fit = "explicit"
-    if "elev_max_deg" not in kwargs and "elev_min_deg" not in kwargs:
-        probe_kwargs = {k: kwargs[k] for k in
-                        ("observer_elevation_m", "max_distance_m",
-                         "min_distance_m", "rel_step", "refraction_k")
-                        if k in kwargs}
-        probe = renderer.render(dem, lat, lon, az_step_deg=1.0,
-                                elev_step_deg=0.25, elev_min_deg=-10.0,
-                                elev_max_deg=25.0, **probe_kwargs)
-        rows = np.nonzero(np.isfinite(probe.depth).any(axis=1))[0]
-        top_elev = float(probe.elev_angles[rows[0]]) if rows.size else 0.0
-        kwargs["elev_max_deg"] = max(top_elev + 1.5, 1.0)
-        # bottom fit: rows where EVERY column is nearer than 300 m are
-        # featureless foreground (grass at your feet) — trim them too
-        far_per_row = np.where(np.isfinite(probe.depth), probe.depth, 0.0).max(axis=1)
-        far_rows = np.nonzero(far_per_row >= 300.0)[0]
-        if far_rows.size:
-            bottom_elev = float(probe.elev_angles[far_rows[-1]])
-            kwargs["elev_min_deg"] = max(min(-1.0, bottom_elev - 0.5), -10.0)
-        # row budget: fine sector steps × a tall fitted window would blow past
-        # mobile GPU texture limits (seen: 7500 rows at 0.0025°). Keep the
-        # skyline, crop the foreground.
-        MAX_ROWS = 4000.0
-        step = float(kwargs["elev_step_deg"])
-        lo = kwargs.get("elev_min_deg", -8.0)
-        if (kwargs["elev_max_deg"] - lo) / step > MAX_ROWS:
-            kwargs["elev_min_deg"] = kwargs["elev_max_deg"] - MAX_ROWS * step
-        elev_fit = (f"auto ({kwargs.get('elev_min_deg', -8.0):.1f}"
-                    f"..{kwargs['elev_max_deg']:.1f}°, horizon {top_elev:.2f}°)")
+    ground, eye, eye_source = _ground_eye(renderer, gdem, lat, lon, kwargs, gps)
+    kwargs["observer_elevation_m"] = eye
+    fit = _fit_elevation(kwargs)
 
     pano = renderer.render(dem, lat, lon, progress=progress, checkpoint=checkpoint,
-                           **kwargs)
+                           elev_fit=fit, **kwargs)
+    _log_dem_cache(cache_before)
     pano.params.update({"eye_source": eye_source, "dsm_stack": stack,
-                        "elev_fit": elev_fit,
+                        "elev_fit": _fit_label(pano, fit),
                         "ground_m": round(ground, 2), "ground_source": ground_src})
     if attribution:
         pano.params["attribution"] = attribution
     return pano.meta(), renderer.encode_depth_u16(pano.depth), _preview_jpeg(pano)
 
 
+def _sequence_batches(items: list[dict], spread_m: float = SEQUENCE_SPREAD_M,
+                      size: int = SEQUENCE_BATCH) -> list[list[dict]]:
+    """Cut a sequence (in shot order) into render batches: consecutive items
+    within spread_m of the batch's first viewpoint, at most `size` each. A
+    hike thus renders a few neighbouring viewpoints per shared march."""
+    batches: list[list[dict]] = []
+    for it in items:
+        b = batches[-1] if batches else None
+        if (b is not None and len(b) < size
+                and _distance_m(b[0], it) <= spread_m):
+            b.append(it)
+        else:
+            batches.append([it])
+    return batches
+
+
+def _distance_m(a: dict, b: dict) -> float:
+    import math
+
+    import renderer
+    dlat = math.radians(float(b["lat"]) - float(a["lat"]))
+    dlon = math.radians(float(b["lon"]) - float(a["lon"]))
+    x = dlon * math.cos(math.radians((float(a["lat"]) + float(b["lat"])) / 2))
+    return renderer.R_EARTH_M * math.hypot(x, dlat)
+
+
+def _render_batch(items: list[dict], params: dict, progress=None) -> list:
+    """Render one batch of a sequence on a shared grid and DEM window.
+    → per item (meta, depth, preview) or the Exception that sank it (a
+    viewpoint off the DEM fails alone; the rest of the batch renders)."""
+    import renderer
+    kwargs, _, (dsm_path, dtm_path, attribution, stack) = _render_setup(params)
+    cache_before = dem_cache().stats()
+    lat = sum(float(it["lat"]) for it in items) / len(items)
+    lon = sum(float(it["lon"]) for it in items) / len(items)
+    spread = max(_distance_m({"lat": lat, "lon": lon}, it) for it in items)
+    max_d = float(kwargs.get("max_distance_m", 100_000.0))
+    _ensure_glo30_coverage(lat, lon, max_d * 1.05 + spread)
+    dem = _load_stack(renderer, dsm_path, lat, lon, max_d * 1.05, spread_m=spread)
+    ground_src = "dtm" if dtm_path else "dsm"
+    gdem = (_load_stack(renderer, dtm_path, lat, lon, 500.0, spread_m=spread)
+            if dtm_path else dem)
+
+    out: list = [None] * len(items)
+    ok, grounds = [], {}
+    for n, it in enumerate(items):
+        gps = (it.get("gps_altitude_m"), it.get("gps_datum", "auto"))
+        try:
+            grounds[n] = _ground_eye(renderer, gdem, float(it["lat"]),
+                                     float(it["lon"]), kwargs, gps)
+            ok.append(n)
+        except Exception as e:  # noqa: BLE001 — one bad viewpoint, not the batch
+            out[n] = e
+    if not ok:
+        return out
+    vps = [(float(items[n]["lat"]), float(items[n]["lon"]), grounds[n][1]) for n in ok]
+    kwargs.pop("observer_elevation_m", None)
+    fit = _fit_elevation(kwargs)
+    panos = renderer.render_many(dem, vps, progress=progress, elev_fit=fit, **kwargs)
+    _log_dem_cache(cache_before)
+    for n, pano in zip(ok, panos):
+        ground, _, eye_source = grounds[n]
+        pano.params.update({"eye_source": eye_source, "dsm_stack": stack,
+                            "elev_fit": _fit_label(pano, fit), "batch": len(items),
+                            "ground_m": round(ground, 2), "ground_source": ground_src})
+        if attribution:
+            pano.params["attribution"] = attribution
+        out[n] = (pano.meta(), renderer.encode_depth_u16(pano.depth), _preview_jpeg(pano))
+    return out
+
+
 def _preview_jpeg(pano) -> bytes:
     import renderer
     from PIL import Image
@@ -350,13 +483,39 @@ def _ensure_cuzk_coverage(lat: float, lon: float, notify=None) -> None:
               f"rendering from the coarser rings", flush=True)
 
 
+def _maybe_fetch_cuzk(params: dict, lat: float, lon: float, notify=None) -> None:
+    # on-demand ČÚZK: no dsm_stack means the default stack — fetch only
+    # when that default IS the promoted ČÚZK composite
+    wants_cuzk = (params.get("dsm_stack") == "cuzk"
+                  or (params.get("dsm_stack") is None and "cuzk" in DSM_PATH))
+    if AUTO_CUZK_FETCH and wants_cuzk and not _cuzk_covered(lat, lon):
+        _ensure_cuzk_coverage(lat, lon, notify=notify)
+
+
+def _artifact_files(depth: bytes | None, preview: bytes | None) -> dict:
+    files = {}
+    if depth is not None:
+        files["depth"] = ("depth.bin", depth, "application/octet-stream")
+    if preview is not None:
+        files["preview"] = ("preview.jpg", preview, "image/jpeg")
+    return files
+
+
+def _post_callback(result: dict, files: dict | None = None,
+                   timeout: float = 120) -> None:
+    import requests
+    requests.post(CALLBACK_URL,
+                  data={"result_json": json.dumps(result)},
+                  files=files or None,
+                  headers={"X-Worker-Token": WORKER_TOKEN},
+                  timeout=timeout)
+
+
 # time limit fits a worst-case render PLUS a first on-demand ČÚZK build
 # (download + pdal rasterize of ~30 sheets)
 @remoulade.actor(queue_name="terrain", time_limit=60 * 60 * 1000, max_retries=1)
 def render_panorama(payload: dict) -> None:
     import time
-
-    import requests
     rid = payload["result_id"]
     print(f"render_panorama {rid} @ ({payload.get('lat')}, {payload.get('lon')})…",
           flush=True)
@@ -370,13 +529,9 @@ def render_panorama(payload: dict) -> None:
     last_progress_post = 0.0
 
     def _post_rendering(meta: dict, files: dict | None) -> None:
-        requests.post(CALLBACK_URL,
-                      data={"result_json": json.dumps({
-                          "result_id": rid, "status": "rendering",
-                          "worker": socket.gethostname(), "meta": meta})},
-                      files=files or None,
-                      headers={"X-Worker-Token": WORKER_TOKEN},
-                      timeout=30)
+        _post_callback({"result_id": rid, "status": "rendering",
+                        "worker": socket.gethostname(), "meta": meta},
+                       files, timeout=30)
 
     def post_progress(frac: float) -> None:
         nonlocal last_progress_post
@@ -415,19 +570,13 @@ def render_panorama(payload: dict) -> None:
     try:
         ram_gate()
         params = payload.get("params") or {}
-        # on-demand ČÚZK: no dsm_stack means the default stack — fetch only
-        # when that default IS the promoted ČÚZK composite
-        wants_cuzk = (params.get("dsm_stack") == "cuzk"
-                      or (params.get("dsm_stack") is None and "cuzk" in DSM_PATH))
-        if AUTO_CUZK_FETCH and wants_cuzk:
-            lat_f, lon_f = float(payload["lat"]), float(payload["lon"])
-            if not _cuzk_covered(lat_f, lon_f):
-                def _note(stage: str) -> None:
-                    try:
-                        _post_rendering({"stage": stage}, None)
-                    except Exception as e:
-                        print(f"  {rid}: stage post failed: {e}", flush=True)
-                _ensure_cuzk_coverage(lat_f, lon_f, notify=_note)
+
+        def _note(stage: str) -> None:
+            try:
+                _post_rendering({"stage": stage}, None)
+            except Exception as e:
+                print(f"  {rid}: stage post failed: {e}", flush=True)
+        _maybe_fetch_cuzk(params, float(payload["lat"]), float(payload["lon"]), _note)
         meta, depth, preview = _render(
             float(payload["lat"]), float(payload["lon"]), params,
             progress=post_progress, checkpoint=post_partial)
@@ -436,16 +585,74 @@ def render_panorama(payload: dict) -> None:
     except Exception as e:
         result.update({"status": "error", "error": f"{type(e).__name__}: {e}"})
         print(f"  {rid} FAILED: {e}", flush=True)
-    files = {}
-    if depth is not None:
-        files["depth"] = ("depth.bin", depth, "application/octet-stream")
-    if preview is not None:
-        files["preview"] = ("preview.jpg", preview, "image/jpeg")
-    requests.post(CALLBACK_URL,
-                  data={"result_json": json.dumps(result)},
-                  files=files or None,
-                  headers={"X-Worker-Token": WORKER_TOKEN},
-                  timeout=120)
-
+    _post_callback(result, _artifact_files(depth, preview))
+
+
+# A whole sequence (a hike) in one job: consecutive nearby viewpoints are
+# batched onto one shared march and DEM window (renderer.render_many); every
+# viewpoint still has its own terrain_renders row and gets its own progress
+# pings and final result on the usual callback. No retries: a retry would
+# re-render the batches that already posted.
+@remoulade.actor(queue_name="terrain", time_limit=6 * 60 * 60 * 1000, max_retries=0)
+def render_sequence(payload: dict) -> None:
+    """payload: {"params": {…shared grid/stack…}, "items": [{"result_id",
+    "lat", "lon", "gps_altitude_m"?, "gps_datum"?}, …]} in shot order."""
+    import time
+    items = payload.get("items") or []
+    params = payload.get("params") or {}
+    host = socket.gethostname()
+    batches = _sequence_batches(items)
+    print(f"render_sequence: {len(items)} viewpoint(s) in {len(batches)} batch(es)…",
+          flush=True)
+    for batch in batches:
+        rids = [it["result_id"] for it in batch]
+        last_progress_post = 0.0
+
+        def post_meta(meta: dict) -> None:
+            for rid in rids:
+                _post_callback({"result_id": rid, "status": "rendering",
+                                "worker": host, "meta": meta}, timeout=30)
+
+        def post_progress(frac: float) -> None:
+            nonlocal last_progress_post
+            now = time.monotonic()
+            if now - last_progress_post < 2.0:
+                return
+            last_progress_post = now
+            try:
+                post_meta({"progress_pct": int(frac * 100), "stage": None})
+            except Exception as e:
+                print(f"  {rids[0]}…: progress post failed: {e}", flush=True)
+
+        def _note(stage: str) -> None:
+            try:
+                post_meta({"stage": stage})
+            except Exception as e:
+                print(f"  {rids[0]}…: stage post failed: {e}", flush=True)
 
-remoulade.declare_actors([render_panorama])
+        try:
+            ram_gate()
+            for it in batch:
+                _maybe_fetch_cuzk(params, float(it["lat"]), float(it["lon"]), _note)
+            outs = _render_batch(batch, params, progress=post_progress)
+        except Exception as e:
+            outs = [e] * len(batch)
+        for rid, out in zip(rids, outs):
+            result = {"result_id": rid, "worker": host, "status": "done"}
+            files = None
+            if isinstance(out, Exception):
+                result.update({"status": "error",
+                               "error": f"{type(out).__name__}: {out}"})
+                print(f"  {rid} FAILED: {out}", flush=True)
+            else:
+                meta, depth, preview = out
+                result["meta"] = meta
+                files = _artifact_files(depth, preview)
+                print(f"  {rid}: {meta['width']}x{meta['height']}", flush=True)
+            try:
+                _post_callback(result, files)
+            except Exception as e:  # keep going: the rest of the hike still renders
+                print(f"  {rid}: result post failed: {e}", flush=True)
+
+
+remoulade.declare_actors([render_panorama, render_sequence])
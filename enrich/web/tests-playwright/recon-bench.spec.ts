@@ -320,9 +320,19 @@ test('renders the point cloud and its camera frusta', async ({ page }) => {
 		buf.writeUInt8(180, i * 15 + 13);
 		buf.writeUInt8(120, i * 15 + 14);
 	}
-	await page.route('**/cloud.bin*', async (route) =>
-		route.fulfill({ body: buf, contentType: 'application/octet-stream' })
+	// served as two LOD tiers, so the count also proves tier 1 streamed in after tier 0
+	const tiers = [300, N];
+	await page.route('**/cloud/lod*', async (route) =>
+		route.fulfill({ json: { n: N, stride: 15, tiers, dense: false } })
 	);
+	await page.route('**/cloud.bin*', async (route) => {
+		const k = Number(new URL(route.request().url()).searchParams.get('tier'));
+		const lo = k ? tiers[k - 1] : 0;
+		return route.fulfill({
+			body: buf.subarray(lo * 15, tiers[k] * 15),
+			contentType: 'application/octet-stream'
+		});
+	});
 	await page.route('**/recon/runs/*/cameras', async (route) =>
 		route.fulfill({
 			json: {
@@ -14,6 +14,7 @@ import { getSettings } from '../settings';
 import { get } from 'svelte/store';
 import { autoUploadLicense } from '../data.svelte';
 import { initSyncStatusListener, isSwAlive, createFgStatusReporter } from '../syncStatus';
+import { startProcessingStatusStream, stopProcessingStatusStream } from './processingStatusStream';
 
 const LOG_PREFIX = '🢄[PhotoSync]';
 const doLog = false;
@@ -86,23 +87,27 @@ export async function triggerPhotoSync(): Promise<void> {
     const authState = get(auth);
     if (!authState.is_authenticated) {
         console.log(`${LOG_PREFIX} Skipping sync — not authenticated`);
+        stopProcessingStatusStream();
         return;
     }
 
     const settings = await getSettings();
     if (!settings.auto_upload_enabled) {
         console.log(`${LOG_PREFIX} Skipping sync — auto_upload is disabled`);
+        stopProcessingStatusStream();
         return;
     }
 
     initSyncStatusListener(); // idempotent
 
-    // Sync processing → completed/failed before starting new uploads
+    // Sync processing → completed/failed before starting new uploads, then
+    // follow further changes on the status stream instead of polling
     try {
         await syncProcessingPhotosStatus(mainThreadAuthFetch);
     } catch (error) {
         console.warn(`${LOG_PREFIX} Processing status sync failed:`, error);
     }
+    startProcessingStatusStream();
 
     if (isBackgroundSyncSupported()) {
         try {
@@ -0,0 +1,112 @@
+// Processing status stream (GET /photos/status/stream).
+// Keeps one EventSource open while the user is signed in with auto-upload on,
+// and applies each server-pushed status change to the matching local photo, so
+// uploads leave 'processing' without the client polling POST /photos/status.
+// That endpoint remains the fallback: run once by triggerPhotoSync, and again
+// when the server says events we missed have been pruned ('resync').
+
+import { backendUrl } from '../config';
+import { createTokenManager } from '../tokenManagerFactory';
+import { mainThreadAuthFetch } from '../secureUpload';
+import { applyServerPhotoStatus, syncProcessingPhotosStatus, type ServerPhotoStatus } from '../uploadProtocol';
+import { browserPhotoStorage } from './photoStorage';
+
+const LOG_PREFIX = '🢄[StatusStream]';
+const RECONNECT_DELAY_MS = 5000;
+
+let eventSource: EventSource | null = null;
+let reconnectTimer: ReturnType<typeof setTimeout> | null = null;
+// Last event id seen; a reconnect with a fresh token resumes after it
+let lastEventId: string | null = null;
+let wanted = false;
+
+async function handleMessage(event: MessageEvent): Promise<void> {
+    if (event.lastEventId) {
+        lastEventId = event.lastEventId;
+    }
+    const data = JSON.parse(event.data);
+    if (data.type === 'resync') {
+        console.log(`${LOG_PREFIX} Missed events were pruned, re-reading statuses`);
+        await syncProcessingPhotosStatus(mainThreadAuthFetch);
+        return;
+    }
+    if (data.type !== 'status') {
+        return;
+    }
+    const status = data as ServerPhotoStatus;
+    const localPhoto = await browserPhotoStorage.getPhotoByServerPhotoId(status.id);
+    if (localPhoto?.status === 'processing') {
+        await applyServerPhotoStatus(localPhoto, status);
+    }
+}
+
+async function connect(): Promise<void> {
+    // EventSource can't send an Authorization header; fall back to the query
+    // token like the photo streams. A token that expires closes the stream
+    // (401), and we reconnect with a fresh one.
+    let token: string | null = null;
+    try {
+        token = await createTokenManager().getValidToken();
+    } catch (error) {
+        console.warn(`${LOG_PREFIX} No token, not connecting:`, error);
+    }
+    if (!token || !wanted || eventSource) {
+        return;
+    }
+
+    const url = new URL(`${backendUrl}/photos/status/stream`);
+    url.searchParams.set('token', token);
+    if (lastEventId) {
+        url.searchParams.set('after', lastEventId);
+    }
+
+    const source = new EventSource(url.toString());
+    eventSource = source;
+    source.onmessage = (event) => {
+        handleMessage(event).catch(error => {
+            console.warn(`${LOG_PREFIX} Failed to apply status event:`, error);
+        });
+    };
+    source.onerror = () => {
+        // CONNECTING: the browser retries by itself (sending Last-Event-ID).
+        // CLOSED: it gave up (e.g. expired token) — reopen with a new token.
+        if (source.readyState === EventSource.CLOSED) {
+            if (eventSource === source) {
+                eventSource = null;
+            }
+            scheduleReconnect();
+        }
+    };
+}
+
+function scheduleReconnect(): void {
+    if (!wanted || reconnectTimer) {
+        return;
+    }
+    reconnectTimer = setTimeout(() => {
+        reconnectTimer = null;
+        connect().catch(error => console.warn(`${LOG_PREFIX} Reconnect failed:`, error));
+    }, RECONNECT_DELAY_MS);
+}
+
+/** Open the stream unless it's already open (idempotent). */
+export function startProcessingStatusStream(): void {
+    if (typeof EventSource === 'undefined') {
+        return;
+    }
+    wanted = true;
+    if (!eventSource && !reconnectTimer) {
+        connect().catch(error => console.warn(`${LOG_PREFIX} Connect failed:`, error));
+    }
+}
+
+export function stopProcessingStatusStream(): void {
+    wanted = false;
+    if (reconnectTimer) {
+        clearTimeout(reconnectTimer);
+        reconnectTimer = null;
+    }
+    eventSource?.close();
+    eventSource = null;
+    lastEventId = null;
+}
@@ -16,7 +16,7 @@
 import CryptoJS from 'crypto-js';
 import { clientCrypto } from './clientCrypto';
 import { backendUrl } from './config';
-import { browserPhotoStorage } from './browser/photoStorage';
+import { browserPhotoStorage, type StoredPhoto } from './browser/photoStorage';
 
 // ── Types ──
 
@@ -414,7 +414,7 @@ export async function uploadToWorker(
 
 // ── Processing status sync ──
 
-interface ServerPhotoStatus {
+export interface ServerPhotoStatus {
 	id: string;
 	processing_status: string;
 	error: string | null;
@@ -480,28 +480,35 @@ export async function syncProcessingPhotosStatus(authFetch: AuthFetch): Promise<
 	for (const status of statuses) {
 		const localPhoto = photosByServerId.get(status.id);
 		if (!localPhoto) continue;
+		await applyServerPhotoStatus(localPhoto, status);
+	}
+}
 
-		if (status.deleted) {
-			console.log(`${STATUS_LOG_PREFIX} Photo ${localPhoto.id} deleted on server`);
-			await browserPhotoStorage.markPhotoAsDeleted(localPhoto.id);
-			continue;
-		}
+/**
+ * Apply one server status (an item of POST /photos/status, or a `status`
+ * event of the status stream) to a local photo that is still processing.
+ */
+export async function applyServerPhotoStatus(localPhoto: StoredPhoto, status: ServerPhotoStatus): Promise<void> {
+	if (status.deleted) {
+		console.log(`${STATUS_LOG_PREFIX} Photo ${localPhoto.id} deleted on server`);
+		await browserPhotoStorage.markPhotoAsDeleted(localPhoto.id);
+		return;
+	}
 
-		switch (status.processing_status) {
-			case 'completed':
-				console.log(`${STATUS_LOG_PREFIX} Photo ${localPhoto.id} completed`);
-				await browserPhotoStorage.markPhotoAsCompleted(localPhoto.id);
-				break;
-			case 'error':
-				console.warn(`${STATUS_LOG_PREFIX} Photo ${localPhoto.id} failed: ${status.error}`);
-				await browserPhotoStorage.markPhotoAsFailed(
-					localPhoto.id,
-					status.error || 'Server processing error'
-				);
-				break;
-			default:
-				// 'authorized' or other — still processing, no change
-				break;
-		}
+	switch (status.processing_status) {
+		case 'completed':
+			console.log(`${STATUS_LOG_PREFIX} Photo ${localPhoto.id} completed`);
+			await browserPhotoStorage.markPhotoAsCompleted(localPhoto.id);
+			break;
+		case 'error':
+			console.warn(`${STATUS_LOG_PREFIX} Photo ${localPhoto.id} failed: ${status.error}`);
+			await browserPhotoStorage.markPhotoAsFailed(
+				localPhoto.id,
+				status.error || 'Server processing error'
+			);
+			break;
+		default:
+			// 'authorized' or other — still processing, no change
+			break;
 	}
 }
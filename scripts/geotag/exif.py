@@ -1,10 +1,15 @@
 """Shared EXIF timestamp utilities for Hillview geotag tools."""
 
+import json
 import subprocess
 import sys
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Sequence
+
+# Tags needed to reconstruct the capture time (see parse_photo_timestamp).
+TIMESTAMP_TAGS = ('SubSecDateTimeOriginal', 'DateTimeOriginal', 'SubSecTimeOriginal')
 
 
 def check_exiftool():
@@ -16,45 +21,180 @@ def check_exiftool():
 		sys.exit(1)
 
 
-def get_photo_timestamp(photo_path: Path) -> Optional[datetime]:
+class ExifToolError(Exception):
+	"""exiftool reported an error for a command run through ExifToolSession."""
+
+
+class ExifToolSession:
+	"""One long-lived `exiftool -stay_open` process.
+
+	Spawning exiftool costs a Perl startup per call, which dominates when
+	tagging thousands of photos. A session keeps a single process around and
+	feeds it argument lists over stdin; each command is terminated by
+	-execute{N} and its output read up to the matching {readyN} marker.
+	Not thread-safe — use one session per thread (see ExifToolPool).
+	"""
+
+	def __init__(self):
+		self._seq = 0
+		self._proc = subprocess.Popen(
+			['exiftool', '-stay_open', 'True', '-@', '-'],
+			stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+			text=True, encoding='utf-8', bufsize=1,
+		)
+
+	def execute(self, *args: str) -> str:
+		"""Run one exiftool command and return its stdout.
+
+		Raises ExifToolError when exiftool wrote an error to stderr.
+		"""
+		stdout, errors = self.run(*args)
+		if errors:
+			raise ExifToolError('\n'.join(errors))
+		return stdout
+
+	def run(self, *args: str) -> tuple[str, list[str]]:
+		"""Run one exiftool command; return its stdout and the "Error" lines
+		it wrote to stderr. A batch read reports unreadable files there while
+		still printing the others, so callers that want the rest use this."""
+		self._seq += 1
+		ready = f'{{ready{self._seq}}}'
+		for arg in args:
+			if '\n' in arg:
+				raise ValueError(f"exiftool argument contains a newline: {arg!r}")
+		# -echo4 is printed to stderr after the command finishes, which gives
+		# us a sentinel to read stderr up to without blocking.
+		lines = [*args, '-echo4', ready, f'-execute{self._seq}']
+		self._proc.stdin.write('\n'.join(lines) + '\n')
+		self._proc.stdin.flush()
+		stdout = self._read_until(self._proc.stdout, ready)
+		stderr = self._read_until(self._proc.stderr, ready)
+		return stdout, [line for line in stderr.splitlines() if line.startswith('Error')]
+
+	@staticmethod
+	def _read_until(stream, marker: str) -> str:
+		out = []
+		while True:
+			line = stream.readline()
+			if not line:
+				raise ExifToolError("exiftool exited unexpectedly")
+			if line.rstrip('\r\n') == marker:
+				return ''.join(out)
+			out.append(line)
+
+	def close(self):
+		if self._proc.poll() is not None:
+			return
+		try:
+			self._proc.stdin.write('-stay_open\nFalse\n')
+			self._proc.stdin.flush()
+			self._proc.wait(timeout=10)
+		except (OSError, subprocess.TimeoutExpired):
+			self._proc.kill()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+
+class ExifToolPool:
+	"""Lazily creates one ExifToolSession per calling thread."""
+
+	def __init__(self):
+		self._local = threading.local()
+		self._lock = threading.Lock()
+		self._sessions: list[ExifToolSession] = []
+
+	def session(self) -> ExifToolSession:
+		session = getattr(self._local, 'session', None)
+		if session is None:
+			session = ExifToolSession()
+			self._local.session = session
+			with self._lock:
+				self._sessions.append(session)
+		return session
+
+	def close(self):
+		with self._lock:
+			sessions, self._sessions = self._sessions, []
+		for session in sessions:
+			session.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+
+def read_tags(photo_paths: Sequence[Path], tags: Sequence[str],
+			  session: Optional[ExifToolSession] = None) -> dict[Path, dict]:
+	"""Read `tags` from many files in a single exiftool invocation.
+
+	Returns {path: {tag: value}}; tags missing from a file are absent from its
+	dict, and unreadable files map to an empty dict (their errors are printed;
+	the rest of the batch is still read). Values are kept as exiftool prints
+	them (-n is not used), except that JSON may turn numeric-looking strings
+	into numbers.
+	"""
+	if not photo_paths:
+		return {}
+	args = ['-j', '-charset', 'filename=utf8', *(f'-{t}' for t in tags),
+			*(str(p) for p in photo_paths)]
+	try:
+		if session is not None:
+			stdout, errors = session.run(*args)
+		else:
+			proc = subprocess.run(['exiftool', *args], capture_output=True, text=True)
+			stdout = proc.stdout
+			errors = [line for line in proc.stderr.splitlines() if line.startswith('Error')]
+		for error in errors:
+			print(f"  Error reading tags: {error}")
+		entries = json.loads(stdout) if stdout.strip() else []
+	except (ExifToolError, json.JSONDecodeError) as e:
+		print(f"  Error reading tags: {e}")
+		entries = []
+	by_source = {entry.get('SourceFile'): entry for entry in entries}
+	return {p: by_source.get(str(p), {}) for p in photo_paths}
+
+
+def parse_photo_timestamp(tags: dict) -> Optional[datetime]:
+	"""Build the capture datetime from TIMESTAMP_TAGS as returned by read_tags."""
+	# SubSecDateTimeOriginal includes subseconds and timezone offset,
+	# e.g. "2026:03:10 16:52:43.00+01:00"
+	datetime_str = str(tags.get('SubSecDateTimeOriginal') or '').strip()
+	if datetime_str:
+		for fmt in ("%Y:%m:%d %H:%M:%S.%f%z", "%Y:%m:%d %H:%M:%S%z",
+					"%Y:%m:%d %H:%M:%S.%f", "%Y:%m:%d %H:%M:%S"):
+			try:
+				return datetime.strptime(datetime_str, fmt)
+			except ValueError:
+				continue
+
+	# Fallback: separate tags for older files without SubSecDateTimeOriginal
+	datetime_str = str(tags.get('DateTimeOriginal') or '').strip()
+	if not datetime_str:
+		return None
+	subsec = str(tags.get('SubSecTimeOriginal') or '').strip() or "0"
+	dt = datetime.strptime(datetime_str, "%Y:%m:%d %H:%M:%S")
+	microseconds = int(float(f"0.{subsec}") * 1_000_000)
+	return dt.replace(microsecond=microseconds)
+
+
+def get_photo_timestamp(photo_path: Path,
+						session: Optional[ExifToolSession] = None) -> Optional[datetime]:
 	"""Get the EXIF DateTimeOriginal as a datetime.
 
 	Returns a timezone-aware datetime when timezone info is available in EXIF,
 	otherwise a naive datetime (caller must handle timezone assumption).
 	Subsecond precision is preserved when available.
 	"""
+	tags = read_tags([photo_path], TIMESTAMP_TAGS, session)[photo_path]
 	try:
-		# SubSecDateTimeOriginal includes subseconds and timezone offset,
-		# e.g. "2026:03:10 16:52:43.00+01:00"
-		result = subprocess.run(
-			['exiftool', '-SubSecDateTimeOriginal', '-s3', str(photo_path)],
-			capture_output=True, text=True, check=True
-		)
-		datetime_str = result.stdout.strip()
-		if datetime_str:
-			for fmt in ("%Y:%m:%d %H:%M:%S.%f%z", "%Y:%m:%d %H:%M:%S%z",
-						"%Y:%m:%d %H:%M:%S.%f", "%Y:%m:%d %H:%M:%S"):
-				try:
-					return datetime.strptime(datetime_str, fmt)
-				except ValueError:
-					continue
-
-		# Fallback: separate tags for older files without SubSecDateTimeOriginal
-		result = subprocess.run(
-			['exiftool', '-DateTimeOriginal', '-SubSecTimeOriginal', '-s3', str(photo_path)],
-			capture_output=True, text=True, check=True
-		)
-		lines = result.stdout.strip().split('\n')
-		if not lines or not lines[0]:
-			return None
-		datetime_str = lines[0].strip()
-		subsec = lines[1].strip() if len(lines) > 1 and lines[1].strip() else "0"
-		dt = datetime.strptime(datetime_str, "%Y:%m:%d %H:%M:%S")
-		if subsec:
-			microseconds = int(float(f"0.{subsec}") * 1_000_000)
-			dt = dt.replace(microsecond=microseconds)
-		return dt
-	except (subprocess.CalledProcessError, ValueError) as e:
+		return parse_photo_timestamp(tags)
+	except ValueError as e:
 		print(f"  Error reading timestamp from {photo_path}: {e}")
 		return None
 
@@ -24,11 +24,20 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 
-from exif import check_exiftool, get_photo_timestamp as get_photo_datetime, datetime_to_ms
+from exif import (
+	TIMESTAMP_TAGS, ExifToolError, ExifToolPool, check_exiftool, datetime_to_ms,
+	parse_photo_timestamp, read_tags,
+)
 
 # RAW file extensions - exiftool support varies
 RAW_EXTENSIONS = {'.cr2', '.cr3', '.nef', '.arw', '.orf', '.rw2', '.dng', '.raf', '.pef', '.srw'}
 
+# Everything process_photo needs from a photo, fetched in one exiftool call.
+READ_TAGS = (*TIMESTAMP_TAGS, 'UserComment')
+
+# Files per exiftool call in the bulk-read phase.
+READ_BATCH_SIZE = 100
+
 
 @dataclass
 class PhotoResult:
@@ -165,9 +174,13 @@ def format_ts_utc(timestamp_ms: int) -> str:
 	return dt.strftime("%Y-%m-%d %H:%M:%S UTC")
 
 
-def get_photo_timestamp(photo_path: Path) -> Optional[int]:
+def get_photo_timestamp(photo_path: Path, tags: dict) -> Optional[int]:
 	"""Get the EXIF DateTimeOriginal as Unix timestamp in milliseconds."""
-	dt = get_photo_datetime(photo_path)
+	try:
+		dt = parse_photo_timestamp(tags)
+	except ValueError as e:
+		print(f"  Error reading timestamp from {photo_path}: {e}")
+		return None
 	if dt is None:
 		return None
 	if dt.tzinfo is None:
@@ -175,24 +188,47 @@ def get_photo_timestamp(photo_path: Path) -> Optional[int]:
 	return datetime_to_ms(dt)
 
 
-def get_existing_user_comment(photo_path: Path) -> Optional[dict]:
-	"""Try to read and parse existing UserComment as JSON."""
-	try:
-		result = subprocess.run(
-			['exiftool', '-UserComment', '-s3', str(photo_path)],
-			capture_output=True, text=True, check=True
-		)
-		comment = result.stdout.strip()
-		if comment:
+def get_existing_user_comment(tags: dict) -> Optional[dict]:
+	"""Try to parse the UserComment from already-read tags as JSON."""
+	comment = str(tags.get('UserComment') or '').strip()
+	if comment:
+		try:
 			return json.loads(comment)
-	except (subprocess.CalledProcessError, json.JSONDecodeError):
-		pass
+		except json.JSONDecodeError:
+			pass
 	return None
 
 
+def read_photo_tags(photos: list[Path], pool: ExifToolPool,
+					workers: int = 1) -> dict[Path, dict]:
+	"""Bulk-read READ_TAGS for all photos up front, READ_BATCH_SIZE files per call."""
+	batches = [photos[i:i + READ_BATCH_SIZE] for i in range(0, len(photos), READ_BATCH_SIZE)]
+
+	def read_batch(batch: list[Path]) -> dict[Path, dict]:
+		return read_tags(batch, READ_TAGS, pool.session())
+
+	tags: dict[Path, dict] = {}
+	if workers > 1 and len(batches) > 1:
+		with ThreadPoolExecutor(max_workers=min(workers, len(batches))) as executor:
+			for batch_tags in executor.map(read_batch, batches):
+				tags.update(batch_tags)
+	else:
+		for batch in batches:
+			tags.update(read_batch(batch))
+	return tags
+
+
 def process_photo(photo_path: Path, locations: list[LocationRecord],
 				  orientations: list[OrientationRecord], time_correction_ms: int,
-				  dry_run: bool, verbose: bool = True) -> PhotoResult:
+				  dry_run: bool, verbose: bool = True,
+				  tags: Optional[dict] = None,
+				  pool: Optional[ExifToolPool] = None) -> PhotoResult:
+	"""Tag one photo.
+
+	`tags` are the photo's READ_TAGS as returned by read_photo_tags; they are
+	read on demand when omitted. With a `pool`, exiftool calls go through the
+	calling thread's long-lived session instead of spawning a process.
+	"""
 	lines = []
 
 	def log(msg: str):
@@ -203,7 +239,11 @@ def process_photo(photo_path: Path, locations: list[LocationRecord],
 	if photo_path.suffix.lower() in RAW_EXTENSIONS:
 		log(f"  Warning: RAW file - exiftool support varies by format")
 
-	photo_ts = get_photo_timestamp(photo_path)
+	if tags is None:
+		session = pool.session() if pool is not None else None
+		tags = read_tags([photo_path], READ_TAGS, session)[photo_path]
+
+	photo_ts = get_photo_timestamp(photo_path, tags)
 	if photo_ts is None:
 		return PhotoResult(photo_path, False, "Could not read timestamp from photo")
 
@@ -238,7 +278,8 @@ def process_photo(photo_path: Path, locations: list[LocationRecord],
 		return PhotoResult(photo_path, False, "No location/orientation data", '\n'.join(lines) if lines else None)
 
 	# Build exiftool command
-	args = ['exiftool', '-overwrite_original']
+	# Same filename charset as read_tags, so non-ASCII paths resolve alike both ways
+	args = ['exiftool', '-overwrite_original', '-charset', 'filename=utf8']
 
 	if location:
 		args.append(f'-GPSLatitude*={location.latitude}')
@@ -260,7 +301,7 @@ def process_photo(photo_path: Path, locations: list[LocationRecord],
 		args.append('-GPSImgDirectionRef=True North')
 
 	# Build UserComment JSON with extra metadata
-	comment = get_existing_user_comment(photo_path) or {}
+	comment = get_existing_user_comment(tags) or {}
 	comment['ts_correction_s'] = round(time_correction_ms / 1000, 3)
 	if location:
 		comment['location_age_s'] = round((corrected_ts - location.timestamp) / 1000, 1)
@@ -291,10 +332,15 @@ def process_photo(photo_path: Path, locations: list[LocationRecord],
 		return PhotoResult(photo_path, True, f"Would tag: {loc_str}, heading: {heading_str}", '\n'.join(lines) if lines else None)
 
 	try:
-		subprocess.run(args, capture_output=True, text=True, check=True)
+		if pool is not None:
+			pool.session().execute(*args[1:])
+		else:
+			subprocess.run(args, capture_output=True, text=True, check=True)
 		return PhotoResult(photo_path, True, f"Tagged: {loc_str}, heading: {heading_str}", '\n'.join(lines) if lines else None)
 	except subprocess.CalledProcessError as e:
 		return PhotoResult(photo_path, False, f"exiftool error: {e.stderr}", '\n'.join(lines) if lines else None)
+	except ExifToolError as e:
+		return PhotoResult(photo_path, False, f"exiftool error: {e}", '\n'.join(lines) if lines else None)
 
 
 def print_result(result: PhotoResult, verbose: bool = False):
@@ -308,15 +354,19 @@ def print_result(result: PhotoResult, verbose: bool = False):
 def process_photos_sequential(photos: list[Path], locations: list[LocationRecord],
 							  orientations: list[OrientationRecord],
 							  time_correction_ms: int, dry_run: bool,
-							  verbose: bool) -> list[PhotoResult]:
+							  verbose: bool, pool: ExifToolPool) -> list[PhotoResult]:
 	"""Process photos sequentially."""
 	results = []
+	existing = [p for p in photos if p.exists()]
+	print(f"Reading EXIF from {len(existing)} photos...")
+	photo_tags = read_photo_tags(existing, pool)
 	for photo_path in photos:
 		if not photo_path.exists():
 			results.append(PhotoResult(photo_path, False, "File not found"))
 			print_result(results[-1], verbose)
 			continue
-		result = process_photo(photo_path, locations, orientations, time_correction_ms, dry_run, verbose)
+		result = process_photo(photo_path, locations, orientations, time_correction_ms, dry_run, verbose,
+							   tags=photo_tags.get(photo_path, {}), pool=pool)
 		results.append(result)
 		print_result(result, verbose)
 	return results
@@ -325,8 +375,12 @@ def process_photos_sequential(photos: list[Path], locations: list[LocationRecord
 def process_photos_parallel(photos: list[Path], locations: list[LocationRecord],
 							orientations: list[OrientationRecord],
 							time_correction_ms: int, dry_run: bool,
-							verbose: bool, workers: int) -> list[PhotoResult]:
-	"""Process photos in parallel using ThreadPoolExecutor."""
+							verbose: bool, workers: int,
+							pool: ExifToolPool) -> list[PhotoResult]:
+	"""Process photos in parallel using ThreadPoolExecutor.
+
+	Each worker thread talks to its own long-lived exiftool from `pool`.
+	"""
 	results = []
 	valid_photos = []
 
@@ -342,6 +396,9 @@ def process_photos_parallel(photos: list[Path], locations: list[LocationRecord],
 	if not valid_photos:
 		return results
 
+	print(f"Reading EXIF from {len(valid_photos)} photos...")
+	photo_tags = read_photo_tags(valid_photos, pool, workers)
+
 	print(f"Processing {len(valid_photos)} photos with {workers} workers...")
 
 	with ThreadPoolExecutor(max_workers=workers) as executor:
@@ -349,7 +406,8 @@ def process_photos_parallel(photos: list[Path], locations: list[LocationRecord],
 		future_to_photo = {
 			executor.submit(
 				process_photo, photo_path, locations, orientations,
-				time_correction_ms, dry_run, verbose
+				time_correction_ms, dry_run, verbose,
+				photo_tags.get(photo_path, {}), pool
 			): photo_path
 			for photo_path in valid_photos
 		}
@@ -388,17 +446,18 @@ def run_geotagging(csv_dir: Path, time_correction: float, photos: list[Path],
 
 	photos = sorted(photos, key=lambda p: p.name)
 
-	if parallel is not None:
-		workers = parallel if parallel > 0 else os.cpu_count() or 4
-		results = process_photos_parallel(
-			photos, locations, orientations, time_correction_ms,
-			dry_run, verbose, workers
-		)
-	else:
-		results = process_photos_sequential(
-			photos, locations, orientations, time_correction_ms,
-			dry_run, verbose
-		)
+	with ExifToolPool() as pool:
+		if parallel is not None:
+			workers = parallel if parallel > 0 else os.cpu_count() or 4
+			results = process_photos_parallel(
+				photos, locations, orientations, time_correction_ms,
+				dry_run, verbose, workers, pool
+			)
+		else:
+			results = process_photos_sequential(
+				photos, locations, orientations, time_correction_ms,
+				dry_run, verbose, pool
+			)
 
 	print()
 	print("\nSummary:")
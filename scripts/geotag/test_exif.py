@@ -0,0 +1,113 @@
+"""Tests for exif.read_tags and ExifToolSession, against a fake `exiftool`.
+
+The fake speaks the -stay_open protocol (arguments on stdin, -executeN,
+{readyN} on stdout, the -echo4 marker on stderr) and, like exiftool, prints
+JSON for the files it can read and an "Error: ..." line per file it can't.
+
+Run:
+	pytest test_exif.py -v
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from exif import ExifToolError, ExifToolSession, TIMESTAMP_TAGS, read_tags
+
+FAKE_EXIFTOOL = '''\
+import json, sys
+
+def run(args):
+	marker = None
+	if '-echo4' in args:
+		marker = args[args.index('-echo4') + 1]
+	files = [a for a in args if a.endswith('.jpg')]
+	entries, errors = [], []
+	for f in files:
+		try:
+			text = open(f, encoding='utf-8').read()
+		except OSError:
+			text = ''
+		if text.startswith('DateTimeOriginal='):
+			entries.append({'SourceFile': f, 'DateTimeOriginal': text.split('=', 1)[1].strip()})
+		else:
+			errors.append(f'Error: File format error - {f}')
+	if entries:
+		sys.stdout.write(json.dumps(entries) + '\\n')
+	for e in errors:
+		sys.stderr.write(e + '\\n')
+	return marker
+
+if '-stay_open' not in sys.argv:
+	run(sys.argv[1:])
+	sys.exit(0)
+
+args = []
+for line in sys.stdin:
+	line = line.rstrip('\\n')
+	if line.startswith('-execute'):
+		marker = run(args)
+		sys.stdout.write('{ready' + line[len('-execute'):] + '}\\n')
+		sys.stdout.flush()
+		if marker:
+			sys.stderr.write(marker + '\\n')
+		sys.stderr.flush()
+		args = []
+	elif args[-1:] == ['-stay_open'] and line == 'False':
+		break
+	else:
+		args.append(line)
+'''
+
+
+@pytest.fixture
+def fake_exiftool(tmp_path, monkeypatch):
+	bin_dir = tmp_path / 'bin'
+	bin_dir.mkdir()
+	exe = bin_dir / 'exiftool'
+	exe.write_text(f'#!{sys.executable}\n' + FAKE_EXIFTOOL)
+	exe.chmod(0o755)
+	monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+	return exe
+
+
+def photos(tmp_path, n_good, bad_at):
+	paths = []
+	for i in range(n_good + 1):
+		p = tmp_path / f'IMG_{i:03d}.jpg'
+		if i == bad_at:
+			p.write_text('not an image')
+		else:
+			p.write_text(f'DateTimeOriginal=2026:03:10 16:52:{i % 60:02d}')
+		paths.append(p)
+	return paths
+
+
+def test_one_bad_file_does_not_lose_the_batch(fake_exiftool, tmp_path, capsys):
+	paths = photos(tmp_path, n_good=99, bad_at=42)
+	with ExifToolSession() as session:
+		tags = read_tags(paths, TIMESTAMP_TAGS, session)
+	assert tags[paths[42]] == {}
+	assert tags[paths[0]]['DateTimeOriginal'] == '2026:03:10 16:52:00'
+	assert sum(1 for t in tags.values() if t) == 99
+	assert 'IMG_042.jpg' in capsys.readouterr().out
+
+
+def test_one_bad_file_without_a_session(fake_exiftool, tmp_path):
+	paths = photos(tmp_path, n_good=3, bad_at=1)
+	tags = read_tags(paths, TIMESTAMP_TAGS)
+	assert [bool(tags[p]) for p in paths] == [True, False, True, True]
+
+
+def test_execute_still_raises_on_errors(fake_exiftool, tmp_path):
+	paths = photos(tmp_path, n_good=1, bad_at=0)
+	with ExifToolSession() as session:
+		with pytest.raises(ExifToolError, match='IMG_000.jpg'):
+			session.execute('-j', *(str(p) for p in paths))
+		# the session stays usable after an error
+		stdout, errors = session.run('-j', str(paths[1]))
+		assert errors == [] and 'IMG_001.jpg' in stdout
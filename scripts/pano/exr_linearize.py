@@ -26,27 +26,40 @@ Uses the OpenEXR Python library directly (not pyvips), because some
 libvips builds have openexrload without openexrsave.
 
 Usage:
-	exr_linearize.py FILE.exr              # overwrite in place, drop alpha
-	exr_linearize.py FILE.exr -o OUT.exr   # write to a new file
-	exr_linearize.py FILE.exr --keep-alpha # preserve alpha (rare)
-
-Memory: loads all channels into numpy arrays via OpenEXR.File
-(separate_channels=True). For a gigapixel 4-channel half-float pano
-that's ~4.5 GB; for float32 ~9 GB. Modern File API is required because
-the legacy InputFile/OutputFile path silently drops custom-named string
-attributes — exr_meta.py set's hillview:encoding=linear write would be
-a no-op there.
+	exr_linearize.py FILE.exr                # overwrite in place, drop alpha
+	exr_linearize.py FILE.exr -o OUT.exr     # write to a new file
+	exr_linearize.py FILE.exr --keep-alpha   # preserve alpha (rare)
+	exr_linearize.py FILE.exr --chunk-rows 0 # whole-image, in-memory
+
+Memory: by default the image is streamed in blocks of --chunk-rows
+scanlines: read through the legacy InputFile scanline interface, run
+through inv_srgb on a thread pool, and appended to a scanline
+OutputFile in order. Peak RAM is a few chunks (bounded by --threads),
+not the image. Tiled input is read fine but always written back as
+scanlines.
+
+--chunk-rows 0 keeps the old whole-image path: all channels loaded into
+numpy arrays via OpenEXR.File (separate_channels=True). For a gigapixel
+4-channel half-float pano that's ~4.5 GB; for float32 ~9 GB.
+
+Either way the hillview:encoding tag goes into the output header, so
+the file is written exactly once. The input's other header attributes
+(owner, software, custom hillview:* keys) are carried over as-is.
 """
 
 import argparse
-import subprocess
+import os
 import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import Imath
+
 import numpy as np
 import OpenEXR
 
-EXR_META = Path(__file__).resolve().parent / "exr_meta.py"
+ENCODING_ATTR = "hillview:encoding"
 
 
 def inv_srgb(v: np.ndarray) -> np.ndarray:
@@ -66,7 +79,30 @@ def inv_srgb(v: np.ndarray) -> np.ndarray:
 		).astype(np.float32)
 
 
-def linearize(in_path: Path, out_path: Path, keep_alpha: bool = False) -> None:
+# Scanlines per block in chunked mode. A multiple of 32 so blocks line up
+# with PIZ/B44 compression chunks (ZIP uses 16) and nothing is decoded twice.
+DEFAULT_CHUNK_ROWS = 64
+
+# Legacy Imath pixel types -> numpy storage dtype.
+_NP_DTYPES = {
+		Imath.PixelType.UINT: np.uint32,
+		Imath.PixelType.HALF: np.float16,
+		Imath.PixelType.FLOAT: np.float32,
+}
+
+
+def linearize(in_path: Path, out_path: Path, keep_alpha: bool = False,
+							chunk_rows: int = 0, threads: int | None = None) -> None:
+		"""Linearize in_path into out_path.
+
+		chunk_rows > 0 streams the image in blocks of that many scanlines
+		(see linearize_chunked); 0 loads the whole image at once.
+		"""
+		if chunk_rows > 0:
+				linearize_chunked(in_path, out_path, keep_alpha=keep_alpha,
+													chunk_rows=chunk_rows, threads=threads)
+				return
+
 		f = OpenEXR.File(str(in_path), separate_channels=True)
 		src_channels = f.channels()
 		print(f"  channels in:  {list(src_channels.keys())}", file=sys.stderr)
@@ -95,10 +131,85 @@ def linearize(in_path: Path, out_path: Path, keep_alpha: bool = False) -> None:
 		# accept but isn't guaranteed to.
 		hdr = {k: v for k, v in f.header().items()
 					 if k not in ("channels", "dataWindow", "displayWindow")}
+		hdr[ENCODING_ATTR] = "linear"
 
 		OpenEXR.File(hdr, new_channels).write(str(out_path))
 
 
+def _linearize_block(block: dict[str, bytes], dtypes: dict[str, type],
+										 passthrough: set[str]) -> dict[str, bytes]:
+		"""inv_srgb one block of raw scanline bytes, channel storage type preserved."""
+		out = {}
+		for name, raw in block.items():
+				if name in passthrough:
+						out[name] = raw
+						continue
+				px = np.frombuffer(raw, dtype=dtypes[name])
+				out[name] = inv_srgb(px.astype(np.float32)).astype(dtypes[name]).tobytes()
+		return out
+
+
+def linearize_chunked(in_path: Path, out_path: Path, keep_alpha: bool = False,
+											chunk_rows: int = DEFAULT_CHUNK_ROWS,
+											threads: int | None = None) -> None:
+		"""Streaming linearize: peak memory ~ chunk_rows * width * (2 * threads + 1).
+
+		Reading and writing stay on the calling thread (OpenEXR does its own
+		decompression threading); only the per-block math is farmed out. At
+		most 2 * threads blocks are in flight, and results are written
+		strictly in scanline order.
+		"""
+		threads = threads or os.cpu_count() or 4
+		src = OpenEXR.InputFile(str(in_path))
+		try:
+				hdr = src.header()
+				src_channels = hdr["channels"]
+				print(f"  channels in:  {list(src_channels.keys())}", file=sys.stderr)
+
+				# Same alpha policy as the in-memory path: drop by default,
+				# pass through untouched with keep_alpha.
+				names = [n for n in src_channels if keep_alpha or n.upper() != "A"]
+				passthrough = {n for n in names if n.upper() == "A"}
+				dtypes = {n: _NP_DTYPES[src_channels[n].type.v] for n in names}
+				print(f"  channels out: {names}", file=sys.stderr)
+
+				out_hdr = dict(hdr)
+				out_hdr["channels"] = {n: src_channels[n] for n in names}
+				# Blocks are appended top-to-bottom, so the output is always an
+				# INCREASING_Y scanline image whatever the input layout was.
+				out_hdr.pop("tiles", None)
+				out_hdr["type"] = b"scanlineimage"
+				out_hdr["lineOrder"] = Imath.LineOrder(Imath.LineOrder.INCREASING_Y)
+				# The legacy API hands string attributes back as bytes and only
+				# writes them when given bytes (a str value is dropped with an
+				# "unknown attribute" warning), so the tag goes in as bytes too.
+				out_hdr[ENCODING_ATTR] = b"linear"
+
+				dw = hdr["dataWindow"]
+				y_min, y_max = dw.min.y, dw.max.y
+
+				dst = OpenEXR.OutputFile(str(out_path), out_hdr)
+				try:
+						pending: deque = deque()
+						with ThreadPoolExecutor(max_workers=threads) as pool:
+								for y in range(y_min, y_max + 1, chunk_rows):
+										y_end = min(y + chunk_rows - 1, y_max)
+										raw = src.channels(names, scanLine1=y, scanLine2=y_end)
+										block = dict(zip(names, raw))
+										pending.append((pool.submit(_linearize_block, block, dtypes, passthrough),
+																		y_end - y + 1))
+										if len(pending) >= 2 * threads:
+												fut, rows = pending.popleft()
+												dst.writePixels(fut.result(), rows)
+								while pending:
+										fut, rows = pending.popleft()
+										dst.writePixels(fut.result(), rows)
+				finally:
+						dst.close()
+		finally:
+				src.close()
+
+
 def main() -> int:
 		ap = argparse.ArgumentParser(
 				description=__doc__,
@@ -110,6 +221,11 @@ def main() -> int:
 		ap.add_argument("--keep-alpha", action="store_true",
 										help="Preserve alpha channel (default: drop). "
 												 "Rare — useful only for deliberate compositing.")
+		ap.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+										help="Scanlines per streamed block; 0 = load the whole "
+												 f"image into memory (default: {DEFAULT_CHUNK_ROWS})")
+		ap.add_argument("--threads", type=int, default=None,
+										help="Worker threads for chunked mode (default: CPU count)")
 		args = ap.parse_args()
 
 		in_path = Path(args.input).resolve()
@@ -121,13 +237,10 @@ def main() -> int:
 
 		tmp = out_path.with_name(out_path.stem + ".linearize.exr")
 		print(f"linearizing {in_path.name} -> {tmp.name}", file=sys.stderr)
-		linearize(in_path, tmp, keep_alpha=args.keep_alpha)
+		linearize(in_path, tmp, keep_alpha=args.keep_alpha,
+							chunk_rows=args.chunk_rows, threads=args.threads)
 		tmp.replace(out_path)
-		print(f"linearized: {out_path}", file=sys.stderr)
-
-		print(f"tagging hillview:encoding=linear ...", file=sys.stderr)
-		subprocess.check_call([str(EXR_META), "set", str(out_path),
-													 "--encoding", "linear"])
+		print(f"linearized: {out_path} ({ENCODING_ATTR}=linear)", file=sys.stderr)
 		return 0
 
 
@@ -22,6 +22,11 @@ What's verified:
 	- linearize applies inv_srgb to RGB (constant fill round-trips through
 		the known transfer-function value).
 	- Mixed HALF + FLOAT channels in one image survive linearize.
+	- Chunked (streaming) linearize is bit-identical to the in-memory path
+		for chunk sizes that do and don't divide the height, for a data
+		window that doesn't start at y=0, and for tiled input.
+	- Both linearize paths write hillview:encoding=linear themselves and
+		carry the input's other header attributes over.
 
 Run:
 	./test_exr_chunking.py
@@ -81,8 +86,8 @@ def read_pixels(path):
 	return {name: ch.pixels for name, ch in f.channels().items()}
 
 
-# A few heights that exercise different shapes (no chunking anymore, but
-# size-dependent bugs still possible — height==1, height==prime, etc.).
+# A few heights that exercise different shapes (size-dependent bugs —
+# height==1, height==prime, chunk boundaries, etc.).
 TEST_HEIGHTS = [1, 4, 17, 200]
 
 
@@ -257,27 +262,145 @@ def test_linearize_preserves_storage_type(tmp_path):
 	assert after['A'].dtype == np.float32
 
 
+# --- chunked linearize ---
+
+
+def assert_same_pixels(a, b):
+	assert set(a) == set(b)
+	for c in a:
+		assert a[c].dtype == b[c].dtype, f"channel {c} dtype differs"
+		np.testing.assert_array_equal(a[c], b[c], err_msg=f"channel {c} differs")
+
+
+@pytest.mark.parametrize("height", TEST_HEIGHTS)
+@pytest.mark.parametrize("chunk_rows", [1, 7, 64])
+@pytest.mark.parametrize("keep_alpha", [False, True])
+def test_linearize_chunked_matches_in_memory(tmp_path, height, chunk_rows, keep_alpha):
+	src = tmp_path / "img.exr"
+	whole = tmp_path / "whole.exr"
+	chunked = tmp_path / "chunked.exr"
+	make_test_exr(src, width=32, height=height, dtype=np.float16)
+	exr_linearize.linearize(src, whole, keep_alpha=keep_alpha)
+	exr_linearize.linearize(src, chunked, keep_alpha=keep_alpha,
+													chunk_rows=chunk_rows, threads=3)
+	assert_same_pixels(read_pixels(whole), read_pixels(chunked))
+
+
+def test_linearize_chunked_preserves_storage_type(tmp_path):
+	src = tmp_path / "img.exr"
+	out = tmp_path / "out.exr"
+	chans = {
+		'R': np.full((17, 8), 0.5, dtype=np.float16),
+		'G': np.full((17, 8), 0.5, dtype=np.float32),
+		'A': np.full((17, 8), 0.5, dtype=np.float32),
+	}
+	header = {"compression": OpenEXR.ZIP_COMPRESSION, "type": OpenEXR.scanlineimage}
+	OpenEXR.File(header, chans).write(str(src))
+
+	exr_linearize.linearize(src, out, keep_alpha=True, chunk_rows=4)
+
+	after = read_pixels(out)
+	assert after['R'].dtype == np.float16
+	assert after['G'].dtype == np.float32
+	np.testing.assert_allclose(after['R'], 0.21404, atol=1e-3)
+	np.testing.assert_array_equal(after['A'], np.full((17, 8), 0.5, dtype=np.float32))
+
+
+def test_linearize_chunked_offset_data_window(tmp_path):
+	"""Scanline indices are absolute; a data window starting at y != 0
+	must still be read and written in full."""
+	src = tmp_path / "img.exr"
+	whole = tmp_path / "whole.exr"
+	chunked = tmp_path / "chunked.exr"
+	arr = (np.arange(10 * 8).reshape(10, 8) / 80.0).astype(np.float32)
+	header = {
+		"compression": OpenEXR.ZIP_COMPRESSION,
+		"type": OpenEXR.scanlineimage,
+		"dataWindow": (np.array([3, 5], dtype=np.int32), np.array([10, 14], dtype=np.int32)),
+		"displayWindow": (np.array([0, 0], dtype=np.int32), np.array([19, 19], dtype=np.int32)),
+	}
+	OpenEXR.File(header, {"R": arr, "G": arr, "B": arr}).write(str(src))
+	exr_linearize.linearize(src, whole)
+	exr_linearize.linearize(src, chunked, chunk_rows=3)
+	assert_same_pixels(read_pixels(whole), read_pixels(chunked))
+
+
+def test_linearize_chunked_tiled_input(tmp_path):
+	"""Tiled input streams through the scanline reader and comes out as
+	a scanline image with the same pixels."""
+	src = tmp_path / "img.exr"
+	whole = tmp_path / "whole.exr"
+	chunked = tmp_path / "chunked.exr"
+	arr = (np.arange(40 * 24).reshape(40, 24) % 97 / 96.0).astype(np.float16)
+	tiles = OpenEXR.TileDescription()
+	tiles.xSize = 16
+	tiles.ySize = 16
+	header = {"compression": OpenEXR.ZIP_COMPRESSION, "type": OpenEXR.tiledimage,
+						"tiles": tiles}
+	OpenEXR.File(header, {"R": arr, "G": arr, "B": arr}).write(str(src))
+	exr_linearize.linearize(src, whole)
+	exr_linearize.linearize(src, chunked, chunk_rows=5)
+	assert OpenEXR.File(str(chunked)).header()["type"] == OpenEXR.scanlineimage
+	assert_same_pixels(read_pixels(whole), read_pixels(chunked))
+
+
 # --- end-to-end pipeline integration ---
 
 
-def test_linearize_then_set_encoding_roundtrip(tmp_path):
-	"""The pipeline does linearize first, then exr_meta set --encoding linear
-	(via subprocess). Verify we don't lose either pixel changes or the
-	attribute when both run."""
+@pytest.mark.parametrize("chunk_rows", [0, 3])
+def test_linearize_tags_encoding_in_the_same_write(tmp_path, chunk_rows):
+	"""The output carries hillview:encoding=linear straight from
+	linearize; no exr_meta.py rewrite of the whole image afterwards."""
 	src = tmp_path / "img.exr"
-	mid = tmp_path / "linearized.exr"
+	out = tmp_path / "out.exr"
 	make_constant_exr(src, width=16, height=8,
 										channels=("R", "G", "B"), dtype=np.float32, value=0.5)
-	exr_linearize.linearize(src, mid)
-	exr_meta.set_encoding(str(mid), "linear")
+	exr_meta.set_encoding(str(src), "srgb")
+	exr_linearize.linearize(src, out, chunk_rows=chunk_rows)
 
-	# Attribute persisted
-	assert exr_meta.read_encoding(str(mid)) == "linear"
-	# Pixels are linearized
-	after = read_pixels(mid)
+	assert exr_meta.read_encoding(str(out)) == "linear"
+	after = read_pixels(out)
 	for c in ("R", "G", "B"):
 		np.testing.assert_allclose(after[c], 0.21404, atol=1e-4)
 
 
+@pytest.mark.parametrize("chunk_rows", [0, 3])
+def test_linearize_keeps_input_attributes(tmp_path, chunk_rows):
+	"""Standard and custom header attributes of the input survive."""
+	src = tmp_path / "img.exr"
+	out = tmp_path / "out.exr"
+	arr = np.full((8, 16), 0.5, dtype=np.float16)
+	header = {
+		"compression": OpenEXR.ZIP_COMPRESSION,
+		"type": OpenEXR.scanlineimage,
+		"owner": "Someone",
+		"software": "Hugin",
+		"hillview:source": "IMG_0001-IMG_0012",
+		"custom_int": 7,
+		"custom_float": 1.5,
+	}
+	OpenEXR.File(header, {"R": arr, "G": arr, "B": arr}).write(str(src))
+	exr_linearize.linearize(src, out, chunk_rows=chunk_rows)
+
+	got = OpenEXR.File(str(out), header_only=True).header()
+	assert got["owner"] == "Someone"
+	assert got["software"] == "Hugin"
+	assert got["hillview:source"] == "IMG_0001-IMG_0012"
+	assert got["custom_int"] == 7
+	assert got["custom_float"] == pytest.approx(1.5)
+	assert got["compression"] == OpenEXR.ZIP_COMPRESSION
+
+
+def test_main_writes_tagged_file_in_place(tmp_path, monkeypatch):
+	src = tmp_path / "img.exr"
+	make_constant_exr(src, width=16, height=8,
+										channels=("R", "G", "B", "A"), dtype=np.float16, value=0.5)
+	monkeypatch.setattr(sys, "argv", ["exr_linearize.py", str(src), "--chunk-rows", "4"])
+	assert exr_linearize.main() == 0
+	assert exr_meta.read_encoding(str(src)) == "linear"
+	assert set(read_pixels(src)) == {"R", "G", "B"}
+	assert [p.name for p in tmp_path.iterdir()] == ["img.exr"]
+
+
 if __name__ == "__main__":
 	sys.exit(pytest.main([__file__, "-v"]))